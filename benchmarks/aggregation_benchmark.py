@@ -0,0 +1,62 @@
+"""Benchmark for evaluating a GROUP BY in parallel.
+
+Run from the repository root with:
+    python -m benchmarks.aggregation_benchmark [num_rows] [num_groups]
+
+This runs a GROUP BY with several aggregates over one large table, using
+different numbers of worker processes. Each worker pre-aggregates a range of
+the rows and then merges one partition of the groups, so the speedup is
+bounded by the number of cores.
+"""
+import collections
+import multiprocessing
+import sys
+import time
+
+from tinyquery import context, tinyquery, tq_types
+
+
+QUERY = (
+    'SELECT user_id, COUNT(*), SUM(value), MAX(value), AVG(value) '
+    'FROM ds.events GROUP BY user_id')
+
+
+def make_table(num_rows, num_groups):
+    return tinyquery.Table(
+        'ds.events',
+        num_rows,
+        collections.OrderedDict([
+            ('user_id', context.Column(tq_types.INT,
+                                       [i % num_groups
+                                        for i in xrange(num_rows)])),
+            ('value', context.Column(tq_types.INT, range(num_rows))),
+        ]))
+
+
+def sorted_rows(result):
+    return sorted(zip(*[column.values
+                        for column in result.columns.itervalues()]))
+
+
+def main(num_rows, num_groups):
+    tq = tinyquery.TinyQuery()
+    tq.load_table_or_view(make_table(num_rows, num_groups))
+    print('{} rows in {} groups, {} cores'.format(
+        num_rows, num_groups, multiprocessing.cpu_count()))
+    expected_rows = None
+    for num_workers in (1, 2, 4, 8):
+        tq.num_query_workers = num_workers
+        start_time = time.time()
+        result = tq.evaluate_query(QUERY)
+        elapsed_time = time.time() - start_time
+        # The groups come back in a different order in parallel.
+        rows = sorted_rows(result)
+        if expected_rows is None:
+            expected_rows = rows
+        assert rows == expected_rows
+        print('{} workers: {:.2f}s'.format(num_workers, elapsed_time))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000 * 1000,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 1000)
@@ -0,0 +1,82 @@
+"""Benchmark for sharing one TinyQuery service between many threads.
+
+Run from the repository root with:
+    python -m benchmarks.concurrency_benchmark [num_rows]
+
+Each thread runs a mix of queries against a shared table while one writer
+thread keeps streaming rows into it, and we report the total query throughput
+for 1, 4 and 16 threads. Evaluation is pure Python, so the GIL keeps the
+throughput from scaling with threads; the point is that it shouldn't drop
+much either, since queries only wait for writers, not for each other.
+"""
+import collections
+import sys
+import threading
+import time
+
+from tinyquery import context, tinyquery, tq_types
+
+
+QUERIES = [
+    'SELECT COUNT(*) FROM ds.events WHERE value < 10',
+    'SELECT value, COUNT(*) FROM ds.events GROUP BY value',
+    'SELECT MAX(ts) FROM ds.events',
+]
+
+DURATION_SECONDS = 5
+
+
+def make_table(num_rows):
+    return tinyquery.Table(
+        'ds.events',
+        num_rows,
+        collections.OrderedDict([
+            ('ts', context.Column(tq_types.INT, range(num_rows))),
+            ('value', context.Column(tq_types.INT,
+                                     [i % 100 for i in xrange(num_rows)])),
+        ]))
+
+
+def run_threads(tq, num_threads):
+    """Run queries from num_threads threads and return the queries/second."""
+    stop_event = threading.Event()
+    query_counts = [0] * num_threads
+
+    def run_queries(thread_num):
+        while not stop_event.is_set():
+            tq.evaluate_query(QUERIES[query_counts[thread_num] % len(QUERIES)])
+            query_counts[thread_num] += 1
+
+    def stream_rows():
+        while not stop_event.is_set():
+            tq.insert_rows('ds', 'events',
+                           [(None, {'ts': i, 'value': i % 100})
+                            for i in xrange(100)])
+            time.sleep(0.1)
+
+    threads = [threading.Thread(target=run_queries, args=(thread_num,))
+               for thread_num in xrange(num_threads)]
+    threads.append(threading.Thread(target=stream_rows))
+    start_time = time.time()
+    for thread in threads:
+        thread.start()
+    time.sleep(DURATION_SECONDS)
+    stop_event.set()
+    for thread in threads:
+        thread.join()
+    # Queries that were running when we asked the threads to stop are still
+    # counted, so include the time taken to finish them.
+    return sum(query_counts) / (time.time() - start_time)
+
+
+def main(num_rows):
+    for num_threads in (1, 4, 16):
+        tq = tinyquery.TinyQuery()
+        tq.load_table_or_view(make_table(num_rows))
+        queries_per_second = run_threads(tq, num_threads)
+        print('{:2d} threads: {:.1f} queries/s'.format(
+            num_threads, queries_per_second))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10 * 1000)
@@ -0,0 +1,70 @@
+"""Benchmark for evaluating a join in parallel.
+
+Run from the repository root with:
+    python -m benchmarks.join_benchmark [num_rows] [num_users]
+
+This joins a large event table with a smaller table of users, with the large
+table on each side of the join, using different numbers of worker processes.
+Each worker partitions a range of the rows of one side and then joins one
+partition, so the speedup is bounded by the number of cores.
+"""
+import collections
+import multiprocessing
+import sys
+import time
+
+from tinyquery import context, tinyquery, tq_types
+
+
+QUERIES = [
+    'SELECT e.value, u.name FROM ds.events e '
+    'LEFT OUTER JOIN EACH ds.users u ON e.user_id = u.user_id',
+    'SELECT u.name, e.value FROM ds.users u '
+    'JOIN EACH ds.events e ON u.user_id = e.user_id',
+]
+
+
+def make_tables(tq, num_rows, num_users):
+    tq.load_table_or_view(tinyquery.Table(
+        'ds.events',
+        num_rows,
+        collections.OrderedDict([
+            # Some events are for users that don't exist.
+            ('user_id', context.Column(tq_types.INT,
+                                       [i % (num_users + 10)
+                                        for i in xrange(num_rows)])),
+            ('value', context.Column(tq_types.INT, range(num_rows))),
+        ])))
+    tq.load_table_or_view(tinyquery.Table(
+        'ds.users',
+        num_users,
+        collections.OrderedDict([
+            ('user_id', context.Column(tq_types.INT, range(num_users))),
+            ('name', context.Column(tq_types.STRING,
+                                    ['user{}'.format(i)
+                                     for i in xrange(num_users)])),
+        ])))
+
+
+def main(num_rows, num_users):
+    tq = tinyquery.TinyQuery()
+    make_tables(tq, num_rows, num_users)
+    print('{} events, {} users, {} cores'.format(
+        num_rows, num_users, multiprocessing.cpu_count()))
+    for query in QUERIES:
+        print(query)
+        expected_result = None
+        for num_workers in (1, 2, 4, 8):
+            tq.num_query_workers = num_workers
+            start_time = time.time()
+            result = tq.evaluate_query(query)
+            elapsed_time = time.time() - start_time
+            if expected_result is None:
+                expected_result = result
+            assert result == expected_result
+            print('{} workers: {:.2f}s'.format(num_workers, elapsed_time))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000 * 1000,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 1000)
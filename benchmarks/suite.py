@@ -0,0 +1,411 @@
+"""A suite of benchmarks for the hot paths of the query engine.
+
+Run from the repository root with:
+    python -m benchmarks.suite [--output results.json] [--baseline old.json]
+
+Each benchmark builds its synthetic tables (see benchmarks.synthetic), runs
+its workload once to warm up, and then times it --repeat times. The results
+are written as JSON, so that the results from two commits can be compared:
+
+    git checkout old_commit && python -m benchmarks.suite -o old.json
+    git checkout new_commit && python -m benchmarks.suite -b old.json
+
+With --baseline, any benchmark whose median time grew by more than
+--threshold (as a fraction) compared to the baseline is reported as a
+regression, and the exit status is 1. Only compare results from the same
+machine and the same --scale.
+"""
+import argparse
+import atexit
+import collections
+import functools
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+from benchmarks import synthetic
+from tinyquery import api_client, compiler, parser, tinyquery
+
+
+# The number of rows in the main table of each benchmark, before scaling.
+BASE_ROWS = 100000
+
+
+class Benchmark(collections.namedtuple('Benchmark', ['name', 'setup'])):
+    """One workload to time.
+
+    Fields:
+        name: The unique name of the benchmark.
+        setup: A function that takes the scale and builds everything the
+            workload needs, and returns a function that runs the workload
+            once. Only the returned function is timed.
+    """
+
+
+def scaled_rows(scale, num_rows=BASE_ROWS):
+    return max(1, int(num_rows * scale))
+
+
+def make_service(*tables):
+    tq = tinyquery.TinyQuery()
+    for table in tables:
+        tq.load_table_or_view(table)
+    return tq
+
+
+def query_benchmark(name, make_tables, query):
+    """Make a Benchmark that evaluates a query.
+
+    Arguments:
+        name: The name of the benchmark.
+        make_tables: A function that takes the scale and returns a list of
+            the tables that the query reads.
+        query: The query to evaluate.
+    """
+    def setup(scale):
+        tq = make_service(*make_tables(scale))
+        return lambda: tq.evaluate_query(query)
+    return Benchmark(name, setup)
+
+
+def events_table(scale, key_cardinality=1000):
+    return synthetic.make_table(
+        'ds.events',
+        synthetic.table_spec(scaled_rows(scale),
+                             key_cardinality=key_cardinality))
+
+
+def scan_filter_benchmark():
+    return query_benchmark(
+        'scan_filter',
+        lambda scale: [events_table(scale)],
+        'SELECT id, value, name FROM ds.events '
+        'WHERE value > 500000 AND score < 0.5')
+
+
+def nullable_aggregate_benchmark():
+    return query_benchmark(
+        'nullable_aggregate',
+        lambda scale: [events_table(scale)],
+        'SELECT COUNT(value), SUM(value), AVG(value), MIN(value), '
+        'MAX(value) FROM ds.events')
+
+
+def nullable_arithmetic_benchmark():
+    return query_benchmark(
+        'nullable_arithmetic',
+        lambda scale: [events_table(scale)],
+        'SELECT SUM(value * 2 + key), COUNT(value - key) FROM ds.events '
+        'WHERE value IS NULL OR value > key')
+
+
+def expensive_branch_benchmark(name, query):
+    """A query with an expensive argument that few rows need evaluated."""
+    return query_benchmark('expensive_branch_' + name,
+                           lambda scale: [events_table(scale)], query)
+
+
+def group_by_benchmark(key_cardinality):
+    return query_benchmark(
+        'group_by_{}_keys'.format(key_cardinality),
+        lambda scale: [events_table(scale, key_cardinality)],
+        'SELECT key, COUNT(*), SUM(value), MAX(score), COUNT(DISTINCT name) '
+        'FROM ds.events GROUP BY key')
+
+
+def join_benchmark(fan_out):
+    """Join events to a table with fan_out rows for each key."""
+    def make_tables(scale):
+        num_keys = 1000
+        left_spec = synthetic.table_spec(
+            max(1, scaled_rows(scale) // fan_out), key_cardinality=num_keys)
+        right_spec = synthetic.table_spec(num_keys * fan_out,
+                                          key_cardinality=num_keys, seed=1)
+        right_columns = synthetic.make_columns(right_spec)
+        # Give each key exactly fan_out rows.
+        right_columns['key'] = right_columns['key']._replace(
+            values=[i % num_keys for i in xrange(right_spec.num_rows)])
+        return [synthetic.make_table('ds.events', left_spec),
+                tinyquery.Table('ds.users', right_spec.num_rows,
+                                right_columns)]
+    return query_benchmark(
+        'join_fan_out_{}'.format(fan_out),
+        make_tables,
+        'SELECT e.id, u.name FROM ds.events e '
+        'JOIN ds.users u ON e.key = u.key')
+
+
+def string_key_benchmarks(query_name, query):
+    """Make a pair of Benchmarks for a query on the name column.
+
+    One reads a table with a plain name column, and the other reads the same
+    table with its name column dictionary-encoded.
+    """
+    def make_tables(encode_strings, scale):
+        spec = synthetic.table_spec(scaled_rows(scale), key_cardinality=100)
+        return [synthetic.make_table('ds.events', spec, encode_strings),
+                synthetic.make_table('ds.names', synthetic.table_spec(
+                    100, key_cardinality=100, null_ratio=0, seed=0),
+                    encode_strings)]
+    return [
+        query_benchmark(
+            'string_{}_{}'.format(query_name,
+                                  'encoded' if encode_strings else 'plain'),
+            functools.partial(make_tables, encode_strings),
+            query)
+        for encode_strings in (False, True)]
+
+
+def run_length_benchmarks(query_name, query):
+    """Make a pair of Benchmarks for a query on the day and tenant columns.
+
+    One reads a table with plain columns, and the other reads the same table
+    with its day and tenant columns run-length encoded.
+    """
+    def make_tables(encode_runs, scale):
+        spec = synthetic.table_spec(scaled_rows(scale), key_cardinality=100)
+        return [synthetic.make_run_table('ds.events', spec, encode_runs)]
+    return [
+        query_benchmark(
+            'runs_{}_{}'.format(query_name,
+                                'encoded' if encode_runs else 'plain'),
+            functools.partial(make_tables, encode_runs),
+            query)
+        for encode_runs in (False, True)]
+
+
+def union_benchmark(num_shards):
+    def make_tables(scale):
+        rows_per_shard = max(1, scaled_rows(scale) // num_shards)
+        return [synthetic.make_table(
+            'ds.shard_{:04d}'.format(shard_num),
+            synthetic.table_spec(rows_per_shard, seed=shard_num))
+            for shard_num in xrange(num_shards)]
+    tables = ', '.join('ds.shard_{:04d}'.format(shard_num)
+                       for shard_num in xrange(num_shards))
+    return query_benchmark(
+        'union_{}_shards'.format(num_shards),
+        make_tables,
+        'SELECT COUNT(*), SUM(value) FROM {} WHERE key < 500'.format(tables))
+
+
+def csv_load_benchmark():
+    def setup(scale):
+        temp_dir = tempfile.mkdtemp()
+        atexit.register(shutil.rmtree, temp_dir, True)
+        filename = os.path.join(temp_dir, 'events.csv')
+        synthetic.write_csv(filename,
+                            synthetic.table_spec(scaled_rows(scale)))
+        return lambda: tinyquery.TinyQuery().load_table_from_csv(
+            'ds.events', synthetic.get_raw_schema(), filename)
+    return Benchmark('csv_load', setup)
+
+
+def rows_from_table_benchmark():
+    def setup(scale):
+        table = events_table(scale)
+        return lambda: list(api_client.rows_from_table(table))
+    return Benchmark('rows_from_table', setup)
+
+
+# A query with a bit of everything, for the parse and compile benchmarks.
+COMPLEX_QUERY = (
+    'SELECT e.key AS k, COUNT(*) AS c, SUM(e.value) AS total, '
+    'MAX(u.score) AS best, COUNT(DISTINCT e.name) AS names '
+    'FROM (SELECT key, value, name FROM ds.events '
+    '      WHERE value > 10 AND (name = "abc" OR name IS NULL)) e '
+    'LEFT OUTER JOIN ds.users u ON e.key = u.key '
+    'WHERE e.value % 7 = 3 AND u.score < 0.5 '
+    'GROUP BY k ORDER BY c DESC LIMIT 10')
+
+
+def parse_benchmark():
+    def setup(scale):
+        def run():
+            for _ in xrange(100):
+                parser.parse_text(COMPLEX_QUERY)
+        return run
+    return Benchmark('parse', setup)
+
+
+def compile_benchmark():
+    def setup(scale):
+        spec = synthetic.table_spec(10)
+        tables_by_name = tinyquery.TablesByName({
+            'ds.events': synthetic.make_table('ds.events', spec),
+            'ds.users': synthetic.make_table('ds.users', spec),
+        })
+        select_ast = parser.parse_text(COMPLEX_QUERY)
+
+        def run():
+            for _ in xrange(100):
+                compiler.Compiler(tables_by_name).compile_select(select_ast)
+        return run
+    return Benchmark('compile', setup)
+
+
+BENCHMARKS = [
+    scan_filter_benchmark(),
+    nullable_aggregate_benchmark(),
+    nullable_arithmetic_benchmark(),
+    expensive_branch_benchmark(
+        'and',
+        'SELECT COUNT(*) FROM ds.events '
+        'WHERE score < 0.05 AND REGEXP_MATCH(name, "^[a-m].*[n-z]$")'),
+    expensive_branch_benchmark(
+        'or',
+        'SELECT COUNT(*) FROM ds.events '
+        'WHERE score > 0.05 OR (value * 3 + key) % 7 = (key * key + id) % 7'),
+    expensive_branch_benchmark(
+        'if',
+        'SELECT SUM(IF(score < 0.1, (value * 3 + key * key) % 1000, 0)) '
+        'FROM ds.events'),
+    expensive_branch_benchmark(
+        'ifnull',
+        'SELECT SUM(IFNULL(value, (key * key + id) % 1000)) FROM ds.events'),
+    group_by_benchmark(10),
+    group_by_benchmark(1000),
+    group_by_benchmark(100000),
+    join_benchmark(1),
+    join_benchmark(10),
+    join_benchmark(100),
+] + string_key_benchmarks(
+    'filter',
+    'SELECT id, value FROM ds.events '
+    'WHERE name = "abcdefgh" OR name IN ("a", "b", "c")'
+) + string_key_benchmarks(
+    'group_by',
+    'SELECT name, COUNT(*), SUM(value) FROM ds.events GROUP BY name'
+) + string_key_benchmarks(
+    'group_by_in_memory',
+    'SELECT name, STDDEV_SAMP(score) FROM ds.events GROUP BY name'
+) + string_key_benchmarks(
+    'join',
+    'SELECT e.id, n.key FROM ds.events e JOIN ds.names n ON e.name = n.name'
+) + run_length_benchmarks(
+    'filter',
+    'SELECT id, value FROM ds.events '
+    'WHERE day % 10 = 3 AND tenant = "acme"'
+) + run_length_benchmarks(
+    'aggregate',
+    'SELECT SUM(day), COUNT(tenant), AVG(day), MAX(day) FROM ds.events'
+) + run_length_benchmarks(
+    'group_by',
+    'SELECT day, COUNT(*), SUM(value) FROM ds.events GROUP BY day'
+) + run_length_benchmarks(
+    'group_by_constant',
+    'SELECT tenant, COUNT(*), SUM(day) FROM ds.events GROUP BY tenant'
+) + [
+    union_benchmark(10),
+    union_benchmark(100),
+    csv_load_benchmark(),
+    rows_from_table_benchmark(),
+    parse_benchmark(),
+    compile_benchmark(),
+]
+
+
+def time_benchmark(benchmark, scale, repeat):
+    """Run a benchmark and return a dict with its results."""
+    run = benchmark.setup(scale)
+    # Warm up any caches, like the parser tables.
+    run()
+    times = []
+    for _ in xrange(repeat):
+        start_time = time.time()
+        run()
+        times.append(time.time() - start_time)
+    times.sort()
+    return {
+        'times': times,
+        'min': times[0],
+        'median': times[len(times) // 2],
+    }
+
+
+def run_benchmarks(benchmarks, scale, repeat, out=sys.stdout):
+    """Run benchmarks, and return the results in the JSON output format."""
+    results = collections.OrderedDict()
+    for benchmark in benchmarks:
+        results[benchmark.name] = time_benchmark(benchmark, scale, repeat)
+        out.write('{}: median {:.4f}s, min {:.4f}s\n'.format(
+            benchmark.name, results[benchmark.name]['median'],
+            results[benchmark.name]['min']))
+    return collections.OrderedDict([
+        ('scale', scale),
+        ('repeat', repeat),
+        ('python', platform.python_version()),
+        ('platform', platform.platform()),
+        ('benchmarks', results),
+    ])
+
+
+def find_regressions(baseline, results, threshold):
+    """Compare results with a baseline from an earlier run.
+
+    Returns: A list of (benchmark name, baseline median, new median) triples
+        for the benchmarks whose median time grew by more than threshold,
+        as a fraction of the baseline median.
+    """
+    regressions = []
+    for name, result in results['benchmarks'].iteritems():
+        baseline_result = baseline['benchmarks'].get(name)
+        if baseline_result is None:
+            continue
+        if result['median'] > baseline_result['median'] * (1 + threshold):
+            regressions.append((name, baseline_result['median'],
+                                result['median']))
+    return regressions
+
+
+def main(argv):
+    arg_parser = argparse.ArgumentParser(
+        description='Benchmark the tinyquery query engine.')
+    arg_parser.add_argument('-o', '--output',
+                            help='Write the results as JSON to this file.')
+    arg_parser.add_argument('-b', '--baseline',
+                            help='Compare with the results in this file.')
+    arg_parser.add_argument('-t', '--threshold', type=float, default=0.1,
+                            help='The fraction that a median time can grow '
+                                 'by before it counts as a regression.')
+    arg_parser.add_argument('-s', '--scale', type=float, default=1.0,
+                            help='Multiply the table sizes by this.')
+    arg_parser.add_argument('-r', '--repeat', type=int, default=5,
+                            help='The number of timed runs of each '
+                                 'benchmark.')
+    arg_parser.add_argument('-k', '--filter', default='',
+                            help='Only run benchmarks whose names contain '
+                                 'this.')
+    args = arg_parser.parse_args(argv)
+
+    benchmarks = [benchmark for benchmark in BENCHMARKS
+                  if args.filter in benchmark.name]
+    results = run_benchmarks(benchmarks, args.scale, args.repeat)
+    if args.output is not None:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2, separators=(',', ': '))
+    if args.baseline is None:
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline['scale'] != args.scale:
+        print('Baseline was run at scale {}, not {}.'.format(
+            baseline['scale'], args.scale))
+        return 2
+    regressions = find_regressions(baseline, results, args.threshold)
+    for name, baseline_median, median in regressions:
+        print('REGRESSION {}: {:.4f}s -> {:.4f}s ({:+.1%})'.format(
+            name, baseline_median, median, median / baseline_median - 1))
+    if regressions:
+        return 1
+    print('No regressions over {:.0%}.'.format(args.threshold))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
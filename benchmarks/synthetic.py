@@ -0,0 +1,130 @@
+"""Generators for reproducible synthetic tables to benchmark queries on.
+
+Every table is generated from a seeded random number generator, so the same
+arguments always give the same rows.
+"""
+import collections
+import random
+import string
+
+from tinyquery import context, encoding, tinyquery, tq_types
+
+
+TableSpec = collections.namedtuple('TableSpec', [
+    'num_rows', 'key_cardinality', 'null_ratio', 'string_length', 'seed'])
+
+
+def table_spec(num_rows, key_cardinality=1000, null_ratio=0.1,
+               string_length=8, seed=0):
+    """Describe a synthetic table.
+
+    Arguments:
+        num_rows: The number of rows in the table.
+        key_cardinality: The number of distinct values of the key and name
+            columns.
+        null_ratio: The fraction of the values of the value and name columns
+            that are null.
+        string_length: The length of each value of the name column.
+        seed: The seed for the random values.
+    """
+    return TableSpec(num_rows, key_cardinality, null_ratio, string_length,
+                     seed)
+
+
+def make_columns(spec):
+    """Generate the columns of a synthetic table.
+
+    The columns are:
+        id: The row number.
+        key: A uniformly random INTEGER in [0, key_cardinality).
+        value: A random INTEGER in [0, 1000000), or null.
+        score: A random FLOAT in [0, 1).
+        name: One of key_cardinality random strings, or null.
+
+    Returns: An OrderedDict mapping column name to Column.
+    """
+    rng = random.Random(spec.seed)
+    names = [''.join(rng.choice(string.ascii_lowercase)
+                     for _ in xrange(spec.string_length))
+             for _ in xrange(spec.key_cardinality)]
+
+    def maybe_null(value):
+        return None if rng.random() < spec.null_ratio else value
+    return collections.OrderedDict([
+        ('id', context.Column(tq_types.INT, range(spec.num_rows))),
+        ('key', context.Column(tq_types.INT, [
+            rng.randrange(spec.key_cardinality)
+            for _ in xrange(spec.num_rows)])),
+        ('value', context.Column(tq_types.INT, [
+            maybe_null(rng.randrange(1000000))
+            for _ in xrange(spec.num_rows)])),
+        ('score', context.Column(tq_types.FLOAT, [
+            rng.random() for _ in xrange(spec.num_rows)])),
+        ('name', context.Column(tq_types.STRING, [
+            maybe_null(rng.choice(names)) for _ in xrange(spec.num_rows)])),
+    ])
+
+
+def make_table(name, spec, encode_strings=False):
+    """Generate a synthetic tinyquery.Table; see make_columns.
+
+    If encode_strings is True, the STRING columns are dictionary-encoded, as
+    load_table_from_csv would do.
+    """
+    columns = make_columns(spec)
+    if encode_strings:
+        for column_name, column in columns.items():
+            if column.type == tq_types.STRING:
+                columns[column_name] = column._replace(
+                    values=encoding.dictionary_encode(column.values))
+    return tinyquery.Table(name, spec.num_rows, columns)
+
+
+def make_run_table(name, spec, encode_runs=False):
+    """Generate a table with columns that have long runs of equal values.
+
+    The columns are those of make_columns, plus:
+        day: One of key_cardinality INTEGER days, in increasing order, with
+            the same number of rows for each day.
+        tenant: The same STRING for every row.
+
+    If encode_runs is True, the columns are encoded as load_table_from_csv
+    would do, so the day and tenant columns are run-length encoded.
+    """
+    columns = make_columns(spec)
+    rows_per_day = max(1, spec.num_rows // spec.key_cardinality)
+    columns['day'] = context.Column(tq_types.INT, [
+        20160101 + i // rows_per_day for i in xrange(spec.num_rows)])
+    columns['tenant'] = context.Column(tq_types.STRING,
+                                       ['acme'] * spec.num_rows)
+    if encode_runs:
+        for column_name, column in columns.items():
+            columns[column_name] = column._replace(
+                values=encoding.choose_encoding(column.values))
+    return tinyquery.Table(name, spec.num_rows, columns)
+
+
+def get_raw_schema():
+    """Get the schema of a synthetic table, for load_table_from_csv."""
+    return {'fields': [
+        {'name': 'id', 'type': tq_types.INT},
+        {'name': 'key', 'type': tq_types.INT},
+        {'name': 'value', 'type': tq_types.INT},
+        {'name': 'score', 'type': tq_types.FLOAT},
+        {'name': 'name', 'type': tq_types.STRING},
+    ]}
+
+
+def write_csv(filename, spec):
+    """Write a synthetic table in the format of load_table_from_csv.
+
+    CSV files can't hold null numbers, so the value column has no nulls.
+    """
+    columns = make_columns(spec)
+    columns['value'] = context.Column(
+        tq_types.INT, [0 if value is None else value
+                       for value in columns['value'].values])
+    with open(filename, 'w') as f:
+        for row in zip(*[column.values for column in columns.itervalues()]):
+            f.write(','.join('null' if value is None else str(value)
+                             for value in row) + '\n')
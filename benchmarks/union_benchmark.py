@@ -0,0 +1,60 @@
+"""Benchmark for evaluating the members of a table union in parallel.
+
+Run from the repository root with:
+    python -m benchmarks.union_benchmark [num_tables] [rows_per_table]
+
+This builds one table per day, like a sharded event log, and runs a filtered
+aggregate over all of them with TABLE_DATE_RANGE, using different numbers of
+worker processes. Each worker evaluates and filters whole member tables, so
+the speedup is bounded by the number of cores.
+"""
+import collections
+import datetime
+import multiprocessing
+import sys
+import time
+
+from tinyquery import context, tinyquery, tq_types
+
+
+QUERY = (
+    'SELECT COUNT(*), SUM(value) '
+    'FROM TABLE_DATE_RANGE([ds.events_], "2016-01-01", "2016-12-31") '
+    'WHERE value % 7 = 3')
+
+
+def make_tables(tq, num_tables, rows_per_table):
+    start_date = datetime.date(2016, 1, 1)
+    for table_num in xrange(num_tables):
+        date = start_date + datetime.timedelta(days=table_num)
+        tq.load_table_or_view(tinyquery.Table(
+            'ds.events_' + date.strftime('%Y%m%d'),
+            rows_per_table,
+            collections.OrderedDict([
+                ('value', context.Column(tq_types.INT,
+                                         range(rows_per_table))),
+                ('name', context.Column(tq_types.STRING,
+                                        ['event'] * rows_per_table)),
+            ])))
+
+
+def main(num_tables, rows_per_table):
+    tq = tinyquery.TinyQuery()
+    make_tables(tq, num_tables, rows_per_table)
+    print('{} tables of {} rows, {} cores'.format(
+        num_tables, rows_per_table, multiprocessing.cpu_count()))
+    expected_result = None
+    for num_workers in (1, 2, 4, 8):
+        tq.num_query_workers = num_workers
+        start_time = time.time()
+        result = tq.evaluate_query(QUERY)
+        elapsed_time = time.time() - start_time
+        if expected_result is None:
+            expected_result = result
+        assert result == expected_result
+        print('{} workers: {:.2f}s'.format(num_workers, elapsed_time))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 365,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 10 * 1000)
@@ -0,0 +1,54 @@
+"""Benchmark for skipping chunks using zone maps on a sorted table.
+
+Run from the repository root with:
+    python -m benchmarks.zone_map_benchmark [num_rows]
+
+The table has a sorted "ts" column, so a range filter on it only needs to look
+at a few chunks. The same filter written as "ts + 0 >= X" can't be checked
+against the chunk stats, so it shows the cost of a full scan.
+"""
+import collections
+import sys
+import time
+
+from tinyquery import context, tinyquery, tq_types
+
+
+def make_sorted_table(num_rows):
+    return tinyquery.Table(
+        'events',
+        num_rows,
+        collections.OrderedDict([
+            ('ts', context.Column(tq_types.INT, range(num_rows))),
+            ('value', context.Column(tq_types.INT,
+                                     [i % 100 for i in xrange(num_rows)])),
+        ]))
+
+
+def time_query(tq, query):
+    start_time = time.time()
+    result = tq.evaluate_query(query)
+    return time.time() - start_time, result
+
+
+def main(num_rows):
+    tq = tinyquery.TinyQuery()
+    start_time = time.time()
+    tq.load_table_or_view(make_sorted_table(num_rows))
+    print('Loaded {} rows in {:.2f}s'.format(num_rows,
+                                             time.time() - start_time))
+
+    # Select the last 1% of the table.
+    threshold = num_rows - num_rows // 100
+    pruned_time, pruned_result = time_query(
+        tq, 'SELECT COUNT(*) FROM events WHERE ts >= {}'.format(threshold))
+    full_time, full_result = time_query(
+        tq, 'SELECT COUNT(*) FROM events WHERE ts + 0 >= {}'.format(
+            threshold))
+    assert pruned_result == full_result
+    print('With zone maps:    {:.3f}s'.format(pruned_time))
+    print('Without zone maps: {:.3f}s'.format(full_time))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10 * 1000 * 1000)
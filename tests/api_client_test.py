@@ -1,6 +1,10 @@
+import collections
+import json
+import mock
+import threading
 import unittest
 
-from tinyquery import tq_types, api_client, tinyquery
+from tinyquery import api_client, context, tinyquery, tq_types
 
 
 class ApiClientTest(unittest.TestCase):
@@ -243,3 +247,396 @@ class ApiClientTest(unittest.TestCase):
         self.assertEqual('hello', list_response['rows'][0]['f'][1]['v'])
         self.assertEqual('7', list_response['rows'][1]['f'][0]['v'])
         self.assertEqual('goodbye', list_response['rows'][1]['f'][1]['v'])
+
+    def test_partitioned_table(self):
+        self.tq_service.tables().insert(
+            projectId='test_project',
+            datasetId='test_dataset',
+            body={
+                'tableReference': self.table_ref('partitioned_table'),
+                'schema': {
+                    'fields': [
+                        {'name': 'day', 'type': 'STRING'},
+                        {'name': 'foo', 'type': 'INTEGER'},
+                    ]
+                },
+                'timePartitioning': {'type': 'DAY', 'field': 'day'}
+            }).execute()
+        table_info = self.tq_service.tables().get(
+            projectId='test_project', datasetId='test_dataset',
+            tableId='partitioned_table').execute()
+        self.assertEqual({'type': 'DAY', 'field': 'day'},
+                         table_info['timePartitioning'])
+        self.query_to_table(
+            """
+            SELECT * FROM
+                (SELECT '20160101' AS day, 1 AS foo),
+                (SELECT '20160102' AS day, 2 AS foo)
+            """,
+            'test_dataset', 'partitioned_table')
+        query_result = self.run_query(
+            'SELECT foo FROM [test_dataset.partitioned_table$20160102]')
+        self.assertEqual(1, len(query_result['rows']))
+        self.assertEqual('2', query_result['rows'][0]['f'][0]['v'])
+
+    def test_dataset_management(self):
+        self.tq_service.datasets().insert(
+            projectId='test_project',
+            body={
+                'datasetReference': {
+                    'projectId': 'test_project',
+                    'datasetId': 'new_dataset'
+                },
+                'friendlyName': 'New dataset'
+            }).execute()
+        # Inserting a table implicitly creates its dataset.
+        self.insert_simple_table()
+
+        response = self.tq_service.datasets().list(
+            projectId='test_project').execute()
+        self.assertEqual(
+            ['new_dataset', 'test_dataset'],
+            [dataset['datasetReference']['datasetId']
+             for dataset in response['datasets']])
+
+        dataset_info = self.tq_service.datasets().get(
+            projectId='test_project', datasetId='new_dataset').execute()
+        self.assertEqual('test_project:new_dataset', dataset_info['id'])
+        self.assertEqual('New dataset', dataset_info['friendlyName'])
+
+        with self.assertRaises(api_client.FakeHttpError):
+            self.tq_service.datasets().insert(
+                projectId='test_project',
+                body={'datasetReference': {'datasetId': 'new_dataset'}}
+            ).execute()
+        with self.assertRaises(api_client.FakeHttpError):
+            self.tq_service.datasets().delete(
+                projectId='test_project', datasetId='test_dataset').execute()
+
+        self.tq_service.datasets().delete(
+            projectId='test_project', datasetId='test_dataset',
+            deleteContents=True).execute()
+        self.tq_service.datasets().delete(
+            projectId='test_project', datasetId='new_dataset').execute()
+        response = self.tq_service.datasets().list(
+            projectId='test_project').execute()
+        self.assertEqual([], response['datasets'])
+        with self.assertRaises(api_client.FakeHttpError):
+            self.tq_service.tables().get(
+                projectId='test_project', datasetId='test_dataset',
+                tableId='test_table').execute()
+        with self.assertRaises(api_client.FakeHttpError):
+            self.tq_service.datasets().get(
+                projectId='test_project', datasetId='test_dataset').execute()
+
+    def test_list_tabledata_pages(self):
+        self.query_to_table(
+            """
+            SELECT * FROM
+                (SELECT 0 AS foo), (SELECT 1 AS foo), (SELECT 2 AS foo),
+                (SELECT 3 AS foo), (SELECT 4 AS foo)
+            """,
+            'test_dataset', 'test_table_2')
+        page_values = []
+        page_token = None
+        while True:
+            list_response = self.tq_service.tabledata().list(
+                projectId='test_project', datasetId='test_dataset',
+                tableId='test_table_2', pageToken=page_token,
+                maxResults=2).execute()
+            self.assertEqual('5', list_response['totalRows'])
+            page_values.append([row['f'][0]['v']
+                                for row in list_response['rows']])
+            page_token = list_response.get('pageToken')
+            if page_token is None:
+                break
+        self.assertEqual([['0', '1'], ['2', '3'], ['4']], page_values)
+
+        list_response = self.tq_service.tabledata().list(
+            projectId='test_project', datasetId='test_dataset',
+            tableId='test_table_2', startIndex='3').execute()
+        self.assertEqual(['3', '4'], [row['f'][0]['v']
+                                      for row in list_response['rows']])
+        self.assertNotIn('pageToken', list_response)
+
+        with self.assertRaises(api_client.FakeHttpError):
+            self.tq_service.tabledata().list(
+                projectId='test_project', datasetId='test_dataset',
+                tableId='test_table_2', pageToken='not a token').execute()
+
+    def test_invalid_page_arguments(self):
+        self.query_to_table('SELECT 1 AS foo', 'test_dataset', 'test_table_2')
+        for kwargs in [{'maxResults': 0}, {'maxResults': -1},
+                       {'maxResults': 'many'}, {'startIndex': '2'},
+                       {'startIndex': '-1'}]:
+            with self.assertRaises(api_client.FakeHttpError) as cm:
+                self.tq_service.tabledata().list(
+                    projectId='test_project', datasetId='test_dataset',
+                    tableId='test_table_2', **kwargs).execute()
+            self.assertEqual(400,
+                             json.loads(cm.exception.content)['error']['code'])
+
+        # Starting right at the end gives an empty last page.
+        list_response = self.tq_service.tabledata().list(
+            projectId='test_project', datasetId='test_dataset',
+            tableId='test_table_2', startIndex='1').execute()
+        self.assertEqual([], list_response['rows'])
+        self.assertNotIn('pageToken', list_response)
+
+        with self.assertRaises(api_client.FakeHttpError):
+            self.tq_service.datasets().list(
+                projectId='test_project', maxResults=0).execute()
+        with self.assertRaises(api_client.FakeHttpError):
+            self.tq_service.tables().list(
+                projectId='test_project', datasetId='test_dataset',
+                maxResults=0).execute()
+
+    def test_query_results_pages(self):
+        job_info = self.tq_service.jobs().insert(
+            projectId='test_project',
+            body={
+                'projectId': 'test_project',
+                'configuration': {
+                    'query': {
+                        'query': 'SELECT * FROM (SELECT 1 AS foo), '
+                                 '(SELECT 2 AS foo), (SELECT 3 AS foo)'
+                    }
+                }
+            }
+        ).execute()
+        job_id = job_info['jobReference']['jobId']
+        first_page = self.tq_service.jobs().getQueryResults(
+            projectId='test_project', jobId=job_id, maxResults=2).execute()
+        self.assertEqual('3', first_page['totalRows'])
+        self.assertEqual(2, len(first_page['rows']))
+        second_page = self.tq_service.jobs().getQueryResults(
+            projectId='test_project', jobId=job_id,
+            pageToken=first_page['pageToken']).execute()
+        self.assertEqual([{'f': [{'v': '3'}]}], second_page['rows'])
+        self.assertNotIn('pageToken', second_page)
+
+    def test_list_datasets_pages(self):
+        for dataset in ['dataset_c', 'dataset_a', 'dataset_b']:
+            self.tq_service.datasets().insert(
+                projectId='test_project',
+                body={'datasetReference': {'datasetId': dataset}}).execute()
+        response = self.tq_service.datasets().list(
+            projectId='test_project', maxResults='2').execute()
+        self.assertEqual(
+            ['dataset_a', 'dataset_b'],
+            [dataset['datasetReference']['datasetId']
+             for dataset in response['datasets']])
+        response = self.tq_service.datasets().list(
+            projectId='test_project', pageToken=response['nextPageToken'],
+            maxResults='2').execute()
+        self.assertEqual(
+            ['dataset_c'],
+            [dataset['datasetReference']['datasetId']
+             for dataset in response['datasets']])
+        self.assertNotIn('nextPageToken', response)
+
+    def test_list_tables_pages(self):
+        for table_name in ['table_c', 'table_a', 'table_d', 'table_b']:
+            self.tq_service.tables().insert(
+                projectId='test_project',
+                datasetId='test_dataset',
+                body={
+                    'tableReference': self.table_ref(table_name),
+                    'schema': {'fields': [{'name': 'foo', 'type': 'INTEGER'}]}
+                }).execute()
+        response = self.tq_service.tables().list(
+            projectId='test_project', datasetId='test_dataset',
+            maxResults=3).execute()
+        self.assertEqual(4, response['totalItems'])
+        self.assertEqual(
+            ['table_a', 'table_b', 'table_c'],
+            [table['tableReference']['tableId']
+             for table in response['tables']])
+        response = self.tq_service.tables().list(
+            projectId='test_project', datasetId='test_dataset',
+            pageToken=response['nextPageToken'], maxResults=3).execute()
+        self.assertEqual(
+            ['table_d'],
+            [table['tableReference']['tableId']
+             for table in response['tables']])
+        self.assertNotIn('nextPageToken', response)
+        response = self.tq_service.tables().list(
+            projectId='test_project', datasetId='missing_dataset').execute()
+        self.assertEqual({'tables': [], 'totalItems': 0}, response)
+
+    def test_typed_row_values(self):
+        self.tinyquery.load_table_or_view(tinyquery.Table(
+            'test_dataset.typed_table',
+            2,
+            collections.OrderedDict([
+                ('i', context.Column(tq_types.INT, [1, None])),
+                ('f', context.Column(tq_types.FLOAT, [1.5, 2.0])),
+                ('b', context.Column(tq_types.BOOL, [True, False])),
+                ('s', context.Column(tq_types.STRING, ['x', None])),
+            ])))
+        list_response = self.tq_service.tabledata().list(
+            projectId='test_project', datasetId='test_dataset',
+            tableId='typed_table').execute()
+        self.assertEqual(
+            [[{'v': '1'}, {'v': '1.5'}, {'v': 'true'}, {'v': 'x'}],
+             [{'v': None}, {'v': '2.0'}, {'v': 'false'}, {'v': None}]],
+            [row['f'] for row in list_response['rows']])
+
+        columnar_response = self.tq_service.tabledata().list(
+            projectId='test_project', datasetId='test_dataset',
+            tableId='typed_table', columnar=True).execute()
+        self.assertNotIn('rows', columnar_response)
+        self.assertEqual(
+            [['1', None], ['1.5', '2.0'], ['true', 'false'], ['x', None]],
+            columnar_response['columns'])
+
+    def test_rows_from_table_is_lazy(self):
+        table = tinyquery.Table(
+            'typed_table',
+            3,
+            collections.OrderedDict([
+                ('i', context.Column(tq_types.INT, [1, 2, None])),
+            ]))
+        with mock.patch.dict(api_client.VALUE_FORMATTERS,
+                             {tq_types.INT: mock.Mock(side_effect=str)}):
+            formatter = api_client.VALUE_FORMATTERS[tq_types.INT]
+            rows = api_client.rows_from_table(table, 1)
+            self.assertEqual(0, formatter.call_count)
+            self.assertEqual({'f': [{'v': '2'}]}, next(rows))
+            self.assertEqual(1, formatter.call_count)
+            self.assertEqual([{'f': [{'v': None}]}], list(rows))
+
+    def insert_all(self, rows, **kwargs):
+        body = {'rows': rows}
+        body.update(kwargs)
+        return self.tq_service.tabledata().insertAll(
+            projectId='test_project', datasetId='test_dataset',
+            tableId='test_table', body=body).execute()
+
+    def list_simple_table(self):
+        list_response = self.tq_service.tabledata().list(
+            projectId='test_project', datasetId='test_dataset',
+            tableId='test_table').execute()
+        return [[field['v'] for field in row['f']]
+                for row in list_response['rows']]
+
+    def test_insert_all(self):
+        self.insert_simple_table()
+        response = self.insert_all([
+            {'insertId': 'a', 'json': {'foo': 1, 'bar': True}},
+            {'insertId': 'b', 'json': {'foo': '2'}},
+            {'json': {'bar': 'false'}},
+        ])
+        self.assertNotIn('insertErrors', response)
+        # Rows with a recently used insert ID are dropped.
+        self.insert_all([
+            {'insertId': 'b', 'json': {'foo': 2}},
+            {'insertId': 'c', 'json': {'foo': 3}},
+            {'insertId': 'c', 'json': {'foo': 3}},
+        ])
+        self.assertEqual(
+            [['1', 'true'], ['2', None], [None, 'false'], ['3', None]],
+            self.list_simple_table())
+
+    def test_insert_all_invalid_rows(self):
+        self.insert_simple_table()
+        rows = [
+            {'json': {'foo': 1}},
+            {'json': {'foo': 'one'}},
+            {'json': {'foo': 2, 'baz': 3}},
+        ]
+        response = self.insert_all(rows)
+        self.assertEqual(
+            [(0, 'stopped'), (1, 'invalid'), (2, 'invalid')],
+            [(error['index'], error['errors'][0]['reason'])
+             for error in response['insertErrors']])
+        self.assertEqual([], self.list_simple_table())
+
+        response = self.insert_all(rows, skipInvalidRows=True,
+                                   ignoreUnknownValues=True)
+        self.assertEqual(
+            [1], [error['index'] for error in response['insertErrors']])
+        self.assertEqual([['1', None], ['2', None]], self.list_simple_table())
+
+        with self.assertRaises(api_client.FakeHttpError):
+            self.tq_service.tabledata().insertAll(
+                projectId='test_project', datasetId='test_dataset',
+                tableId='missing_table', body={'rows': []}).execute()
+
+
+class AsyncJobApiClientTest(unittest.TestCase):
+    def setUp(self):
+        self.tinyquery = tinyquery.TinyQuery(job_pool_size=2)
+        self.addCleanup(self.tinyquery.job_pool.terminate)
+        self.tq_service = api_client.TinyQueryApiClient(self.tinyquery)
+        # Queries wait for this event before they are evaluated.
+        self.query_allowed = threading.Event()
+        self.query_started = threading.Event()
+        real_evaluate_query = self.tinyquery.evaluate_query
+
+        def evaluate_query(query, *args):
+            self.query_started.set()
+            self.query_allowed.wait()
+            return real_evaluate_query(query, *args)
+        patcher = mock.patch.object(self.tinyquery, 'evaluate_query',
+                                    side_effect=evaluate_query)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.query_allowed.set)
+
+    def insert_query_job(self, query, dest_table=None):
+        config = {'query': query}
+        if dest_table is not None:
+            config['destinationTable'] = {
+                'projectId': 'test_project',
+                'datasetId': 'test_dataset',
+                'tableId': dest_table
+            }
+        job_info = self.tq_service.jobs().insert(
+            projectId='test_project',
+            body={'configuration': {'query': config}}).execute()
+        return job_info['jobReference']['jobId']
+
+    def get_state(self, job_id):
+        return self.tq_service.jobs().get(
+            projectId='test_project', jobId=job_id).execute()['status']
+
+    def test_job_states(self):
+        job_id = self.insert_query_job('SELECT 7 AS foo')
+        self.assertTrue(self.query_started.wait(5))
+        self.assertEqual({'state': 'RUNNING'}, self.get_state(job_id))
+        results = self.tq_service.jobs().getQueryResults(
+            projectId='test_project', jobId=job_id, timeoutMs=0).execute()
+        self.assertFalse(results['jobComplete'])
+
+        self.query_allowed.set()
+        results = self.tq_service.jobs().getQueryResults(
+            projectId='test_project', jobId=job_id).execute()
+        self.assertTrue(results['jobComplete'])
+        self.assertEqual('7', results['rows'][0]['f'][0]['v'])
+        job_info = self.tq_service.jobs().get(
+            projectId='test_project', jobId=job_id).execute()
+        self.assertEqual({'state': 'DONE'}, job_info['status'])
+        self.assertIn('startTime', job_info['statistics'])
+        self.assertIn('endTime', job_info['statistics'])
+
+    def test_job_error(self):
+        self.query_allowed.set()
+        job_id = self.insert_query_job('SELECT foo FROM missing_table')
+        with self.assertRaises(api_client.FakeHttpError):
+            self.tq_service.jobs().getQueryResults(
+                projectId='test_project', jobId=job_id).execute()
+        self.assertEqual('invalid',
+                         self.get_state(job_id)['errorResult']['reason'])
+
+    def test_cancel(self):
+        job_id = self.insert_query_job('SELECT 1 AS foo', 'dest_table')
+        self.assertTrue(self.query_started.wait(5))
+        self.tq_service.jobs().cancel(
+            projectId='test_project', jobId=job_id).execute()
+        self.query_allowed.set()
+        self.assertTrue(self.tinyquery.wait_for_job(job_id, 5))
+        self.assertEqual('stopped',
+                         self.get_state(job_id)['errorResult']['reason'])
+        self.assertNotIn('test_dataset.dest_table',
+                         self.tinyquery.get_all_tables())
@@ -223,7 +223,7 @@ class CompilerTest(unittest.TestCase):
                     'f1_')],
                 typed_ast.Table('table1', self.table1_type_ctx),
                 typed_ast.Literal(True, tq_types.BOOL),
-                typed_ast.GroupSet(set(), []),
+                typed_ast.GroupSet(set(), [], False),
                 None,
                 self.make_type_context([
                     (None, 'f0_', tq_types.INT),
@@ -248,7 +248,8 @@ class CompilerTest(unittest.TestCase):
                 typed_ast.Literal(True, tq_types.BOOL),
                 typed_ast.GroupSet(
                     alias_groups={'foo'},
-                    field_groups=[]
+                    field_groups=[],
+                    is_each=False
                 ),
                 None,
                 self.make_type_context(
@@ -273,7 +274,8 @@ class CompilerTest(unittest.TestCase):
                 typed_ast.GroupSet(
                     alias_groups=set(),
                     field_groups=[
-                        typed_ast.ColumnRef('table1', 'value2', tq_types.INT)]
+                        typed_ast.ColumnRef('table1', 'value2', tq_types.INT)],
+                    is_each=False
                 ),
                 None,
                 self.make_type_context(
@@ -299,7 +301,8 @@ class CompilerTest(unittest.TestCase):
                 typed_ast.Literal(True, tq_types.BOOL),
                 typed_ast.GroupSet(
                     alias_groups={'value'},
-                    field_groups=[]
+                    field_groups=[],
+                    is_each=False
                 ),
                 None,
                 self.make_type_context(
@@ -506,6 +509,7 @@ class CompilerTest(unittest.TestCase):
                         typed_ast.ColumnRef('t2', 'value', tq_types.INT)
                     )],
                     False,
+                    False,
                     self.make_type_context([
                         ('t1', 'value', tq_types.INT),
                         ('t1', 'value2', tq_types.INT),
@@ -550,6 +554,7 @@ class CompilerTest(unittest.TestCase):
                         typed_ast.ColumnRef('t2', 'value3', tq_types.INT)
                     )],
                     False,
+                    False,
                     self.make_type_context([
                         ('t1', 'value', tq_types.INT),
                         ('t1', 'value2', tq_types.INT),
@@ -586,3 +591,72 @@ class CompilerTest(unittest.TestCase):
                     self.make_type_context([
                         ('table1', 'value', tq_types.INT),
                         ('table1', 'value2', tq_types.INT)]))))
+
+    def test_index_lookup(self):
+        self.table1.create_index('value2', 'sorted')
+        self.table1.create_index('value', 'hash')
+        self.assert_compiled_select(
+            'SELECT value FROM table1 WHERE value2 > 3 AND value = 2',
+            typed_ast.Select(
+                [typed_ast.SelectField(
+                    typed_ast.ColumnRef('table1', 'value', tq_types.INT),
+                    'value')],
+                typed_ast.IndexLookup('table1', 'value', '=', (2,),
+                                      self.table1_type_ctx),
+                typed_ast.FunctionCall(
+                    runtime.get_binary_op('and'),
+                    [typed_ast.FunctionCall(
+                        runtime.get_binary_op('>'),
+                        [typed_ast.ColumnRef('table1', 'value2',
+                                             tq_types.INT),
+                         typed_ast.Literal(3, tq_types.INT)],
+                        tq_types.BOOL),
+                     typed_ast.FunctionCall(
+                         runtime.get_binary_op('='),
+                         [typed_ast.ColumnRef('table1', 'value', tq_types.INT),
+                          typed_ast.Literal(2, tq_types.INT)],
+                         tq_types.BOOL)],
+                    tq_types.BOOL),
+                None,
+                None,
+                self.make_type_context([(None, 'value', tq_types.INT)],
+                                       self.make_type_context([
+                                           ('table1', 'value', tq_types.INT)
+                                       ]))
+            )
+        )
+
+    def test_index_lookup_selectivity(self):
+        table = tinyquery.Table(
+            'table3',
+            100,
+            collections.OrderedDict([
+                ('value', context.Column(tq_types.INT, range(100))),
+                ('value2', context.Column(tq_types.INT, [i % 2 for i in
+                                                         range(100)]))]))
+        table.create_index('value', 'sorted')
+        table.create_index('value2', 'hash')
+        self.tables_by_name['table3'] = table
+
+        def compile_table_expr(where):
+            return compiler.compile_text(
+                'SELECT value FROM table3 WHERE ' + where,
+                self.tables_by_name).table
+
+        # The range predicate finds fewer rows than the equality one.
+        table_expr = compile_table_expr('value < 10 AND value2 = 1')
+        self.assertIsInstance(table_expr, typed_ast.IndexLookup)
+        self.assertEqual(('value', '<', (10,)),
+                         (table_expr.column, table_expr.operator,
+                          table_expr.values))
+        # Neither predicate is selective enough to be worth an index lookup.
+        self.assertIsInstance(compile_table_expr('value > 10 AND value2 = 1'),
+                              typed_ast.Table)
+
+    def test_table_function_errors(self):
+        self.assert_compile_error('SELECT value FROM NOT_A_FUNCTION(table1)')
+        self.assert_compile_error(
+            'SELECT value FROM TABLE_DATE_RANGE(ds.table, "2016-01-01")')
+        self.assert_compile_error(
+            'SELECT value FROM TABLE_DATE_RANGE(ds.table, "2016-01-01", '
+            '"2016-01-31")')
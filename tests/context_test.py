@@ -0,0 +1,45 @@
+import collections
+import unittest
+
+from tinyquery import context, tq_types
+
+
+class CrossJoinTest(unittest.TestCase):
+    def setUp(self):
+        self.context1 = context.Context(3, collections.OrderedDict([
+            (('t1', 'a'), context.Column(tq_types.INT, [1, 2, 3])),
+            (('t1', 'b'), context.Column(tq_types.STRING, ['x', 'y', 'z'])),
+        ]), None)
+        self.context2 = context.Context(2, collections.OrderedDict([
+            (('t2', 'c'), context.Column(tq_types.INT, [10, 20])),
+        ]), None)
+
+    def test_cross_join_contexts(self):
+        self.assertEqual(
+            context.Context(6, collections.OrderedDict([
+                (('t1', 'a'), context.Column(tq_types.INT,
+                                             [1, 1, 2, 2, 3, 3])),
+                (('t1', 'b'), context.Column(tq_types.STRING,
+                                             ['x', 'x', 'y', 'y', 'z', 'z'])),
+                (('t2', 'c'), context.Column(tq_types.INT,
+                                             [10, 20, 10, 20, 10, 20])),
+            ]), None),
+            context.cross_join_contexts(self.context1, self.context2))
+
+    def test_iter_cross_join_contexts(self):
+        expected_result = context.cross_join_contexts(self.context1,
+                                                      self.context2)
+        for max_rows in xrange(1, 8):
+            batches = list(context.iter_cross_join_contexts(
+                self.context1, self.context2, max_rows))
+            for batch in batches:
+                self.assertTrue(1 <= batch.num_rows <= max_rows)
+            self.assertEqual(expected_result,
+                             context.concat_contexts(batches))
+
+    def test_iter_cross_join_empty_contexts(self):
+        empty_context = context.empty_context_from_template(self.context2)
+        self.assertEqual([], list(context.iter_cross_join_contexts(
+            self.context1, empty_context, 10)))
+        self.assertEqual([], list(context.iter_cross_join_contexts(
+            empty_context, self.context1, 10)))
@@ -0,0 +1,453 @@
+import array
+import collections
+import os
+import tempfile
+import unittest
+
+import mock
+
+from tinyquery import context
+from tinyquery import encoding
+from tinyquery import evaluator
+from tinyquery import memory
+from tinyquery import runtime
+from tinyquery import storage
+from tinyquery import tinyquery
+from tinyquery import tq_types
+
+
+def make_values(dictionary, codes):
+    return encoding.DictionaryValues(dictionary, array.array('B', codes))
+
+
+class DictionaryValuesTest(unittest.TestCase):
+    def test_sequence(self):
+        values = make_values(['a', 'b', None], [0, 1, 1, 2, 0])
+        self.assertEqual(5, len(values))
+        self.assertEqual(['a', 'b', 'b', None, 'a'], list(values))
+        self.assertEqual('b', values[1])
+        self.assertEqual('a', values[-1])
+        self.assertRaises(IndexError, lambda: values[5])
+        self.assertIsInstance(values[1:3], encoding.DictionaryValues)
+        self.assertEqual(['b', 'b'], values[1:3])
+        self.assertEqual([], values[4:2])
+        self.assertEqual(['a', 'b', 'a'], values[::2])
+        self.assertEqual(['a', 'b', 'b', None, 'a'], values)
+        self.assertEqual(values, ('a', 'b', 'b', None, 'a'))
+        self.assertNotEqual(['a', 'b', 'b', None], values)
+        self.assertEqual(['a', 'a'], values[:1] * 2)
+        self.assertEqual([1, 'b'], [1] + values[1:2])
+
+    def test_take_and_compress(self):
+        values = make_values(['a', 'b'], [0, 1, 1, 0])
+        taken = encoding.take(values, [3, 1, 1])
+        self.assertIs(values.dictionary, taken.dictionary)
+        self.assertEqual(['a', 'b', 'b'], taken)
+        self.assertEqual(['a', None], encoding.take_or_null(values, [0, -1]))
+        compressed = encoding.compress(values, [True, False, True, False])
+        self.assertIs(values.dictionary, compressed.dictionary)
+        self.assertEqual(['a', 'b'], compressed)
+        self.assertEqual([2, 3], encoding.compress([1, 2, 3], [0, 1, 1]))
+
+    def test_concat(self):
+        values1 = make_values(['a', 'b'], [0, 1])
+        values2 = make_values(['a', 'b'], [1])
+        values3 = make_values(['c', 'a'], [0, 1])
+        same = encoding.concat_values([values1, values2])
+        self.assertIs(values1.dictionary, same.dictionary)
+        self.assertEqual(['a', 'b', 'b'], same)
+        merged = encoding.concat_values([values1, [], values3])
+        self.assertEqual(['a', 'b', 'c'], merged.dictionary)
+        self.assertEqual(['a', 'b', 'c', 'a'], merged)
+        self.assertEqual(['a', 'b', 'x'],
+                         encoding.concat_values([values1, ['x']]))
+
+    def test_group_codes(self):
+        values = make_values(['a', 'b', 'c'], [1, 0, 1, 1])
+        self.assertEqual([[1], [0, 2, 3], []], values.group_codes())
+
+    def test_builder(self):
+        self.assertEqual(
+            make_values(['a', 'b'], [0, 1, 0, 0]),
+            encoding.dictionary_encode(['a', 'b', 'a', 'a']))
+        self.assertIsInstance(
+            encoding.dictionary_encode(['a', 'b', 'a', 'a']),
+            encoding.DictionaryValues)
+        # Too many distinct values to be worth encoding.
+        self.assertEqual(['a', 'b', 'c', 'a'],
+                         encoding.dictionary_encode(['a', 'b', 'c', 'a']))
+        self.assertIsInstance(encoding.dictionary_encode(['a', 'b', 'c']),
+                              list)
+
+    def test_estimate_bytes(self):
+        plain = context.Column(tq_types.STRING,
+                               ['country%d' % (i % 4) for i in xrange(1000)])
+        encoded = context.Column(tq_types.STRING,
+                                 encoding.dictionary_encode(plain.values))
+        self.assertLess(memory.estimate_column_bytes(encoded) * 10,
+                        memory.estimate_column_bytes(plain))
+
+
+class RunLengthValuesTest(unittest.TestCase):
+    def setUp(self):
+        self.plain = [1] * 5 + [2] * 3 + [None] * 4 + [1] * 2
+        self.values = encoding.RunLengthValues.from_values(self.plain)
+
+    def test_sequence(self):
+        self.assertEqual([1, 2, None, 1], self.values.run_values)
+        self.assertEqual([5, 8, 12, 14], list(self.values.run_ends))
+        self.assertEqual(self.plain, list(self.values))
+        self.assertEqual(self.plain, self.values)
+        for i in xrange(-14, 14):
+            self.assertEqual(self.plain[i], self.values[i])
+        for start in xrange(-16, 16):
+            for stop in xrange(-16, 16):
+                self.assertEqual(self.plain[start:stop],
+                                 self.values[start:stop])
+        self.assertIsInstance(self.values[3:9], encoding.RunLengthValues)
+        self.assertIsInstance(self.values[5:8], encoding.ConstantValues)
+        self.assertEqual(self.plain * 2, self.values * 2)
+        self.assertEqual(self.plain + self.plain, self.values + self.values)
+
+    def test_take_and_compress(self):
+        indexes = [0, 3, 5, 6, 13, 13, 2]
+        self.assertEqual([self.plain[i] for i in indexes],
+                         encoding.take(self.values, indexes))
+        mask = [i % 3 == 0 for i in xrange(14)]
+        self.assertEqual([value for value, keep in zip(self.plain, mask)
+                          if keep],
+                         encoding.compress(self.values, mask))
+        run_mask = encoding.RunLengthValues.from_values(
+            [True] * 3 + [False] * 6 + [True] * 5)
+        compressed = encoding.compress(self.values, run_mask)
+        self.assertIsInstance(compressed, encoding.RunLengthValues)
+        self.assertEqual([1, 1, 1, None, None, None, 1, 1], compressed)
+
+    def test_constant(self):
+        values = encoding.ConstantValues('x', 4)
+        self.assertEqual(['x'] * 4, values)
+        self.assertEqual(['x'] * 2, values[1:3])
+        self.assertEqual(['x'] * 3, encoding.compress(values, [1, 0, 1, 1]))
+        self.assertEqual(['x'] * 2, encoding.take(values, [3, 0]))
+        # Concatenating equal constants gives a constant.
+        self.assertIsInstance(encoding.concat_values([values, values]),
+                              encoding.ConstantValues)
+        concatenated = encoding.concat_values([values, self.values])
+        self.assertIsInstance(concatenated, encoding.RunLengthValues)
+        self.assertEqual(['x'] * 4 + self.plain, concatenated)
+
+    def test_choose_encoding(self):
+        self.assertIsInstance(encoding.choose_encoding([3] * 50),
+                              encoding.ConstantValues)
+        self.assertIsInstance(
+            encoding.choose_encoding([i // 20 for i in xrange(100)]),
+            encoding.RunLengthValues)
+        # The runs are too short.
+        self.assertEqual(self.plain, encoding.choose_encoding(self.plain))
+        self.assertIsInstance(encoding.choose_encoding(self.plain), list)
+        runs = encoding.choose_encoding(encoding.dictionary_encode(
+            ['a'] * 30 + ['b'] * 30))
+        self.assertEqual(['a', 'b'], runs.run_values)
+
+    def test_aggregates(self):
+        for function_name, expected_result in [('sum', 13), ('count', 10),
+                                               ('avg', 1.3), ('min', 1),
+                                               ('max', 2)]:
+            function = runtime.get_func(function_name)
+            self.assertEqual(expected_result,
+                             function.evaluate(1, self.values)[0])
+            self.assertEqual(expected_result,
+                             function.finalize_state(
+                                 function.partial_state(self.values)))
+
+    def test_stats(self):
+        stats = storage.ColumnStats.from_values(self.values)
+        self.assertEqual((1, 2, 4), (stats.min, stats.max, stats.null_count))
+
+    def test_estimate_bytes(self):
+        plain = context.Column(tq_types.INT,
+                               [i // 1000 for i in xrange(10000)])
+        encoded = context.Column(tq_types.INT,
+                                 encoding.choose_encoding(plain.values))
+        self.assertLess(memory.estimate_column_bytes(encoded) * 100,
+                        memory.estimate_column_bytes(plain))
+
+
+class NullableValuesTest(unittest.TestCase):
+    def setUp(self):
+        self.values = encoding.NullableValues(
+            [1, None, 3, None], bytearray([1, 0, 1, 0]))
+
+    def test_sequence(self):
+        self.assertEqual(4, len(self.values))
+        self.assertEqual([1, None, 3, None], list(self.values))
+        self.assertEqual(3, self.values[2])
+        self.assertEqual([1, None, 3, None], self.values)
+        self.assertIsInstance(self.values[:2], encoding.NullableValues)
+        self.assertEqual(bytearray([1, 0]), self.values[:2].validity)
+        # Slices without nulls don't need a bitmap.
+        self.assertEqual([3], self.values[2:3])
+        self.assertIsInstance(self.values[2:3], list)
+
+    def test_take_and_compress(self):
+        self.assertEqual([3, 1, None], self.values.take([2, 0, 1]))
+        compressed = self.values.compress([True, True, False, False])
+        self.assertEqual([1, None], compressed)
+        self.assertEqual(bytearray([1, 0]), compressed.validity)
+        mask = encoding.NullableValues([True, None, True, False],
+                                       bytearray([1, 0, 1, 0]))
+        self.assertEqual([1, 3], self.values.compress(mask))
+
+    def test_concat(self):
+        concatenated = encoding.concat_values([self.values, self.values])
+        self.assertIsInstance(concatenated, encoding.NullableValues)
+        self.assertEqual([1, None, 3, None] * 2, concatenated)
+        self.assertEqual(bytearray([1, 0, 1, 0] * 2), concatenated.validity)
+        self.assertEqual([1, None, 3, None, 5],
+                         encoding.concat_values([self.values, [5]]))
+
+    def test_from_validity(self):
+        self.assertIsInstance(
+            encoding.NullableValues.from_validity([1, 2], bytearray([1, 1])),
+            list)
+        self.assertIsInstance(
+            encoding.NullableValues.from_validity([1, None],
+                                                  bytearray([1, 0])),
+            encoding.NullableValues)
+
+    def test_estimate_bytes(self):
+        plain = context.Column(tq_types.INT, [1, None, 3, None])
+        nullable = context.Column(tq_types.INT, self.values)
+        self.assertEqual(memory.estimate_column_bytes(plain) + 4,
+                         memory.estimate_column_bytes(nullable))
+
+
+class EncodedQueryTest(unittest.TestCase):
+    def setUp(self):
+        self.plain_tq = tinyquery.TinyQuery()
+        self.encoded_tq = tinyquery.TinyQuery()
+        # Dictionary-encoded even though half of its values are distinct.
+        codes = make_values(['us', 'fr', 'jp'], [1, 0, 1, 2])
+        for tq, encode in ((self.plain_tq, list),
+                           (self.encoded_tq, encoding.dictionary_encode)):
+            tq.load_table_or_view(tinyquery.Table(
+                'ds.events',
+                60,
+                collections.OrderedDict([
+                    ('country', context.Column(tq_types.STRING, encode(
+                        [['us', 'fr', None, 'de'][i % 4]
+                         for i in xrange(60)]))),
+                    ('status', context.Column(tq_types.STRING, encode(
+                        ['ok' if i % 3 else 'err' for i in xrange(60)]))),
+                    ('val', context.Column(tq_types.INT, range(60))),
+                ])))
+            tq.load_table_or_view(tinyquery.Table(
+                'ds.countries',
+                4,
+                collections.OrderedDict([
+                    ('code', context.Column(
+                        tq_types.STRING,
+                        list(codes) if encode is list else codes)),
+                    ('name', context.Column(tq_types.STRING,
+                                            ['France', 'USA', 'Fr', 'Japan'])),
+                ])))
+
+    def assert_same_result(self, query):
+        self.assertEqual(self.plain_tq.evaluate_query(query),
+                         self.encoded_tq.evaluate_query(query))
+
+    def assert_same_groups(self, query):
+        # The groups can come out in a different order.
+        results = [tq.evaluate_query(query)
+                   for tq in (self.plain_tq, self.encoded_tq)]
+        self.assertEqual(*[result.columns.keys() for result in results])
+        self.assertEqual(*[
+            sorted(zip(*[column.values
+                         for column in result.columns.itervalues()]))
+            for result in results])
+
+    def test_filters(self):
+        for query in [
+                "SELECT val FROM ds.events WHERE country = 'fr'",
+                "SELECT val FROM ds.events WHERE 'fr' != country",
+                "SELECT val FROM ds.events WHERE country IN ('fr', 'de')",
+                "SELECT val FROM ds.events WHERE country IS NULL",
+                "SELECT country, status FROM ds.events "
+                "WHERE country = 'us' AND status = 'ok'",
+                "SELECT CONCAT(country, '!') FROM ds.events "
+                "WHERE country IS NOT NULL",
+                "SELECT country FROM ds.events WHERE val > 50"]:
+            self.assert_same_result(query)
+
+    def test_function_evaluated_per_code(self):
+        query = "SELECT val FROM ds.events WHERE country = 'fr'"
+        with mock.patch.object(
+                evaluator, 'evaluate_on_dictionary',
+                side_effect=evaluator.evaluate_on_dictionary) as (
+                    evaluate_on_dictionary):
+            self.plain_tq.evaluate_query(query)
+            self.assertEqual(0, evaluate_on_dictionary.call_count)
+            self.encoded_tq.evaluate_query(query)
+            self.assertEqual(1, evaluate_on_dictionary.call_count)
+
+    def test_group_by(self):
+        for query in [
+                'SELECT country, COUNT(*), SUM(val) FROM ds.events '
+                'GROUP BY country',
+                'SELECT country, status, MAX(val) FROM ds.events '
+                'GROUP BY country, status',
+                'SELECT status, val % 2 AS parity, COUNT(*) FROM ds.events '
+                'GROUP BY status, parity',
+                'SELECT country, STDDEV_SAMP(val) FROM ds.events '
+                'GROUP BY country',
+                'SELECT country, COUNT(*) FROM ds.events '
+                'WHERE status = \'ok\' GROUP EACH BY country',
+                'SELECT c, COUNT(*) FROM '
+                '(SELECT country AS c FROM ds.events) GROUP BY c']:
+            self.assert_same_groups(query)
+
+    def test_join(self):
+        for query in [
+                'SELECT e.val, c.name FROM ds.events e '
+                'JOIN ds.countries c ON e.country = c.code',
+                'SELECT e.val, c.name FROM ds.events e '
+                'LEFT OUTER JOIN ds.countries c ON e.country = c.code',
+                'SELECT e.val, c.name FROM '
+                '(SELECT country, val FROM ds.events) e '
+                'LEFT OUTER JOIN ds.countries c ON e.country = c.code']:
+            self.assert_same_result(query)
+        self.assert_same_groups(
+            'SELECT c.name, COUNT(*) FROM ds.events e '
+            'JOIN ds.countries c ON e.country = c.code GROUP BY c.name')
+        with mock.patch.object(
+                evaluator, 'probe_dictionary_join',
+                side_effect=evaluator.probe_dictionary_join) as (
+                    probe_dictionary_join):
+            for query in [
+                    'SELECT e.val FROM ds.events e '
+                    'JOIN ds.countries c ON e.country = c.code',
+                    'SELECT e.val FROM (SELECT country, val FROM ds.events) e '
+                    'JOIN ds.countries c ON e.country = c.code']:
+                self.encoded_tq.evaluate_query(query)
+            self.assertEqual(2, probe_dictionary_join.call_count)
+
+    def test_load_table_from_csv(self):
+        fd, filename = tempfile.mkstemp()
+        self.addCleanup(os.remove, filename)
+        with os.fdopen(fd, 'w') as f:
+            for i in xrange(10):
+                f.write('{},{},{}\n'.format(
+                    i, ['us', 'fr', 'null'][i % 3], 'name%d' % i))
+        tq = tinyquery.TinyQuery()
+        tq.load_table_from_csv('ds.csv', {'fields': [
+            {'name': 'val', 'type': 'INTEGER'},
+            {'name': 'country', 'type': 'STRING'},
+            {'name': 'name', 'type': 'STRING'},
+        ]}, filename)
+        columns = tq.tables_by_name['ds.csv'].columns
+        self.assertIsInstance(columns['country'].values,
+                              encoding.DictionaryValues)
+        self.assertEqual(['us', 'fr', None], columns['country'].values[:3])
+        # Every value is distinct, so the column isn't encoded.
+        self.assertIsInstance(columns['name'].values, list)
+        result = tq.evaluate_query(
+            "SELECT country, COUNT(*) AS c FROM ds.csv "
+            "WHERE country != 'us' GROUP BY country")
+        # Comparing a null country gives null, so those rows are filtered.
+        self.assertEqual(
+            [('fr', 3)],
+            sorted(zip(*[column.values
+                         for column in result.columns.itervalues()])))
+
+
+class RunLengthQueryTest(unittest.TestCase):
+    def setUp(self):
+        chunk_size_patcher = mock.patch.object(storage, 'CHUNK_SIZE', 16)
+        chunk_size_patcher.start()
+        self.addCleanup(chunk_size_patcher.stop)
+        self.plain_tq = tinyquery.TinyQuery()
+        self.encoded_tq = tinyquery.TinyQuery()
+        for tq, encode in ((self.plain_tq, list),
+                           (self.encoded_tq, encoding.choose_encoding)):
+            tq.load_table_or_view(tinyquery.Table(
+                'ds.events',
+                100,
+                collections.OrderedDict([
+                    ('day', context.Column(tq_types.INT, encode(
+                        [20160101 + i // 30 for i in xrange(100)]))),
+                    ('tenant', context.Column(tq_types.STRING, encode(
+                        ['acme'] * 100))),
+                    ('status', context.Column(tq_types.STRING, encode(
+                        [None if i < 50 else 'ok' for i in xrange(100)]))),
+                    ('val', context.Column(tq_types.INT, range(100))),
+                ])))
+
+    def assert_same_result(self, query):
+        self.assertEqual(self.plain_tq.evaluate_query(query),
+                         self.encoded_tq.evaluate_query(query))
+
+    def assert_same_groups(self, query):
+        results = [tq.evaluate_query(query)
+                   for tq in (self.plain_tq, self.encoded_tq)]
+        self.assertEqual(*[
+            sorted(zip(*[column.values
+                         for column in result.columns.itervalues()]))
+            for result in results])
+
+    def test_filters(self):
+        for query in [
+                'SELECT val FROM ds.events WHERE day = 20160102',
+                'SELECT val, day FROM ds.events WHERE day >= 20160102 '
+                'AND val % 7 = 0',
+                "SELECT tenant, status FROM ds.events WHERE tenant = 'acme'",
+                'SELECT val FROM ds.events WHERE status IS NULL',
+                'SELECT day + 1 FROM ds.events']:
+            self.assert_same_result(query)
+
+    def test_function_evaluated_per_run(self):
+        with mock.patch.object(
+                evaluator, 'evaluate_on_runs',
+                side_effect=evaluator.evaluate_on_runs) as evaluate_on_runs:
+            query = 'SELECT val FROM ds.events WHERE day = 20160102'
+            self.plain_tq.evaluate_query(query)
+            self.assertEqual(0, evaluate_on_runs.call_count)
+            self.encoded_tq.evaluate_query(query)
+            self.assertGreater(evaluate_on_runs.call_count, 0)
+
+    def test_aggregates(self):
+        for query in [
+                'SELECT SUM(day), COUNT(status), AVG(day), MIN(status), '
+                'MAX(day), COUNT(DISTINCT day), FIRST(tenant) FROM ds.events',
+                'SELECT SUM(day), COUNT(*) FROM ds.events WHERE val > 10']:
+            self.assert_same_result(query)
+
+    def test_group_by(self):
+        for query in [
+                'SELECT day, COUNT(*), SUM(val) FROM ds.events GROUP BY day',
+                'SELECT tenant, day, status, COUNT(*) FROM ds.events '
+                'GROUP BY tenant, day, status',
+                'SELECT day, status, SUM(val) FROM ds.events '
+                'GROUP BY day, status',
+                'SELECT day, COUNT(*) FROM ds.events WHERE val % 2 = 0 '
+                'GROUP EACH BY day',
+                'SELECT day, STDDEV_SAMP(val), SUM(val) FROM ds.events '
+                'GROUP BY day']:
+            self.assert_same_groups(query)
+
+    def test_load_table_from_csv(self):
+        fd, filename = tempfile.mkstemp()
+        self.addCleanup(os.remove, filename)
+        with os.fdopen(fd, 'w') as f:
+            for i in xrange(100):
+                f.write('{},{},acme\n'.format(i, i // 25))
+        tq = tinyquery.TinyQuery()
+        tq.load_table_from_csv('ds.csv', {'fields': [
+            {'name': 'val', 'type': 'INTEGER'},
+            {'name': 'day', 'type': 'INTEGER'},
+            {'name': 'tenant', 'type': 'STRING'},
+        ]}, filename)
+        columns = tq.tables_by_name['ds.csv'].columns
+        self.assertIsInstance(columns['val'].values, list)
+        self.assertEqual([0, 1, 2, 3], columns['day'].values.run_values)
+        self.assertIsInstance(columns['tenant'].values,
+                              encoding.ConstantValues)
@@ -2,7 +2,8 @@ import collections
 import mock
 import unittest
 
-from tinyquery import tq_types,  context, tinyquery
+from tinyquery import (tq_types, compiler, context, evaluator, parallel,
+                       storage, tinyquery)
 
 
 class EvaluatorTest(unittest.TestCase):
@@ -239,6 +240,61 @@ class EvaluatorTest(unittest.TestCase):
                 ('f1_', tq_types.BOOL, [True, False, False, True]),
             ]))
 
+    def test_null_propagation(self):
+        self.assert_query_result(
+            'SELECT foo + 1, IFNULL(foo, 0) FROM null_table',
+            self.make_context([
+                ('f0_', tq_types.INT, [2, None, None, 6]),
+                ('f1_', tq_types.INT, [1, 0, 0, 5]),
+            ]))
+
+    def test_null_filter(self):
+        # A comparison with null is null, which doesn't match either way.
+        self.assert_query_result(
+            'SELECT foo FROM null_table WHERE foo > 2 OR foo <= 2',
+            self.make_context([('foo', tq_types.INT, [1, 5])]))
+        self.assert_query_result(
+            'SELECT foo FROM null_table WHERE foo > 2 OR foo IS NULL',
+            self.make_context([('foo', tq_types.INT, [None, None, 5])]))
+
+    def test_null_aggregates(self):
+        self.assert_query_result(
+            'SELECT SUM(foo), MIN(foo), COUNT(foo) FROM null_table',
+            self.make_context([
+                ('f0_', tq_types.INT, [6]),
+                ('f1_', tq_types.INT, [1]),
+                ('f2_', tq_types.INT, [2]),
+            ]))
+
+    def test_lazy_arguments(self):
+        # The division is only evaluated for the rows that need it, so it
+        # never divides by zero.
+        self.assert_query_result(
+            'SELECT IF(bar > 2, foo / (bar - 1), 0) FROM test_table_3',
+            self.make_context([('f0_', tq_types.INT, [0, 0, 2, 0, 0])]))
+        self.assert_query_result(
+            'SELECT foo FROM test_table_3 '
+            'WHERE bar > 2 AND foo / (bar - 1) > 0',
+            self.make_context([('foo', tq_types.INT, [4])]))
+        self.assert_query_result(
+            'SELECT IFNULL(foo, 2 * 3) FROM null_table',
+            self.make_context([('f0_', tq_types.INT, [1, 6, 6, 5])]))
+
+    def test_lazy_arguments_mostly_selected(self):
+        # Most rows pass the guard here, but the rows that don't still never
+        # reach the division.
+        self.assert_query_result(
+            'SELECT IF(bar != 1, foo / (bar - 1), 0) FROM test_table_3',
+            self.make_context([('f0_', tq_types.INT, [1, 0, 2, 0, 0])]))
+        self.assert_query_result(
+            'SELECT foo FROM test_table_3 '
+            'WHERE bar != 1 AND foo / (bar - 1) > 0',
+            self.make_context([('foo', tq_types.INT, [1, 4])]))
+        self.assert_query_result(
+            'SELECT COUNT(*) FROM test_table_3 '
+            'WHERE bar = 1 OR foo / (bar - 1) > 0',
+            self.make_context([('f0_', tq_types.INT, [4])]))
+
     def test_string_comparison(self):
         self.assert_query_result(
             'SELECT str = "hello" FROM string_table',
@@ -360,6 +416,38 @@ class EvaluatorTest(unittest.TestCase):
             ])
         )
 
+    def test_filtered_cross_join_in_batches(self):
+        query = ('SELECT t1.val1, t2.val3 FROM test_table t1 '
+                 'CROSS JOIN test_table_2 t2 WHERE t1.val1 + t2.val3 > 9')
+        expected_result = self.make_context([
+            ('t1.val1', tq_types.INT, [4, 8, 8, 2]),
+            ('t2.val3', tq_types.INT, [8, 3, 8, 8]),
+        ])
+        self.assert_query_result(query, expected_result)
+        with mock.patch.object(evaluator, 'CROSS_JOIN_BATCH_ROWS', 3):
+            with mock.patch.object(
+                    context, 'cross_join_contexts',
+                    side_effect=context.cross_join_contexts) as (
+                        cross_join_contexts):
+                self.assert_query_result(query, expected_result)
+                # One batch for each row of test_table.
+                self.assertEqual(5, cross_join_contexts.call_count)
+
+    def test_filter_projects_columns_first(self):
+        # With workers, the pipeline isn't used, so the table is filtered by
+        # evaluate_filtered_table_expr, which shouldn't copy unused columns.
+        self.tq.num_query_workers = 2
+        with mock.patch.object(context, 'mask_context',
+                               side_effect=context.mask_context) as (
+                                   mask_context):
+            self.assert_query_result(
+                'SELECT val1 FROM test_table WHERE val1 > 2',
+                self.make_context([('val1', tq_types.INT, [4, 8])]))
+        self.assertTrue(mask_context.call_args_list)
+        for args, _ in mask_context.call_args_list:
+            self.assertEqual(['val1'], [column_name for _, column_name
+                                        in args[0].columns])
+
     def test_limit(self):
         self.assert_query_result(
             'SELECT * from test_table LIMIT 3',
@@ -423,3 +511,346 @@ class EvaluatorTest(unittest.TestCase):
         )
 
         # TODO(colin): test behavior on empty list in both cases
+
+    def test_limit_does_not_modify_table(self):
+        self.tq.evaluate_query('SELECT * FROM test_table LIMIT 2')
+        self.assert_query_result(
+            'SELECT val1 FROM test_table',
+            self.make_context([('val1', tq_types.INT, [4, 1, 8, 1, 2])]))
+
+    def test_multiple_chunks(self):
+        with mock.patch.object(storage, 'CHUNK_SIZE', 2):
+            self.tq.load_table_or_view(tinyquery.Table(
+                'chunked_table',
+                5,
+                collections.OrderedDict([
+                    ('foo', context.Column(tq_types.INT, [1, 2, 3, 4, 5])),
+                ])))
+        self.assertEqual(
+            3, len(self.tq.get_all_tables()['chunked_table'].chunks))
+        self.assert_query_result(
+            'SELECT foo FROM chunked_table WHERE foo % 2 = 1',
+            self.make_context([('foo', tq_types.INT, [1, 3, 5])]))
+        self.assert_query_result(
+            'SELECT COUNT(*) FROM chunked_table',
+            self.make_context([('f0_', tq_types.INT, [5])]))
+
+    def test_zone_maps_skip_chunks(self):
+        with mock.patch.object(storage, 'CHUNK_SIZE', 2):
+            self.tq.load_table_or_view(tinyquery.Table(
+                'sorted_table',
+                6,
+                collections.OrderedDict([
+                    ('foo', context.Column(tq_types.INT,
+                                           [1, 2, 3, 4, 5, 6])),
+                    ('bar', context.Column(tq_types.INT,
+                                           [None, 2, 8, 3, 7, None])),
+                ])))
+        with mock.patch.object(evaluator.Evaluator, 'filter_context',
+                               autospec=True,
+                               side_effect=evaluator.Evaluator.filter_context
+                               ) as filter_context:
+            self.assert_query_result(
+                'SELECT bar FROM sorted_table WHERE foo >= 4 AND bar > 5',
+                self.make_context([('bar', tq_types.INT, [7])]))
+            self.assertEqual(2, filter_context.call_count)
+            self.assert_query_result(
+                'SELECT foo FROM sorted_table WHERE foo > 10',
+                self.make_context([('foo', tq_types.INT, [])]))
+            self.assertEqual(2, filter_context.call_count)
+            self.assert_query_result(
+                'SELECT foo FROM sorted_table WHERE bar < 3',
+                self.make_context([('foo', tq_types.INT, [2])]))
+            self.assertEqual(3, filter_context.call_count)
+
+    @mock.patch.object(compiler, 'MAX_INDEX_LOOKUP_FRACTION', 1)
+    def test_index_lookup(self):
+        # The test table is too small for the indexes to be selective enough
+        # to use, so we allow any lookup.
+        self.tq.create_index('test_table', 'val1', kind='hash')
+        self.tq.create_index('test_table', 'val2', kind='sorted')
+        self.assert_query_result(
+            'SELECT val2 FROM test_table WHERE val1 = 1',
+            self.make_context([('val2', tq_types.INT, [2, 1])]))
+        self.assert_query_result(
+            'SELECT val1 FROM test_table WHERE val1 IN (1, 8) AND val2 > 1',
+            self.make_context([('val1', tq_types.INT, [1, 8])]))
+        self.assert_query_result(
+            'SELECT val1 FROM test_table t WHERE t.val2 >= 6',
+            self.make_context([('val1', tq_types.INT, [4, 2])]))
+
+    def test_index_maintained_on_copy(self):
+        self.tq.create_index('test_table', 'val1', kind='hash')
+        table = self.tq.get_all_tables()['test_table']
+        self.tq.copy_table(table, 'test_table_copy', 'CREATE_IF_NEEDED',
+                           'WRITE_APPEND')
+        self.tq.copy_table(table, 'test_table_copy', 'CREATE_IF_NEEDED',
+                           'WRITE_APPEND')
+        copied_table = self.tq.get_all_tables()['test_table_copy']
+        self.assertEqual([1, 3, 6, 8],
+                         copied_table.indexes['val1'].lookup('=', (1,)))
+        self.assert_query_result(
+            'SELECT val2 FROM test_table_copy WHERE val1 = 1',
+            self.make_context([('val2', tq_types.INT, [2, 1, 2, 1])]))
+        self.tq.copy_table(table, 'test_table_copy', 'CREATE_IF_NEEDED',
+                           'WRITE_TRUNCATE')
+        self.assertEqual([1, 3],
+                         copied_table.indexes['val1'].lookup('=', (1,)))
+
+    def load_partitioned_table(self):
+        self.tq.load_table_or_view(tinyquery.PartitionedTable(
+            'events',
+            5,
+            collections.OrderedDict([
+                ('day', context.Column(tq_types.STRING, [
+                    '20160102', '20160101', '20160103', '20160101', None])),
+                ('val', context.Column(tq_types.INT, [1, 2, 3, 4, 5])),
+            ]),
+            'day'))
+        return self.tq.get_all_tables()['events']
+
+    def test_partitioned_table(self):
+        table = self.load_partitioned_table()
+        self.assertEqual([None, '20160101', '20160102', '20160103'],
+                         table.partition_keys)
+        self.assert_query_result(
+            'SELECT val FROM events',
+            self.make_context([('val', tq_types.INT, [5, 2, 4, 1, 3])]))
+        self.assert_query_result(
+            'SELECT val FROM [events$20160101]',
+            self.make_context([('val', tq_types.INT, [2, 4])]))
+        self.assert_query_result(
+            'SELECT events.val FROM [events$__NULL__]',
+            self.make_context([('events.val', tq_types.INT, [5])]))
+        self.assert_query_result(
+            'SELECT val FROM [events$20160104]',
+            self.make_context([('val', tq_types.INT, [])]))
+
+    def test_partition_pruning(self):
+        table = self.load_partitioned_table()
+        with mock.patch.object(
+                table, 'get_partition_chunks',
+                side_effect=table.get_partition_chunks) as get_chunks:
+            self.assert_query_result(
+                'SELECT val FROM events '
+                'WHERE day >= "20160102" AND val > 0',
+                self.make_context([('val', tq_types.INT, [1, 3])]))
+            get_chunks.assert_called_once_with(('20160102', '20160103'))
+
+    def test_copy_into_partitioned_table(self):
+        table = self.load_partitioned_table()
+        self.tq.copy_table(table, 'events_copy', 'CREATE_IF_NEEDED',
+                           'WRITE_APPEND')
+        self.tq.copy_table(table, 'events_copy', 'CREATE_IF_NEEDED',
+                           'WRITE_APPEND')
+        copied_table = self.tq.get_all_tables()['events_copy']
+        self.assertTrue(isinstance(copied_table, tinyquery.PartitionedTable))
+        self.assertEqual(10, copied_table.num_rows)
+        self.assert_query_result(
+            'SELECT val FROM [events_copy$20160103]',
+            self.make_context([('val', tq_types.INT, [3, 3])]))
+
+    @mock.patch.object(compiler, 'MAX_INDEX_LOOKUP_FRACTION', 1)
+    def test_index_on_partitioned_table(self):
+        table = self.load_partitioned_table()
+        self.tq.create_index('events', 'val', kind='sorted')
+        last_partition_index = table.indexes['val'].partition_indexes[
+            '20160103']
+        # Appending to an earlier partition changes the row numbers of the
+        # later ones, but only the appended partition needs to be indexed.
+        table.append_chunks(storage.chunks_from_columns(
+            2, collections.OrderedDict([
+                ('day', context.Column(tq_types.STRING,
+                                       ['20160101', '20160101'])),
+                ('val', context.Column(tq_types.INT, [3, 6]))])))
+        self.assertIs(last_partition_index,
+                      table.indexes['val'].partition_indexes['20160103'])
+        self.assertEqual(7, table.indexes['val'].num_rows)
+        self.assertEqual([3, 6], table.indexes['val'].lookup('=', (3,)))
+        self.assert_query_result(
+            'SELECT day FROM events WHERE val >= 3',
+            self.make_context([('day', tq_types.STRING, [
+                None, '20160101', '20160101', '20160101', '20160103'])]))
+
+    def load_date_tables(self):
+        for day, values in [('20160101', [1]), ('20160102', [2, 3]),
+                            ('20160103', [4]), ('20160104', [5])]:
+            self.tq.load_table_or_view(tinyquery.Table(
+                'ds.events_' + day,
+                len(values),
+                collections.OrderedDict([
+                    ('val', context.Column(tq_types.INT, values)),
+                ])))
+        self.tq.load_table_or_view(tinyquery.Table(
+            'ds.events_backup',
+            1,
+            collections.OrderedDict([
+                ('val', context.Column(tq_types.INT, [6])),
+            ])))
+
+    def test_table_date_range(self):
+        self.load_date_tables()
+        self.assert_query_result(
+            'SELECT val FROM TABLE_DATE_RANGE([ds.events_], '
+            'TIMESTAMP("2016-01-02"), TIMESTAMP("2016-01-03"))',
+            self.make_context([('val', tq_types.INT, [2, 3, 4])]))
+
+    def test_table_date_range_with_filter(self):
+        self.load_date_tables()
+        self.assert_query_result(
+            'SELECT val FROM TABLE_DATE_RANGE([ds.events_], '
+            '"2016-01-01", "2016-12-31") WHERE val > 2',
+            self.make_context([('val', tq_types.INT, [3, 4, 5])]))
+
+    def test_table_query(self):
+        self.load_date_tables()
+        self.assert_query_result(
+            'SELECT val FROM TABLE_QUERY(ds, '
+            '"REGEXP_MATCH(table_id, \'^events_2016010[24]$\') OR '
+            'row_count > 4")',
+            self.make_context([('val', tq_types.INT, [2, 3, 5])]))
+        # Quotes in the expression stay within it.
+        self.assert_query_result(
+            'SELECT val FROM TABLE_QUERY(ds, '
+            '"table_id = \'events_20160102\' OR table_id = \'--\'")',
+            self.make_context([('val', tq_types.INT, [2, 3])]))
+
+    def test_table_query_errors(self):
+        self.load_date_tables()
+        for expr in ["table_id = 'events_20160102",
+                     "table_id = 'events_20160102' LIMIT 1",
+                     "true) OR (false",
+                     "name = 'events'",
+                     "row_count"]:
+            with self.assertRaises(compiler.CompileError) as cm:
+                self.tq.evaluate_query(
+                    'SELECT val FROM TABLE_QUERY(ds, "{}")'.format(expr))
+            self.assertIn('TABLE_QUERY' if expr != "name = 'events'"
+                          else 'name', str(cm.exception))
+
+    def test_parallel_union(self):
+        self.load_date_tables()
+        queries = [
+            'SELECT val FROM TABLE_DATE_RANGE([ds.events_], '
+            '"2016-01-01", "2016-12-31") WHERE val > 1',
+            'SELECT COUNT(*) FROM TABLE_DATE_RANGE([ds.events_], '
+            '"2016-01-01", "2016-12-31")',
+            'SELECT val1, val3 FROM test_table, test_table_2, '
+            '(SELECT val3 FROM test_table_2, test_table_2) WHERE val2 > 1',
+        ]
+        serial_results = [self.tq.evaluate_query(query) for query in queries]
+        self.tq.num_query_workers = 2
+        with mock.patch.object(
+                parallel, 'fork_map', side_effect=parallel.fork_map) as (
+                    fork_map):
+            parallel_results = [self.tq.evaluate_query(query)
+                                for query in queries]
+            self.assertEqual(3, fork_map.call_count)
+        self.assertEqual(serial_results, parallel_results)
+
+    def test_join_rows_build_side(self):
+        rows1 = [(0, (1,)), (1, (2,)), (2, (1,)), (3, (5,))]
+        rows2 = [(0, (2,)), (1, (1,)), (2, (1,))]
+        # The hash table is built on the second table here, and on the first
+        # table when the second table has more rows.
+        self.assertEqual(
+            [(0, [1, 2]), (1, [0]), (2, [1, 2]), (3, [])],
+            evaluator.join_rows(rows1, rows2, is_left_outer=True))
+        self.assertEqual(
+            [(0, [1, 2]), (1, [0]), (2, [1, 2]), (3, [])],
+            evaluator.join_rows(rows1[:3] + [(3, (5,))],
+                                rows2 + [(3, (7,)), (4, (8,))],
+                                is_left_outer=True)[:4])
+        self.assertEqual(
+            [(1, [0]), (2, [1, 2])],
+            evaluator.join_rows(rows1[1:3], rows2, is_left_outer=False))
+
+    def test_parallel_join(self):
+        self.tq.load_table_or_view(tinyquery.Table(
+            'ds.big',
+            60,
+            collections.OrderedDict([
+                ('key', context.Column(tq_types.INT,
+                                       [i % 9 for i in xrange(60)])),
+                ('key2', context.Column(tq_types.INT,
+                                        [i % 2 for i in xrange(60)])),
+                ('val', context.Column(tq_types.INT, range(60))),
+            ])))
+        self.tq.load_table_or_view(tinyquery.Table(
+            'ds.small',
+            6,
+            collections.OrderedDict([
+                ('key', context.Column(tq_types.INT, [0, 1, 1, 3, 4, 12])),
+                ('key2', context.Column(tq_types.INT, [0, 1, 0, 1, 0, 1])),
+                ('name', context.Column(tq_types.STRING,
+                                        ['a', 'b', 'c', 'd', 'e', 'f'])),
+            ])))
+        queries = [
+            'SELECT b.val, s.name FROM ds.big b JOIN ds.small s '
+            'ON b.key = s.key',
+            'SELECT s.name, b.val FROM ds.small s JOIN ds.big b '
+            'ON s.key = b.key',
+            'SELECT b.val, s.name FROM ds.big b LEFT OUTER JOIN ds.small s '
+            'ON b.key = s.key AND b.key2 = s.key2',
+            'SELECT s.name, b.val FROM ds.small s LEFT OUTER JOIN ds.big b '
+            'ON s.key = b.key',
+        ]
+        serial_results = [self.tq.evaluate_query(query) for query in queries]
+        self.tq.num_query_workers = 3
+        with mock.patch.object(evaluator, 'MIN_ROWS_PER_JOIN_WORKER', 1):
+            with mock.patch.object(
+                    parallel, 'fork_map', side_effect=parallel.fork_map) as (
+                        fork_map):
+                parallel_results = [self.tq.evaluate_query(query)
+                                    for query in queries]
+                # Each query partitions and then joins.
+                self.assertEqual(8, fork_map.call_count)
+        # Unlike groups, joined rows come back in the same order.
+        self.assertEqual(serial_results, parallel_results)
+
+    def test_parallel_group_by(self):
+        self.tq.load_table_or_view(tinyquery.Table(
+            'ds.events',
+            100,
+            collections.OrderedDict([
+                ('key', context.Column(tq_types.INT,
+                                       [i % 7 for i in xrange(100)])),
+                ('val', context.Column(tq_types.INT,
+                                       [None if i % 5 == 0 else i
+                                        for i in xrange(100)])),
+                ('name', context.Column(tq_types.STRING,
+                                        ['name%d' % (i % 3)
+                                         for i in xrange(100)])),
+            ])))
+        queries = [
+            'SELECT key, SUM(val), COUNT(val), MIN(val), MAX(val), '
+            'AVG(val), COUNT(DISTINCT name), FIRST(val) '
+            'FROM ds.events GROUP BY key',
+            'SELECT name, key + 1 AS k, COUNT(*) * 2 AS c '
+            'FROM ds.events GROUP BY name, k',
+            'SELECT COUNT(*), SUM(val) FROM ds.events',
+        ]
+
+        def sorted_rows(result):
+            return sorted(zip(*[column.values
+                                for column in result.columns.itervalues()]))
+        serial_results = [self.tq.evaluate_query(query) for query in queries]
+        self.tq.num_query_workers = 3
+        with mock.patch.object(evaluator, 'MIN_ROWS_PER_AGGREGATION_WORKER',
+                               1):
+            with mock.patch.object(
+                    parallel, 'fork_map', side_effect=parallel.fork_map) as (
+                        fork_map):
+                parallel_results = [self.tq.evaluate_query(query)
+                                    for query in queries]
+                # Each query pre-aggregates and then combines.
+                self.assertEqual(6, fork_map.call_count)
+        for serial_result, parallel_result in zip(serial_results,
+                                                  parallel_results):
+            self.assertEqual(serial_result.columns.keys(),
+                             parallel_result.columns.keys())
+            self.assertEqual(
+                [column.type for column in serial_result.columns.values()],
+                [column.type for column in parallel_result.columns.values()])
+            self.assertEqual(sorted_rows(serial_result),
+                             sorted_rows(parallel_result))
@@ -0,0 +1,124 @@
+import collections
+import unittest
+
+from tinyquery import context, explain, tinyquery, tq_types
+
+
+class ExplainTest(unittest.TestCase):
+    def setUp(self):
+        self.tq = tinyquery.TinyQuery()
+        self.tq.load_table_or_view(tinyquery.Table(
+            'ds.events',
+            6,
+            collections.OrderedDict([
+                ('key', context.Column(tq_types.INT, [1, 2, 3, 1, 2, 3])),
+                ('name', context.Column(tq_types.STRING,
+                                        ['a', 'b', 'c', 'd', None, 'f'])),
+            ])))
+        self.tq.load_table_or_view(tinyquery.Table(
+            'ds.keys',
+            2,
+            collections.OrderedDict([
+                ('key', context.Column(tq_types.INT, [1, 2])),
+            ])))
+
+    def get_plan_lines(self, query):
+        result = self.tq.evaluate_query(query)
+        self.assertEqual([(None, 'plan')], result.columns.keys())
+        return result.columns[(None, 'plan')].values
+
+    def test_explain(self):
+        self.assertEqual(
+            ['Limit: LIMIT 2',
+             '  Project: ds.events.name AS name',
+             '    Filter: WHERE ((ds.events.key > 1) AND '
+             '(ds.events.name IS NOT NULL))',
+             '      Scan: table ds.events; zone map predicates '
+             'ds.events.key > 1, ds.events.name IS NOT NULL'],
+            self.get_plan_lines(
+                'EXPLAIN SELECT name FROM ds.events '
+                'WHERE key > 1 AND name IS NOT NULL LIMIT 2'))
+
+    def test_explain_join(self):
+        self.assertEqual(
+            ['Aggregate: GROUP BY e.name; e.name AS e.name; '
+             'COUNT(1) AS f0_',
+             '  Filter: WHERE true',
+             '    Join: LEFT OUTER; ON e.key = k.key',
+             '      Scan: table ds.events',
+             '      Scan: table ds.keys'],
+            self.get_plan_lines(
+                'EXPLAIN SELECT e.name, COUNT(*) FROM ds.events e '
+                'LEFT OUTER JOIN ds.keys k ON e.key = k.key '
+                'GROUP BY e.name'))
+
+    def test_explain_each(self):
+        self.assertEqual(
+            ['Aggregate: GROUP EACH BY e.name; e.name AS e.name; '
+             'COUNT(1) AS f0_',
+             '  Filter: WHERE true',
+             '    Join: EACH; ON e.key = k.key',
+             '      Scan: table ds.events',
+             '      Scan: table ds.keys'],
+            self.get_plan_lines(
+                'EXPLAIN SELECT e.name, COUNT(*) FROM ds.events e '
+                'JOIN EACH ds.keys k ON e.key = k.key '
+                'GROUP EACH BY e.name'))
+
+    def test_explain_analyze(self):
+        lines = self.get_plan_lines(
+            'EXPLAIN ANALYZE SELECT e.name FROM ds.events e '
+            'JOIN ds.keys k ON e.key = k.key WHERE e.name != "a"')
+        self.assertEqual(5, len(lines))
+        self.assertTrue(
+            lines[0].startswith('Project: e.name AS e.name (time='))
+        self.assertTrue(lines[0].endswith(
+            'rows in=2, rows out=2, peak cells=2)'))
+        # The row with a null name is filtered out too.
+        self.assertTrue(lines[1].endswith(
+            'rows in=4, rows out=2, peak cells=6)'))
+        self.assertTrue(lines[2].startswith('    Join: ON e.key = k.key'))
+        self.assertTrue(lines[2].endswith(
+            'rows in=8, rows out=4, peak cells=12)'))
+        self.assertTrue(lines[3].endswith(
+            'rows in=6, rows out=6, peak cells=12)'))
+        self.assertTrue(lines[4].endswith(
+            'rows in=2, rows out=2, peak cells=2)'))
+
+    def test_query_stats(self):
+        query_stats = explain.QueryStats()
+        result = self.tq.evaluate_query(
+            'SELECT key, COUNT(*) FROM ds.events WHERE key < 3 GROUP BY key',
+            query_stats)
+        self.assertEqual(2, result.num_rows)
+        stages = query_stats.get_query_plan()
+        self.assertEqual(['S00: Scan', 'S01: Filter', 'S02: Aggregate'],
+                         [stage['name'] for stage in stages])
+        self.assertEqual([[], ['0'], ['1']],
+                         [stage['inputStages'] for stage in stages])
+        self.assertEqual(['6', '6', '4'],
+                         [stage['recordsRead'] for stage in stages])
+        self.assertEqual(['6', '4', '2'],
+                         [stage['recordsWritten'] for stage in stages])
+        self.assertEqual(['READ', 'FILTER', 'AGGREGATE'],
+                         [stage['steps'][0]['kind'] for stage in stages])
+
+    def test_nested_timers(self):
+        query_stats = explain.QueryStats()
+        with query_stats.timed('Filter', None) as outer_stats:
+            with query_stats.timed('Scan', None) as inner_stats:
+                pass
+        self.assertIsNot(outer_stats, inner_stats)
+        self.assertGreaterEqual(outer_stats.wall_time, 0)
+        self.assertGreaterEqual(inner_stats.wall_time, 0)
+        self.assertEqual([], query_stats.active_timers)
+
+    def test_query_job_plan(self):
+        job_info = self.tq.run_query_job(
+            'test_project', 'SELECT key FROM ds.keys', None, None, None,
+            None)
+        job_info = self.tq.get_job_info(job_info['jobReference']['jobId'])
+        self.assertEqual(
+            ['S00: Scan', 'S01: Filter', 'S02: Project'],
+            [stage['name']
+             for stage in job_info['statistics']['query']['queryPlan']])
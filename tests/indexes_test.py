@@ -0,0 +1,67 @@
+import collections
+import unittest
+
+from tinyquery import context, indexes, storage, tq_types
+
+
+class IndexesTest(unittest.TestCase):
+    def make_chunks(self, values, chunk_size=3):
+        return storage.chunks_from_columns(
+            len(values),
+            collections.OrderedDict([
+                ('foo', context.Column(tq_types.INT, values))]),
+            chunk_size=chunk_size)
+
+    def test_hash_index(self):
+        index = indexes.HashIndex('foo', self.make_chunks([5, 3, 5, 1, None]))
+        self.assertEqual(5, index.num_rows)
+        self.assertEqual([0, 2], index.lookup('=', (5,)))
+        self.assertEqual([], index.lookup('=', (4,)))
+        self.assertEqual([0, 1, 2], index.lookup('in', (3, 5, 7)))
+
+    def test_sorted_index(self):
+        index = indexes.SortedIndex('foo',
+                                    self.make_chunks([5, 3, 5, 1, None]))
+        self.assertEqual([0, 2], index.lookup('=', (5,)))
+        self.assertEqual([0, 1, 2], index.lookup('>=', (3,)))
+        self.assertEqual([0, 2], index.lookup('>', (3,)))
+        # Nulls sort first, but don't match comparisons.
+        self.assertEqual([3], index.lookup('<', (3,)))
+        self.assertEqual([1, 3], index.lookup('<=', (3,)))
+        self.assertEqual([1, 3], index.lookup('in', (1, 3)))
+
+    def test_add_chunks(self):
+        for index_class in (indexes.HashIndex, indexes.SortedIndex):
+            index = index_class('foo', self.make_chunks([2, 1]))
+            index.add_chunks(self.make_chunks([1, 4, 2, 1], chunk_size=2))
+            self.assertEqual(6, index.num_rows)
+            self.assertEqual([1, 2, 5], index.lookup('=', (1,)))
+            self.assertEqual([0, 4], index.lookup('=', (2,)))
+            index.clear()
+            self.assertEqual([], index.lookup('=', (1,)))
+
+    def test_sorted_index_merges_appended_runs_lazily(self):
+        index = indexes.SortedIndex('foo', self.make_chunks([5, 1]))
+        index.add_chunks(self.make_chunks([3, 1]))
+        index.add_chunks(self.make_chunks([2]))
+        self.assertEqual(3, len(index.pending_runs))
+        self.assertEqual([1, 3], index.lookup('=', (1,)))
+        self.assertEqual([], index.pending_runs)
+        self.assertEqual([1, 3, 4, 2, 0], index.row_nums)
+
+    def test_estimate_rows(self):
+        chunks = self.make_chunks([5, 3, 5, 1, None])
+        for index_class in (indexes.HashIndex, indexes.SortedIndex):
+            index = index_class('foo', chunks)
+            self.assertEqual(2, index.estimate_rows('=', (5,)))
+            self.assertEqual(3, index.estimate_rows('in', (1, 5, 7)))
+        index = indexes.SortedIndex('foo', chunks)
+        self.assertEqual(2, index.estimate_rows('<', (5,)))
+        self.assertEqual(3, index.estimate_rows('>=', (3,)))
+
+    def test_stats(self):
+        stats = indexes.HashIndex('foo', self.make_chunks([1, 2])).get_stats()
+        self.assertEqual('hash', stats['kind'])
+        self.assertEqual(2, stats['numRows'])
+        self.assertTrue(stats['memoryBytes'] > 0)
+        self.assertTrue(stats['buildTimeSeconds'] >= 0)
@@ -0,0 +1,136 @@
+import collections
+import unittest
+
+from tinyquery import (api_client, context, instrumentation, tinyquery,
+                       tq_types)
+
+
+class RecordingInstrumentation(instrumentation.Instrumentation):
+    def __init__(self):
+        self.events = []
+
+    def stage_started(self, fingerprint, stage):
+        self.events.append(('start', fingerprint, stage))
+
+    def stage_finished(self, fingerprint, stage, duration, size):
+        assert duration >= 0
+        self.events.append(('finish', fingerprint, stage, size))
+
+
+class InstrumentationTest(unittest.TestCase):
+    def setUp(self):
+        self.recorder = RecordingInstrumentation()
+        self.tq = tinyquery.TinyQuery(query_instrumentation=self.recorder)
+        self.tq.load_table_or_view(tinyquery.Table(
+            'ds.events',
+            4,
+            collections.OrderedDict([
+                ('key', context.Column(tq_types.INT, [1, 2, 3, 4])),
+            ])))
+
+    def test_fingerprint(self):
+        fingerprint = instrumentation.get_fingerprint(
+            'SELECT key FROM ds.events WHERE key > 3 AND name = "foo"')
+        self.assertEqual(16, len(fingerprint))
+        self.assertEqual(
+            fingerprint,
+            instrumentation.get_fingerprint(
+                'select key  from ds.events -- A comment.\n'
+                "WHERE key > 10 AND name = 'bar'"))
+        self.assertNotEqual(
+            fingerprint,
+            instrumentation.get_fingerprint(
+                'SELECT key FROM ds.events WHERE key < 3 AND name = "foo"'))
+        self.assertEqual(
+            'select key from ds.events_2016 where key > ? and name = ?',
+            instrumentation.normalize_query(
+                'SELECT key FROM ds.events_2016 WHERE key > 1.5 AND '
+                'name = "foo"'))
+
+    def test_query_events(self):
+        query = 'SELECT key FROM ds.events WHERE key > 1'
+        fingerprint = instrumentation.get_fingerprint(query)
+        self.tq.evaluate_query(query)
+        self.assertEqual([
+            ('start', fingerprint, 'lex'),
+            ('finish', fingerprint, 'lex', 10),
+            ('start', fingerprint, 'parse'),
+            ('finish', fingerprint, 'parse', 10),
+            # The query is compiled once to find its tables, and again once
+            # they are locked.
+            ('start', fingerprint, 'compile'),
+            ('finish', fingerprint, 'compile', 1),
+            ('start', fingerprint, 'compile'),
+            ('finish', fingerprint, 'compile', 1),
+            ('start', fingerprint, 'evaluate.Project'),
+            ('start', fingerprint, 'evaluate.Filter'),
+            ('start', fingerprint, 'evaluate.Scan'),
+            ('finish', fingerprint, 'evaluate.Scan', 4),
+            ('finish', fingerprint, 'evaluate.Filter', 3),
+            ('finish', fingerprint, 'evaluate.Project', 3),
+        ], self.recorder.events)
+
+    def test_failed_stage(self):
+        with self.assertRaises(SyntaxError):
+            self.tq.evaluate_query('SELECT FROM')
+        self.assertEqual(['lex', 'lex', 'parse', 'parse'],
+                         [event[2] for event in self.recorder.events])
+
+    def test_serialize_events(self):
+        tq_service = api_client.TinyQueryApiClient(self.tq)
+        query = 'SELECT key FROM ds.events'
+        tq_service.jobs().query(projectId='test_project',
+                                body={'query': query,
+                                      'maxResults': 3}).execute()
+        self.assertEqual(
+            [('start', instrumentation.get_fingerprint(query), 'serialize'),
+             ('finish', instrumentation.get_fingerprint(query), 'serialize',
+              3)],
+            self.recorder.events[-2:])
+
+    def test_tabledata_serialize_events(self):
+        tq_service = api_client.TinyQueryApiClient(self.tq)
+        tq_service.tabledata().list(projectId='test_project', datasetId='ds',
+                                    tableId='events', maxResults=3).execute()
+        fingerprint = instrumentation.get_table_fingerprint('ds.events')
+        self.assertEqual(
+            instrumentation.get_fingerprint('select * from ds.events'),
+            fingerprint)
+        self.assertEqual(
+            [('start', fingerprint, 'serialize'),
+             ('finish', fingerprint, 'serialize', 3)],
+            self.recorder.events)
+
+    def test_histogram(self):
+        histogram = instrumentation.Histogram()
+        for micros in [1, 3, 3, 100, 1000]:
+            histogram.add(micros / 1e6, 10)
+        self.assertEqual(5, histogram.count)
+        self.assertEqual(50, histogram.total_size)
+        self.assertEqual([1, 0, 2, 0, 0, 0, 0, 1, 0, 0, 1],
+                         histogram.bucket_counts)
+        self.assertAlmostEqual(4e-6, histogram.get_percentile(50))
+        self.assertAlmostEqual(128e-6, histogram.get_percentile(80))
+        self.assertAlmostEqual(1000e-6, histogram.get_percentile(100))
+
+    def test_histogram_aggregator(self):
+        aggregator = instrumentation.HistogramAggregator()
+        self.tq.instrumentation = aggregator
+        for limit in [1, 2, 3]:
+            self.tq.evaluate_query(
+                'SELECT key FROM ds.events LIMIT {}'.format(limit))
+        self.tq.evaluate_query('SELECT COUNT(*) FROM ds.events')
+        fingerprint = instrumentation.get_fingerprint(
+            'SELECT key FROM ds.events LIMIT 1')
+        self.assertEqual(2, len(aggregator.get_fingerprints()))
+        histograms = aggregator.get_histograms(fingerprint)
+        self.assertEqual(
+            ['compile', 'evaluate.Filter', 'evaluate.Limit',
+             'evaluate.Project', 'evaluate.Scan', 'lex', 'parse'],
+            sorted(histograms))
+        self.assertEqual(3, histograms['lex'].count)
+        self.assertEqual(6, histograms['compile'].count)
+        self.assertEqual(1 + 2 + 3, histograms['evaluate.Limit'].total_size)
+        report = aggregator.format_report().split('\n')
+        self.assertEqual(8 + 7, len(report))
+        self.assertIn(fingerprint, report)
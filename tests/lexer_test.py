@@ -239,3 +239,9 @@ class LexerTest(unittest.TestCase):
             [select, ident('max'), lparen, ident('val'), rparen, from_tok,
              ident('2014.test_table')]
         )
+
+    def test_table_decorator(self):
+        self.assert_tokens(
+            'SELECT val FROM [dataset.table$20160101]',
+            [select, ident('val'), from_tok, ident('dataset.table$20160101')]
+        )
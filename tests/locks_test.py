@@ -0,0 +1,132 @@
+import collections
+import sys
+import threading
+import unittest
+
+from tinyquery import context, locks, tinyquery, tq_types
+
+
+class ReadWriteLockTest(unittest.TestCase):
+    def test_readers_share_lock(self):
+        lock = locks.ReadWriteLock()
+        lock.acquire_read()
+        other_reader_done = threading.Event()
+
+        def read():
+            with lock.read_locked():
+                other_reader_done.set()
+        thread = threading.Thread(target=read)
+        thread.start()
+        self.assertTrue(other_reader_done.wait(5))
+        thread.join()
+        lock.release_read()
+
+    def test_writer_excludes_readers(self):
+        lock = locks.ReadWriteLock()
+        lock.acquire_read()
+        events = []
+        writer_waiting = threading.Event()
+
+        def write():
+            writer_waiting.set()
+            with lock.write_locked():
+                events.append('write')
+
+        def read():
+            with lock.read_locked():
+                events.append('read')
+        writer = threading.Thread(target=write)
+        writer.start()
+        self.assertTrue(writer_waiting.wait(5))
+        # Wait for the writer to start waiting for the lock, so that the new
+        # reader has to wait for the writer.
+        while lock.num_waiting_writers == 0:
+            pass
+        reader = threading.Thread(target=read)
+        reader.start()
+        self.assertEqual([], events)
+        lock.release_read()
+        writer.join()
+        reader.join()
+        self.assertEqual(['write', 'read'], events)
+
+
+class ConcurrencyStressTest(unittest.TestCase):
+    NUM_THREADS = 8
+    NUM_ITERATIONS = 12
+
+    def setUp(self):
+        self.tq = tinyquery.TinyQuery()
+        self.tq.load_table_or_view(tinyquery.Table(
+            'ds.src',
+            100,
+            collections.OrderedDict([
+                ('val', context.Column(tq_types.INT, range(100))),
+            ])))
+        self.tq.copy_table(self.tq.get_table('ds', 'src'), 'ds.dest',
+                           'CREATE_IF_NEEDED', 'WRITE_EMPTY')
+        self.tq.load_table_or_view(self.tq.get_table('ds', 'src')
+                                   .make_empty_copy('ds.streamed'))
+        self.errors = []
+        # Switch threads as often as possible, to make races more likely.
+        old_check_interval = sys.getcheckinterval()
+        sys.setcheckinterval(1)
+        self.addCleanup(sys.setcheckinterval, old_check_interval)
+
+    def run_threads(self, target):
+        def run():
+            try:
+                for i in xrange(self.NUM_ITERATIONS):
+                    target(i)
+            except Exception as e:
+                self.errors.append(e)
+        threads = [threading.Thread(target=run)
+                   for _ in xrange(self.NUM_THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def query_count(self, table_name):
+        result = self.tq.evaluate_query(
+            'SELECT COUNT(*) AS c FROM {}'.format(table_name))
+        return result.columns[(None, 'c')].values[0]
+
+    def test_concurrent_reads_and_writes(self):
+        counts = []
+
+        def work(i):
+            if i % 3 == 0:
+                self.tq.run_copy_job('test_project', 'ds', 'src', 'ds',
+                                     'dest', 'CREATE_IF_NEEDED',
+                                     'WRITE_TRUNCATE')
+            elif i % 3 == 1:
+                self.tq.insert_rows(
+                    'ds', 'streamed',
+                    [(None, {'val': j}) for j in xrange(10)])
+            else:
+                counts.append((self.query_count('ds.dest'),
+                               self.query_count('ds.streamed')))
+        self.run_threads(work)
+
+        self.assertEqual([], self.errors)
+        # Every query sees the whole of each write or none of it.
+        for dest_count, streamed_count in counts:
+            self.assertEqual(100, dest_count)
+            self.assertEqual(0, streamed_count % 10)
+        self.assertEqual(10 * self.NUM_THREADS * (self.NUM_ITERATIONS // 3),
+                         self.query_count('ds.streamed'))
+
+    def test_job_ids_are_unique(self):
+        job_ids = []
+
+        def work(i):
+            job_info = self.tq.run_query_job(
+                'test_project', 'SELECT val FROM ds.src', None, None,
+                'CREATE_IF_NEEDED', 'WRITE_EMPTY')
+            job_ids.append(job_info['jobReference']['jobId'])
+        self.run_threads(work)
+
+        self.assertEqual([], self.errors)
+        self.assertEqual(self.NUM_THREADS * self.NUM_ITERATIONS,
+                         len(set(job_ids)))
@@ -0,0 +1,150 @@
+import collections
+import unittest
+
+from tinyquery import context, memory, tinyquery, tq_types
+
+
+class MemoryTrackerTest(unittest.TestCase):
+    def make_context(self, values):
+        return context.Context(len(values), collections.OrderedDict([
+            ((None, 'foo'), context.Column(tq_types.INT, values)),
+        ]), None)
+
+    def test_estimate_column_bytes(self):
+        self.assertEqual(
+            3 * (memory.POINTER_BYTES + memory.VALUE_BYTES[tq_types.INT]),
+            memory.estimate_column_bytes(
+                context.Column(tq_types.INT, [1, 2, 3])))
+        self.assertEqual(
+            2 * (memory.POINTER_BYTES + memory.VALUE_BYTES[tq_types.STRING] +
+                 4),
+            memory.estimate_column_bytes(
+                context.Column(tq_types.STRING, ['abcd', None])))
+
+    def test_track_and_release(self):
+        tracker = memory.MemoryTracker()
+        ctx = self.make_context([1, 2, 3])
+        ctx_bytes = memory.estimate_column_bytes(ctx.columns[(None, 'foo')])
+        tracker.track_context(ctx)
+        self.assertEqual(ctx_bytes, tracker.current_bytes)
+        # A context sharing the same list isn't counted twice.
+        projected_ctx = context.project_context(ctx, {(None, 'foo')})
+        tracker.track_context(projected_ctx)
+        tracker.track_context(ctx)
+        self.assertEqual(ctx_bytes, tracker.current_bytes)
+
+        del ctx
+        self.assertEqual(ctx_bytes, tracker.current_bytes)
+        del projected_ctx
+        self.assertEqual(0, tracker.current_bytes)
+        self.assertEqual(ctx_bytes, tracker.peak_bytes)
+
+    def test_retrack_after_truncate(self):
+        tracker = memory.MemoryTracker()
+        ctx = self.make_context([1, 2, 3, 4])
+        tracker.track_context(ctx)
+        full_bytes = tracker.current_bytes
+        context.truncate_context(ctx, 1)
+        tracker.track_context(ctx)
+        self.assertEqual(full_bytes * 5 / 4, tracker.current_bytes)
+        del ctx
+        self.assertEqual(0, tracker.current_bytes)
+
+    def test_budget(self):
+        tracker = memory.MemoryTracker(max_bytes=1000)
+        tracker.check_allocation(1000)
+        ctx = self.make_context([1] * 10)
+        tracker.track_context(ctx)
+        with self.assertRaises(tinyquery.ResourcesExceededError):
+            tracker.check_allocation(1000)
+        self.assertEqual(tracker.current_bytes + 1000, tracker.peak_bytes)
+        with self.assertRaises(tinyquery.ResourcesExceededError):
+            tracker.track_context(self.make_context([1] * 100))
+        self.assertEqual(0, tracker.get_remaining_bytes())
+        self.assertIsNone(memory.MemoryTracker().get_remaining_bytes())
+
+
+class QueryMemoryTest(unittest.TestCase):
+    def setUp(self):
+        self.tq = tinyquery.TinyQuery(max_query_bytes=100000)
+        self.tq.load_table_or_view(tinyquery.Table(
+            'ds.events',
+            1000,
+            collections.OrderedDict([
+                ('key', context.Column(tq_types.INT, range(1000))),
+            ])))
+
+    def test_small_query(self):
+        tracker = memory.MemoryTracker()
+        result = self.tq.evaluate_query(
+            'SELECT COUNT(*) FROM ds.events WHERE key < 10', None, tracker)
+        self.assertEqual([10], result.columns[(None, 'f0_')].values)
+        self.assertGreater(tracker.peak_bytes, 0)
+        self.assertLess(tracker.peak_bytes, 100000)
+
+    def test_cross_join(self):
+        for query in ['SELECT e1.key FROM ds.events e1 '
+                      'CROSS JOIN ds.events e2',
+                      'SELECT e1.key FROM ds.events e1 '
+                      'CROSS JOIN ds.events e2 WHERE e1.key = e2.key',
+                      'SELECT * FROM (SELECT e1.key FROM ds.events e1 '
+                      'CROSS JOIN ds.events e2)']:
+            with self.assertRaises(tinyquery.ResourcesExceededError) as cm:
+                self.tq.evaluate_query(query)
+            self.assertIn('Resources exceeded', str(cm.exception))
+
+    def test_group_by(self):
+        self.tq.evaluate_query(
+            'SELECT key % 10 AS k, COUNT(*) FROM ds.events GROUP BY k')
+        # The groups don't fit in the budget, so they spill to disk.
+        result = self.tq.evaluate_query(
+            'SELECT key, COUNT(*) FROM ds.events GROUP BY key')
+        self.assertEqual(range(1000),
+                         sorted(result.columns[(None, 'key')].values))
+        self.assertEqual([1] * 1000, result.columns[(None, 'f0_')].values)
+        # Non-mergeable aggregates are evaluated differently.
+        result = self.tq.evaluate_query(
+            'SELECT key, STDDEV_SAMP(key) FROM ds.events GROUP BY key')
+        self.assertEqual(range(1000),
+                         sorted(result.columns[(None, 'key')].values))
+
+    def test_small_budget(self):
+        # A full batch of this table is bigger than the whole budget, but
+        # the results are small, so the table is read in smaller batches.
+        num_rows = 100000
+        self.tq.load_table_or_view(tinyquery.Table(
+            'ds.big',
+            num_rows,
+            collections.OrderedDict([
+                ('key', context.Column(tq_types.INT, range(num_rows))),
+            ])))
+        self.tq.max_query_bytes = 200000
+        result = self.tq.evaluate_query(
+            'SELECT COUNT(*) FROM ds.big WHERE key % 2 = 0')
+        self.assertEqual([num_rows / 2], result.columns[(None, 'f0_')].values)
+        result = self.tq.evaluate_query(
+            'SELECT key % 10 AS k, COUNT(*) FROM ds.big GROUP BY k')
+        self.assertEqual([num_rows / 10] * 10,
+                         result.columns[(None, 'f0_')].values)
+        with self.assertRaises(tinyquery.ResourcesExceededError):
+            self.tq.evaluate_query('SELECT key FROM ds.big')
+
+    def test_job_statistics(self):
+        self.tq.max_query_bytes = None
+        job_info = self.tq.run_query_job(
+            'test_project', 'SELECT key + 1 FROM ds.events', None, None,
+            None, None)
+        job_info = self.tq.get_job_info(job_info['jobReference']['jobId'])
+        self.assertGreater(
+            int(job_info['statistics']['query']['peakMemoryBytes']), 1000)
+
+    def test_job_error(self):
+        tq = tinyquery.TinyQuery(job_pool_size=1, max_query_bytes=1000)
+        self.addCleanup(tq.job_pool.terminate)
+        tq.load_table_or_view(self.tq.tables_by_name['ds.events'])
+        job_id = tq.run_query_job(
+            'test_project', 'SELECT key + 1 FROM ds.events', None, None,
+            None, None)['jobReference']['jobId']
+        tq.wait_for_job(job_id, 10)
+        error_result = tq.get_job_info(job_id)['status']['errorResult']
+        self.assertEqual('resourcesExceeded', error_result['reason'])
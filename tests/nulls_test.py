@@ -0,0 +1,66 @@
+import array
+import operator
+import unittest
+
+from tinyquery import encoding
+from tinyquery import nulls
+
+
+class NullsTest(unittest.TestCase):
+    def setUp(self):
+        self.encodings = [
+            [1, None, 1, 1, None],
+            encoding.NullableValues([1, None, 1, 1, None],
+                                    bytearray([1, 0, 1, 1, 0])),
+            encoding.DictionaryValues([1, None],
+                                      array.array('B', [0, 1, 0, 0, 1])),
+            encoding.RunLengthValues([1, None, 1, None], [1, 2, 4, 5]),
+        ]
+
+    def test_count_nulls(self):
+        for values in self.encodings:
+            self.assertEqual(2, nulls.count_nulls(values))
+        self.assertEqual(0, nulls.count_nulls([1, 2]))
+        self.assertEqual(0, nulls.count_nulls(
+            encoding.DictionaryValues(['a'], array.array('B', [0, 0]))))
+
+    def test_get_validity(self):
+        for values in self.encodings:
+            self.assertEqual(bytearray([1, 0, 1, 1, 0]),
+                             nulls.get_validity(values))
+        self.assertIsNone(nulls.get_validity([1, 2]))
+        self.assertIsNone(nulls.get_validity(
+            encoding.RunLengthValues([1], [3])))
+
+    def test_with_validity(self):
+        self.assertIsInstance(nulls.with_validity([1, None]),
+                              encoding.NullableValues)
+        self.assertIsInstance(nulls.with_validity([1, 2]), list)
+        for values in self.encodings[1:]:
+            self.assertIs(values, nulls.with_validity(values))
+
+    def test_and_validity(self):
+        self.assertIsNone(nulls.and_validity(None, None))
+        self.assertEqual(bytearray([1, 0, 1]),
+                         nulls.and_validity(None, bytearray([1, 0, 1])))
+        self.assertEqual(bytearray([0, 0, 0, 1]),
+                         nulls.and_validity(bytearray([0, 1, 0, 1]),
+                                            bytearray([0, 0, 1, 1])))
+
+    def test_iter_valid(self):
+        for values in self.encodings:
+            self.assertEqual([1, 1, 1], list(nulls.iter_valid(values)))
+
+    def test_map_valid(self):
+        result = nulls.map_valid(operator.add, [[1, None, 3], [4, 5, None]])
+        self.assertEqual([5, None, None], result)
+        self.assertEqual(bytearray([1, 0, 0]), result.validity)
+        self.assertEqual([5, 7], nulls.map_valid(operator.add,
+                                                 [[1, 2], [4, 5]]))
+
+    def test_map_valid_checked_args(self):
+        arg_list = [1, None]
+        result = nulls.map_valid(lambda x, y: y is None,
+                                 [arg_list, [None, 2]],
+                                 checked_arg_lists=[arg_list])
+        self.assertEqual([True, None], result)
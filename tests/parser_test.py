@@ -27,6 +27,7 @@ class ParserTest(unittest.TestCase):
                 None,
                 None,
                 None,
+                False,
                 None,
                 None,
                 None))
@@ -39,6 +40,7 @@ class ParserTest(unittest.TestCase):
                 tq_ast.TableId('bar', None),
                 None,
                 None,
+                False,
                 None,
                 None,
                 None
@@ -57,6 +59,7 @@ class ParserTest(unittest.TestCase):
                 tq_ast.TableId('baz', None),
                 None,
                 None,
+                False,
                 None,
                 None,
                 None
@@ -81,6 +84,7 @@ class ParserTest(unittest.TestCase):
                 None,
                 None,
                 None,
+                False,
                 None,
                 None,
                 None
@@ -102,6 +106,7 @@ class ParserTest(unittest.TestCase):
                 None,
                 None,
                 None,
+                False,
                 None,
                 None,
                 None
@@ -118,6 +123,7 @@ class ParserTest(unittest.TestCase):
                 None,
                 None,
                 None,
+                False,
                 None,
                 None,
                 None
@@ -132,6 +138,7 @@ class ParserTest(unittest.TestCase):
                 None,
                 None,
                 None,
+                False,
                 None,
                 None,
                 None
@@ -159,6 +166,7 @@ class ParserTest(unittest.TestCase):
                 None,
                 None,
                 None,
+                False,
                 None,
                 None,
                 None
@@ -180,6 +188,7 @@ class ParserTest(unittest.TestCase):
                     tq_ast.ColumnId('foo'),
                     tq_ast.Literal(3)),
                 None,
+                False,
                 None,
                 None,
                 None))
@@ -200,6 +209,7 @@ class ParserTest(unittest.TestCase):
                 tq_ast.TableId('test_table', None),
                 None,
                 None,
+                False,
                 None,
                 None,
                 None
@@ -217,6 +227,7 @@ class ParserTest(unittest.TestCase):
                 tq_ast.TableId('bar', None),
                 None,
                 None,
+                False,
                 None,
                 None,
                 None
@@ -231,6 +242,7 @@ class ParserTest(unittest.TestCase):
                 tq_ast.TableId('bar', None),
                 None,
                 [tq_ast.ColumnId('baz')],
+                False,
                 None,
                 None,
                 None
@@ -248,6 +260,7 @@ class ParserTest(unittest.TestCase):
                 ]),
                 None,
                 None,
+                False,
                 None,
                 None,
                 None
@@ -264,12 +277,14 @@ class ParserTest(unittest.TestCase):
                     tq_ast.TableId('table', None),
                     None,
                     None,
+                    False,
                     None,
                     None,
                     None
                 ),
                 None,
                 None,
+                False,
                 None,
                 None,
                 None
@@ -288,6 +303,7 @@ class ParserTest(unittest.TestCase):
                 tq_ast.TableId('table', None),
                 None,
                 None,
+                False,
                 None,
                 None,
                 None
@@ -309,10 +325,12 @@ class ParserTest(unittest.TestCase):
                         tq_ast.ColumnId('t1.id'),
                         tq_ast.ColumnId('t2.id')
                     ),
-                    is_left_outer=False
+                    is_left_outer=False,
+                    is_each=False
                 ),
                 None,
                 None,
+                False,
                 None,
                 None,
                 None
@@ -334,10 +352,12 @@ class ParserTest(unittest.TestCase):
                         tq_ast.ColumnId('t1.id'),
                         tq_ast.ColumnId('t2.id')
                     ),
-                    is_left_outer=True
+                    is_left_outer=True,
+                    is_each=True
                 ),
                 None,
                 None,
+                False,
                 None,
                 None,
                 None
@@ -352,6 +372,7 @@ class ParserTest(unittest.TestCase):
                 tq_ast.TableId('dataset.table', None),
                 None,
                 None,
+                False,
                 None,
                 None,
                 None))
@@ -372,6 +393,7 @@ class ParserTest(unittest.TestCase):
                 tq_ast.TableId('table', None),
                 None,
                 None,
+                False,
                 None,
                 None,
                 None))
@@ -384,6 +406,7 @@ class ParserTest(unittest.TestCase):
                 tq_ast.TableId('table', None),
                 None,
                 [tq_ast.ColumnId('foo')],
+                True,
                 None,
                 None,
                 None))
@@ -401,9 +424,10 @@ class ParserTest(unittest.TestCase):
                         tq_ast.ColumnId('t1.foo'),
                         tq_ast.ColumnId('t2.bar')
                     ),
-                    is_left_outer=False),
+                    is_left_outer=False, is_each=True),
                 None,
                 None,
+                False,
                 None,
                 None,
                 None))
@@ -416,6 +440,7 @@ class ParserTest(unittest.TestCase):
                 None,
                 None,
                 None,
+                False,
                 None,
                 None,
                 None))
@@ -430,6 +455,7 @@ class ParserTest(unittest.TestCase):
                 None,
                 None,
                 None,
+                False,
                 None,
                 None,
                 None)
@@ -446,6 +472,7 @@ class ParserTest(unittest.TestCase):
                 tq_ast.TableId('table', None),
                 None,
                 None,
+                False,
                 None,
                 None,
                 None)
@@ -460,6 +487,7 @@ class ParserTest(unittest.TestCase):
                                  tq_ast.TableId('table2', 't2')),
                 None,
                 None,
+                False,
                 None,
                 None,
                 None
@@ -483,6 +511,7 @@ class ParserTest(unittest.TestCase):
                     tq_ast.TableId('table2', None)]),
                 None,
                 [tq_ast.ColumnId('col1'), tq_ast.ColumnId('col2')],
+                False,
                 None,
                 None,
                 None
@@ -503,6 +532,7 @@ class ParserTest(unittest.TestCase):
                 tq_ast.TableId('bar', None),
                 None,
                 [tq_ast.ColumnId('baz')],
+                False,
                 None,
                 10,
                 None
@@ -518,7 +548,9 @@ class ParserTest(unittest.TestCase):
                 tq_ast.SelectField(tq_ast.ColumnId('baz'), None)],
                 tq_ast.TableId('table', None),
                 None,
-                None, [
+                None,
+                False,
+                [
                     tq_ast.Ordering(tq_ast.ColumnId('foo'), False),
                     tq_ast.Ordering(tq_ast.ColumnId('bar'), True),
                     tq_ast.Ordering(tq_ast.ColumnId('baz'), True)],
@@ -526,3 +558,34 @@ class ParserTest(unittest.TestCase):
                 None
             )
         )
+
+    def test_table_function(self):
+        self.assert_parsed_select(
+            'SELECT foo FROM TABLE_DATE_RANGE(ds.events_, '
+            'TIMESTAMP("2016-01-01"), "2016-01-31") t',
+            tq_ast.Select(
+                [tq_ast.SelectField(tq_ast.ColumnId('foo'), None)],
+                tq_ast.TableFunction(
+                    'table_date_range',
+                    [tq_ast.ColumnId('ds.events_'),
+                     tq_ast.FunctionCall('timestamp',
+                                         [tq_ast.Literal('2016-01-01')]),
+                     tq_ast.Literal('2016-01-31')],
+                    't'),
+                None,
+                None,
+                False,
+                None,
+                None,
+                None
+            )
+        )
+
+    def test_explain(self):
+        select = tq_ast.Select(
+            [tq_ast.SelectField(tq_ast.ColumnId('foo'), None)],
+            tq_ast.TableId('bar', None), None, None, False, None, None, None)
+        self.assert_parsed_select('EXPLAIN SELECT foo FROM bar',
+                                  tq_ast.Explain(select, False))
+        self.assert_parsed_select('EXPLAIN ANALYZE SELECT foo FROM bar',
+                                  tq_ast.Explain(select, True))
@@ -0,0 +1,132 @@
+import collections
+import mock
+import unittest
+
+from tinyquery import (compiler, context, memory, pipeline, tinyquery,
+                       tq_types)
+
+
+class PipelineTest(unittest.TestCase):
+    def setUp(self):
+        self.tq = tinyquery.TinyQuery()
+        self.tq.load_table_or_view(tinyquery.Table(
+            'ds.events',
+            20,
+            collections.OrderedDict([
+                ('user_id', context.Column(tq_types.INT,
+                                           [i % 6 for i in xrange(20)])),
+                ('value', context.Column(tq_types.INT,
+                                         [None if i % 7 == 0 else i
+                                          for i in xrange(20)])),
+            ])))
+        self.tq.load_table_or_view(tinyquery.Table(
+            'ds.users',
+            4,
+            collections.OrderedDict([
+                ('user_id', context.Column(tq_types.INT, [0, 1, 1, 3])),
+                ('name', context.Column(tq_types.STRING,
+                                        ['a', 'b', 'c', 'd'])),
+            ])))
+        # Use tiny batches, so that every query has several of them.
+        batch_size_patcher = mock.patch.object(pipeline, 'BATCH_SIZE', 3)
+        batch_size_patcher.start()
+        self.addCleanup(batch_size_patcher.stop)
+
+    def evaluate_without_pipeline(self, query):
+        with mock.patch.object(pipeline, 'can_evaluate_select',
+                               return_value=False):
+            return self.tq.evaluate_query(query)
+
+    def assert_same_result(self, query, ordered=True):
+        with mock.patch.object(pipeline, 'evaluate_select',
+                               side_effect=pipeline.evaluate_select) as (
+                                   evaluate_select):
+            result = self.tq.evaluate_query(query)
+            self.assertTrue(evaluate_select.called)
+        expected_result = self.evaluate_without_pipeline(query)
+        if ordered:
+            self.assertEqual(expected_result, result)
+        else:
+            self.assertEqual(expected_result.columns.keys(),
+                             result.columns.keys())
+            self.assertEqual(
+                sorted(zip(*[column.values
+                             for column in expected_result.columns.values()])),
+                sorted(zip(*[column.values
+                             for column in result.columns.values()])))
+
+    def test_filter_and_project(self):
+        self.assert_same_result(
+            'SELECT user_id + 1 AS u, value FROM ds.events WHERE user_id < 3')
+        self.assert_same_result(
+            'SELECT value FROM ds.events WHERE user_id > 100')
+
+    def test_limit(self):
+        self.assert_same_result('SELECT value FROM ds.events LIMIT 7')
+        self.assert_same_result(
+            'SELECT value FROM ds.events WHERE value > 5 LIMIT 100')
+
+    def test_join(self):
+        self.assert_same_result(
+            'SELECT e.value, u.name FROM ds.events e '
+            'JOIN ds.users u ON e.user_id = u.user_id WHERE e.value > 2')
+        self.assert_same_result(
+            'SELECT e.value, u.name FROM ds.events e '
+            'LEFT OUTER JOIN ds.users u ON e.user_id = u.user_id')
+        self.assert_same_result(
+            'SELECT e.value, u.name FROM ds.events e '
+            'JOIN ds.users u ON e.user_id = u.user_id '
+            'AND e.value = u.user_id')
+
+    def test_group_by(self):
+        self.assert_same_result(
+            'SELECT user_id, COUNT(*), SUM(value), MIN(value), MAX(value), '
+            'AVG(value), FIRST(value) FROM ds.events GROUP BY user_id',
+            ordered=False)
+        self.assert_same_result(
+            'SELECT u.name, COUNT(DISTINCT e.value) AS c FROM ds.events e '
+            'JOIN ds.users u ON e.user_id = u.user_id GROUP BY u.name',
+            ordered=False)
+        self.assert_same_result(
+            'SELECT COUNT(*), MAX(value) FROM ds.events WHERE value > 5')
+        self.assert_same_result(
+            'SELECT COUNT(*) FROM ds.events WHERE value > 100')
+
+    def test_unsupported_queries(self):
+        for query in ['SELECT QUANTILES(value, 3) FROM ds.events',
+                      'SELECT * FROM (SELECT value FROM ds.events)',
+                      'SELECT e1.value FROM ds.events e1 '
+                      'CROSS JOIN ds.events e2']:
+            self.assertFalse(pipeline.can_evaluate_select(
+                compiler.compile_text(query, self.tq.tables_by_name)))
+
+    def test_limit_stops_early(self):
+        batches_read = []
+
+        def batches():
+            for i in xrange(10):
+                batches_read.append(i)
+                yield context.Context(3, collections.OrderedDict([
+                    ((None, 'x'), context.Column(tq_types.INT, [i] * 3)),
+                ]), None)
+        limited_batches = list(pipeline.limit_batches(batches(), 5))
+        self.assertEqual([3, 2], [batch.num_rows
+                                  for batch in limited_batches])
+        self.assertEqual([0, 1], batches_read)
+
+    def test_batch_size_from_budget(self):
+        chunk_context = context.Context(10, collections.OrderedDict([
+            ((None, 'x'), context.Column(tq_types.INT, range(10))),
+        ]), None)
+        row_bytes = memory.estimate_row_bytes(chunk_context)
+        self.assertEqual(
+            3, pipeline.get_batch_size(memory.MemoryTracker(), chunk_context))
+        # A tenth of the budget holds two rows.
+        self.assertEqual(
+            2, pipeline.get_batch_size(
+                memory.MemoryTracker(max_bytes=20 * row_bytes),
+                chunk_context))
+        # There's always at least one row per batch.
+        self.assertEqual(
+            1, pipeline.get_batch_size(memory.MemoryTracker(max_bytes=0),
+                                       chunk_context))
@@ -0,0 +1,47 @@
+import collections
+import unittest
+
+from tinyquery import compiler, context, predicates, tinyquery, tq_types
+
+
+class PredicatesTest(unittest.TestCase):
+    def setUp(self):
+        self.tables_by_name = {
+            'table1': tinyquery.Table(
+                'table1',
+                0,
+                collections.OrderedDict([
+                    ('value', context.Column(tq_types.INT, [])),
+                    ('str', context.Column(tq_types.STRING, []))
+                ]))
+        }
+
+    def get_predicates(self, where_clause):
+        select_ast = compiler.compile_text(
+            'SELECT value FROM table1 WHERE ' + where_clause,
+            self.tables_by_name)
+        return [
+            (predicate.column.column, predicate.operator, predicate.values)
+            for predicate in predicates.get_column_predicates(
+                select_ast.where_expr)]
+
+    def test_comparisons(self):
+        self.assertEqual(
+            [('value', '>=', (3,)), ('str', '=', ('a',))],
+            self.get_predicates('value >= 3 AND str = "a"'))
+
+    def test_flipped_comparison(self):
+        self.assertEqual([('value', '>', (3,))],
+                         self.get_predicates('3 < value'))
+
+    def test_in_and_null_checks(self):
+        self.assertEqual(
+            [('value', 'in', (1, 2)), ('str', 'is_not_null', ())],
+            self.get_predicates('value IN (1, 2) AND str IS NOT NULL'))
+
+    def test_complex_conjuncts_ignored(self):
+        self.assertEqual(
+            [('value', '<', (10,))],
+            self.get_predicates(
+                '(value > 3 OR value = 0) AND value + 1 > 3 AND value < 10 '
+                'AND value = NULL'))
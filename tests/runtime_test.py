@@ -0,0 +1,179 @@
+import unittest
+
+from tinyquery import runtime, tq_types
+
+
+class MergeableAggregateFunctionTest(unittest.TestCase):
+    def assert_merges(self, func_name, arg_list):
+        """Check that merging the states of pieces of arg_list is correct."""
+        func = runtime.get_func(func_name)
+        expected_value = func.evaluate(1, arg_list)[0]
+        for split_index in xrange(len(arg_list) + 1):
+            state = func.merge_states(
+                func.partial_state(arg_list[:split_index]),
+                func.partial_state(arg_list[split_index:]))
+            self.assertEqual(expected_value, func.finalize_state(state))
+
+    def test_merge_states(self):
+        arg_list = [3, None, 7, 1, 7, None, 4]
+        for func_name in ('sum', 'count', 'min', 'max', 'avg',
+                          'count_distinct', 'first'):
+            self.assert_merges(func_name, arg_list)
+
+    def test_merge_empty_states(self):
+        for func_name in ('sum', 'count', 'avg', 'count_distinct', 'first'):
+            self.assert_merges(func_name, [])
+            self.assert_merges(func_name, [None])
+
+    def test_not_mergeable(self):
+        self.assertFalse(isinstance(runtime.get_func('quantiles'),
+                                    runtime.MergeableAggregateFunction))
+
+
+class NullSemanticsTest(unittest.TestCase):
+    def evaluate(self, func_name, *arg_lists):
+        return runtime.get_func(func_name).evaluate(len(arg_lists[0]),
+                                                    *arg_lists)
+
+    def evaluate_unary(self, op_name, arg_list):
+        return runtime.get_unary_op(op_name).evaluate(len(arg_list), arg_list)
+
+    def evaluate_binary(self, op_name, arg_list1, arg_list2):
+        return runtime.get_binary_op(op_name).evaluate(len(arg_list1),
+                                                       arg_list1, arg_list2)
+
+    def test_aggregates_ignore_nulls(self):
+        arg_list = [3, None, 1, None]
+        self.assertEqual([4], self.evaluate('sum', arg_list))
+        self.assertEqual([2], self.evaluate('count', arg_list))
+        self.assertEqual([1], self.evaluate('min', arg_list))
+        self.assertEqual([3], self.evaluate('max', arg_list))
+        self.assertEqual([2.0], self.evaluate('avg', arg_list))
+        self.assertEqual([2], self.evaluate('count_distinct', arg_list))
+
+    def test_aggregates_of_only_nulls(self):
+        for func_name in ('sum', 'min', 'max'):
+            self.assertEqual([None], self.evaluate(func_name, [None, None]))
+        self.assertEqual([0], self.evaluate('count', [None, None]))
+
+    def test_arithmetic_propagates_nulls(self):
+        self.assertEqual([3, None, None],
+                         self.evaluate_binary('+', [1, None, 2], [2, 3, None]))
+        self.assertEqual([None, False],
+                         self.evaluate_binary('<', [None, 2], [1, 1]))
+
+    def test_three_valued_logic(self):
+        left = [True, True, True, False, False, False, None, None, None]
+        right = [True, False, None, True, False, None, True, False, None]
+        self.assertEqual(
+            [True, False, None, False, False, False, None, False, None],
+            self.evaluate_binary('and', left, right))
+        self.assertEqual(
+            [True, True, True, True, False, None, True, None, None],
+            self.evaluate_binary('or', left, right))
+
+    def test_null_checks(self):
+        self.assertEqual([False, True],
+                         self.evaluate_unary('is_null', [1, None]))
+        self.assertEqual([True, False],
+                         self.evaluate_unary('is_not_null', [1, None]))
+        self.assertEqual([1, 0, 3],
+                         self.evaluate('ifnull', [1, None, 3], [0, 0, 0]))
+
+
+class RegexpMatchFunctionTest(unittest.TestCase):
+    def setUp(self):
+        self.func = runtime.get_func('regexp_match')
+
+    def test_match(self):
+        # The pattern can match anywhere in the string unless it's anchored.
+        self.assertEqual(
+            [True, True, False, False],
+            self.func.evaluate(4, ['events_1', 'old_events', 'users', ''],
+                               ['events'] * 3 + ['.']))
+        self.assertEqual(
+            [True, False],
+            self.func.evaluate(2, ['events_20160101', 'events_2016'],
+                               [r'^events_\d{8}$'] * 2))
+
+    def test_null(self):
+        self.assertEqual(
+            [None, True, None],
+            self.func.evaluate(3, ['abc', 'abc', None], [None, 'b', 'b']))
+
+    def test_check_types(self):
+        self.assertEqual(
+            tq_types.BOOL,
+            self.func.check_types(tq_types.STRING, tq_types.STRING))
+        with self.assertRaises(TypeError):
+            self.func.check_types(tq_types.INT, tq_types.STRING)
+        with self.assertRaises(TypeError):
+            self.func.check_types(tq_types.STRING, tq_types.INT)
+
+
+class LazyFunctionTest(unittest.TestCase):
+    def evaluate_lazily(self, func, *arg_lists):
+        """Evaluate a LazyFunction, recording the masks its args are given."""
+        self.masks = []
+
+        def evaluate_arg(arg_index, mask=None):
+            self.masks.append((arg_index, mask))
+            if mask is None:
+                return arg_lists[arg_index]
+            return [value for value, selected
+                    in zip(arg_lists[arg_index], mask) if selected]
+        return func.evaluate_lazily(len(arg_lists[0]), evaluate_arg)
+
+    def test_and(self):
+        result = self.evaluate_lazily(
+            runtime.get_binary_op('and'),
+            [False, True, None, False, False], [True, False, None, 1, 2])
+        self.assertEqual([False, False, None, False, False], result)
+        self.assertEqual(
+            [(0, None), (1, [False, True, True, False, False])], self.masks)
+
+    def test_or_mostly_undecided(self):
+        # Rows the first operand already decides are masked out even when
+        # most rows still need the second operand.
+        result = self.evaluate_lazily(runtime.get_binary_op('or'),
+                                      [True, False, None], [1, True, False])
+        self.assertEqual([True, True, None], result)
+        self.assertEqual([(0, None), (1, [False, True, True])], self.masks)
+
+    def test_or_all_undecided(self):
+        result = self.evaluate_lazily(runtime.get_binary_op('or'),
+                                      [False, None], [True, False])
+        self.assertEqual([True, None], result)
+        self.assertEqual([(0, None), (1, None)], self.masks)
+
+    def test_if(self):
+        result = self.evaluate_lazily(runtime.get_func('if'),
+                                      [True, False, None, True],
+                                      [1, 2, 3, 4], [5, 6, 7, 8])
+        self.assertEqual([1, 6, 7, 4], result)
+        self.assertEqual([(0, None), (1, [True, False, False, True]),
+                          (2, [False, True, True, False])], self.masks)
+
+    def test_if_mostly_one_branch(self):
+        # A branch taken by most rows is still only evaluated for those rows.
+        result = self.evaluate_lazily(runtime.get_func('if'),
+                                      [True, False, True], [1, 2, 3],
+                                      [4, 5, 6])
+        self.assertEqual([1, 5, 3], result)
+        self.assertEqual([(0, None), (1, [True, False, True]),
+                          (2, [False, True, False])], self.masks)
+        result = self.evaluate_lazily(runtime.get_func('if'),
+                                      [True, False, None], [1, 2, 3],
+                                      [4, 5, 6])
+        self.assertEqual([1, 5, 6], result)
+        self.assertEqual([(0, None), (1, [True, False, False]),
+                          (2, [False, True, True])], self.masks)
+
+    def test_ifnull(self):
+        result = self.evaluate_lazily(runtime.get_func('ifnull'),
+                                      [1, None, 3, 4], [5, 6, 7, 8])
+        self.assertEqual([1, 6, 3, 4], result)
+        self.assertEqual([(0, None), (1, [False, True, False, False])],
+                         self.masks)
+        self.evaluate_lazily(runtime.get_func('ifnull'), [1, 2], [3, 4])
+        self.assertEqual([(0, None)], self.masks)
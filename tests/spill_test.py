@@ -0,0 +1,175 @@
+import collections
+import unittest
+
+import mock
+
+from tinyquery import context
+from tinyquery import evaluator
+from tinyquery import memory
+from tinyquery import parallel
+from tinyquery import spill
+from tinyquery import tinyquery
+from tinyquery import tq_types
+from tinyquery import typed_ast
+
+
+class PartitionFilesTest(unittest.TestCase):
+    def setUp(self):
+        write_batch_patcher = mock.patch.object(spill, 'WRITE_BATCH_ROWS', 2)
+        write_batch_patcher.start()
+        self.addCleanup(write_batch_patcher.stop)
+
+    def test_round_trip(self):
+        rows = [(i, 'name%d' % i, u'\xe9', i / 2.0, None, i % 2 == 0,
+                 [i], {i, i + 1})
+                for i in xrange(20)]
+        partitions = spill.PartitionFiles(num_partitions=3)
+        self.addCleanup(partitions.close)
+        for row in rows:
+            partitions.add(row[:2], row)
+        self.assertEqual(20, partitions.num_rows)
+
+        for partition_index in xrange(3):
+            self.assertEqual(
+                [row for row in rows
+                 if spill.get_partition(row[:2], 3) == partition_index],
+                list(partitions.iter_partition(partition_index)))
+        # Reading a partition again gives the same rows.
+        self.assertEqual(
+            [row for row in rows if spill.get_partition(row[:2], 3) == 0],
+            list(partitions.iter_partition(0)))
+
+    def test_join_contexts(self):
+        def make_context(table, keys):
+            return context.Context(len(keys), collections.OrderedDict([
+                ((table, 'key'), context.Column(tq_types.INT, keys)),
+            ]), None)
+        context1 = make_context('t1', [i % 7 for i in xrange(50)])
+        context2 = make_context('t2', [i % 5 for i in xrange(3, 30)])
+        key_refs1 = [typed_ast.ColumnRef('t1', 'key', tq_types.INT)]
+        key_refs2 = [typed_ast.ColumnRef('t2', 'key', tq_types.INT)]
+        for is_left_outer in (False, True):
+            self.assertEqual(
+                evaluator.flatten_join_matches(evaluator.join_rows(
+                    enumerate(evaluator.get_join_keys(context1, key_refs1)),
+                    enumerate(evaluator.get_join_keys(context2, key_refs2)),
+                    is_left_outer)),
+                spill.join_contexts(context1, key_refs1, context2, key_refs2,
+                                    is_left_outer))
+
+
+class SpillQueryTest(unittest.TestCase):
+    def setUp(self):
+        self.tq = tinyquery.TinyQuery()
+        self.tq.load_table_or_view(tinyquery.Table(
+            'ds.events',
+            100,
+            collections.OrderedDict([
+                ('key', context.Column(tq_types.INT,
+                                       [i % 7 for i in xrange(100)])),
+                ('val', context.Column(tq_types.INT,
+                                       [None if i % 5 == 0 else i
+                                        for i in xrange(100)])),
+                ('name', context.Column(tq_types.STRING,
+                                        ['name%d' % (i % 3)
+                                         for i in xrange(100)])),
+            ])))
+        self.tq.load_table_or_view(tinyquery.Table(
+            'ds.users',
+            10,
+            collections.OrderedDict([
+                ('key', context.Column(tq_types.INT,
+                                       [i % 4 for i in xrange(10)])),
+                ('score', context.Column(tq_types.FLOAT,
+                                         [i / 4.0 for i in xrange(10)])),
+            ])))
+
+    def assert_same_rows(self, expected_result, result):
+        self.assertEqual(expected_result.columns.keys(),
+                         result.columns.keys())
+        self.assertEqual(
+            [column.type for column in expected_result.columns.values()],
+            [column.type for column in result.columns.values()])
+        self.assertEqual(
+            sorted(zip(*[column.values
+                         for column in expected_result.columns.values()])),
+            sorted(zip(*[column.values
+                         for column in result.columns.values()])))
+
+    def test_group_each_by(self):
+        for query in [
+                'SELECT key, SUM(val), COUNT(val), MIN(val), MAX(val), '
+                'AVG(val), COUNT(DISTINCT name), FIRST(val) '
+                'FROM ds.events GROUP {each}BY key',
+                'SELECT name, key + 1 AS k, COUNT(*) * 2 AS c '
+                'FROM ds.events GROUP {each}BY name, k',
+                'SELECT key, STDDEV_SAMP(val) '
+                'FROM ds.events GROUP {each}BY key',
+                'SELECT 1 AS one, COUNT(*) FROM ds.events GROUP {each}BY one',
+                'SELECT key, COUNT(*) FROM ds.events WHERE key > 100 '
+                'GROUP {each}BY key']:
+            self.assert_same_rows(
+                self.tq.evaluate_query(query.format(each='')),
+                self.tq.evaluate_query(query.format(each='EACH ')))
+
+    def test_join_each(self):
+        for query in [
+                'SELECT e.key, e.val, u.score FROM ds.events e '
+                'JOIN {each}ds.users u ON e.key = u.key',
+                'SELECT e.key, e.val, u.score FROM ds.events e '
+                'LEFT OUTER JOIN {each}ds.users u ON e.key = u.key']:
+            # Joined rows come back in the same order.
+            self.assertEqual(
+                self.tq.evaluate_query(query.format(each='')),
+                self.tq.evaluate_query(query.format(each='EACH ')))
+        query = ('SELECT e.key, COUNT(*), SUM(u.score) FROM ds.events e '
+                 'JOIN {each}ds.users u ON e.key = u.key '
+                 'GROUP {each}BY e.key')
+        self.assert_same_rows(
+            self.tq.evaluate_query(query.format(each='')),
+            self.tq.evaluate_query(query.format(each='EACH ')))
+
+    def test_spill_paths(self):
+        queries = {
+            'aggregate_batches':
+                'SELECT key, COUNT(*) FROM ds.events GROUP EACH BY key',
+            'group_context':
+                'SELECT key, STDDEV_SAMP(val) FROM ds.events '
+                'GROUP EACH BY key',
+            'join_contexts':
+                'SELECT e.key FROM ds.events e '
+                'JOIN EACH ds.users u ON e.key = u.key',
+        }
+        for name, query in queries.iteritems():
+            with mock.patch.object(spill, name,
+                                   side_effect=getattr(spill, name)) as (
+                                       spill_function):
+                self.tq.evaluate_query(query)
+                self.assertEqual(1, spill_function.call_count)
+
+    def test_parallel_group_each_by(self):
+        # GROUP EACH BY spills instead of using workers.
+        self.tq.num_query_workers = 3
+        query = 'SELECT key, COUNT(*) FROM ds.events GROUP {}BY key'
+        with mock.patch.object(evaluator, 'MIN_ROWS_PER_AGGREGATION_WORKER',
+                               1):
+            with mock.patch.object(
+                    parallel, 'fork_map', side_effect=parallel.fork_map) as (
+                        fork_map):
+                self.assert_same_rows(
+                    self.tq.evaluate_query(query.format('')),
+                    self.tq.evaluate_query(query.format('EACH ')))
+                self.assertEqual(2, fork_map.call_count)
+
+    def test_memory_threshold(self):
+        query = 'SELECT key, COUNT(*) FROM ds.events GROUP BY key'
+        with mock.patch.object(spill, 'aggregate_batches',
+                               side_effect=spill.aggregate_batches) as (
+                                   aggregate_batches):
+            expected_result = self.tq.evaluate_query(query)
+            self.assertEqual(0, aggregate_batches.call_count)
+            # The hash table of the 7 groups doesn't fit in this budget.
+            result = self.tq.evaluate_query(
+                query, None, memory.MemoryTracker(max_bytes=1500))
+            self.assertEqual(1, aggregate_batches.call_count)
+        self.assert_same_rows(expected_result, result)
@@ -0,0 +1,127 @@
+import collections
+import mock
+import unittest
+
+from tinyquery import context, predicates, storage, tinyquery, tq_types
+
+
+class StorageTest(unittest.TestCase):
+    def make_columns(self, values1, values2):
+        return collections.OrderedDict([
+            ('foo', context.Column(tq_types.INT, values1)),
+            ('bar', context.Column(tq_types.STRING, values2)),
+        ])
+
+    def test_single_chunk_shares_values(self):
+        values = [1, 2, 3]
+        chunks = storage.chunks_from_columns(
+            3, self.make_columns(values, ['a', 'b', 'c']))
+        self.assertEqual(1, len(chunks))
+        self.assertIs(values, chunks[0].columns['foo'].values)
+
+    def test_split_into_chunks(self):
+        chunks = storage.chunks_from_columns(
+            5, self.make_columns([1, 2, 3, 4, 5], list('abcde')), chunk_size=2)
+        self.assertEqual([2, 2, 1], [chunk.num_rows for chunk in chunks])
+        self.assertEqual([5], chunks[2].columns['foo'].values)
+        self.assertEqual(['c', 'd'], chunks[1].columns['bar'].values)
+        self.assertEqual(
+            [1, 2, 3, 4, 5],
+            storage.columns_from_chunks(
+                collections.OrderedDict([('foo', tq_types.INT),
+                                         ('bar', tq_types.STRING)]),
+                chunks)['foo'].values)
+
+    def test_append_merges_small_chunks(self):
+        chunk1, chunk2, chunk3 = storage.chunks_from_columns(
+            5, self.make_columns([1, 2, 3, 4, 5], list('abcde')), chunk_size=2)
+        result = storage.append_chunks([chunk3], [chunk1], chunk_size=3)
+        self.assertEqual([3], [chunk.num_rows for chunk in result])
+        self.assertEqual([5, 1, 2], result[0].columns['foo'].values)
+        result = storage.append_chunks(result, [chunk2], chunk_size=3)
+        self.assertEqual([3, 2], [chunk.num_rows for chunk in result])
+        self.assertIs(chunk2, result[1])
+
+    def test_project_chunk(self):
+        chunk = storage.Chunk(2, self.make_columns([1, 2], ['a', 'b']))
+        projected = storage.project_chunk(chunk, collections.OrderedDict([
+            ('bar', tq_types.STRING), ('baz', tq_types.FLOAT)]))
+        self.assertEqual(['bar', 'baz'], projected.columns.keys())
+        self.assertIs(chunk.columns['bar'], projected.columns['bar'])
+        self.assertEqual([None, None], projected.columns['baz'].values)
+
+    def test_table_append_shares_chunks(self):
+        src_table = tinyquery.Table(
+            'src', 3, self.make_columns([1, 2, 3], ['a', 'b', 'c']))
+        dest_table = tinyquery.Table(
+            'dest', 0, self.make_columns([], []))
+        with mock.patch.object(storage, 'CHUNK_SIZE', 4):
+            dest_table.append_chunks(src_table.chunks)
+            self.assertIs(src_table.chunks[0], dest_table.chunks[0])
+            dest_table.append_chunks(src_table.chunks)
+        self.assertEqual(6, dest_table.num_rows)
+        self.assertEqual([3, 3], [chunk.num_rows
+                                  for chunk in dest_table.chunks])
+        self.assertEqual([1, 2, 3, 1, 2, 3],
+                         dest_table.columns['foo'].values)
+        # The source table is unaffected.
+        self.assertEqual([1, 2, 3], src_table.columns['foo'].values)
+
+    def test_column_stats(self):
+        stats = storage.ColumnStats.from_values([3, None, 1, 7])
+        self.assertEqual(storage.ColumnStats(1, 7, 1), stats)
+        self.assertEqual(
+            storage.ColumnStats(None, None, 2),
+            storage.ColumnStats.from_values([None, None]))
+        self.assertEqual(
+            storage.ColumnStats(0, 7, 3),
+            storage.ColumnStats.merge(
+                stats, storage.ColumnStats.from_values([0, None, None])))
+
+    def test_concat_chunks_merges_stats(self):
+        chunk1, chunk2 = storage.chunks_from_columns(
+            4, self.make_columns([5, 2, 9, None], list('abcd')), chunk_size=2)
+        merged = storage.concat_chunks(chunk1, chunk2)
+        self.assertEqual(storage.ColumnStats(2, 9, 1), merged.stats['foo'])
+        self.assertEqual(storage.ColumnStats('a', 'd', 0),
+                         merged.stats['bar'])
+
+    def test_may_match(self):
+        def may_match(operator, values, stats_values):
+            predicate = predicates.ColumnPredicate(None, operator, values)
+            return storage.ColumnStats.from_values(stats_values).may_match(
+                predicate, len(stats_values))
+
+        self.assertTrue(may_match('=', (3,), [1, 5]))
+        self.assertFalse(may_match('=', (6,), [1, 5]))
+        self.assertFalse(may_match('>', (5,), [1, 5]))
+        self.assertTrue(may_match('>=', (5,), [1, 5]))
+        self.assertFalse(may_match('<', (1,), [1, 5]))
+        # Comparisons with nulls are null, so they never match.
+        self.assertFalse(may_match('<', (1,), [1, 5, None]))
+        self.assertTrue(may_match('in', (0, 2), [1, 5]))
+        self.assertFalse(may_match('in', (0, 6), [1, 5]))
+        self.assertFalse(may_match('is_null', (), [1, 5]))
+        self.assertFalse(may_match('is_not_null', (), [None, None]))
+        self.assertFalse(may_match('=', (3,), [None, None]))
+
+    def test_take_rows(self):
+        chunks = storage.chunks_from_columns(
+            5, self.make_columns([1, 2, 3, 4, 5], list('abcde')), chunk_size=2)
+        result = storage.take_rows(
+            collections.OrderedDict([('foo', tq_types.INT),
+                                     ('bar', tq_types.STRING)]),
+            chunks, [0, 3, 4])
+        self.assertEqual([1, 4, 5], result['foo'].values)
+        self.assertEqual(['a', 'd', 'e'], result['bar'].values)
+
+    def test_slice_rows(self):
+        chunks = storage.chunks_from_columns(
+            5, self.make_columns([1, 2, 3, 4, 5], list('abcde')), chunk_size=2)
+        column_types = collections.OrderedDict([('foo', tq_types.INT),
+                                                ('bar', tq_types.STRING)])
+        result = storage.slice_rows(column_types, chunks, 1, 4)
+        self.assertEqual([2, 3, 4], result['foo'].values)
+        self.assertEqual(['b', 'c', 'd'], result['bar'].values)
+        result = storage.slice_rows(column_types, chunks, 4, 10)
+        self.assertEqual([5], result['foo'].values)
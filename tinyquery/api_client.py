@@ -2,14 +2,32 @@
 
 This can be used in place of the value returned by apiclient.discovery.build().
 """
+import base64
 import functools
+import itertools
 import json
 
+import instrumentation
+import tinyquery
+import tq_types
+
+
+# The page size for list operations when maxResults isn't given. Responses are
+# always built one page at a time, so this bounds the memory used by a call.
+DEFAULT_MAX_RESULTS = 100000
+
+# How long getQueryResults waits for a job to finish when timeoutMs isn't
+# given, in milliseconds.
+DEFAULT_TIMEOUT_MS = 10000
+
 
 class TinyQueryApiClient(object):
     def __init__(self, tq_service):
         self.tq_service = tq_service
 
+    def datasets(self):
+        return DatasetServiceApiClient(self.tq_service)
+
     def tables(self):
         return TableServiceApiClient(self.tq_service)
 
@@ -51,6 +69,75 @@ def http_request_provider(func):
     return wrapper
 
 
+class DatasetServiceApiClient(object):
+    def __init__(self, tq_service):
+        """Service object for creating and managing datasets.
+
+        :type tq_service: tinyquery.TinyQuery
+        """
+        self.tq_service = tq_service
+
+    @http_request_provider
+    def insert(self, projectId, body):
+        """Create an empty dataset."""
+        dataset_id = body['datasetReference']['datasetId']
+        info = {key: value for key, value in body.iteritems()
+                if key in ('friendlyName', 'description', 'labels')}
+        try:
+            return self.tq_service.create_dataset(projectId, dataset_id, info)
+        except tinyquery.TinyQueryError:
+            raise FakeHttpError(None, json.dumps({
+                'error': {
+                    'code': 409,
+                    'message': 'Already Exists: Dataset %s:%s' % (
+                        projectId, dataset_id)
+                }
+            }))
+
+    @http_request_provider
+    def get(self, projectId, datasetId):
+        try:
+            return self.tq_service.get_dataset_info(projectId, datasetId)
+        except KeyError:
+            raise dataset_not_found_error(projectId, datasetId)
+
+    @http_request_provider
+    def list(self, projectId, pageToken=None, maxResults=None):
+        first_dataset_name = None
+        if pageToken is not None:
+            first_dataset_name = parse_page_token(pageToken)
+        datasets, next_dataset_name = self.tq_service.get_dataset_info_page(
+            projectId, first_dataset_name, get_max_results(maxResults))
+        result = {'datasets': datasets}
+        if next_dataset_name is not None:
+            result['nextPageToken'] = make_page_token(next_dataset_name)
+        return result
+
+    @http_request_provider
+    def delete(self, projectId, datasetId, deleteContents=False):
+        try:
+            self.tq_service.delete_dataset(datasetId, deleteContents)
+        except KeyError:
+            raise dataset_not_found_error(projectId, datasetId)
+        except tinyquery.TinyQueryError:
+            raise FakeHttpError(None, json.dumps({
+                'error': {
+                    'code': 400,
+                    'message': 'Dataset %s:%s is still in use' % (
+                        projectId, datasetId)
+                }
+            }))
+
+
+def dataset_not_found_error(project_id, dataset_id):
+    return FakeHttpError(None, json.dumps({
+        'error': {
+            'code': 404,
+            'message': 'Not found: Dataset %s:%s' % (project_id, dataset_id)
+        }
+    }))
+
+
 class TableServiceApiClient(object):
     def __init__(self, tq_service):
         """Service object for creating and managing tables.
@@ -73,7 +160,11 @@ class TableServiceApiClient(object):
         else:
             #The new table is a regular table.
             raw_schema = body['schema']
-            table = self.tq_service.make_empty_table(table_name, raw_schema)
+            # Only column-based partitioning is supported; a table partitioned
+            # by ingestion time is treated as a regular table.
+            partition_column = body.get('timePartitioning', {}).get('field')
+            table = self.tq_service.make_empty_table(
+                table_name, raw_schema, partition_column=partition_column)
             self.tq_service.load_table_or_view(table)
 
     @http_request_provider
@@ -91,12 +182,19 @@ class TableServiceApiClient(object):
 
     @http_request_provider
     def list(self, projectId, datasetId, pageToken=None, maxResults=None):
-        # TODO(alan): Support paging.
-        all_tables = self.tq_service.get_all_table_info_in_dataset(
-            projectId, datasetId)
-        return {
-            'tables': all_tables[:maxResults]
+        first_table_name = None
+        if pageToken is not None:
+            first_table_name = parse_page_token(pageToken)
+        tables, next_table_name = self.tq_service.get_table_info_page(
+            projectId, datasetId, first_table_name,
+            get_max_results(maxResults))
+        result = {
+            'tables': tables,
+            'totalItems': self.tq_service.get_num_tables_in_dataset(datasetId)
         }
+        if next_table_name is not None:
+            result['nextPageToken'] = make_page_token(next_table_name)
+        return result
 
     @http_request_provider
     def delete(self, projectId, datasetId, tableId):
@@ -164,20 +262,66 @@ class JobServiceApiClient(object):
 
     @http_request_provider
     def get(self, projectId, jobId):
-        return self.tq_service.get_job_info(jobId)
+        try:
+            return self.tq_service.get_job_info(jobId)
+        except KeyError:
+            raise job_not_found_error(projectId, jobId)
 
     @http_request_provider
-    def getQueryResults(self, projectId, jobId):
-        result_table = self.tq_service.get_query_result_table(jobId)
-        result_rows = rows_from_table(result_table)
-        result_schema = schema_from_table(result_table)
-
-        # TODO: Also add the schema.
+    def cancel(self, projectId, jobId):
+        try:
+            job_info = self.tq_service.cancel_job(jobId)
+        except KeyError:
+            raise job_not_found_error(projectId, jobId)
         return {
-            'rows': result_rows,
-            'schema': result_schema
+            'kind': 'bigquery#jobCancelResponse',
+            'job': job_info
         }
 
+    @http_request_provider
+    def getQueryResults(self, projectId, jobId, pageToken=None,
+                        maxResults=None, startIndex=None, timeoutMs=None,
+                        columnar=False):
+        """Get a page of query results.
+
+        If the job isn't done yet, this waits for up to timeoutMs
+        milliseconds (10 seconds by default) for it to finish, and returns a
+        response with jobComplete set to False if it doesn't.
+
+        The columnar argument is a tinyquery extension; see table_rows_page.
+        """
+        if timeoutMs is None:
+            timeoutMs = DEFAULT_TIMEOUT_MS
+        try:
+            job_complete = self.tq_service.wait_for_job(
+                jobId, int(timeoutMs) / 1000.0)
+        except KeyError:
+            raise job_not_found_error(projectId, jobId)
+        job_info = self.tq_service.get_job_info(jobId)
+        if not job_complete:
+            return {
+                'jobReference': job_info['jobReference'],
+                'jobComplete': False
+            }
+        if 'errorResult' in job_info['status']:
+            raise FakeHttpError(None, json.dumps({
+                'error': {
+                    'code': 400,
+                    'message': job_info['status']['errorResult']['message']
+                }
+            }))
+        result_table = self.tq_service.get_query_result_table(jobId)
+        with self.tq_service.measure_stage(
+                self.tq_service.get_query_fingerprint(jobId),
+                'serialize') as measurement:
+            result = table_rows_page(result_table, pageToken, maxResults,
+                                     startIndex, columnar)
+            measurement.size = get_page_num_rows(result)
+        result['schema'] = schema_from_table(result_table)
+        result['jobReference'] = job_info['jobReference']
+        result['jobComplete'] = True
+        return result
+
     @http_request_provider
     def query(self, projectId, body):
         # TODO(alan): Disallow things that are allowed for full jobs but not
@@ -190,7 +334,18 @@ class JobServiceApiClient(object):
         }).execute()
         return self.getQueryResults(
             projectId=projectId,
-            jobId=job_insert_result['jobReference']['jobId']).execute()
+            jobId=job_insert_result['jobReference']['jobId'],
+            maxResults=body.get('maxResults'),
+            timeoutMs=body.get('timeoutMs')).execute()
+
+
+def job_not_found_error(project_id, job_id):
+    return FakeHttpError(None, json.dumps({
+        'error': {
+            'code': 404,
+            'message': 'Not found: Job %s:%s' % (project_id, job_id)
+        }
+    }))
 
 
 class TabledataServiceApiClient(object):
@@ -203,13 +358,13 @@ class TabledataServiceApiClient(object):
 
     @http_request_provider
     def list(self, projectId, datasetId, tableId, pageToken=None,
-             maxResults=None):
-        # TODO(alan): Support paging.
+             maxResults=None, startIndex=None, columnar=False):
+        """Get a page of rows from a table.
+
+        The columnar argument is a tinyquery extension; see table_rows_page.
+        """
         try:
             table = self.tq_service.get_table(datasetId, tableId)
-            return {
-                'rows': rows_from_table(table)
-            }
         except KeyError:
             raise FakeHttpError(None, json.dumps({
                 'error': {
@@ -217,23 +372,212 @@ class TabledataServiceApiClient(object):
                     'message': 'Table not found: %s.%s' % (datasetId, tableId)
                 }
             }))
+        with table.lock.read_locked(), self.tq_service.measure_stage(
+                instrumentation.get_table_fingerprint(table.name),
+                'serialize') as measurement:
+            result = table_rows_page(table, pageToken, maxResults, startIndex,
+                                     columnar)
+            measurement.size = get_page_num_rows(result)
+        return result
+
+    @http_request_provider
+    def insertAll(self, projectId, datasetId, tableId, body):
+        """Stream rows into a table."""
+        rows = [(row.get('insertId'), row.get('json'))
+                for row in body.get('rows', [])]
+        try:
+            errors = self.tq_service.insert_rows(
+                datasetId, tableId, rows,
+                skip_invalid_rows=body.get('skipInvalidRows', False),
+                ignore_unknown_values=body.get('ignoreUnknownValues', False))
+        except KeyError:
+            raise FakeHttpError(None, json.dumps({
+                'error': {
+                    'code': 404,
+                    'message': 'Table not found: %s.%s' % (datasetId, tableId)
+                }
+            }))
+        except tinyquery.TinyQueryError as e:
+            raise FakeHttpError(None, json.dumps({
+                'error': {
+                    'code': 400,
+                    'message': str(e)
+                }
+            }))
+        result = {'kind': 'bigquery#tableDataInsertAllResponse'}
+        if errors:
+            result['insertErrors'] = [
+                {
+                    'index': row_index,
+                    'errors': [{
+                        'reason': 'invalid' if message else 'stopped',
+                        'message': message or ''
+                    }]
+                }
+                for row_index, message in errors]
+        return result
+
+
+def make_page_token(position):
+    """Build an opaque page token that refers to a position in a list."""
+    return base64.urlsafe_b64encode(json.dumps(position))
+
+
+def parse_page_token(page_token):
+    """Get the position that a page token from make_page_token refers to."""
+    try:
+        return json.loads(base64.urlsafe_b64decode(str(page_token)))
+    except (TypeError, ValueError):
+        raise FakeHttpError(None, json.dumps({
+            'error': {
+                'code': 400,
+                'message': 'Invalid page token: %s' % page_token
+            }
+        }))
+
+
+def invalid_value_error(name, value):
+    return FakeHttpError(None, json.dumps({
+        'error': {
+            'code': 400,
+            'message': 'Invalid value for %s: %s' % (name, value)
+        }
+    }))
+
+
+def get_max_results(max_results):
+    """Get the page size to use, rejecting ones that could never progress."""
+    if max_results is None:
+        return DEFAULT_MAX_RESULTS
+    try:
+        page_size = int(max_results)
+    except (TypeError, ValueError):
+        raise invalid_value_error('maxResults', max_results)
+    if page_size <= 0:
+        raise invalid_value_error('maxResults', max_results)
+    return page_size
+
+
+def table_rows_page(table, page_token, max_results, start_index,
+                    columnar=False):
+    """Build the response for one page of rows from a table.
+
+    The page starts at the row referred to by the page token, if given, or
+    otherwise at start_index. Only the rows in the page are read from the
+    table. A start_index past the end of the table, or a max_results that
+    isn't positive, is rejected with a 400 error.
+
+    If columnar is true, the response has a 'columns' list, with a list of
+    values for each column in the schema, instead of the usual 'rows'. This
+    isn't part of the BigQuery API, but is much more compact, so it's useful
+    for in-process callers reading large results.
+    """
+    if page_token is not None:
+        start = parse_page_token(page_token)
+    elif start_index is not None:
+        try:
+            start = int(start_index)
+        except (TypeError, ValueError):
+            raise invalid_value_error('startIndex', start_index)
+        if not 0 <= start <= table.num_rows:
+            raise invalid_value_error('startIndex', start_index)
+    else:
+        start = 0
+    end = min(table.num_rows, start + get_max_results(max_results))
+    result = {
+        'totalRows': str(table.num_rows),
+    }
+    if columnar:
+        result['columns'] = columns_from_table(table, start, end)
+    else:
+        result['rows'] = list(rows_from_table(table, start, end))
+    if end < table.num_rows:
+        result['pageToken'] = make_page_token(end)
+    return result
+
+
+def get_page_num_rows(page):
+    """Get the number of rows in a response from table_rows_page."""
+    if 'rows' in page:
+        return len(page['rows'])
+    if not page['columns']:
+        return 0
+    return len(page['columns'][0])
 
 
 def schema_from_table(table):
     """Given a tinyquery.Table, build an API-compatible schema."""
     return {'fields': [
-        {'name': name, 'type': col.type}
-        for name, col in table.columns.iteritems()
+        {'name': name, 'type': col_type}
+        for name, col_type in table.column_types.iteritems()
     ]}
 
 
-def rows_from_table(table):
-    """Given a tinyquery.Table, build an API-compatible rows object."""
-    result_rows = []
-    for i in xrange(table.num_rows):
-        field_values = [{'v': str(col.values[i])}
-                        for col in table.columns.itervalues()]
-        result_rows.append({
-            'f': field_values
-        })
-    return result_rows
+def rows_from_table(table, start=0, end=None):
+    """Given a tinyquery.Table, lazily build an API-compatible rows object.
+
+    Each row's values are only formatted when the row is needed, so callers
+    that stream the rows never hold more than one formatted row at a time.
+
+    Arguments:
+        table: The tinyquery.Table to read.
+        start: The number of the first row to include.
+        end: The number of the row just past the last one to include, or None
+            to include every row after start.
+
+    Yields: A dict in the API's format for each row.
+    """
+    if end is None:
+        end = table.num_rows
+    columns = table.slice_rows(start, end).values()
+    formatters = [VALUE_FORMATTERS.get(column.type, str)
+                  for column in columns]
+    for row in itertools.izip(*[column.values for column in columns]):
+        yield {'f': [{'v': None if value is None else formatter(value)}
+                     for formatter, value in itertools.izip(formatters,
+                                                            row)]}
+
+
+def columns_from_table(table, start=0, end=None):
+    """Get a list of the API-formatted values in each column of a table.
+
+    The arguments are the same as for rows_from_table.
+    """
+    if end is None:
+        end = table.num_rows
+    return [format_values(column.type, column.values)
+            for column in table.slice_rows(start, end).itervalues()]
+
+
+def format_values(col_type, values):
+    """Convert values of the given type to the API's JSON representation.
+
+    Nulls become JSON nulls, and everything else becomes a string, in the same
+    format that BigQuery uses.
+    """
+    formatter = VALUE_FORMATTERS.get(col_type, str)
+    return [None if value is None else formatter(value) for value in values]
+
+
+def format_bool(value):
+    return 'true' if value else 'false'
+
+
+def format_string(value):
+    return value
+
+
+def format_null(value):
+    return None
+
+
+# Map from column type to a function converting a non-null value of that type
+# to a string for the API.
+VALUE_FORMATTERS = {
+    tq_types.INT: str,
+    # repr gives enough digits that the float can be read back exactly.
+    tq_types.FLOAT: repr,
+    tq_types.BOOL: format_bool,
+    tq_types.STRING: format_string,
+    tq_types.NONETYPE: format_null,
+}
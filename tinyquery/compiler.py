@@ -5,10 +5,16 @@ This step has a number of responsibilities:
 -Resolve all select fields to their aliases and types.
 """
 import collections
+import datetime
 
+import context
+import evaluator
+import lexer
 import tinyquery
 import parser
+import predicates
 import runtime
+import storage
 import tq_ast
 import typed_ast
 import type_context
@@ -19,6 +25,17 @@ class CompileError(Exception):
     pass
 
 
+# The predicate operators that an index can answer, from most to least
+# preferred. Equality lookups usually find the fewest rows, so we prefer them
+# when multiple predicates with an index are estimated to find the same number
+# of rows.
+INDEX_OPERATOR_PREFERENCE = ['=', 'in', '<', '<=', '>', '>=']
+# Taking rows found by an index costs more per row than scanning the table
+# (which can also skip whole chunks using their zone maps), so an index is
+# only used if it's estimated to find at most this fraction of the rows.
+MAX_INDEX_LOOKUP_FRACTION = 0.25
+
+
 def compile_text(text, tables_by_name):
     ast = parser.parse_text(text)
     return Compiler(tables_by_name).compile_select(ast)
@@ -33,11 +50,13 @@ class Compiler(object):
         table_expr = self.compile_table_expr(select.table_expr)
         table_ctx = table_expr.type_ctx
         where_expr = self.compile_where_expr(select.where_expr, table_ctx)
+        table_expr = self.prune_partitions(table_expr, where_expr)
+        table_expr = self.use_index_if_possible(table_expr, where_expr)
         select_fields = self.expand_select_fields(select.select_fields,
                                                   table_expr)
         aliases = self.get_aliases(select_fields)
-        group_set = self.compile_groups(select.groups, select_fields, aliases,
-                                        table_ctx)
+        group_set = self.compile_groups(select.groups, select.is_group_each,
+                                        select_fields, aliases, table_ctx)
 
         compiled_field_dict, aggregate_context = self.compile_group_fields(
             select_fields, aliases, group_set, table_ctx)
@@ -161,6 +180,74 @@ class Compiler(object):
         else:
             assert False, 'Unexpected type: %s' % type(expr)
 
+    def prune_partitions(self, table_expr, where_expr):
+        """Only read the partitions of a table that the WHERE might match.
+
+        If table_expr reads from a partitioned table and the WHERE clause has
+        predicates on the partition column, we return a TablePartitions with
+        just the partitions that can match those predicates. Otherwise,
+        table_expr is returned unchanged.
+        """
+        if not isinstance(table_expr, (typed_ast.Table,
+                                       typed_ast.TablePartitions)):
+            return table_expr
+        table = self.tables_by_name[table_expr.name]
+        if not isinstance(table, tinyquery.PartitionedTable):
+            return table_expr
+        partition_predicates = [
+            predicate
+            for column_name, predicate in
+            predicates.get_table_column_predicates(
+                table_expr.type_ctx, table.column_types.keys(), where_expr)
+            if column_name == table.partition_column]
+        if not partition_predicates:
+            return table_expr
+        if isinstance(table_expr, typed_ast.TablePartitions):
+            partition_keys = table_expr.partition_keys
+        else:
+            partition_keys = table.partition_keys
+        return typed_ast.TablePartitions(
+            table_expr.name,
+            tuple(key for key in partition_keys
+                  if all(storage.ColumnStats.from_values([key]).may_match(
+                      predicate, 1) for predicate in partition_predicates)),
+            table_expr.type_ctx)
+
+    def use_index_if_possible(self, table_expr, where_expr):
+        """Replace a base table with an index lookup, if one is worth using.
+
+        If table_expr is a base table, and there's an index on one of its
+        columns that can answer a predicate in the WHERE clause, we return an
+        IndexLookup for the predicate estimated to find the fewest rows. If
+        there's no such predicate, or it isn't selective enough for the lookup
+        to be cheaper than a scan, table_expr is returned unchanged.
+        """
+        if not isinstance(table_expr, typed_ast.Table):
+            return table_expr
+        table = self.tables_by_name[table_expr.name]
+        if not table.indexes:
+            return table_expr
+        candidates = []
+        for column_name, predicate in predicates.get_table_column_predicates(
+                table_expr.type_ctx, table.column_types.keys(), where_expr):
+            index = table.indexes.get(column_name)
+            if (index is not None and
+                    predicate.operator in index.supported_operators):
+                num_rows = index.estimate_rows(predicate.operator,
+                                               predicate.values)
+                preference = INDEX_OPERATOR_PREFERENCE.index(
+                    predicate.operator)
+                candidates.append(
+                    ((num_rows, preference), column_name, predicate))
+        if not candidates:
+            return table_expr
+        (num_rows, _), column_name, predicate = min(candidates)
+        if num_rows > table.num_rows * MAX_INDEX_LOOKUP_FRACTION:
+            return table_expr
+        return typed_ast.IndexLookup(table_expr.name, column_name,
+                                     predicate.operator, predicate.values,
+                                     table_expr.type_ctx)
+
     def compile_table_expr(self, table_expr):
         """Compile a table expression and determine its result type context.
 
@@ -183,6 +270,8 @@ class Compiler(object):
             return method(table_expr)
 
     def compile_table_expr_TableId(self, table_expr):
+        if '$' in table_expr.name:
+            return self.compile_partition_ref(table_expr)
         table = self.tables_by_name[table_expr.name]
         if isinstance(table, tinyquery.Table):
             return self.compile_table_ref(table_expr, table)
@@ -193,13 +282,29 @@ class Compiler(object):
 
     def compile_table_ref(self, table_expr, table):
         alias = table_expr.alias or table_expr.name
-        columns = collections.OrderedDict([
-            (name, column.type) for name, column in table.columns.iteritems()
-        ])
         type_ctx = type_context.TypeContext.from_table_and_columns(
-            alias, columns, None)
+            alias, table.column_types, None)
         return typed_ast.Table(table_expr.name, type_ctx)
 
+    def compile_partition_ref(self, table_expr):
+        """Compile a reference to a table with a partition decorator.
+
+        The decorator isn't part of the default alias, so the columns of
+        [dataset.table$20160101] can be referred to as dataset.table.column.
+        """
+        table_name, decorator = table_expr.name.split('$', 1)
+        table = self.tables_by_name.get(table_name)
+        if not isinstance(table, tinyquery.PartitionedTable):
+            raise CompileError(
+                'Partition decorators can only be used on partitioned '
+                'tables: {}'.format(table_expr.name))
+        alias = table_expr.alias or table_name
+        type_ctx = type_context.TypeContext.from_table_and_columns(
+            alias, table.column_types, None)
+        return typed_ast.TablePartitions(
+            table_name, tuple(table.get_decorator_partition_keys(decorator)),
+            type_ctx)
+
     def compile_view_ref(self, table_expr, view):
         # TODO(alan): This code allows fields from the view's implicit column
         # context to be selected, which probably isn't allowed in regular
@@ -229,13 +334,189 @@ class Compiler(object):
             table.type_ctx for table in compiled_tables)
         return typed_ast.TableUnion(compiled_tables, type_ctx)
 
+    def compile_table_expr_TableFunction(self, table_expr):
+        """Compile a table wildcard function into a union of its tables.
+
+        The matching tables are found when the query is compiled, and the
+        union reads one member table at a time when it is evaluated.
+        """
+        method = getattr(self, 'get_table_function_' + table_expr.name, None)
+        if method is None:
+            raise CompileError(
+                'Unknown table function: {}'.format(table_expr.name))
+        try:
+            dataset, table_names = method(*table_expr.args)
+        except TypeError:
+            raise CompileError('Wrong number of arguments to {}.'.format(
+                table_expr.name.upper()))
+        if not table_names:
+            raise CompileError('{} matched no tables.'.format(table_expr))
+        compiled_tables = [
+            self.compile_table_expr(
+                tq_ast.TableId(dataset + '.' + table_name, None))
+            for table_name in table_names]
+        type_ctx = type_context.TypeContext.union_contexts(
+            table.type_ctx for table in compiled_tables)
+        if table_expr.alias is not None:
+            type_ctx = type_ctx.context_with_full_alias(table_expr.alias)
+        return typed_ast.TableUnion(compiled_tables, type_ctx)
+
+    def get_table_function_table_date_range(self, prefix_expr, start_expr,
+                                            end_expr):
+        """Find the tables for TABLE_DATE_RANGE(prefix, start, end).
+
+        The tables are the ones named with the prefix followed by a date in
+        YYYYMMDD form between the start and end timestamps, inclusive.
+        Since those names sort in date order, they can be found with a range
+        lookup in the sorted list of table names.
+
+        Returns: A pair of the dataset name and a list of table names.
+        """
+        dataset, prefix = self.get_dataset_and_table_arg(prefix_expr)
+        start_date = self.get_date_arg(start_expr)
+        end_date = self.get_date_arg(end_expr)
+        candidate_names = self.get_table_name_index(
+        ).get_dataset_table_names_in_range(
+            dataset, prefix + start_date.strftime('%Y%m%d'),
+            prefix + end_date.strftime('%Y%m%d'))
+        return dataset, [
+            name for name in candidate_names
+            if self.is_date_suffix(name[len(prefix):])]
+
+    def get_table_function_table_query(self, dataset_expr, query_expr):
+        """Find the tables for TABLE_QUERY(dataset, expression).
+
+        The expression is a string with a boolean expression, which is
+        evaluated over a metadata table with one row per table in the dataset.
+        The metadata table has the columns dataset_id, table_id, row_count
+        and type (1 for tables and 2 for views).
+
+        Returns: A pair of the dataset name and a list of table names.
+        """
+        if not isinstance(dataset_expr, tq_ast.ColumnId):
+            raise CompileError('Expected a dataset name, got {}.'.format(
+                dataset_expr))
+        dataset = dataset_expr.name
+        query = self.get_string_arg(query_expr)
+        table_names = self.get_table_name_index().get_dataset_table_names(
+            dataset)
+        tables = [self.tables_by_name[dataset + '.' + table_name]
+                  for table_name in table_names]
+        metadata_columns = collections.OrderedDict([
+            ('dataset_id', context.Column(tq_types.STRING,
+                                          [dataset] * len(table_names))),
+            ('table_id', context.Column(tq_types.STRING, table_names)),
+            ('row_count', context.Column(
+                tq_types.INT,
+                [table.num_rows if isinstance(table, tinyquery.Table)
+                 else None for table in tables])),
+            ('type', context.Column(
+                tq_types.INT,
+                [1 if isinstance(table, tinyquery.Table) else 2
+                 for table in tables])),
+        ])
+        metadata_type_ctx = type_context.TypeContext.from_table_and_columns(
+            '__TABLES__',
+            collections.OrderedDict(
+                (column_name, column.type)
+                for column_name, column in metadata_columns.iteritems()))
+        # The expression can only refer to the metadata columns.
+        filter_expr = Compiler({}).compile_expr(
+            self.parse_table_query_expr(query), metadata_type_ctx)
+        if filter_expr.type != tq_types.BOOL:
+            raise CompileError(
+                'TABLE_QUERY expression must be a boolean, got {}.'.format(
+                    query))
+        result_context = evaluator.Evaluator({}).filter_context(
+            context.context_from_columns(len(table_names), metadata_columns,
+                                         metadata_type_ctx),
+            filter_expr)
+        return dataset, result_context.columns[
+            ('__TABLES__', 'table_id')].values
+
+    @staticmethod
+    def parse_table_query_expr(query):
+        """Parse the expression argument of TABLE_QUERY on its own.
+
+        The parser only accepts whole queries, so the tokens of the expression
+        are parsed as the WHERE clause of a query over the metadata table.
+        They're lexed separately, so the expression can't change how the
+        rest of that query is read, and it can't add clauses of its own.
+        """
+        try:
+            expr_tokens = lexer.lex_text(query)
+            select = parser.parse_tokens(
+                lexer.lex_text('SELECT table_id FROM __TABLES__ WHERE') +
+                expr_tokens)
+        except SyntaxError as e:
+            raise CompileError(
+                'Invalid TABLE_QUERY expression {!r}: {}'.format(query, e))
+        if (select.groups is not None or select.orderings is not None or
+                select.limit is not None):
+            raise CompileError(
+                'Invalid TABLE_QUERY expression {!r}.'.format(query))
+        return select.where_expr
+
+    def get_table_name_index(self):
+        """Get a TablesByName with the tables we can compile against.
+
+        This is normally just tables_by_name, but if we were given a plain
+        dict, we need to index the table names ourselves.
+        """
+        if not isinstance(self.tables_by_name, tinyquery.TablesByName):
+            self.tables_by_name = tinyquery.TablesByName(self.tables_by_name)
+        return self.tables_by_name
+
+    @staticmethod
+    def get_dataset_and_table_arg(expr):
+        """Get the dataset and table name from a table function argument."""
+        split_name = None
+        if isinstance(expr, tq_ast.ColumnId):
+            split_name = tinyquery.TablesByName.split_name(expr.name)
+        if split_name is None:
+            raise CompileError(
+                'Expected a table name prefix of the form dataset.prefix, '
+                'got {}.'.format(expr))
+        return split_name
+
+    @staticmethod
+    def get_string_arg(expr):
+        if (not isinstance(expr, tq_ast.Literal) or
+                not isinstance(expr.value, basestring)):
+            raise CompileError('Expected a string literal, got {}.'.format(
+                expr))
+        return expr.value
+
+    @classmethod
+    def get_date_arg(cls, expr):
+        """Get the date from a literal or TIMESTAMP(literal) argument."""
+        if (isinstance(expr, tq_ast.FunctionCall) and
+                expr.name == 'timestamp' and len(expr.args) == 1):
+            expr = expr.args[0]
+        date_str = cls.get_string_arg(expr)
+        try:
+            return datetime.datetime.strptime(date_str[:10],
+                                              '%Y-%m-%d').date()
+        except ValueError:
+            raise CompileError('Invalid date: {}'.format(date_str))
+
+    @staticmethod
+    def is_date_suffix(suffix):
+        if len(suffix) != 8 or not suffix.isdigit():
+            return False
+        try:
+            datetime.datetime.strptime(suffix, '%Y%m%d')
+        except ValueError:
+            return False
+        return True
+
     def compile_table_expr_CrossJoin(self, table_expr):
         compiled_table1, _ = self.compile_joined_table(table_expr.table1)
         compiled_table2, _ = self.compile_joined_table(table_expr.table2)
         result_type_ctx = type_context.TypeContext.join_contexts(
             [compiled_table1.type_ctx, compiled_table2.type_ctx])
         return typed_ast.Join(compiled_table1, compiled_table2, [],
-                              False, result_type_ctx)
+                              False, False, result_type_ctx)
 
     def compile_table_expr_Join(self, table_expr):
         compiled_table1, alias1 = self.compile_joined_table(table_expr.table1)
@@ -246,7 +527,8 @@ class Compiler(object):
         result_type_ctx = type_context.TypeContext.join_contexts(
             [compiled_table1.type_ctx, compiled_table2.type_ctx])
         return typed_ast.Join(compiled_table1, compiled_table2, result_fields,
-                              table_expr.is_left_outer, result_type_ctx)
+                              table_expr.is_left_outer, table_expr.is_each,
+                              result_type_ctx)
 
     def compile_joined_table(self, table_expr):
         """Given one side of a JOIN, get its table expression and alias."""
@@ -303,7 +585,8 @@ class Compiler(object):
             select_result = select_result.with_type_ctx(new_type_context)
         return select_result
 
-    def compile_groups(self, groups, select_fields, aliases, table_ctx):
+    def compile_groups(self, groups, is_each, select_fields, aliases,
+                       table_ctx):
         """Gets the group set to use for the query.
 
         This involves handling the special cases when no GROUP BY statement
@@ -313,6 +596,7 @@ class Compiler(object):
         Arguments:
             groups: Either None, indicating that no GROUP BY was specified, or
                 a list of strings from the GROUP BY.
+            is_each: True if the groups came from GROUP EACH BY.
             select_fields: A list of tq_ast.SelectField objects for the query
                 we are compiling.
             aliases: The aliases we will assign to the select fields.
@@ -352,7 +636,7 @@ class Compiler(object):
                     # references could potentially be rethought.
                     field_groups.append(
                         table_ctx.column_ref_for_name(group.name))
-            return typed_ast.GroupSet(alias_groups, field_groups)
+            return typed_ast.GroupSet(alias_groups, field_groups, is_each)
 
     def compile_select_field(self, expr, alias, type_ctx):
         compiled_expr = self.compile_expr(expr, type_ctx)
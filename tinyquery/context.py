@@ -6,6 +6,8 @@ It is the basic container for intermediate data when evaluating a query.
 import collections
 import itertools
 
+import encoding
+
 
 class Context(object):
     """Represents the columns accessible when evaluating an expression.
@@ -65,13 +67,26 @@ def context_from_table(table, type_context):
     The order of the columns in the type context must match the order of the
     columns in the table.
     """
-    any_column = table.columns.itervalues().next()
+    return context_from_columns(table.num_rows, table.columns, type_context)
+
+
+def context_from_chunk(chunk, type_context):
+    """Given a single chunk of a table, build a context with its values.
+
+    As with context_from_table, the order of the columns in the type context
+    must match the order of the columns in the chunk.
+    """
+    return context_from_columns(chunk.num_rows, chunk.columns, type_context)
+
+
+def context_from_columns(num_rows, columns, type_context):
+    """Rename an OrderedDict of table columns using the given type context."""
     new_columns = collections.OrderedDict([
         (column_name, column)
         for (column_name, column) in zip(type_context.columns.iterkeys(),
-                                         table.columns.itervalues())
+                                         columns.itervalues())
     ])
-    return Context(len(any_column.values), new_columns, None)
+    return Context(num_rows, new_columns, None)
 
 
 def context_with_overlayed_type_context(context, type_context):
@@ -100,16 +115,21 @@ def mask_context(context, mask):
     Arguments:
         context: A Context to filter.
         mask: A column of type bool. Each row in this column should be True if
-            the row should be kept for the whole context and False otherwise.
+            the row should be kept for the whole context and False or None
+            (null) otherwise.
     """
     assert context.aggregate_context is None, (
         'Cannot mask a context with an aggregate context.')
     new_columns = collections.OrderedDict([
         (column_name,
-         Column(column.type, list(itertools.compress(column.values, mask))))
+         Column(column.type, encoding.compress(column.values, mask)))
         for (column_name, column) in context.columns.iteritems()
     ])
-    return Context(sum(mask), new_columns, None)
+    if new_columns:
+        num_rows = len(next(new_columns.itervalues()).values)
+    else:
+        num_rows = sum(itertools.imap(bool, mask))
+    return Context(num_rows, new_columns, None)
 
 
 def empty_context_from_template(context):
@@ -176,6 +196,50 @@ def append_context_to_context(src_context, dest_context):
             dest_column.values.extend(src_column.values)
 
 
+def concat_contexts(contexts):
+    """Build a context with all rows of the given contexts, in order.
+
+    All contexts must have the same columns, and there must be at least one.
+    If there is only one context, it is returned as-is.
+    """
+    if len(contexts) == 1:
+        return contexts[0]
+    return Context(
+        sum(ctx.num_rows for ctx in contexts),
+        collections.OrderedDict(
+            (column_key, Column(column.type, encoding.concat_values(
+                [ctx.columns[column_key].values if column_key in ctx.columns
+                 else [None] * ctx.num_rows for ctx in contexts])))
+            for column_key, column in contexts[0].columns.iteritems()),
+        None)
+
+
+def project_context(context, column_keys):
+    """Return a context with just the columns with the given keys.
+
+    The columns are shared with the given context rather than copied.
+    """
+    return Context(
+        context.num_rows,
+        collections.OrderedDict(
+            (column_key, column)
+            for column_key, column in context.columns.iteritems()
+            if column_key in column_keys),
+        context.aggregate_context)
+
+
+def slice_context(context, start, end):
+    """Return a context with the rows from index start up to index end."""
+    assert context.aggregate_context is None
+    start, end = min(start, context.num_rows), min(end, context.num_rows)
+    return Context(
+        end - start,
+        collections.OrderedDict(
+            (column_key, Column(column.type, column.values[start:end]))
+            for column_key, column in context.columns.iteritems()),
+        None)
+
+
 def row_context_from_context(src_context, index):
     """Pull a specific row out of a context as its own context."""
     assert src_context.aggregate_context is None
@@ -187,25 +251,59 @@ def row_context_from_context(src_context, index):
 
 
 def cross_join_contexts(context1, context2):
+    """Build a context with every pair of rows of two contexts.
+
+    The rows are in order of the rows of context1, and then of context2. Each
+    column is built in one go: the values of context1 are each repeated once
+    for every row of context2, and the values of context2 are tiled once for
+    every row of context1.
+    """
     assert context1.aggregate_context is None
     assert context2.aggregate_context is None
+    num_rows1 = context1.num_rows
+    num_rows2 = context2.num_rows
     result_columns = collections.OrderedDict(
-        [(col_name, Column(col.type, []))
-         for col_name, col in context1.columns.iteritems()] +
-        [(col_name, Column(col.type, []))
-         for col_name, col in context2.columns.iteritems()])
+        (col_name, Column(col.type, list(itertools.chain.from_iterable(
+            itertools.repeat(value, num_rows2) for value in col.values))))
+        for col_name, col in context1.columns.iteritems())
+    for col_name, col in context2.columns.iteritems():
+        result_columns[col_name] = Column(col.type, col.values * num_rows1)
+    return Context(num_rows1 * num_rows2, result_columns, None)
+
 
-    for index1 in xrange(context1.num_rows):
-        for index2 in xrange(context2.num_rows):
-            for col_name, column in context1.columns.iteritems():
-                result_columns[col_name].values.append(column.values[index1])
-            for col_name, column in context2.columns.iteritems():
-                result_columns[col_name].values.append(column.values[index2])
-    return Context(context1.num_rows * context2.num_rows, result_columns, None)
+def iter_cross_join_contexts(context1, context2, max_rows):
+    """Lazily compute cross_join_contexts(context1, context2) in batches.
+
+    Yields: Contexts with at most max_rows rows each (but at least one row),
+        which together have the same rows as cross_join_contexts, in order.
+    """
+    num_rows2 = context2.num_rows
+    if num_rows2 == 0:
+        return
+    if num_rows2 <= max_rows:
+        # Pair as many rows of context1 as fit in a batch with all of
+        # context2.
+        rows_per_batch = max_rows // num_rows2
+        for start in xrange(0, context1.num_rows, rows_per_batch):
+            yield cross_join_contexts(
+                slice_context(context1, start, start + rows_per_batch),
+                context2)
+    else:
+        for index in xrange(context1.num_rows):
+            row_context = row_context_from_context(context1, index)
+            for start in xrange(0, num_rows2, max_rows):
+                yield cross_join_contexts(
+                    row_context,
+                    slice_context(context2, start, start + max_rows))
 
 
 def truncate_context(context, limit):
-    """Modify the given context to have at most the given number of rows."""
+    """Modify the given context to have at most the given number of rows.
+
+    The value lists may be shared with tables or other contexts, so the
+    existing lists are replaced with truncated copies rather than being
+    modified in place.
+    """
     assert context.aggregate_context is None
     # BigQuery adds non-int limits, so we need to allow floats up until now.
     limit = int(limit)
@@ -213,5 +311,6 @@ def truncate_context(context, limit):
         return
     context.num_rows = limit
 
-    for column in context.columns.itervalues():
-        column.values[limit:] = []
+    for column_name, column in context.columns.iteritems():
+        context.columns[column_name] = Column(column.type,
+                                              column.values[:limit])
@@ -0,0 +1,503 @@
+"""Compact encodings for the values of columns.
+
+The values of a Column are normally a list with one value per row, but the
+columns of a table can hold an encoded sequence instead, which stores the same
+values more compactly. Encoded sequences are immutable, and support the parts
+of the list interface that don't modify the list (len, indexing, slicing,
+iteration, comparison, + and *), so code that only reads values works on them
+unchanged. Code that knows about an encoding can work on its compact form
+directly, and the functions in this module (take, compress, concat_values)
+keep the encoding where a list operation would lose it.
+
+The encodings are:
+    DictionaryValues: An array of small integer codes, and a list of the
+        distinct values that the codes refer to. This is used for STRING
+        columns with few distinct values.
+    RunLengthValues: A list with the value of each run of equal values, and
+        an array with the end of each run. This is used for columns with long
+        runs, like a sorted column or a partition date.
+    ConstantValues: A single value repeated for every row. This is the special
+        case of RunLengthValues with only one run.
+    NullableValues: A list of values, with a validity bitmap saying which of
+        them aren't null. This isn't any more compact than a list, but it
+        saves functions from having to look for nulls in the values; see the
+        nulls module.
+
+The encoding of each column of a table loaded from a CSV file is picked by
+choose_encoding.
+"""
+import array
+import bisect
+import functools
+import itertools
+
+
+# STRING columns are only dictionary-encoded if they have at most this many
+# distinct values for each row.
+MAX_DICTIONARY_FRACTION = 0.5
+# Columns are only run-length encoded if they have at most this many runs for
+# each row.
+MAX_RUN_FRACTION = 0.1
+
+
+def get_code_typecode(dictionary_size):
+    """Get the smallest array typecode for the codes of a dictionary."""
+    if dictionary_size <= 1 << 8:
+        return 'B'
+    if dictionary_size <= 1 << 16:
+        return 'H'
+    return 'l'
+
+
+class EncodedValues(object):
+    """An immutable sequence of the values of a column, in a compact form.
+
+    Subclasses implement __len__, __iter__, get_value, get_slice, take,
+    compress and __mul__.
+    """
+    # Like lists, encoded values are compared by value, so they can't be
+    # hashed.
+    __hash__ = None
+
+    def __getitem__(self, index):
+        num_values = len(self)
+        if isinstance(index, slice):
+            start, stop, step = index.indices(num_values)
+            if step == 1:
+                return self.get_slice(start, max(start, stop))
+            return [self.get_value(i) for i in xrange(start, stop, step)]
+        if index < 0:
+            index += num_values
+        if not 0 <= index < num_values:
+            raise IndexError('Index out of range: {}'.format(index))
+        return self.get_value(index)
+
+    def __getslice__(self, start, stop):
+        # Python 2 calls this instead of __getitem__ for simple slices.
+        return self.__getitem__(slice(max(start, 0), max(stop, 0)))
+
+    def __eq__(self, other):
+        if not isinstance(other, (list, tuple, EncodedValues)):
+            return NotImplemented
+        return (len(self) == len(other) and
+                all(value1 == value2
+                    for value1, value2 in itertools.izip(self, other)))
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        if result is NotImplemented:
+            return result
+        return not result
+
+    def __add__(self, other):
+        return concat_values([self, other])
+
+    def __radd__(self, other):
+        return concat_values([other, self])
+
+    def __rmul__(self, count):
+        return self * count
+
+    def __repr__(self):
+        return '{}({!r})'.format(self.__class__.__name__, list(self))
+
+
+class DictionaryValues(EncodedValues):
+    """Values stored as codes into a list of the distinct values.
+
+    Fields:
+        dictionary: A list of distinct values. It is never modified, so it
+            can be shared by many DictionaryValues, and values with the same
+            dictionary can be compared by their codes.
+        codes: An array with the index into dictionary of each value. Not
+            every value of the dictionary needs to be used.
+    """
+    def __init__(self, dictionary, codes):
+        self.dictionary = dictionary
+        self.codes = codes
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __iter__(self):
+        return itertools.imap(self.dictionary.__getitem__, self.codes)
+
+    def __mul__(self, count):
+        return DictionaryValues(self.dictionary, self.codes * count)
+
+    def get_value(self, index):
+        return self.dictionary[self.codes[index]]
+
+    def get_slice(self, start, stop):
+        return DictionaryValues(self.dictionary, self.codes[start:stop])
+
+    def take(self, indexes):
+        return DictionaryValues(
+            self.dictionary,
+            array.array(self.codes.typecode,
+                        itertools.imap(self.codes.__getitem__, indexes)))
+
+    def compress(self, mask):
+        return DictionaryValues(
+            self.dictionary,
+            array.array(self.codes.typecode,
+                        itertools.compress(self.codes, mask)))
+
+    def group_codes(self):
+        """Get a list with the indexes of the values with each code."""
+        indexes_by_code = [[] for _ in self.dictionary]
+        appends = [indexes.append for indexes in indexes_by_code]
+        for index, code in enumerate(self.codes):
+            appends[code](index)
+        return indexes_by_code
+
+    @classmethod
+    def concat(cls, values_list):
+        """Concatenate DictionaryValues, merging their dictionaries."""
+        dictionary = values_list[0].dictionary
+        if all(values.dictionary == dictionary for values in values_list):
+            codes = array.array(values_list[0].codes.typecode)
+            for values in values_list:
+                codes.extend(values.codes)
+            return cls(dictionary, codes)
+
+        dictionary = list(dictionary)
+        code_by_value = {value: code for code, value in enumerate(dictionary)}
+        translations = []
+        for values in values_list:
+            translation = []
+            for value in values.dictionary:
+                code = code_by_value.get(value)
+                if code is None:
+                    code = code_by_value[value] = len(dictionary)
+                    dictionary.append(value)
+                translation.append(code)
+            translations.append(translation)
+        codes = array.array(get_code_typecode(len(dictionary)))
+        for values, translation in zip(values_list, translations):
+            codes.extend(itertools.imap(translation.__getitem__,
+                                        values.codes))
+        return cls(dictionary, codes)
+
+
+class RunLengthValues(EncodedValues):
+    """Values stored as runs of equal values.
+
+    Adjacent runs may have equal values, so code that only needs to look at
+    each distinct value once per run can use the runs as they are, but the
+    runs shouldn't be relied on to be as long as possible.
+
+    Fields:
+        run_values: A list with the value of each run.
+        run_ends: An array with the index just past the last value of each
+            run, in increasing order. The last one is the number of values.
+    """
+    def __init__(self, run_values, run_ends):
+        self.run_values = run_values
+        self.run_ends = run_ends
+
+    @classmethod
+    def from_runs(cls, runs):
+        """Build RunLengthValues from an iterable of (value, length) pairs.
+
+        Runs with no values are skipped, and a single run gives
+        ConstantValues.
+        """
+        run_values = []
+        run_ends = array.array('l')
+        end = 0
+        for value, length in runs:
+            if length > 0:
+                end += length
+                run_values.append(value)
+                run_ends.append(end)
+        if len(run_values) == 1:
+            return ConstantValues(run_values[0], end)
+        return cls(run_values, run_ends)
+
+    @classmethod
+    def from_values(cls, values):
+        """Run-length encode values, which must all have the same type."""
+        return cls.from_runs((value, sum(1 for _ in group))
+                             for value, group in itertools.groupby(values))
+
+    def __len__(self):
+        return self.run_ends[-1] if self.run_ends else 0
+
+    def __iter__(self):
+        return itertools.chain.from_iterable(
+            itertools.imap(itertools.repeat, self.run_values,
+                           self.get_run_lengths()))
+
+    def __mul__(self, count):
+        return self.from_runs(
+            zip(self.run_values, self.get_run_lengths()) * count)
+
+    def get_run_lengths(self):
+        """Get a list with the number of values in each run."""
+        run_ends = self.run_ends
+        return [end - start for start, end
+                in itertools.izip(itertools.chain([0], run_ends), run_ends)]
+
+    def iter_runs(self):
+        """Yield a (value, length) pair for each run."""
+        return itertools.izip(self.run_values, self.get_run_lengths())
+
+    def with_run_values(self, run_values):
+        """Get values with the same runs, but with new values for each run."""
+        return RunLengthValues(run_values, self.run_ends)
+
+    def get_value(self, index):
+        return self.run_values[bisect.bisect_right(self.run_ends, index)]
+
+    def get_slice(self, start, stop):
+        if start >= stop:
+            return RunLengthValues([], array.array('l'))
+        run_ends = self.run_ends
+        first_run = bisect.bisect_right(run_ends, start)
+        last_run = bisect.bisect_right(run_ends, stop - 1)
+        return self.from_runs(
+            (self.run_values[run],
+             min(run_ends[run], stop) -
+             max(run_ends[run - 1] if run > 0 else 0, start))
+            for run in xrange(first_run, last_run + 1))
+
+    def take(self, indexes):
+        run_indexes = itertools.imap(
+            functools.partial(bisect.bisect_right, self.run_ends), indexes)
+        return self.from_runs(
+            (self.run_values[run_index], sum(1 for _ in group))
+            for run_index, group in itertools.groupby(run_indexes))
+
+    def compress(self, mask):
+        if isinstance(mask, RunLengthValues):
+            return self.from_runs(
+                (value, length)
+                for (value, keep), length in iter_merged_runs([self, mask])
+                if keep)
+        mask_iter = iter(mask)
+        return self.from_runs(
+            (value, sum(itertools.imap(
+                bool, itertools.islice(mask_iter, length))))
+            for value, length in self.iter_runs())
+
+    @classmethod
+    def concat(cls, values_list):
+        """Concatenate RunLengthValues, merging runs across the boundaries."""
+        runs = []
+        for values in values_list:
+            for value, length in values.iter_runs():
+                if runs and runs[-1][0] == value and (
+                        type(runs[-1][0]) is type(value)):
+                    runs[-1][1] += length
+                else:
+                    runs.append([value, length])
+        return cls.from_runs(runs)
+
+
+class ConstantValues(RunLengthValues):
+    """The same value for every row.
+
+    Fields:
+        value: The value.
+    """
+    def __init__(self, value, num_values):
+        super(ConstantValues, self).__init__(
+            [value], array.array('l', [num_values]))
+        self.value = value
+
+    def __iter__(self):
+        return itertools.repeat(self.value, len(self))
+
+    def __mul__(self, count):
+        return ConstantValues(self.value, len(self) * count)
+
+    def with_run_values(self, run_values):
+        return ConstantValues(run_values[0], len(self))
+
+    def get_value(self, index):
+        return self.value
+
+    def get_slice(self, start, stop):
+        return ConstantValues(self.value, max(stop - start, 0))
+
+    def take(self, indexes):
+        return ConstantValues(self.value, len(indexes))
+
+    def compress(self, mask):
+        return ConstantValues(self.value,
+                              sum(itertools.imap(bool, mask)))
+
+
+class NullableValues(EncodedValues):
+    """Values with a validity bitmap saying which of them aren't null.
+
+    Fields:
+        values: A list of the values, with None for each null.
+        validity: A bytearray with 1 for each value that isn't null, and 0 for
+            each null.
+    """
+    def __init__(self, values, validity):
+        self.values = values
+        self.validity = validity
+
+    @classmethod
+    def from_validity(cls, values, validity):
+        """Build NullableValues, or just return values if none are null."""
+        if 0 not in validity:
+            return values
+        return cls(values, validity)
+
+    def __len__(self):
+        return len(self.values)
+
+    def __iter__(self):
+        return iter(self.values)
+
+    def __mul__(self, count):
+        return NullableValues(self.values * count, self.validity * count)
+
+    def get_value(self, index):
+        return self.values[index]
+
+    def get_slice(self, start, stop):
+        return self.from_validity(self.values[start:stop],
+                                  self.validity[start:stop])
+
+    def take(self, indexes):
+        # Rows are usually taken a few at a time (like the rows of a group),
+        # where finding the nulls again if they're needed is cheaper than
+        # gathering the bitmap, so this gives a plain list.
+        return map(self.values.__getitem__, indexes)
+
+    def compress(self, mask):
+        # The mask is iterated over twice.
+        if isinstance(mask, NullableValues):
+            mask = mask.values
+        elif not isinstance(mask, list):
+            mask = list(mask)
+        return self.from_validity(
+            list(itertools.compress(self.values, mask)),
+            bytearray(itertools.compress(self.validity, mask)))
+
+    @classmethod
+    def concat(cls, values_list):
+        return cls(
+            list(itertools.chain.from_iterable(
+                values.values for values in values_list)),
+            bytearray().join(values.validity for values in values_list))
+
+
+def iter_merged_runs(values_list):
+    """Iterate over the runs of several RunLengthValues of the same length.
+
+    Yields: A (values, length) pair for each range of indexes where none of
+        the RunLengthValues changes value, where values is a tuple with the
+        value of each of them.
+    """
+    boundaries = sorted(set(itertools.chain.from_iterable(
+        values.run_ends for values in values_list)))
+    run_indexes = [0] * len(values_list)
+    start = 0
+    for end in boundaries:
+        yield (tuple(values.run_values[run_index] for values, run_index
+                     in itertools.izip(values_list, run_indexes)),
+               end - start)
+        for i, values in enumerate(values_list):
+            if values.run_ends[run_indexes[i]] == end:
+                run_indexes[i] += 1
+        start = end
+
+
+def choose_encoding(values):
+    """Pick an encoding for the values of a column as it is loaded.
+
+    Values with long enough runs are run-length encoded (or stored as a
+    constant, for a single run), and otherwise they are left as they are.
+    The runs of DictionaryValues are found from their codes.
+
+    Returns: The encoded values, or values itself.
+    """
+    num_values = len(values)
+    if num_values == 0:
+        return values
+    run_keys = values.codes if isinstance(values, DictionaryValues) else values
+    num_runs = sum(1 for _ in itertools.groupby(run_keys))
+    if num_runs > 1 and num_runs > num_values * MAX_RUN_FRACTION:
+        return values
+    return RunLengthValues.from_values(values)
+
+
+class DictionaryBuilder(object):
+    """Builds the values of a STRING column one value at a time.
+
+    The dictionary is built as the values are added, so the column never
+    needs to be held as a list of separate string objects.
+    """
+    def __init__(self):
+        self.dictionary = []
+        self.code_by_value = {}
+        self.codes = array.array('l')
+
+    def append(self, value):
+        code = self.code_by_value.get(value)
+        if code is None:
+            code = self.code_by_value[value] = len(self.dictionary)
+            self.dictionary.append(value)
+        self.codes.append(code)
+
+    def build(self):
+        """Get the values, dictionary-encoded if there are few enough.
+
+        Otherwise, the values are returned as a list, which still shares a
+        single string object between equal values.
+        """
+        if len(self.dictionary) > (len(self.codes) *
+                                   MAX_DICTIONARY_FRACTION):
+            return map(self.dictionary.__getitem__, self.codes)
+        return DictionaryValues(
+            self.dictionary,
+            array.array(get_code_typecode(len(self.dictionary)), self.codes))
+
+
+def dictionary_encode(values):
+    """Dictionary-encode a list of values if it has few distinct values."""
+    builder = DictionaryBuilder()
+    for value in values:
+        builder.append(value)
+    return builder.build()
+
+
+def take(values, indexes):
+    """Get the values at the given indexes, in order."""
+    if isinstance(values, EncodedValues):
+        return values.take(indexes)
+    return map(values.__getitem__, indexes)
+
+
+def take_or_null(values, indexes):
+    """Like take, but each negative index gives None."""
+    if isinstance(values, EncodedValues) and min(indexes or [0]) >= 0:
+        return values.take(indexes)
+    return [None if i < 0 else values[i] for i in indexes]
+
+
+def compress(values, mask):
+    """Get the values whose element of mask is true, in order."""
+    if isinstance(values, EncodedValues):
+        return values.compress(mask)
+    return list(itertools.compress(values, mask))
+
+
+def concat_values(values_list):
+    """Concatenate sequences of values into a new sequence.
+
+    The result keeps the encoding if all of the non-empty sequences have the
+    same encoding.
+    """
+    values_list = [values for values in values_list if len(values) > 0]
+    for encoded_class in (DictionaryValues, RunLengthValues, NullableValues):
+        if values_list and all(isinstance(values, encoded_class)
+                               for values in values_list):
+            return encoded_class.concat(values_list)
+    return list(itertools.chain.from_iterable(values_list))
@@ -1,34 +1,210 @@
+import array
 import collections
+import itertools
 
 import context
+import encoding
+import explain
+import memory
+import parallel
+import pipeline
+import predicates
+import runtime
+import spill
+import storage
 import typed_ast
 
 
+# Each worker process used for a GROUP BY gets at least this many rows, since
+# forking workers and sending partial results between them isn't free.
+MIN_ROWS_PER_AGGREGATION_WORKER = 10000
+# The same, but for the total number of rows on both sides of a join.
+MIN_ROWS_PER_JOIN_WORKER = 10000
+# Cross joins are filtered in batches of at most this many rows, so the whole
+# cross product doesn't need to fit in memory at once.
+CROSS_JOIN_BATCH_ROWS = 100000
+
+
 class Evaluator(object):
-    def __init__(self, tables_by_name):
+    def __init__(self, tables_by_name, num_workers=1, query_stats=None,
+                 memory_tracker=None):
+        """Create an evaluator for queries over the given tables.
+
+        Arguments:
+            tables_by_name: A dict mapping full table name to Table.
+            num_workers: If more than 1, the members of table unions, large
+                GROUP BYs and large joins are evaluated in parallel in this
+                many forked worker processes.
+            query_stats: If given, an explain.QueryStats to record the time
+                spent in each operator and the rows it outputs.
+            memory_tracker: If given, a memory.MemoryTracker to count the
+                memory used by the query against its budget.
+        """
         self.tables_by_name = tables_by_name
+        self.num_workers = num_workers
+        if query_stats is None:
+            query_stats = explain.NullQueryStats()
+        self.query_stats = query_stats
+        if memory_tracker is None:
+            memory_tracker = memory.MemoryTracker()
+        self.memory_tracker = memory_tracker
 
     def evaluate_select(self, select_ast):
         """Given a select statement, return a Context with the results."""
         assert isinstance(select_ast, typed_ast.Select)
 
-        table_context = self.evaluate_table_expr(select_ast.table)
-        mask_column = self.evaluate_expr(select_ast.where_expr, table_context)
-        select_context = context.mask_context(table_context, mask_column)
+        column_keys = get_column_keys(select_ast._replace(table=None))
+        # The pipeline runs in one process, so when we have workers to spread
+        # the work across, we use the parallel operators instead.
+        if self.num_workers == 1 and pipeline.can_evaluate_select(select_ast):
+            return pipeline.evaluate_select(self, select_ast, column_keys)
+
+        with self.query_stats.timed('Filter', select_ast) as stats:
+            select_context = self.evaluate_filtered_table_expr(
+                select_ast.table, select_ast.where_expr, column_keys)
+            self.add_output(stats, select_context)
 
         if select_ast.group_set is not None:
-            result = self.evaluate_groups(
-                select_ast.select_fields, select_ast.group_set, select_context)
+            with self.query_stats.timed('Aggregate', select_ast) as stats:
+                result = self.evaluate_groups(
+                    select_ast.select_fields, select_ast.group_set,
+                    select_context)
+                self.add_output(stats, result)
         else:
-            result = self.evaluate_select_fields(
-                select_ast.select_fields, select_context)
+            with self.query_stats.timed('Project', select_ast) as stats:
+                result = self.evaluate_select_fields(
+                    select_ast.select_fields, select_context)
+                self.add_output(stats, result)
         if select_ast.limit is not None:
-            context.truncate_context(result, select_ast.limit)
+            with self.query_stats.timed('Limit', select_ast) as stats:
+                context.truncate_context(result, select_ast.limit)
+                self.add_output(stats, result)
         return result
 
+    def add_output(self, stats, ctx):
+        """Record the output of an operator, and count its memory."""
+        stats.add_output(ctx)
+        self.memory_tracker.track_context(ctx)
+
+    def filter_tracked_context(self, ctx, where_expr):
+        """Filter a context, and count the memory of the result."""
+        result = self.filter_context(ctx, where_expr)
+        self.memory_tracker.track_context(result)
+        return result
+
+    def evaluate_filtered_table_expr(self, table_expr, where_expr,
+                                     column_keys):
+        """Evaluate a table expression and filter it using a WHERE expression.
+
+        Base tables are scanned one chunk at a time, so only the rows that pass
+        the filter, and only the columns in column_keys, are ever copied into a
+        new context. Chunks whose column statistics show that some part of the
+        WHERE expression can't match are skipped entirely. Likewise, cross
+        joins are built and filtered in batches, so the whole cross product is
+        never in memory at once.
+
+        Arguments:
+            table_expr: The table expression to evaluate.
+            where_expr: The expression to filter by.
+            column_keys: A set of the (table, column) keys of the columns that
+                the WHERE expression and the rest of the query use. Other
+                columns may be left out of the result.
+        """
+        if isinstance(table_expr, (typed_ast.Table,
+                                   typed_ast.TablePartitions)):
+            chunk_contexts = [
+                self.filter_tracked_context(
+                    context.project_context(chunk_context, column_keys),
+                    where_expr)
+                for chunk_context in self.query_stats.timed_batches(
+                    'Scan', table_expr,
+                    self.iter_chunk_contexts(table_expr, where_expr))]
+            if not chunk_contexts:
+                return context.project_context(
+                    context.empty_context_from_type_context(
+                        table_expr.type_ctx),
+                    column_keys)
+            return context.concat_contexts(chunk_contexts)
+        if isinstance(table_expr, typed_ast.TableUnion):
+            if (self.num_workers > 1 and len(table_expr.tables) > 1 and
+                    parallel.can_fork()):
+                # The members are filtered in the workers, so the rows output
+                # by the union are only the ones that pass the filter.
+                with self.query_stats.timed('Union', table_expr) as stats:
+                    result = context.concat_contexts(parallel.fork_map(
+                        Evaluator.evaluate_filtered_union_member,
+                        (self, table_expr, where_expr, column_keys),
+                        range(len(table_expr.tables)), self.num_workers))
+                    self.add_output(stats, result)
+                return result
+            # Filter each member of the union as soon as it's evaluated, so we
+            # never hold more than one unfiltered member in memory.
+            return context.concat_contexts([
+                self.filter_tracked_context(member_context, where_expr)
+                for member_context in self.query_stats.timed_batches(
+                    'Union', table_expr,
+                    self.iter_union_member_contexts(table_expr))])
+        if (isinstance(table_expr, typed_ast.Join) and
+                not table_expr.conditions):
+            context1 = self.evaluate_table_expr(table_expr.table1)
+            context2 = self.evaluate_table_expr(table_expr.table2)
+            batch_contexts = [
+                context.project_context(
+                    self.filter_tracked_context(batch_context, where_expr),
+                    column_keys)
+                for batch_context in self.query_stats.timed_batches(
+                    'CrossJoin', table_expr,
+                    self.memory_tracker.track_batches(
+                        context.iter_cross_join_contexts(
+                            context1, context2, CROSS_JOIN_BATCH_ROWS)))]
+            if not batch_contexts:
+                # The cross product is empty, so this is cheap.
+                return context.cross_join_contexts(context1, context2)
+            return context.concat_contexts(batch_contexts)
+        table_context = self.evaluate_table_expr(table_expr)
+        return self.filter_context(table_context, where_expr)
+
+    def get_table_expr_chunks(self, table_expr):
+        """Get the chunks to read for a Table or TablePartitions."""
+        table = self.tables_by_name[table_expr.name]
+        if isinstance(table_expr, typed_ast.TablePartitions):
+            return table.get_partition_chunks(table_expr.partition_keys)
+        return table.chunks
+
+    def iter_chunk_contexts(self, table_expr, where_expr=None):
+        """Lazily read the chunks of a Table or TablePartitions.
+
+        Arguments:
+            table_expr: A typed_ast.Table or typed_ast.TablePartitions.
+            where_expr: If given, chunks whose column statistics show that
+                some part of this expression can't match are skipped. The
+                rows of the other chunks are not filtered.
+
+        Yields: A context for each chunk that isn't skipped.
+        """
+        table = self.tables_by_name[table_expr.name]
+        if where_expr is None:
+            chunk_predicates = []
+        else:
+            chunk_predicates = predicates.get_table_column_predicates(
+                table_expr.type_ctx, table.column_types.keys(), where_expr)
+        for chunk in self.get_table_expr_chunks(table_expr):
+            if all(chunk.may_match(column_name, predicate)
+                   for column_name, predicate in chunk_predicates):
+                yield context.context_from_chunk(chunk, table_expr.type_ctx)
+
+    def filter_context(self, ctx, where_expr):
+        """Return a context with only the rows matching where_expr."""
+        mask_column = self.evaluate_expr(where_expr, ctx)
+        return context.mask_context(ctx, mask_column)
+
     def evaluate_groups(self, select_fields, group_set, select_context):
         """Evaluate a list of select fields, grouping by some of the values.
 
+        For GROUP EACH BY, or if the groups wouldn't fit in the memory budget
+        of the query, the rows are split into partitions on disk and grouped
+        one partition at a time; see spill.group_context.
+
         Arguments:
             select_fields: A list of SelectField instances to evaluate.
             group_set: The groups (either fields in select_context or aliases
@@ -39,6 +215,38 @@ class Evaluator(object):
         Returns:
             A context with the results.
         """
+        if group_set.is_each:
+            return spill.group_context(self, select_fields, group_set,
+                                       select_context)
+
+        num_workers = min(
+            self.num_workers,
+            select_context.num_rows // MIN_ROWS_PER_AGGREGATION_WORKER)
+        if (num_workers > 1 and parallel.can_fork() and
+                can_merge_aggregates(select_fields)):
+            return self.evaluate_groups_in_parallel(
+                select_fields, group_set, select_context, num_workers)
+
+        # Every row is copied into the context for its group, so if those
+        # wouldn't fit in memory, we only build one partition of the groups
+        # at a time. Grouping by nothing always gives one group, so that
+        # wouldn't help.
+        if (group_set != typed_ast.TRIVIAL_GROUP_SET and
+                not self.memory_tracker.has_room(
+                    select_context.num_rows *
+                    memory.estimate_row_bytes(select_context))):
+            return spill.group_context(self, select_fields, group_set,
+                                       select_context)
+        return self.evaluate_groups_in_memory(select_fields, group_set,
+                                              select_context)
+
+    def evaluate_groups_in_memory(self, select_fields, group_set,
+                                  select_context):
+        """Evaluate a GROUP BY by copying each row into its group's context.
+
+        This works for any aggregate functions, and takes the same arguments
+        as evaluate_groups.
+        """
         field_groups = group_set.field_groups
         alias_groups = group_set.alias_groups
         alias_group_list = sorted(alias_groups)
@@ -50,6 +258,10 @@ class Evaluator(object):
 
         alias_group_result_context = self.evaluate_select_fields(
             group_key_select_fields, select_context)
+        # Every row is copied into the context for its group.
+        self.memory_tracker.check_allocation(
+            select_context.num_rows *
+            memory.estimate_row_bytes(select_context))
 
         # Dictionary mapping (singleton) group key context to the context of
         # values for that key.
@@ -73,17 +285,26 @@ class Evaluator(object):
 
         # TODO: Seems pretty ugly and wasteful to use a whole context as a
         # group key.
-        for i in xrange(select_context.num_rows):
+        key_columns = (
+            [select_context.column_from_ref(field_group)
+             for field_group in field_groups] +
+            [alias_group_result_context.columns[(None, alias_group)]
+             for alias_group in alias_group_list])
+        group_rows = group_row_indexes(
+            [column.values for column in key_columns],
+            select_context.num_rows)
+        for rows in group_rows.itervalues():
             key = self.get_group_key(
                 field_groups, alias_group_list, select_context,
-                alias_group_result_context, i)
-            if key not in group_contexts:
-                new_group_context = context.empty_context_from_template(
-                    select_context)
-                group_contexts[key] = new_group_context
-            group_context = group_contexts[key]
-            context.append_row_to_context(src_context=select_context, index=i,
-                                          dest_context=group_context)
+                alias_group_result_context, rows[0])
+            group_contexts[key] = context.Context(
+                len(rows),
+                collections.OrderedDict(
+                    (column_key, context.Column(
+                        column.type, encoding.take(column.values, rows)))
+                    for column_key, column
+                    in select_context.columns.iteritems()),
+                None)
 
         result_context = self.empty_context_from_select_fields(select_fields)
         result_col_names = [field.alias for field in select_fields]
@@ -98,6 +319,144 @@ class Evaluator(object):
                                           result_context)
         return result_context
 
+    def evaluate_groups_in_parallel(self, select_fields, group_set,
+                                    select_context, num_workers):
+        """Evaluate a GROUP BY in forked worker processes.
+
+        This gives the same result as evaluate_groups, except for the order of
+        the groups, but every aggregate function must be a
+        MergeableAggregateFunction. Each worker first pre-aggregates a range
+        of the rows into partial states for each group it sees, and splits
+        those groups into num_workers partitions by the hash of their key.
+        Then each worker merges the partial states for one partition and
+        evaluates the select fields for its groups.
+        """
+        aggregation = GroupAggregation.create(select_fields, group_set,
+                                              num_workers)
+        num_rows = select_context.num_rows
+        row_ranges = [(num_rows * i // num_workers,
+                       num_rows * (i + 1) // num_workers)
+                      for i in xrange(num_workers)]
+        partitioned_states = parallel.fork_map(
+            Evaluator.pre_aggregate_rows,
+            (self, aggregation, select_context), row_ranges, num_workers)
+        return context.concat_contexts(parallel.fork_map(
+            Evaluator.combine_partition, (self, aggregation,
+                                          partitioned_states),
+            range(num_workers), num_workers))
+
+    @staticmethod
+    def pre_aggregate_rows(pre_aggregation_state, row_range):
+        """Compute the partial aggregate states for a range of rows.
+
+        Arguments:
+            pre_aggregation_state: A tuple of (evaluator, aggregation,
+                select_context), where aggregation is a GroupAggregation and
+                select_context has the rows being grouped.
+            row_range: A (start, end) tuple of the rows to aggregate.
+
+        Returns: A list with a dict for each partition, in the form returned
+            by aggregate_rows.
+        """
+        evaluator, aggregation, select_context = pre_aggregation_state
+        start, end = row_range
+        group_states = evaluator.aggregate_rows(
+            aggregation, context.slice_context(select_context, start, end))
+        partitions = [{} for _ in xrange(aggregation.num_partitions)]
+        for key, states in group_states.iteritems():
+            partitions[hash(key) % aggregation.num_partitions][key] = states
+        return partitions
+
+    @staticmethod
+    def combine_partition(combine_state, partition_index):
+        """Merge the partial states for one partition and finalize them.
+
+        Arguments:
+            combine_state: A tuple of (evaluator, aggregation,
+                partitioned_states), where partitioned_states is the list of
+                results of pre_aggregate_rows, in row order.
+            partition_index: The index of the partition to combine.
+
+        Returns: A context with a row for each group in the partition.
+        """
+        evaluator, aggregation, partitioned_states = combine_state
+        merged_states = collections.OrderedDict()
+        for partitions in partitioned_states:
+            merge_group_states(aggregation, merged_states,
+                               partitions[partition_index])
+        return evaluator.context_from_group_states(aggregation, merged_states)
+
+    def aggregate_rows(self, aggregation, rows_context):
+        """Compute the partial aggregate states for each group in a context.
+
+        Arguments:
+            aggregation: A GroupAggregation.
+            rows_context: A context with the rows to group.
+
+        Returns: A dict mapping each group key tuple to a list with the
+            partial state for each of the aggregation's aggregate calls.
+        """
+        alias_group_context = self.evaluate_select_fields(
+            aggregation.group_key_select_fields, rows_context)
+        key_value_lists = (
+            [rows_context.columns[column_key].values
+             for column_key in aggregation.field_group_keys] +
+            [alias_group_context.columns[column_key].values
+             for column_key in aggregation.alias_group_keys])
+        group_rows = group_row_indexes(key_value_lists,
+                                       rows_context.num_rows)
+        # Grouping by nothing always gives one group, even with no rows; see
+        # evaluate_groups.
+        if aggregation.is_trivial and not group_rows:
+            group_rows[()] = []
+
+        arg_value_lists = [
+            self.evaluate_expr(call.args[0], rows_context)
+            for call in aggregation.aggregate_calls]
+        group_states = {}
+        for key, rows in group_rows.iteritems():
+            if len(rows) == rows_context.num_rows:
+                # The group has every row, so the values (which may be
+                # encoded) can be aggregated as they are.
+                group_arg_value_lists = arg_value_lists
+            else:
+                group_arg_value_lists = [encoding.take(arg_values, rows)
+                                         for arg_values in arg_value_lists]
+            group_states[key] = [
+                call.func.partial_state(arg_values)
+                for call, arg_values in zip(aggregation.aggregate_calls,
+                                            group_arg_value_lists)]
+        return group_states
+
+    def context_from_group_states(self, aggregation, merged_states):
+        """Finalize merged aggregate states and evaluate the select fields.
+
+        Arguments:
+            aggregation: A GroupAggregation.
+            merged_states: A dict mapping group key tuples to the merged
+                partial states of the aggregate calls for the group.
+
+        Returns: A context with a row for each group.
+        """
+        num_groups = len(merged_states)
+        keys = merged_states.keys()
+        key_columns = collections.OrderedDict(
+            (column_key, context.Column(column_type,
+                                        [key[i] for key in keys]))
+            for i, (column_key, column_type) in enumerate(
+                aggregation.key_column_types))
+        group_columns = key_columns.copy()
+        for i, call in enumerate(aggregation.aggregate_calls):
+            group_columns[aggregate_column_key(i)] = context.Column(
+                call.type, [call.func.finalize_state(merged_states[key][i])
+                            for key in keys])
+        aggregate_result_context = self.evaluate_select_fields(
+            aggregation.result_select_fields,
+            context.Context(num_groups, group_columns, None))
+        return self.merge_contexts_for_select_fields(
+            aggregation.result_col_names, aggregate_result_context,
+            context.Context(num_groups, key_columns, None))
+
     def merge_contexts_for_select_fields(self, col_names, context1, context2):
         """Build a context that combines columns of two contexts.
 
@@ -187,7 +546,18 @@ class Evaluator(object):
             raise NotImplementedError(
                 'Missing handler for table type {}'.format(
                     table_expr.__class__.__name__))
-        return method(table_expr)
+        operator = explain.get_table_operator(table_expr)
+        if operator is None:
+            return method(table_expr)
+        with self.query_stats.timed(operator, table_expr) as stats:
+            result = method(table_expr)
+            if operator == 'Scan':
+                # Scans usually share their columns with the table, so they
+                # don't count towards the memory of the query.
+                stats.add_output(result)
+            else:
+                self.add_output(stats, result)
+        return result
 
     def eval_table_NoTable(self, table_expr):
         # If the user isn't selecting from any tables, just specify that there
@@ -203,6 +573,27 @@ class Evaluator(object):
         table = self.tables_by_name[table_expr.name]
         return context.context_from_table(table, table_expr.type_ctx)
 
+    def eval_table_TablePartitions(self, table_expr):
+        """Get the values from only the requested partitions of a table."""
+        table = self.tables_by_name[table_expr.name]
+        chunks = self.get_table_expr_chunks(table_expr)
+        return context.context_from_columns(
+            sum(chunk.num_rows for chunk in chunks),
+            storage.columns_from_chunks(table.column_types, chunks),
+            table_expr.type_ctx)
+
+    def eval_table_IndexLookup(self, table_expr):
+        """Get the rows of a table that an index says might be needed."""
+        table = self.tables_by_name[table_expr.name]
+        index = table.indexes.get(table_expr.column)
+        if index is None:
+            # The index was dropped after the query was compiled, so fall back
+            # to the full table. The WHERE clause still filters the rows.
+            return context.context_from_table(table, table_expr.type_ctx)
+        row_nums = index.lookup(table_expr.operator, table_expr.values)
+        return context.context_from_columns(
+            len(row_nums), table.take_rows(row_nums), table_expr.type_ctx)
+
     def eval_table_TableUnion(self, table_expr):
         result_context = context.empty_context_from_type_context(
             table_expr.type_ctx)
@@ -212,6 +603,46 @@ class Evaluator(object):
                                                       result_context)
         return result_context
 
+    def iter_union_member_contexts(self, table_expr):
+        """Lazily evaluate each member table of a union.
+
+        Yields: A context for each member table, in order. Each context has
+            all of the columns of the union, with nulls for columns that the
+            member table doesn't have.
+        """
+        for table in table_expr.tables:
+            yield self.get_union_member_context(table_expr, table)
+
+    def get_union_member_context(self, table_expr, member_table_expr):
+        member_context = context.empty_context_from_type_context(
+            table_expr.type_ctx)
+        context.append_partial_context_to_context(
+            self.evaluate_table_expr(member_table_expr), member_context)
+        return member_context
+
+    @staticmethod
+    def evaluate_filtered_union_member(union_state, member_index):
+        """Evaluate and filter one member of a union in a worker process.
+
+        Only the columns that the query needs are sent back to the parent
+        process.
+
+        Arguments:
+            union_state: A tuple of (evaluator, table_expr, where_expr,
+                column_keys), with the same meanings as for
+                evaluate_filtered_table_expr.
+            member_index: The index of the member of the union to evaluate.
+        """
+        evaluator, table_expr, where_expr, column_keys = union_state
+        # Worker processes can't start their own workers, so any nested unions
+        # are evaluated serially. The evaluator is the worker's own copy.
+        evaluator.num_workers = 1
+        member_context = evaluator.get_union_member_context(
+            table_expr, table_expr.tables[member_index])
+        return context.project_context(
+            evaluator.filter_context(member_context, where_expr),
+            column_keys)
+
     def eval_table_Join(self, table_expr):
         result_context_1 = self.evaluate_table_expr(table_expr.table1)
         result_context_2 = self.evaluate_table_expr(table_expr.table2)
@@ -219,60 +650,90 @@ class Evaluator(object):
         table_1_key_refs = [cond.column1 for cond in table_expr.conditions]
         table_2_key_refs = [cond.column2 for cond in table_expr.conditions]
 
-        # Build a map from table 2 key to value.
-        table_2_key_contexts = {}
-        for i in xrange(result_context_2.num_rows):
-            key = self.get_join_key(result_context_2, table_2_key_refs, i)
-            if key not in table_2_key_contexts:
-                new_group_context = context.empty_context_from_template(
-                    result_context_2)
-                table_2_key_contexts[key] = new_group_context
-            context.append_row_to_context(
-                src_context=result_context_2, index=i,
-                dest_context=table_2_key_contexts[key])
-
-        result_context = context.cross_join_contexts(
-            context.empty_context_from_template(result_context_1),
-            context.empty_context_from_template(result_context_2),
-        )
-        for i in xrange(result_context_1.num_rows):
-            key = self.get_join_key(result_context_1, table_1_key_refs, i)
-            if key not in table_2_key_contexts:
-                # Left outer join means that if we didn't find something, we
-                # still put in a row with nulls on the right.
-                if table_expr.is_left_outer:
-                    row_context = context.row_context_from_context(
-                        result_context_1, i)
-                    context.append_context_to_context(row_context,
-                                                      result_context)
-                continue
-            row_context = context.row_context_from_context(result_context_1, i)
-            new_rows = context.cross_join_contexts(row_context,
-                                                   table_2_key_contexts[key])
-            context.append_context_to_context(new_rows, result_context)
-
-        return result_context
+        row_bytes = (memory.estimate_row_bytes(result_context_1) +
+                     memory.estimate_row_bytes(result_context_2))
+        if not table_expr.conditions:
+            self.memory_tracker.check_allocation(
+                result_context_1.num_rows * result_context_2.num_rows *
+                row_bytes)
+            return context.cross_join_contexts(result_context_1,
+                                               result_context_2)
 
-    def get_join_key(self, table_context, key_column_refs, index):
-        """Get the join key for a row in a table that is part of a join.
+        num_workers = min(
+            self.num_workers,
+            (result_context_1.num_rows + result_context_2.num_rows) //
+            MIN_ROWS_PER_JOIN_WORKER)
+        # The keys of both sides and a hash table of one of them.
+        key_bytes = memory.estimate_group_bytes(
+            result_context_1.num_rows + result_context_2.num_rows,
+            len(table_expr.conditions))
+        # Spilling bounds the memory of the hash table only. Both contexts
+        # are already in memory, and so is the joined result built below.
+        if (table_expr.is_each or
+                not self.memory_tracker.has_room(key_bytes)):
+            indexes1, indexes2 = spill.join_contexts(
+                result_context_1, table_1_key_refs, result_context_2,
+                table_2_key_refs, table_expr.is_left_outer)
+        elif num_workers > 1 and parallel.can_fork():
+            indexes1, indexes2 = self.join_in_parallel(
+                result_context_1, table_1_key_refs, result_context_2,
+                table_2_key_refs, table_expr.is_left_outer, num_workers)
+        else:
+            values1 = get_dictionary_join_key(result_context_1,
+                                              table_1_key_refs)
+            if values1 is not None:
+                indexes1, indexes2 = probe_dictionary_join(
+                    get_join_hash_table(result_context_2, table_2_key_refs),
+                    values1, table_expr.is_left_outer)
+            else:
+                indexes1, indexes2 = flatten_join_matches(join_rows(
+                    enumerate(get_join_keys(result_context_1,
+                                            table_1_key_refs)),
+                    enumerate(get_join_keys(result_context_2,
+                                            table_2_key_refs)),
+                    table_expr.is_left_outer))
+        self.memory_tracker.check_allocation(len(indexes1) * row_bytes)
+        return context_from_join_indexes(result_context_1, result_context_2,
+                                         indexes1, indexes2)
 
-        Note that, while this code is similar to the code that computes group
-        keys, groups are different because they need to be specifically
-        selected from later (so we build a context for them), whereas join keys
-        can have different column names.
+    def join_in_parallel(self, context1, key_refs1, context2, key_refs2,
+                         is_left_outer, num_workers):
+        """Find the rows matched by a join in forked worker processes.
 
-        Arguments:
-            table_context: A Context containing the data in one of the tables
-                being joined.
-            key_column_refs: A list of ColumnRef specifying the columns to use
-                in the key and their order.
-            index: The index of the row to compute the key for.
+        Each worker first computes the keys for a range of the rows of one
+        side of the join, and splits those rows into num_workers partitions by
+        the hash of their key, so rows with equal keys always end up in the
+        same partition. Then each worker joins one partition of each side.
+        Only arrays of row indexes are sent between processes.
 
-        Returns: A tuple of values for the key for this row.
+        Returns: The matches, in the same form and order as
+            flatten_join_matches.
         """
-        return tuple(
-            table_context.column_from_ref(col_ref).values[index]
-            for col_ref in key_column_refs)
+        row_ranges = []
+        for side, ctx in enumerate((context1, context2)):
+            row_ranges.extend(
+                (side, ctx.num_rows * i // num_workers,
+                 ctx.num_rows * (i + 1) // num_workers)
+                for i in xrange(num_workers))
+        range_partitions = parallel.fork_map(
+            partition_join_rows,
+            ((context1, key_refs1), (context2, key_refs2), num_workers),
+            row_ranges, num_workers)
+
+        # Gather each partition of each side, keeping the rows in order.
+        partitions1 = [array.array('l') for _ in xrange(num_workers)]
+        partitions2 = [array.array('l') for _ in xrange(num_workers)]
+        for (side, _, _), partitions in zip(row_ranges, range_partitions):
+            side_partitions = partitions2 if side else partitions1
+            for side_partition, partition in zip(side_partitions, partitions):
+                side_partition.extend(partition)
+
+        partition_matches = parallel.fork_map(
+            join_partition,
+            ((context1, key_refs1, partitions1),
+             (context2, key_refs2, partitions2), is_left_outer),
+            range(num_workers), num_workers)
+        return decode_join_matches(partition_matches, context2.num_rows)
 
     def eval_table_Select(self, table_expr):
         """Evaluate a select table expression.
@@ -295,10 +756,53 @@ class Evaluator(object):
         return method(expr, context)
 
     def evaluate_FunctionCall(self, func_call, context):
-        arg_results = [self.evaluate_expr(arg, context)
-                       for arg in func_call.args]
+        if (isinstance(func_call.func, runtime.LazyFunction) and
+                context.aggregate_context is None and
+                not all(is_cheap_expr(arg) for arg in func_call.args[1:])):
+            return self.evaluate_lazy_function_call(func_call, context)
+        column_args = [arg for arg in func_call.args
+                       if not isinstance(arg, typed_ast.Literal)]
+        if len(column_args) == 1:
+            # A function of a single encoded column only needs to be evaluated
+            # once for each distinct value, or once for each run.
+            values = self.evaluate_expr(column_args[0], context)
+            if (isinstance(values, encoding.DictionaryValues) and
+                    len(values.dictionary) < context.num_rows):
+                return evaluate_on_dictionary(func_call, values)
+            if (isinstance(values, encoding.RunLengthValues) and
+                    len(values.run_values) < context.num_rows):
+                return evaluate_on_runs(func_call, values)
+            arg_results = [
+                values if arg is column_args[0]
+                else self.evaluate_expr(arg, context)
+                for arg in func_call.args]
+        else:
+            arg_results = [self.evaluate_expr(arg, context)
+                           for arg in func_call.args]
         return func_call.func.evaluate(context.num_rows, *arg_results)
 
+    def evaluate_lazy_function_call(self, func_call, ctx):
+        """Evaluate a call to a LazyFunction.
+
+        An argument evaluated for only some rows is evaluated on a context
+        with just those rows, and just the columns that it uses.
+        """
+        def evaluate_arg(arg_index, mask=None):
+            arg = func_call.args[arg_index]
+            if mask is None:
+                return self.evaluate_expr(arg, ctx)
+            num_selected = mask.count(True)
+            if num_selected == ctx.num_rows:
+                return self.evaluate_expr(arg, ctx)
+            if num_selected == 0:
+                return []
+            if is_cheap_expr(arg):
+                return encoding.compress(self.evaluate_expr(arg, ctx), mask)
+            arg_ctx = context.mask_context(
+                context.project_context(ctx, get_column_keys(arg)), mask)
+            return self.evaluate_expr(arg, arg_ctx)
+        return func_call.func.evaluate_lazily(ctx.num_rows, evaluate_arg)
+
     def evaluate_AggregateFunctionCall(self, func_call, context):
         # Switch to the aggregate context when evaluating the arguments to the
         # aggregate.
@@ -309,8 +813,514 @@ class Evaluator(object):
         return func_call.func.evaluate(context.num_rows, *arg_results)
 
     def evaluate_Literal(self, literal, context):
-        return [literal.value for _ in xrange(context.num_rows)]
+        return [literal.value] * context.num_rows
 
     def evaluate_ColumnRef(self, column_ref, ctx):
         column = ctx.columns[(column_ref.table, column_ref.column)]
         return column.values
+
+
+def is_cheap_expr(expr):
+    """Whether an expression costs nothing to evaluate for every row."""
+    return isinstance(expr, (typed_ast.Literal, typed_ast.ColumnRef))
+
+
+def get_join_keys(table_context, key_column_refs, row_indexes=None):
+    """Get the join keys for the rows of one side of a join.
+
+    Arguments:
+        table_context: A context with the rows of the table.
+        key_column_refs: A list of ColumnRefs for the columns of the key, in
+            order.
+        row_indexes: The indexes of the rows to get the keys for, or None to
+            get the keys for every row.
+
+    Returns: A list of tuples of the key values for each row. If there are no
+        key columns, every row has the empty tuple as its key.
+    """
+    key_value_lists = [
+        table_context.column_from_ref(col_ref).values
+        for col_ref in key_column_refs]
+    if row_indexes is not None:
+        key_value_lists = [[values[i] for i in row_indexes]
+                           for values in key_value_lists]
+        num_rows = len(row_indexes)
+    else:
+        num_rows = table_context.num_rows
+    if not key_value_lists:
+        return [()] * num_rows
+    return zip(*key_value_lists)
+
+
+def join_rows(rows1, rows2, is_left_outer):
+    """Find the pairs of rows with equal keys from the two sides of a join.
+
+    The hash table is built from whichever side has fewer rows, and the other
+    side is probed against it. Either way, the matches come out in the same
+    order.
+
+    Arguments:
+        rows1: An iterable of (index, key) tuples for the rows of the first
+            table, in order of index.
+        rows2: An iterable of (index, key) tuples for the rows of the second
+            table, in order of index.
+        is_left_outer: If True, rows of the first table without any matches
+            are still included, with no matching rows.
+
+    Returns: A list of (index1, indexes2) tuples, in order of index1, where
+        indexes2 is the list of the indexes of the rows of the second table
+        that match the row of the first table with index index1, in order.
+    """
+    rows1, rows2 = list(rows1), list(rows2)
+    if len(rows1) < len(rows2):
+        indexes1_by_key = {}
+        for index1, key in rows1:
+            indexes1_by_key.setdefault(key, []).append(index1)
+        indexes2_by_index1 = {index1: [] for index1, _ in rows1}
+        for index2, key in rows2:
+            for index1 in indexes1_by_key.get(key, ()):
+                indexes2_by_index1[index1].append(index2)
+        return [(index1, indexes2_by_index1[index1]) for index1, _ in rows1
+                if is_left_outer or indexes2_by_index1[index1]]
+
+    indexes2_by_key = {}
+    for index2, key in rows2:
+        indexes2_by_key.setdefault(key, []).append(index2)
+    result = []
+    for index1, key in rows1:
+        indexes2 = indexes2_by_key.get(key)
+        if indexes2 is not None:
+            result.append((index1, indexes2))
+        elif is_left_outer:
+            result.append((index1, []))
+    return result
+
+
+def flatten_join_matches(matches):
+    """Turn the result of join_rows into a pair of arrays of row indexes.
+
+    Returns: A tuple of (indexes1, indexes2), with an element for each row of
+        the result of the join. Rows of the first table without any matches
+        have -1 as the index of the row of the second table.
+    """
+    indexes1 = array.array('l')
+    indexes2 = array.array('l')
+    for index1, match_indexes2 in matches:
+        if match_indexes2:
+            indexes1.extend([index1] * len(match_indexes2))
+            indexes2.extend(match_indexes2)
+        else:
+            indexes1.append(index1)
+            indexes2.append(-1)
+    return indexes1, indexes2
+
+
+def get_dictionary_join_key(table_context, key_column_refs):
+    """Get the values of the key of one side of a join, if they are encoded.
+
+    Returns: The DictionaryValues of the key column, or None if the key isn't
+        a single dictionary-encoded column.
+    """
+    if len(key_column_refs) != 1:
+        return None
+    values = table_context.column_from_ref(key_column_refs[0]).values
+    if isinstance(values, encoding.DictionaryValues):
+        return values
+    return None
+
+
+def get_join_hash_table(table_context, key_column_refs):
+    """Map each key of one side of a join to the indexes of its rows.
+
+    Returns: A dict mapping each key tuple to a list of the indexes of the
+        rows with that key, in order.
+    """
+    return group_row_indexes(
+        [table_context.column_from_ref(col_ref).values
+         for col_ref in key_column_refs],
+        table_context.num_rows)
+
+
+def probe_dictionary_join(indexes2_by_key, values1, is_left_outer):
+    """Find the rows that match each row of the first table of a join.
+
+    The key of the first table is a dictionary-encoded column, so only each
+    distinct value of its dictionary is looked up in the hash table, rather
+    than the key of every row.
+
+    Arguments:
+        indexes2_by_key: The hash table of the second table, as returned by
+            get_join_hash_table.
+        values1: The DictionaryValues of the key column of the first table.
+        is_left_outer: True for a left outer join.
+
+    Returns: The matches, in the same form and order as
+        flatten_join_matches.
+    """
+    no_matches = []
+    matches_by_code = [indexes2_by_key.get((value,), no_matches)
+                       for value in values1.dictionary]
+    indexes1 = array.array('l')
+    indexes2 = array.array('l')
+    for index1, code in enumerate(values1.codes):
+        match_indexes2 = matches_by_code[code]
+        if match_indexes2:
+            indexes1.extend([index1] * len(match_indexes2))
+            indexes2.extend(match_indexes2)
+        elif is_left_outer:
+            indexes1.append(index1)
+            indexes2.append(-1)
+    return indexes1, indexes2
+
+
+def partition_join_rows(partition_state, row_range):
+    """Split a range of the rows of one side of a join into partitions.
+
+    Arguments:
+        partition_state: A tuple of (side1, side2, num_partitions), where each
+            side is a tuple of (context, key_column_refs).
+        row_range: A tuple of (side, start, end), where side is 0 for the
+            first table and 1 for the second.
+
+    Returns: A list with an array for each partition of the indexes of its
+        rows, in order.
+    """
+    side1, side2, num_partitions = partition_state
+    side, start, end = row_range
+    table_context, key_column_refs = side2 if side else side1
+    partitions = [array.array('l') for _ in xrange(num_partitions)]
+    partition_appends = [partition.append for partition in partitions]
+    row_indexes = xrange(start, end)
+    for index, key in itertools.izip(
+            row_indexes,
+            get_join_keys(table_context, key_column_refs, row_indexes)):
+        partition_appends[hash(key) % num_partitions](index)
+    return partitions
+
+
+def join_partition(join_state, partition_index):
+    """Join one partition of each side of a join.
+
+    Arguments:
+        join_state: A tuple of (side1, side2, is_left_outer), where each side
+            is a tuple of (context, key_column_refs, partitions), and each
+            partition is an array of row indexes.
+        partition_index: The index of the partition to join.
+
+    Returns: The matches, encoded by encode_join_matches.
+    """
+    side1, side2, is_left_outer = join_state
+    rows1, rows2 = [
+        itertools.izip(partitions[partition_index],
+                       get_join_keys(table_context, key_column_refs,
+                                     partitions[partition_index]))
+        for table_context, key_column_refs, partitions in (side1, side2)]
+    indexes1, indexes2 = flatten_join_matches(
+        join_rows(rows1, rows2, is_left_outer))
+    return encode_join_matches(indexes1, indexes2, side2[0].num_rows)
+
+
+def encode_join_matches(indexes1, indexes2, num_rows2):
+    """Encode the matches of one partition of a join as ints.
+
+    Arguments:
+        indexes1, indexes2: The matches, as returned by flatten_join_matches.
+        num_rows2: The number of rows of the second table.
+
+    Returns: An array with an int for each match, in order. Each one encodes
+        an (index1, index2) pair as index1 * (num_rows2 + 1) + index2 + 1.
+    """
+    multiplier = num_rows2 + 1
+    return array.array('l', [index1 * multiplier + index2 + 1
+                             for index1, index2 in itertools.izip(indexes1,
+                                                                  indexes2)])
+
+
+def decode_join_matches(partition_matches, num_rows2):
+    """Combine the encoded matches of every partition of a join.
+
+    Every row of the first table is in one partition, and the matches for
+    each row are in order of the second table, so sorting the encoded matches
+    puts them in the same order as a join without partitions. Each
+    partition's matches are already sorted, so this is just a merge.
+
+    Arguments:
+        partition_matches: A list of the results of encode_join_matches for
+            each partition.
+        num_rows2: The number of rows of the second table.
+
+    Returns: The matches, in the same form and order as flatten_join_matches.
+    """
+    sorted_matches = sorted(itertools.chain.from_iterable(partition_matches))
+    multiplier = num_rows2 + 1
+    return (array.array('l', [match // multiplier
+                              for match in sorted_matches]),
+            array.array('l', [match % multiplier - 1
+                              for match in sorted_matches]))
+
+
+def context_from_join_indexes(context1, context2, indexes1, indexes2):
+    """Build the result of a join from the matching rows of each side.
+
+    Arguments:
+        context1: A context with the rows of the first table.
+        context2: A context with the rows of the second table.
+        indexes1: The index of the row of the first table for each row of the
+            result.
+        indexes2: The index of the row of the second table for each row of
+            the result, or -1 for nulls.
+    """
+    result_columns = collections.OrderedDict(
+        (column_key, context.Column(column.type,
+                                    encoding.take(column.values, indexes1)))
+        for column_key, column in context1.columns.iteritems())
+    for column_key, column in context2.columns.iteritems():
+        result_columns[column_key] = context.Column(
+            column.type, encoding.take_or_null(column.values, indexes2))
+    return context.Context(len(indexes1), result_columns, None)
+
+
+class GroupAggregation(collections.namedtuple(
+        'GroupAggregation', ['field_group_keys', 'alias_group_keys',
+                             'key_column_types', 'is_trivial',
+                             'group_key_select_fields', 'aggregate_calls',
+                             'result_select_fields', 'result_col_names',
+                             'num_partitions'])):
+    """The plan for evaluating a GROUP BY in parallel.
+
+    Fields:
+        field_group_keys: A list of (table, column) keys of the columns of the
+            select context that are part of the group key.
+        alias_group_keys: A list of (None, alias) keys of the select fields
+            that are part of the group key, after the field groups.
+        key_column_types: A list of (column_key, type) tuples for every
+            column of the group key, in order.
+        is_trivial: True if the query groups by nothing, so there is always
+            exactly one group.
+        group_key_select_fields: The select fields that are part of the group
+            key.
+        aggregate_calls: A list of the AggregateFunctionCalls in the other
+            select fields, each of which must have a single argument.
+        result_select_fields: The other select fields, with each aggregate
+            call replaced by a reference to a column with its final value;
+            see aggregate_column_key.
+        result_col_names: The aliases of all of the select fields, in order.
+        num_partitions: The number of partitions to split the groups into.
+    """
+    @classmethod
+    def create(cls, select_fields, group_set, num_partitions):
+        alias_groups = group_set.alias_groups
+        field_groups = group_set.field_groups
+        field_group_keys = [(field_group.table, field_group.column)
+                            for field_group in field_groups]
+        alias_group_keys = [(None, alias) for alias in sorted(alias_groups)]
+        select_field_types = {(None, field.alias): field.expr.type
+                              for field in select_fields}
+        aggregate_calls = []
+        result_select_fields = [
+            field._replace(expr=replace_aggregate_calls(field.expr,
+                                                        aggregate_calls))
+            for field in select_fields if field.alias not in alias_groups]
+        return cls(
+            field_group_keys=field_group_keys,
+            alias_group_keys=alias_group_keys,
+            key_column_types=(
+                [(column_key, field_group.type)
+                 for column_key, field_group in zip(field_group_keys,
+                                                    field_groups)] +
+                [(column_key, select_field_types[column_key])
+                 for column_key in alias_group_keys]),
+            is_trivial=group_set == typed_ast.TRIVIAL_GROUP_SET,
+            group_key_select_fields=[
+                field for field in select_fields
+                if field.alias in alias_groups],
+            aggregate_calls=aggregate_calls,
+            result_select_fields=result_select_fields,
+            result_col_names=[field.alias for field in select_fields],
+            num_partitions=num_partitions)
+
+
+def group_row_indexes(key_value_lists, num_rows):
+    """Map each distinct group key to the indexes of the rows with that key.
+
+    Dictionary-encoded key columns are grouped by their codes, and only the
+    key of each group is decoded, rather than the key of every row. If every
+    key column is run-length encoded, the key of each run is only looked up
+    once.
+
+    Arguments:
+        key_value_lists: A list with the values of each key column.
+        num_rows: The number of rows.
+
+    Returns: A dict mapping each group key tuple to a list of the indexes of
+        its rows, in order.
+    """
+    if not key_value_lists:
+        return {(): range(num_rows)} if num_rows else {}
+    is_encoded = [isinstance(values, encoding.DictionaryValues)
+                  for values in key_value_lists]
+    if is_encoded == [True]:
+        dictionary = key_value_lists[0].dictionary
+        return {(dictionary[code],): rows for code, rows
+                in enumerate(key_value_lists[0].group_codes()) if rows}
+    if all(isinstance(values, encoding.RunLengthValues)
+           for values in key_value_lists):
+        group_rows = {}
+        start = 0
+        for key, length in encoding.iter_merged_runs(key_value_lists):
+            rows = group_rows.get(key)
+            if rows is None:
+                rows = group_rows[key] = []
+            rows.extend(xrange(start, start + length))
+            start += length
+        return group_rows
+
+    group_rows = {}
+    for i, key in enumerate(itertools.izip(*[
+            values.codes if encoded else values
+            for values, encoded in zip(key_value_lists, is_encoded)])):
+        rows = group_rows.get(key)
+        if rows is None:
+            rows = group_rows[key] = []
+        rows.append(i)
+    if not any(is_encoded):
+        return group_rows
+    dictionaries = [values.dictionary if encoded else None
+                    for values, encoded in zip(key_value_lists, is_encoded)]
+    return {
+        tuple(value if dictionary is None else dictionary[value]
+              for value, dictionary in zip(key, dictionaries)): rows
+        for key, rows in group_rows.iteritems()}
+
+
+def evaluate_on_dictionary(func_call, values):
+    """Evaluate a function call whose only non-literal arg is encoded.
+
+    The function is evaluated once for each code that is used, instead of once
+    per row, and the results are looked up by the code of each row.
+
+    Arguments:
+        func_call: A typed_ast.FunctionCall whose args are all Literals,
+            except for one.
+        values: The DictionaryValues of the other arg.
+
+    Returns: A list with the value of the function for each row.
+    """
+    used_codes = sorted(set(values.codes))
+    arg_results = [
+        [arg.value] * len(used_codes) if isinstance(arg, typed_ast.Literal)
+        else [values.dictionary[code] for code in used_codes]
+        for arg in func_call.args]
+    results_by_code = [None] * len(values.dictionary)
+    for code, result in zip(used_codes, func_call.func.evaluate(
+            len(used_codes), *arg_results)):
+        results_by_code[code] = result
+    return map(results_by_code.__getitem__, values.codes)
+
+
+def evaluate_on_runs(func_call, values):
+    """Evaluate a function call whose only non-literal arg has long runs.
+
+    The function is evaluated once for each run, instead of once per row.
+
+    Arguments:
+        func_call: A typed_ast.FunctionCall whose args are all Literals,
+            except for one.
+        values: The RunLengthValues of the other arg.
+
+    Returns: RunLengthValues with the value of the function for each row, with
+        the same runs as values.
+    """
+    num_runs = len(values.run_values)
+    arg_results = [
+        [arg.value] * num_runs if isinstance(arg, typed_ast.Literal)
+        else values.run_values
+        for arg in func_call.args]
+    return values.with_run_values(
+        list(func_call.func.evaluate(num_runs, *arg_results)))
+
+
+def can_merge_aggregates(select_fields):
+    """Return True if every aggregate call in the select fields is mergeable.
+
+    If so, the select fields can be grouped with a GroupAggregation.
+    """
+    return all(isinstance(call.func, runtime.MergeableAggregateFunction)
+               for call in get_aggregate_calls(select_fields))
+
+
+def merge_group_states(aggregation, merged_states, group_states):
+    """Merge the partial states for some groups into merged_states.
+
+    Arguments:
+        aggregation: A GroupAggregation.
+        merged_states: A dict mapping group key tuples to the merged states so
+            far, which is modified in place.
+        group_states: A dict of the partial states for later rows, in the
+            same form.
+    """
+    for key, states in group_states.iteritems():
+        merged = merged_states.get(key)
+        if merged is None:
+            merged_states[key] = states
+        else:
+            merged_states[key] = [
+                call.func.merge_states(state1, state2)
+                for call, state1, state2 in zip(
+                    aggregation.aggregate_calls, merged, states)]
+
+
+def get_aggregate_calls(node):
+    """Find the AggregateFunctionCalls in a typed_ast node or list of them."""
+    if isinstance(node, typed_ast.AggregateFunctionCall):
+        return [node]
+    result = []
+    if isinstance(node, (tuple, list)):
+        for child in node:
+            result.extend(get_aggregate_calls(child))
+    return result
+
+
+def replace_aggregate_calls(expr, aggregate_calls):
+    """Replace the aggregate calls in an expression with column references.
+
+    Each AggregateFunctionCall is appended to aggregate_calls, and replaced by
+    a ColumnRef to the column with the key aggregate_column_key(i), where i is
+    its index in aggregate_calls.
+    """
+    if isinstance(expr, typed_ast.AggregateFunctionCall):
+        table, column = aggregate_column_key(len(aggregate_calls))
+        aggregate_calls.append(expr)
+        return typed_ast.ColumnRef(table, column, expr.type)
+    if isinstance(expr, typed_ast.FunctionCall):
+        return expr._replace(args=[
+            replace_aggregate_calls(arg, aggregate_calls)
+            for arg in expr.args])
+    return expr
+
+
+def aggregate_column_key(index):
+    """The column key for the value of the aggregate call with an index.
+
+    The table name can't be the name of a real table, so these never clash
+    with other columns.
+    """
+    return '$aggregate', str(index)
+
+
+def get_column_keys(node):
+    """Find the columns used by a typed_ast node.
+
+    Arguments:
+        node: A typed_ast node, or a list of them.
+
+    Returns: A set of (table, column) keys for the columns referenced by
+        ColumnRef nodes.
+    """
+    if isinstance(node, typed_ast.ColumnRef):
+        return {(node.table, node.column)}
+    result = set()
+    if isinstance(node, (tuple, list)):
+        for child in node:
+            result |= get_column_keys(child)
+    return result
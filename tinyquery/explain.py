@@ -0,0 +1,421 @@
+"""Describing how a query is evaluated, for EXPLAIN and EXPLAIN ANALYZE.
+
+The plan of a compiled query is a tree of PlanNodes, with one node for each
+operator that the Evaluator runs. With EXPLAIN ANALYZE, the Evaluator also
+records the time spent in each operator and the rows going through it in a
+QueryStats object.
+"""
+import collections
+import contextlib
+import time
+
+import instrumentation
+import predicates
+import runtime
+import typed_ast
+
+
+class PlanNode(collections.namedtuple(
+        'PlanNode', ['operator', 'ast_node', 'details', 'children'])):
+    """One operator in the plan of a query.
+
+    Fields:
+        operator: The name of the operator: 'Scan', 'Union', 'Join',
+            'CrossJoin', 'Filter', 'Project', 'Aggregate' or 'Limit'.
+        ast_node: The typed_ast node that the operator evaluates. Statistics
+            for the operator are recorded under the operator name and this
+            node.
+        details: A list of strings describing what the operator does.
+        children: A list of PlanNodes for the inputs of the operator.
+    """
+
+
+# The BigQuery step kind for each operator, for query plans in job info.
+_STEP_KINDS = {
+    'Scan': 'READ',
+    'Union': 'READ',
+    'Join': 'JOIN',
+    'CrossJoin': 'JOIN',
+    'Filter': 'FILTER',
+    'Project': 'COMPUTE',
+    'Aggregate': 'AGGREGATE',
+    'Limit': 'LIMIT',
+}
+
+
+def get_table_operator(table_expr):
+    """Get the operator name for a table expression.
+
+    Returns: The name of the operator, or None for table expressions that
+        don't have an operator of their own (subqueries and NoTable).
+    """
+    if isinstance(table_expr, (typed_ast.Table, typed_ast.TablePartitions,
+                               typed_ast.IndexLookup)):
+        return 'Scan'
+    if isinstance(table_expr, typed_ast.TableUnion):
+        return 'Union'
+    if isinstance(table_expr, typed_ast.Join):
+        return 'Join' if table_expr.conditions else 'CrossJoin'
+    return None
+
+
+def get_plan(select_ast):
+    """Get the plan for a compiled typed_ast.Select.
+
+    Returns: The root PlanNode.
+    """
+    table_plans = []
+    if not isinstance(select_ast.table, typed_ast.NoTable):
+        table_plans.append(get_table_expr_plan(select_ast.table,
+                                               select_ast.where_expr))
+    plan = PlanNode('Filter', select_ast,
+                    ['WHERE ' + format_expr(select_ast.where_expr)],
+                    table_plans)
+    select_field_details = [format_select_field(select_field)
+                            for select_field in select_ast.select_fields]
+    if select_ast.group_set is None:
+        plan = PlanNode('Project', select_ast, select_field_details, [plan])
+    else:
+        group_details = []
+        group_set = select_ast.group_set
+        if group_set != typed_ast.TRIVIAL_GROUP_SET:
+            group_details.append('{} {}'.format(
+                'GROUP EACH BY' if group_set.is_each else 'GROUP BY',
+                ', '.join([format_expr(field_group)
+                           for field_group in group_set.field_groups] +
+                          sorted(group_set.alias_groups))))
+        plan = PlanNode('Aggregate', select_ast,
+                        group_details + select_field_details, [plan])
+    if select_ast.limit is not None:
+        plan = PlanNode('Limit', select_ast,
+                        ['LIMIT {}'.format(select_ast.limit)], [plan])
+    return plan
+
+
+def get_table_expr_plan(table_expr, where_expr=None):
+    """Get the plan for a table expression.
+
+    Arguments:
+        table_expr: The table expression.
+        where_expr: The WHERE expression that is applied directly to the
+            table expression, if any. Base tables use it to skip chunks.
+    """
+    if isinstance(table_expr, typed_ast.Select):
+        return get_plan(table_expr)
+    operator = get_table_operator(table_expr)
+    details = []
+    children = []
+    if isinstance(table_expr, (typed_ast.Table, typed_ast.TablePartitions,
+                               typed_ast.IndexLookup)):
+        details.append('table ' + table_expr.name)
+    if isinstance(table_expr, typed_ast.TablePartitions):
+        details.append('partitions ' + ', '.join(
+            format_value(key) for key in table_expr.partition_keys))
+    if isinstance(table_expr, typed_ast.IndexLookup):
+        details.append('index lookup ' + format_predicate(
+            table_expr.column, table_expr.operator, table_expr.values))
+    if (isinstance(table_expr, (typed_ast.Table, typed_ast.TablePartitions))
+            and where_expr is not None):
+        column_predicates = predicates.get_column_predicates(where_expr)
+        if column_predicates:
+            details.append('zone map predicates ' + ', '.join(
+                format_predicate(format_expr(predicate.column),
+                                 predicate.operator, predicate.values)
+                for predicate in column_predicates))
+    if isinstance(table_expr, typed_ast.TableUnion):
+        children = [get_table_expr_plan(table)
+                    for table in table_expr.tables]
+    if isinstance(table_expr, typed_ast.Join):
+        if table_expr.is_left_outer:
+            details.append('LEFT OUTER')
+        if table_expr.is_each:
+            details.append('EACH')
+        if table_expr.conditions:
+            details.append('ON ' + ' AND '.join(
+                '{} = {}'.format(format_expr(condition.column1),
+                                 format_expr(condition.column2))
+                for condition in table_expr.conditions))
+        children = [get_table_expr_plan(table_expr.table1),
+                    get_table_expr_plan(table_expr.table2)]
+    return PlanNode(operator, table_expr, details, children)
+
+
+def format_select_field(select_field):
+    return '{} AS {}'.format(format_expr(select_field.expr),
+                             select_field.alias)
+
+
+def format_expr(expr):
+    """Describe a compiled expression in roughly the query syntax."""
+    if isinstance(expr, typed_ast.ColumnRef):
+        if expr.table is None:
+            return expr.column
+        return '{}.{}'.format(expr.table, expr.column)
+    if isinstance(expr, typed_ast.Literal):
+        return format_value(expr.value)
+    if isinstance(expr, (typed_ast.FunctionCall,
+                         typed_ast.AggregateFunctionCall)):
+        name = runtime.get_func_name(expr.func)
+        args = [format_expr(arg) for arg in expr.args]
+        if name in ('is_null', 'is_not_null'):
+            return '({} {})'.format(args[0], name.replace('_', ' ').upper())
+        if name == 'in':
+            return '({} IN ({}))'.format(args[0], ', '.join(args[1:]))
+        if runtime.is_operator_name(name):
+            if len(args) == 1:
+                return '{}{}'.format(name, args[0])
+            return '({} {} {})'.format(args[0], name.upper(), args[1])
+        return '{}({})'.format(name.upper(), ', '.join(args))
+    return str(expr)
+
+
+def format_value(value):
+    if value is None:
+        return 'NULL'
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, basestring):
+        return '"{}"'.format(value)
+    return repr(value)
+
+
+def format_predicate(column, operator, values):
+    """Describe a predicates.ColumnPredicate-style comparison."""
+    if operator in ('is_null', 'is_not_null'):
+        return '{} {}'.format(column, operator.replace('_', ' ').upper())
+    if operator == 'in':
+        return '{} IN ({})'.format(
+            column, ', '.join(format_value(value) for value in values))
+    return '{} {} {}'.format(column, operator, format_value(values[0]))
+
+
+class OperatorStats(object):
+    """What happened when an operator was evaluated.
+
+    Fields:
+        wall_time: The number of seconds spent in the operator itself, not
+            counting the time spent in its inputs.
+        rows_out: The number of rows that the operator output.
+        peak_cells: The most cells (rows times columns) in one context that
+            the operator output. For operators that output many batches, this
+            is the size of the biggest batch.
+    """
+    def __init__(self):
+        self.wall_time = 0.0
+        self.rows_out = 0
+        self.peak_cells = 0
+
+    def add_output(self, ctx):
+        self.rows_out += ctx.num_rows
+        self.peak_cells = max(self.peak_cells,
+                              ctx.num_rows * len(ctx.columns))
+
+
+class QueryStats(object):
+    """Records the plan of a query and statistics for each of its operators.
+
+    The time spent in each operator is measured by starting its timer when
+    the Evaluator starts working on the operator. Starting the timer of
+    another operator (like one of its inputs) pauses the current timer until
+    the other one stops, so time is never counted twice.
+
+    Each time an operator runs, the start and end events for its
+    evaluate.<Operator> stage are also sent to an
+    instrumentation.Instrumentation.
+
+    Fields:
+        plan: The root PlanNode of the query, once it's known.
+        operator_stats: A dict mapping (operator name, id of the typed_ast
+            node) to the OperatorStats of each operator that has been run.
+        instrumentation: The Instrumentation to send events to.
+        fingerprint: The fingerprint of the query, for the events.
+    """
+    def __init__(self):
+        self.plan = None
+        self.operator_stats = {}
+        # A stack of [OperatorStats, time its timer last started] lists for
+        # the operators whose timers are running or paused.
+        self.active_timers = []
+        self.instrumentation = instrumentation.Instrumentation()
+        self.fingerprint = None
+
+    def set_plan(self, select_ast):
+        self.plan = get_plan(select_ast)
+
+    def set_instrumentation(self, query_instrumentation, fingerprint):
+        self.instrumentation = query_instrumentation
+        self.fingerprint = fingerprint
+
+    def operator_started(self, operator, stats):
+        """Send the start event for an operator.
+
+        Returns: The wall time and rows out of the operator so far, to pass
+            to operator_finished.
+        """
+        self.instrumentation.stage_started(self.fingerprint,
+                                           'evaluate.' + operator)
+        return stats.wall_time, stats.rows_out
+
+    def operator_finished(self, operator, stats, start_totals):
+        """Send the end event for an operator."""
+        start_wall_time, start_rows_out = start_totals
+        self.instrumentation.stage_finished(
+            self.fingerprint, 'evaluate.' + operator,
+            stats.wall_time - start_wall_time,
+            stats.rows_out - start_rows_out)
+
+    def get_stats(self, operator, ast_node):
+        key = (operator, id(ast_node))
+        stats = self.operator_stats.get(key)
+        if stats is None:
+            stats = self.operator_stats[key] = OperatorStats()
+        return stats
+
+    def start_timer(self, stats):
+        now = time.time()
+        if self.active_timers:
+            paused_stats, start_time = self.active_timers[-1]
+            paused_stats.wall_time += now - start_time
+        self.active_timers.append([stats, now])
+
+    def stop_timer(self):
+        now = time.time()
+        stats, start_time = self.active_timers.pop()
+        stats.wall_time += now - start_time
+        if self.active_timers:
+            self.active_timers[-1][1] = now
+
+    @contextlib.contextmanager
+    def timed(self, operator, ast_node):
+        """Count the time spent in a block towards an operator.
+
+        Yields: The OperatorStats for the operator.
+        """
+        stats = self.get_stats(operator, ast_node)
+        start_totals = self.operator_started(operator, stats)
+        self.start_timer(stats)
+        try:
+            yield stats
+        finally:
+            self.stop_timer()
+            self.operator_finished(operator, stats, start_totals)
+
+    def timed_batches(self, operator, ast_node, batches):
+        """Count the time spent producing batches towards an operator.
+
+        The batches are recorded as the output of the operator. The
+        operator's start event is sent when the first batch is requested,
+        and its end event once there are no more batches (or they are no
+        longer needed).
+        """
+        stats = self.get_stats(operator, ast_node)
+        batch_iter = iter(batches)
+        start_totals = self.operator_started(operator, stats)
+        try:
+            while True:
+                self.start_timer(stats)
+                try:
+                    batch = next(batch_iter)
+                except StopIteration:
+                    return
+                finally:
+                    self.stop_timer()
+                stats.add_output(batch)
+                yield batch
+        finally:
+            self.operator_finished(operator, stats, start_totals)
+
+    def get_node_stats(self, plan_node):
+        """Get the OperatorStats for a PlanNode."""
+        return self.operator_stats.get(
+            (plan_node.operator, id(plan_node.ast_node)), OperatorStats())
+
+    def get_rows_in(self, plan_node):
+        """Get the number of rows that an operator read.
+
+        Scans read the rows that they output, and other operators read the
+        rows output by their inputs.
+        """
+        if not plan_node.children:
+            return self.get_node_stats(plan_node).rows_out
+        return sum(self.get_node_stats(child).rows_out
+                   for child in plan_node.children)
+
+    def format_plan(self, analyze=False):
+        """Describe the plan as text, with one line per operator.
+
+        Arguments:
+            analyze: If True, each line includes the statistics for the
+                operator.
+        """
+        lines = []
+
+        def add_lines(plan_node, depth):
+            line = '  ' * depth + plan_node.operator
+            if plan_node.details:
+                line += ': ' + '; '.join(plan_node.details)
+            if analyze:
+                stats = self.get_node_stats(plan_node)
+                line += (' (time={:.3f}ms, rows in={}, rows out={}, '
+                         'peak cells={})'.format(
+                             stats.wall_time * 1000,
+                             self.get_rows_in(plan_node),
+                             stats.rows_out, stats.peak_cells))
+            lines.append(line)
+            for child in plan_node.children:
+                add_lines(child, depth + 1)
+        add_lines(self.plan, 0)
+        return '\n'.join(lines)
+
+    def get_query_plan(self):
+        """Describe the plan in the format of BigQuery's queryPlan statistic.
+
+        Each operator is a stage, and the stages are listed in the order they
+        finish, so every stage comes after its inputs. The statistics use the
+        BigQuery names where there is one. All of the work happens in one
+        worker, so the average and maximum compute times are the same.
+        """
+        stages = []
+
+        def add_stage(plan_node):
+            input_stage_ids = [add_stage(child)
+                               for child in plan_node.children]
+            stage_id = str(len(stages))
+            stats = self.get_node_stats(plan_node)
+            compute_ms = str(int(round(stats.wall_time * 1000)))
+            stages.append({
+                'name': 'S{:02d}: {}'.format(len(stages), plan_node.operator),
+                'id': stage_id,
+                'inputStages': input_stage_ids,
+                'recordsRead': str(self.get_rows_in(plan_node)),
+                'recordsWritten': str(stats.rows_out),
+                'computeMsAvg': compute_ms,
+                'computeMsMax': compute_ms,
+                'peakAllocatedCells': str(stats.peak_cells),
+                'steps': [{
+                    'kind': _STEP_KINDS[plan_node.operator],
+                    'substeps': list(plan_node.details),
+                }],
+            })
+            return stage_id
+        add_stage(self.plan)
+        return stages
+
+
+class NullQueryStats(object):
+    """A stand-in for QueryStats that doesn't record anything."""
+    plan = None
+    fingerprint = None
+
+    def set_plan(self, select_ast):
+        pass
+
+    def set_instrumentation(self, query_instrumentation, fingerprint):
+        pass
+
+    @contextlib.contextmanager
+    def timed(self, operator, ast_node):
+        yield OperatorStats()
+
+    def timed_batches(self, operator, ast_node, batches):
+        return batches
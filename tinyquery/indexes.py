@@ -0,0 +1,303 @@
+"""Secondary indexes on table columns.
+
+An index maps the values of a single column to the row numbers (within the
+whole table) that contain them. Indexes are kept up to date by the Table as
+rows are appended, and are used by the compiler to replace a full table scan
+with an index lookup when the WHERE clause has a suitable predicate.
+"""
+import bisect
+import heapq
+import itertools
+import sys
+import time
+
+
+class Index(object):
+    """Abstract base class for indexes.
+
+    Fields:
+        column_name: The name of the indexed column within the table.
+        num_rows: The number of table rows that have been indexed.
+        build_time: The time in seconds taken to build the index initially.
+    """
+    # The predicate operators that this index can answer. Subclasses should
+    # override this.
+    supported_operators = frozenset()
+
+    def __init__(self, column_name, chunks):
+        self.column_name = column_name
+        self.num_rows = 0
+        start_time = time.time()
+        self.add_chunks(chunks)
+        self.build_time = time.time() - start_time
+
+    def add_chunks(self, chunks):
+        """Index the rows in the given chunks, which follow existing rows."""
+        for chunk in chunks:
+            self.add_values(chunk.columns[self.column_name].values)
+
+    def add_values(self, values):
+        raise NotImplementedError()
+
+    def clear(self):
+        raise NotImplementedError()
+
+    def lookup(self, operator, values):
+        """Return a sorted list of the row numbers matching a predicate.
+
+        Arguments:
+            operator: One of the operators in supported_operators. See
+                predicates.ColumnPredicate for their meanings.
+            values: A tuple of the constants used by the operator.
+        """
+        raise NotImplementedError()
+
+    def estimate_rows(self, operator, values):
+        """Estimate how many rows lookup would return, without looking up.
+
+        This should be much cheaper than lookup itself, since the compiler
+        uses it to decide whether looking up rows in the index is worth it.
+        """
+        raise NotImplementedError()
+
+    @property
+    def memory_bytes(self):
+        """The approximate memory used by the index itself.
+
+        The indexed values are shared with the table, so they aren't counted.
+        """
+        raise NotImplementedError()
+
+    def get_stats(self):
+        return {
+            'column': self.column_name,
+            'kind': self.kind,
+            'numRows': self.num_rows,
+            'buildTimeSeconds': self.build_time,
+            'memoryBytes': self.memory_bytes,
+        }
+
+
+class HashIndex(Index):
+    """An index that can answer equality and IN predicates."""
+    kind = 'hash'
+    supported_operators = frozenset(['=', 'in'])
+
+    def __init__(self, column_name, chunks):
+        self.rows_by_value = {}
+        super(HashIndex, self).__init__(column_name, chunks)
+
+    def add_values(self, values):
+        rows_by_value = self.rows_by_value
+        for row_num, value in enumerate(values, self.num_rows):
+            rows = rows_by_value.get(value)
+            if rows is None:
+                rows_by_value[value] = [row_num]
+            else:
+                rows.append(row_num)
+        self.num_rows += len(values)
+
+    def clear(self):
+        self.rows_by_value = {}
+        self.num_rows = 0
+
+    def lookup(self, operator, values):
+        assert operator in self.supported_operators
+        row_lists = [self.rows_by_value.get(value, []) for value in
+                     set(values)]
+        if len(row_lists) == 1:
+            return row_lists[0]
+        return sorted(row_num for rows in row_lists for row_num in rows)
+
+    def estimate_rows(self, operator, values):
+        assert operator in self.supported_operators
+        return sum(len(self.rows_by_value.get(value, ()))
+                   for value in set(values))
+
+    @property
+    def memory_bytes(self):
+        return sys.getsizeof(self.rows_by_value) + sum(
+            sys.getsizeof(rows) for rows in self.rows_by_value.itervalues())
+
+
+class SortedIndex(Index):
+    """An index that can also answer range predicates.
+
+    The index is a list of (value, row number) pairs sorted by value, stored as
+    two parallel lists so that the values can be binary searched directly.
+    Nulls are kept in the index and sort before every other value, but since
+    comparing a null with anything gives null, they never match a predicate.
+
+    Merging appended rows into the sorted lists takes time proportional to the
+    whole index, so appended rows are sorted on their own and kept as separate
+    runs until the next lookup, which merges all of them at once.
+
+    Fields:
+        pending_runs: A list of (sorted values, row numbers) pairs for the
+            appended rows that haven't been merged into the index yet.
+    """
+    kind = 'sorted'
+    supported_operators = frozenset(['=', 'in', '<', '<=', '>', '>='])
+
+    def __init__(self, column_name, chunks):
+        self.sorted_values = []
+        self.row_nums = []
+        self.pending_runs = []
+        super(SortedIndex, self).__init__(column_name, chunks)
+
+    def add_values(self, values):
+        entries = sorted(
+            (value, row_num)
+            for row_num, value in enumerate(values, self.num_rows))
+        self.pending_runs.append(([value for value, _ in entries],
+                                  [row_num for _, row_num in entries]))
+        self.num_rows += len(values)
+
+    def merge_pending_runs(self):
+        """Merge the appended runs of rows into the sorted lists."""
+        if not self.pending_runs:
+            return
+        runs = [(self.sorted_values, self.row_nums)] + self.pending_runs
+        entries = list(heapq.merge(*[itertools.izip(values, row_nums)
+                                     for values, row_nums in runs]))
+        self.sorted_values = [value for value, _ in entries]
+        self.row_nums = [row_num for _, row_num in entries]
+        self.pending_runs = []
+
+    def clear(self):
+        self.sorted_values = []
+        self.row_nums = []
+        self.pending_runs = []
+        self.num_rows = 0
+
+    def lookup(self, operator, values):
+        assert operator in self.supported_operators
+        if operator == 'in':
+            return sorted(row_num
+                          for value in set(values)
+                          for row_num in self.lookup('=', (value,)))
+        start, end = self.get_range(operator, values[0])
+        return sorted(self.row_nums[start:end])
+
+    def estimate_rows(self, operator, values):
+        assert operator in self.supported_operators
+        if operator == 'in':
+            return sum(self.estimate_rows('=', (value,))
+                       for value in set(values))
+        start, end = self.get_range(operator, values[0])
+        return end - start
+
+    def get_range(self, operator, value):
+        """Find the range of positions in the index matching a comparison.
+
+        Returns: A (start, end) pair of indexes into sorted_values.
+        """
+        self.merge_pending_runs()
+        num_nulls = bisect.bisect_right(self.sorted_values, None)
+        if operator == '=':
+            start = bisect.bisect_left(self.sorted_values, value)
+            end = bisect.bisect_right(self.sorted_values, value)
+        elif operator == '<':
+            start = num_nulls
+            end = bisect.bisect_left(self.sorted_values, value)
+        elif operator == '<=':
+            start = num_nulls
+            end = bisect.bisect_right(self.sorted_values, value)
+        elif operator == '>':
+            start = bisect.bisect_right(self.sorted_values, value)
+            end = len(self.sorted_values)
+        else:
+            start = bisect.bisect_left(self.sorted_values, value)
+            end = len(self.sorted_values)
+        return start, end
+
+    @property
+    def memory_bytes(self):
+        return (sys.getsizeof(self.sorted_values) +
+                sys.getsizeof(self.row_nums) +
+                sum(sys.getsizeof(values) + sys.getsizeof(row_nums)
+                    for values, row_nums in self.pending_runs))
+
+
+class PartitionedIndex(Index):
+    """An index on a partitioned table, made up of an index on each partition.
+
+    The rows of a partitioned table are ordered by partition, so adding rows
+    to a partition changes the row numbers of every later partition. Each
+    partition's index instead uses row numbers within that partition, which
+    never change, and lookups convert them to row numbers within the whole
+    table. Appending rows to a partition therefore only needs to index the
+    new rows.
+
+    Fields:
+        index_class: The Index subclass used for each partition.
+        partition_indexes: A dict mapping each partition key to the index on
+            the rows in that partition.
+    """
+    def __init__(self, column_name, index_class, partitions):
+        """Index the rows of a partitioned table.
+
+        Arguments:
+            column_name: The name of the column to index.
+            index_class: The Index subclass to use for each partition.
+            partitions: A dict mapping each partition key to the list of
+                chunks in that partition.
+        """
+        self.column_name = column_name
+        self.index_class = index_class
+        self.kind = index_class.kind
+        self.supported_operators = index_class.supported_operators
+        self.partition_indexes = {}
+        start_time = time.time()
+        for partition_key, chunks in partitions.iteritems():
+            self.add_partition_chunks(partition_key, chunks)
+        self.build_time = time.time() - start_time
+
+    @property
+    def num_rows(self):
+        return sum(index.num_rows
+                   for index in self.partition_indexes.itervalues())
+
+    def add_partition_chunks(self, partition_key, chunks):
+        """Index the rows in chunks appended to the given partition."""
+        index = self.partition_indexes.get(partition_key)
+        if index is None:
+            self.partition_indexes[partition_key] = self.index_class(
+                self.column_name, chunks)
+        else:
+            index.add_chunks(chunks)
+
+    def add_chunks(self, chunks):
+        raise NotImplementedError(
+            'Chunks must be added to a partition with add_partition_chunks.')
+
+    def clear(self):
+        self.partition_indexes = {}
+
+    def lookup(self, operator, values):
+        # Partitions are ordered by key within the table, so the row numbers
+        # stay sorted if we go through them in the same order.
+        result = []
+        start_row_num = 0
+        for partition_key in sorted(self.partition_indexes):
+            index = self.partition_indexes[partition_key]
+            result.extend(start_row_num + row_num
+                          for row_num in index.lookup(operator, values))
+            start_row_num += index.num_rows
+        return result
+
+    def estimate_rows(self, operator, values):
+        return sum(index.estimate_rows(operator, values)
+                   for index in self.partition_indexes.itervalues())
+
+    @property
+    def memory_bytes(self):
+        return sys.getsizeof(self.partition_indexes) + sum(
+            index.memory_bytes
+            for index in self.partition_indexes.itervalues())
+
+
+INDEX_CLASSES = {
+    'hash': HashIndex,
+    'sorted': SortedIndex,
+}
@@ -0,0 +1,217 @@
+"""Hooks for measuring the stages of running a query.
+
+A TinyQuery service sends an event to its Instrumentation at the start and
+end of each stage of each query. The stages, and what the size reported for
+each of them means, are:
+    lex: The query text is split into tokens. The size is the number of
+        tokens.
+    parse: The tokens are parsed into a tq_ast tree. The size is the number
+        of tokens.
+    compile: The tq_ast tree is compiled into a typed_ast tree. The size is
+        the number of tables that the query reads.
+    evaluate.<Operator>: One operator of the query plan runs, where the
+        operator is one of the names in explain.PlanNode. The duration only
+        counts the time spent in the operator itself, not in its inputs, and
+        the size is the number of rows that it output.
+    serialize: A page of query results, or of the rows of a table listed
+        with tabledata().list, is converted to the API format. The size is
+        the number of rows in the page.
+
+Every event includes the fingerprint of the query, which is the same for
+queries that only differ in their literal values, comments and whitespace.
+Listing a table's rows uses the fingerprint of a query that selects them all.
+"""
+import collections
+import contextlib
+import hashlib
+import math
+import re
+import threading
+import time
+
+import lexer
+
+
+# The parts of a query that are left out of its fingerprint.
+_LITERAL_PATTERN = re.compile(
+    lexer.string_regex("'") + '|' + lexer.string_regex('"') +
+    r'|\b\d+(\.\d+)?\b')
+_COMMENT_PATTERN = re.compile(r'--.*')
+_WHITESPACE_PATTERN = re.compile(r'\s+')
+
+
+def normalize_query(query):
+    """Replace the literals in a query with ?, and normalize its whitespace.
+
+    Comments are removed and everything is lower-cased, so queries that do
+    the same thing with different literal values have the same normalized
+    text.
+    """
+    query = _COMMENT_PATTERN.sub('', query)
+    query = _LITERAL_PATTERN.sub('?', query)
+    return _WHITESPACE_PATTERN.sub(' ', query).strip().lower()
+
+
+def get_fingerprint(query):
+    """Get a short hash of the normalized text of a query."""
+    normalized_query = normalize_query(query)
+    if isinstance(normalized_query, unicode):
+        normalized_query = normalized_query.encode('utf-8')
+    return hashlib.sha1(normalized_query).hexdigest()[:16]
+
+
+def get_table_fingerprint(table_name):
+    """Get the fingerprint used when reading a table's rows directly."""
+    return get_fingerprint('SELECT * FROM %s' % table_name)
+
+
+class Instrumentation(object):
+    """Receives the start and end events of each stage of each query.
+
+    This base class ignores the events; subclasses can override either
+    method. The methods may be called from several threads at once.
+    """
+    def stage_started(self, fingerprint, stage):
+        pass
+
+    def stage_finished(self, fingerprint, stage, duration, size):
+        """Called when a stage ends, even if it ends with an error.
+
+        Arguments:
+            fingerprint: The fingerprint of the query.
+            stage: The name of the stage.
+            duration: The number of seconds that the stage took.
+            size: The size of the stage; see the module docstring.
+        """
+        pass
+
+
+class StageMeasurement(object):
+    """The size of a stage, to be filled in while measuring it."""
+    def __init__(self):
+        self.size = 0
+
+
+@contextlib.contextmanager
+def measure_stage(instrumentation, fingerprint, stage):
+    """Send the start and end events for a block of code.
+
+    Yields: A StageMeasurement, whose size should be set by the block.
+    """
+    measurement = StageMeasurement()
+    instrumentation.stage_started(fingerprint, stage)
+    start_time = time.time()
+    try:
+        yield measurement
+    finally:
+        instrumentation.stage_finished(fingerprint, stage,
+                                       time.time() - start_time,
+                                       measurement.size)
+
+
+class Histogram(object):
+    """A histogram of the durations of one stage of one kind of query.
+
+    The buckets grow by powers of two: bucket i counts the durations of more
+    than 2 ** (i - 1) and at most 2 ** i microseconds, and bucket 0 counts
+    everything of up to one microsecond.
+
+    Fields:
+        count: The number of durations recorded.
+        total_duration: The sum of the durations, in seconds.
+        max_duration: The longest duration, in seconds.
+        total_size: The sum of the sizes of the stages.
+        bucket_counts: A list with the number of durations in each bucket.
+    """
+    def __init__(self):
+        self.count = 0
+        self.total_duration = 0.0
+        self.max_duration = 0.0
+        self.total_size = 0
+        self.bucket_counts = []
+
+    @staticmethod
+    def get_bucket(duration):
+        micros = duration * 1e6
+        if micros <= 1:
+            return 0
+        return int(math.ceil(math.log(micros, 2)))
+
+    @staticmethod
+    def get_bucket_upper_bound(bucket):
+        """Get the longest duration in a bucket, in seconds."""
+        return 2 ** bucket / 1e6
+
+    def add(self, duration, size):
+        self.count += 1
+        self.total_duration += duration
+        self.max_duration = max(self.max_duration, duration)
+        self.total_size += size
+        bucket = self.get_bucket(duration)
+        if bucket >= len(self.bucket_counts):
+            self.bucket_counts.extend(
+                [0] * (bucket + 1 - len(self.bucket_counts)))
+        self.bucket_counts[bucket] += 1
+
+    def get_percentile(self, percentile):
+        """Estimate a percentile of the durations, in seconds.
+
+        The estimate is the upper bound of the bucket that the percentile
+        falls in, so it is at most twice the actual value.
+        """
+        if self.count == 0:
+            return 0.0
+        rank = int(math.ceil(self.count * percentile / 100.0))
+        seen = 0
+        for bucket, bucket_count in enumerate(self.bucket_counts):
+            seen += bucket_count
+            if seen >= rank:
+                return min(self.get_bucket_upper_bound(bucket),
+                           self.max_duration)
+        return self.max_duration
+
+
+class HistogramAggregator(Instrumentation):
+    """Keeps a Histogram for each stage of each query fingerprint.
+
+    Comparing the histograms of a fingerprint over time shows which stage of
+    a query got slower.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        # A dict mapping fingerprint to a dict mapping stage to Histogram.
+        self.histograms = collections.defaultdict(dict)
+
+    def stage_finished(self, fingerprint, stage, duration, size):
+        with self.lock:
+            histogram = self.histograms[fingerprint].get(stage)
+            if histogram is None:
+                histogram = self.histograms[fingerprint][stage] = Histogram()
+            histogram.add(duration, size)
+
+    def get_fingerprints(self):
+        with self.lock:
+            return sorted(self.histograms)
+
+    def get_histograms(self, fingerprint):
+        """Get a dict mapping stage name to Histogram for a fingerprint."""
+        with self.lock:
+            return dict(self.histograms.get(fingerprint, {}))
+
+    def format_report(self):
+        """Describe every histogram as text, with one line per stage."""
+        lines = []
+        for fingerprint in self.get_fingerprints():
+            lines.append(fingerprint)
+            for stage, histogram in sorted(
+                    self.get_histograms(fingerprint).iteritems()):
+                lines.append(
+                    '  {}: count={}, mean={:.3f}ms, p50={:.3f}ms, '
+                    'p99={:.3f}ms, max={:.3f}ms, mean size={:.1f}'.format(
+                        stage, histogram.count,
+                        histogram.total_duration / histogram.count * 1000,
+                        histogram.get_percentile(50) * 1000,
+                        histogram.get_percentile(99) * 1000,
+                        histogram.max_duration * 1000,
+                        float(histogram.total_size) / histogram.count))
+        return '\n'.join(lines)
@@ -32,6 +32,8 @@ reserved_words = {
     'in': 'IN',
     'count': 'COUNT',
     'distinct': 'DISTINCT',
+    'explain': 'EXPLAIN',
+    'analyze': 'ANALYZE',
 }
 
 tokens = [
@@ -117,11 +119,12 @@ def t_ID(t):
 
 
 def t_brackets_id(t):
-    r"""\[[a-zA-Z_0-9\.]*\]"""
+    r"""\[[a-zA-Z_0-9\.\$]*\]"""
     # Tokens can be surrounded with square brackets, in which case they're
     # allowed to start with numbers and contain dots. Tokens specified this way
     # are NOT allowed to be regular keywords, so we don't do that check like in
-    # t_ID.
+    # t_ID. They may also contain a $ for table decorators, like
+    # [dataset.table$20160101].
     t.value = t.value[1:-1]
     t.type = 'ID'
     return t
@@ -143,7 +146,7 @@ def lex_text(text):
     lexer.input(text)
     result = []
     while True:
-        token = lex.token()
+        token = lexer.token()
         if token:
             result.append(token)
         else:
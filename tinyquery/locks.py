@@ -0,0 +1,83 @@
+"""Locks for sharing one TinyQuery service between threads.
+
+Every table has a ReadWriteLock. Queries hold read locks on all of the tables
+they read while they run, and anything that changes a table holds its write
+lock, so a query always sees a consistent snapshot of every table.
+"""
+import contextlib
+import threading
+
+
+class ReadWriteLock(object):
+    """A lock that can be held by any number of readers or by one writer.
+
+    Writers are preferred: once a writer is waiting, new readers wait until it
+    is done, so a steady stream of queries can't starve writes. The lock isn't
+    reentrant, so a thread must not try to acquire it while already holding
+    it.
+    """
+    def __init__(self):
+        self.condition = threading.Condition(threading.Lock())
+        self.num_readers = 0
+        self.num_waiting_writers = 0
+        self.has_writer = False
+
+    def acquire_read(self):
+        with self.condition:
+            while self.has_writer or self.num_waiting_writers > 0:
+                self.condition.wait()
+            self.num_readers += 1
+
+    def release_read(self):
+        with self.condition:
+            self.num_readers -= 1
+            if self.num_readers == 0:
+                self.condition.notify_all()
+
+    def acquire_write(self):
+        with self.condition:
+            self.num_waiting_writers += 1
+            while self.has_writer or self.num_readers > 0:
+                self.condition.wait()
+            self.num_waiting_writers -= 1
+            self.has_writer = True
+
+    def release_write(self):
+        with self.condition:
+            self.has_writer = False
+            self.condition.notify_all()
+
+    @contextlib.contextmanager
+    def read_locked(self):
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextlib.contextmanager
+    def write_locked(self):
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
+
+
+@contextlib.contextmanager
+def all_read_locked(read_write_locks):
+    """Hold read locks on several ReadWriteLocks at once.
+
+    To avoid deadlocks, every caller must acquire locks in the same order
+    (tables are always locked in order of their names), and no thread may
+    wait for another lock while holding a write lock.
+    """
+    acquired_locks = []
+    try:
+        for lock in read_write_locks:
+            lock.acquire_read()
+            acquired_locks.append(lock)
+        yield
+    finally:
+        for lock in reversed(acquired_locks):
+            lock.release_read()
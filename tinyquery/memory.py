@@ -0,0 +1,178 @@
+"""Accounting for the memory that a query uses while it is evaluated.
+
+Every context that an operator outputs is counted towards the memory of the
+query until it is garbage collected. Before building something big (like the
+result of a join, or the hash table of a GROUP BY), the Evaluator also checks
+that its estimated size fits in what's left of the query's budget, so a
+runaway query fails cleanly instead of using all of the memory. GROUP BYs
+and joins whose hash tables wouldn't fit are done one partition at a time
+instead, with the partitions spilled to disk; see the spill module.
+
+The sizes are estimates of the CPython objects involved: a pointer for each
+value in each column list, plus the size of the value objects themselves.
+Encoded columns count the size of their compact form instead.
+Values shared between contexts (or with a table) are counted once per list
+that holds them, so the estimates err on the high side. The contexts output
+by scans are not counted, since they usually share their lists with the
+table.
+"""
+import weakref
+
+import encoding
+import tinyquery
+import tq_types
+
+
+# The size of a pointer in a list.
+POINTER_BYTES = 8
+# The rough size of a value of each type, not counting the characters of
+# strings.
+VALUE_BYTES = {
+    tq_types.INT: 24,
+    tq_types.FLOAT: 24,
+    tq_types.BOOL: 0,
+    tq_types.STRING: 37,
+    tq_types.NONETYPE: 0,
+}
+# The number of values of a string column to look at to estimate the average
+# length of its strings.
+STRING_SAMPLE_SIZE = 10
+# The rough size of the hash table entry for each group of a GROUP BY, not
+# counting the group's key and aggregate states.
+GROUP_BYTES = 200
+
+
+def estimate_column_bytes(column):
+    values = column.values
+    if not values:
+        return 0
+    if isinstance(values, encoding.DictionaryValues):
+        # The codes, plus a list of the distinct values.
+        return (len(values.codes) * values.codes.itemsize +
+                estimate_column_bytes(column._replace(
+                    values=values.dictionary)))
+    if isinstance(values, encoding.NullableValues):
+        # The list of values, plus a byte for each value for the bitmap.
+        return len(values) + estimate_column_bytes(column._replace(
+            values=values.values))
+    if isinstance(values, encoding.RunLengthValues):
+        # The ends of the runs, plus a list of the value of each run.
+        return (len(values.run_ends) * values.run_ends.itemsize +
+                estimate_column_bytes(column._replace(
+                    values=values.run_values)))
+    value_bytes = VALUE_BYTES.get(column.type, POINTER_BYTES)
+    if column.type == tq_types.STRING:
+        step = max(1, len(values) // STRING_SAMPLE_SIZE)
+        sample = [value for value in values[::step] if value is not None]
+        if sample:
+            value_bytes += sum(len(value) for value in sample) // len(sample)
+    return len(values) * (POINTER_BYTES + value_bytes)
+
+
+def estimate_row_bytes(ctx):
+    """Estimate the average size of a row of a context."""
+    if ctx.num_rows == 0:
+        return sum(POINTER_BYTES + VALUE_BYTES.get(column.type, 0)
+                   for column in ctx.columns.itervalues())
+    return (sum(estimate_column_bytes(column)
+                for column in ctx.columns.itervalues()) // ctx.num_rows)
+
+
+def estimate_group_bytes(num_groups, num_values_per_group):
+    """Estimate the size of the hash table for a GROUP BY."""
+    return num_groups * (GROUP_BYTES + num_values_per_group *
+                         (POINTER_BYTES + VALUE_BYTES[tq_types.INT]))
+
+
+class MemoryTracker(object):
+    """Counts the memory used by the contexts of one query.
+
+    Fields:
+        max_bytes: The budget for the query, or None for no limit.
+        current_bytes: The estimated size of the contexts that are still
+            alive.
+        peak_bytes: The most that current_bytes has been, including the
+            estimates checked with check_allocation.
+    """
+    def __init__(self, max_bytes=None):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.peak_bytes = 0
+        # A dict mapping the id of each counted value list to a
+        # [list, size, number of live contexts holding it] list. Holding the
+        # list keeps its id from being reused while it's counted.
+        self.value_lists = {}
+        # A dict mapping the id of each counted context to a pair of a weak
+        # reference to it and the set of ids of its counted value lists.
+        self.contexts = {}
+
+    def check_allocation(self, num_bytes):
+        """Make sure that there's room for a new allocation.
+
+        Raises: tinyquery.ResourcesExceededError if the allocation would go
+            over the budget.
+        """
+        total_bytes = self.current_bytes + num_bytes
+        self.peak_bytes = max(self.peak_bytes, total_bytes)
+        if self.max_bytes is not None and total_bytes > self.max_bytes:
+            raise tinyquery.ResourcesExceededError(
+                'Resources exceeded during query execution: the query needs '
+                'about {} bytes of memory, but its limit is {} bytes.'.format(
+                    total_bytes, self.max_bytes))
+
+    def has_room(self, num_bytes):
+        """Return True if an allocation would fit in the budget."""
+        return (self.max_bytes is None or
+                self.current_bytes + num_bytes <= self.max_bytes)
+
+    def get_remaining_bytes(self):
+        """Get how much is left of the budget, or None if there's no limit."""
+        if self.max_bytes is None:
+            return None
+        return max(0, self.max_bytes - self.current_bytes)
+
+    def track_context(self, ctx):
+        """Count a context until it is garbage collected.
+
+        Tracking a context again after its columns change counts any new
+        value lists.
+
+        Raises: tinyquery.ResourcesExceededError if the context goes over the
+            budget. The context is still counted.
+        """
+        ctx_id = id(ctx)
+        if ctx_id not in self.contexts:
+            self.contexts[ctx_id] = (
+                weakref.ref(ctx, lambda _: self.release_context(ctx_id)),
+                set())
+        list_ids = self.contexts[ctx_id][1]
+        new_bytes = 0
+        for column in ctx.columns.itervalues():
+            list_id = id(column.values)
+            if list_id in list_ids:
+                continue
+            list_ids.add(list_id)
+            entry = self.value_lists.get(list_id)
+            if entry is None:
+                num_bytes = estimate_column_bytes(column)
+                self.value_lists[list_id] = [column.values, num_bytes, 1]
+                new_bytes += num_bytes
+            else:
+                entry[2] += 1
+        self.current_bytes += new_bytes
+        self.check_allocation(0)
+
+    def track_batches(self, batches):
+        """Count each context in an iterable of batches as it is produced."""
+        for batch in batches:
+            self.track_context(batch)
+            yield batch
+
+    def release_context(self, ctx_id):
+        _, list_ids = self.contexts.pop(ctx_id)
+        for list_id in list_ids:
+            entry = self.value_lists[list_id]
+            entry[2] -= 1
+            if entry[2] == 0:
+                del self.value_lists[list_id]
+                self.current_bytes -= entry[1]
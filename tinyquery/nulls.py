@@ -0,0 +1,145 @@
+"""Validity bitmaps, which record which values of a column aren't null.
+
+Nulls are stored as None in the values of a column. Rather than checking
+each value for None as they go, functions that need to handle nulls get a
+validity bitmap for each of their arguments, combine the bitmaps with bitwise
+operations, and then only compute results for the rows that are valid.
+
+A validity bitmap is a bytearray with one byte for each value: 1 if the value
+is valid (not null), and 0 if it is null. Using a byte rather than a bit for
+each value lets a bitmap be used directly as the selectors of
+itertools.compress. Values without any nulls, which are the common case,
+don't get a bitmap at all: get_validity returns None for them, and every
+function here treats a bitmap of None as all valid, so they only cost a
+single scan for None.
+
+The columns of tables with nulls are stored as encoding.NullableValues, which
+keep their bitmap with the values so that it only needs to be built once,
+when the table is loaded. Functions that propagate nulls return
+NullableValues too, so an expression like a * 2 + b only looks for nulls in
+a and b once.
+"""
+import binascii
+import itertools
+import operator
+
+import encoding
+
+
+VALID = '\x01'
+NULL = '\x00'
+
+
+def count_nulls(values):
+    """Count the null values in a sequence of values."""
+    if isinstance(values, list):
+        return values.count(None)
+    elif isinstance(values, encoding.NullableValues):
+        return values.validity.count(NULL)
+    elif isinstance(values, encoding.DictionaryValues):
+        if None not in values.dictionary:
+            return 0
+        return values.codes.count(values.dictionary.index(None))
+    elif isinstance(values, encoding.RunLengthValues):
+        return sum(length for value, length in values.iter_runs()
+                   if value is None)
+    return sum(1 for value in values if value is None)
+
+
+def get_validity(values):
+    """Get the validity bitmap of a sequence of values.
+
+    Returns: A bytearray, or None if the values are known to have no nulls.
+    """
+    # Plain lists are checked first, since this is called for lots of short
+    # lists, like the values of each group of a GROUP BY.
+    if isinstance(values, list):
+        if None not in values:
+            return None
+    elif isinstance(values, encoding.NullableValues):
+        return values.validity
+    elif count_nulls(values) == 0:
+        return None
+    elif isinstance(values, encoding.DictionaryValues):
+        return bytearray(itertools.imap(
+            operator.ne, values.codes,
+            itertools.repeat(values.dictionary.index(None))))
+    elif isinstance(values, encoding.RunLengthValues):
+        return bytearray().join(
+            (NULL if value is None else VALID) * length
+            for value, length in values.iter_runs())
+    return bytearray(itertools.imap(operator.is_not, values,
+                                    itertools.repeat(None)))
+
+
+def with_validity(values):
+    """Attach a validity bitmap to a list of values if it has any nulls.
+
+    Returns: NullableValues, or values itself if it has no nulls or is
+        already encoded.
+    """
+    if isinstance(values, encoding.EncodedValues):
+        return values
+    validity = get_validity(values)
+    if validity is None:
+        return values
+    return encoding.NullableValues(values, validity)
+
+
+def and_validity(*validities):
+    """Combine validity bitmaps into one that is valid where all of them are.
+
+    Any of the bitmaps may be None, for all valid.
+    """
+    validities = [validity for validity in validities if validity is not None]
+    if not validities:
+        return None
+    if len(validities) == 1:
+        return validities[0]
+    # ANDing the bitmaps as long integers is done in C, so it's much faster
+    # than going through them a byte at a time.
+    bits = reduce(operator.and_, [int(binascii.hexlify(validity), 16)
+                                  for validity in validities])
+    return bytearray(binascii.unhexlify(
+        '{:0{}x}'.format(bits, 2 * len(validities[0]))))
+
+
+def iter_valid(values):
+    """Iterate over the values that aren't null, in order.
+
+    The bitmap of NullableValues is used if they have one. Otherwise, the
+    values are just checked for None, which is cheaper than building a bitmap
+    that would only be used once.
+    """
+    if isinstance(values, encoding.NullableValues):
+        return itertools.compress(values.values, values.validity)
+    return [value for value in values if value is not None]
+
+
+def map_valid(func, arg_lists, checked_arg_lists=None):
+    """Apply a function to the values of each row, propagating nulls.
+
+    Arguments:
+        func: A function taking a value from each of arg_lists, which never
+            returns None.
+        arg_lists: A list of sequences of argument values, all of the same
+            length.
+        checked_arg_lists: The sequences whose nulls make the result for a
+            row null, or None for all of arg_lists. The function is still
+            called with nulls from the others.
+
+    Returns: A list with func applied to the values of each row, or
+        NullableValues with None for the rows where a checked argument is
+        null.
+    """
+    if checked_arg_lists is None:
+        checked_arg_lists = arg_lists
+    validity = and_validity(*[get_validity(arg_list)
+                              for arg_list in checked_arg_lists])
+    if validity is None:
+        return map(func, *arg_lists)
+    return encoding.NullableValues(
+        [func(*args) if valid else None
+         for valid, args in itertools.izip(validity,
+                                           itertools.izip(*arg_lists))],
+        validity)
@@ -0,0 +1,56 @@
+"""Helpers for spreading query evaluation across worker processes.
+
+Evaluation is pure Python, so threads can't use more than one core. Instead,
+we fork worker processes, which inherit the tables and the compiled query from
+the parent process for free. Only the inputs and results of each piece of work
+are pickled and sent between processes.
+"""
+import multiprocessing
+import os
+import threading
+
+
+# The state inherited by forked workers; see fork_map.
+_fork_state = None
+# Held while _fork_state is set, so that concurrent calls don't clobber it.
+_fork_state_lock = threading.Lock()
+
+
+def can_fork():
+    """Return True if worker processes can inherit state by forking."""
+    return hasattr(os, 'fork')
+
+
+def fork_map(func, shared_state, items, num_workers):
+    """Compute [func(shared_state, item) for item in items] in parallel.
+
+    The work is spread across up to num_workers forked worker processes. The
+    function and shared state are inherited by the workers rather than being
+    sent to them, so they can be arbitrarily large, and can be things that
+    can't be pickled, like compiled expressions. Each item and result is
+    pickled.
+
+    Returns: The list of results, in the same order as the items.
+    """
+    global _fork_state
+    with _fork_state_lock:
+        _fork_state = (func, shared_state)
+        try:
+            # The workers are forked while the pool is created.
+            pool = multiprocessing.Pool(min(num_workers, len(items)))
+        finally:
+            _fork_state = None
+    try:
+        result = pool.map(_call_with_fork_state, items, chunksize=1)
+    except BaseException:
+        pool.terminate()
+        pool.join()
+        raise
+    pool.close()
+    pool.join()
+    return result
+
+
+def _call_with_fork_state(item):
+    func, shared_state = _fork_state
+    return func(shared_state, item)
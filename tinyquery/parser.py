@@ -15,6 +15,19 @@ precedence = (
     ('left', 'STAR', 'DIVIDED_BY', 'MOD'),
 )
 
+start = 'query'
+
+
+def p_query(p):
+    """query : select
+             | EXPLAIN select
+             | EXPLAIN ANALYZE select
+    """
+    if len(p) == 2:
+        p[0] = p[1]
+    else:
+        p[0] = tq_ast.Explain(p[len(p) - 1], len(p) == 4)
+
 
 def p_select(p):
     """select : SELECT select_field_list optional_limit
@@ -22,9 +35,12 @@ def p_select(p):
                     optional_group_by optional_order_by optional_limit
     """
     if len(p) == 4:
-        p[0] = tq_ast.Select(p[2], None, None, None, None, p[3], None)
+        p[0] = tq_ast.Select(p[2], None, None, None, False, None, p[3],
+                             None)
     elif len(p) == 9:
-        p[0] = tq_ast.Select(p[2], p[4], p[5], p[6], p[7], p[8], None)
+        groups, is_group_each = p[6]
+        p[0] = tq_ast.Select(p[2], p[4], p[5], groups, is_group_each, p[7],
+                             p[8], None)
     else:
         assert False, 'Unexpected number of captured tokens.'
 
@@ -44,10 +60,11 @@ def p_optional_group_by(p):
                          | GROUP BY column_id_list
                          | GROUP EACH BY column_id_list
     """
+    # The result is a pair of the groups and whether EACH was given.
     if len(p) == 1:
-        p[0] = None
+        p[0] = None, False
     else:
-        p[0] = p[len(p) - 1]
+        p[0] = p[len(p) - 1], len(p) == 5
 
 
 def p_optional_order_by(p):
@@ -129,7 +146,8 @@ def p_table_expr_join(p):
                        | aliased_table_expr JOIN EACH aliased_table_expr \
                             ON expression
     """
-    p[0] = tq_ast.Join(p[1], p[len(p) - 3], p[len(p) - 1], is_left_outer=False)
+    p[0] = tq_ast.Join(p[1], p[len(p) - 3], p[len(p) - 1], is_left_outer=False,
+                       is_each=len(p) == 7)
 
 
 def p_table_expr_left_outer_join(p):
@@ -138,7 +156,8 @@ def p_table_expr_left_outer_join(p):
                        | aliased_table_expr LEFT OUTER JOIN EACH \
                          aliased_table_expr ON expression
     """
-    p[0] = tq_ast.Join(p[1], p[len(p) - 3], p[len(p) - 1], is_left_outer=True)
+    p[0] = tq_ast.Join(p[1], p[len(p) - 3], p[len(p) - 1], is_left_outer=True,
+                       is_each=len(p) == 9)
 
 
 def p_table_expr_cross_join(p):
@@ -173,10 +192,10 @@ def p_aliased_table_expr(p):
     else:
         if isinstance(p[1], tq_ast.TableId):
             p[0] = tq_ast.TableId(p[1].name, p[len(p) - 1])
+        elif isinstance(p[1], tq_ast.TableFunction):
+            p[0] = tq_ast.TableFunction(p[1].name, p[1].args, p[len(p) - 1])
         elif isinstance(p[1], tq_ast.Select):
-            p[0] = tq_ast.Select(p[1].select_fields, p[1].table_expr,
-                                 p[1].where_expr, p[1].groups, p[1].orderings,
-                                 p[1].limit, p[len(p) - 1])
+            p[0] = p[1]._replace(alias=p[len(p) - 1])
         else:
             assert False, 'Unexpected table_expr type: %s' % type(p[1])
 
@@ -186,6 +205,11 @@ def p_table_id(p):
     p[0] = tq_ast.TableId(p[1], None)
 
 
+def p_table_function(p):
+    """table_expr : ID LPAREN arg_list RPAREN"""
+    p[0] = tq_ast.TableFunction(p[1].lower(), p[3], None)
+
+
 def p_select_table_expression(p):
     """table_expr : select"""
     p[0] = p[1]
@@ -388,12 +412,21 @@ def p_error(p):
     raise SyntaxError('Unexpected token: %s' % p)
 
 
-def parse_text(text):
+def get_parser():
     # If you're making changes to the parser, you need to run the the code with
     # SHOULD_REBUILD_PARSER=1 in order to update it.
     should_rebuild_parser = int(os.getenv('SHOULD_REBUILD_PARSER', '0'))
     if should_rebuild_parser:
-        parser = yacc.yacc()
+        return yacc.yacc()
     else:
-        parser = yacc.yacc(debug=0, write_tables=0)
-    return parser.parse(text, lexer=lexer.get_lexer())
+        return yacc.yacc(debug=0, write_tables=0)
+
+
+def parse_text(text):
+    return get_parser().parse(text, lexer=lexer.get_lexer())
+
+
+def parse_tokens(tokens):
+    """Parse a list of tokens from lexer.lex_text."""
+    token_iter = iter(tokens)
+    return get_parser().parse(tokenfunc=lambda: next(token_iter, None))
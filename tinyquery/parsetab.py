@@ -1,13 +1,14 @@
 
-# /Users/cburnham/work/tinyquery/parsetab.py
+# parsetab.py
 # This file is automatically generated. Do not edit.
-_tabversion = '3.5'
+# pylint: disable=W,C,R
+_tabversion = '3.10'
 
 _lr_method = 'LALR'
 
-_lr_signature = '848ED66DFF74862312A4846ABF98E3CA'
+_lr_signature = 'queryleftEQUALSNOT_EQUALGREATER_THANLESS_THANGREATER_THAN_OR_EQUALLESS_THAN_OR_EQUALleftPLUSMINUSleftSTARDIVIDED_BYMODANALYZE AND AS ASC BY COMMA COUNT CROSS DESC DISTINCT DIVIDED_BY DOT EACH EQUALS EXPLAIN FALSE FLOAT FROM GREATER_THAN GREATER_THAN_OR_EQUAL GROUP ID IN IS JOIN LEFT LESS_THAN LESS_THAN_OR_EQUAL LIMIT LPAREN MINUS MOD NOT NOT_EQUAL NULL NUMBER ON OR ORDER OUTER PLUS RPAREN SELECT STAR STRING TRUE WHEREquery : select\n             | EXPLAIN select\n             | EXPLAIN ANALYZE select\n    select : SELECT select_field_list optional_limit\n              | SELECT select_field_list FROM full_table_expr optional_where                     optional_group_by optional_order_by optional_limit\n    optional_where :\n                      | WHERE expression\n    optional_group_by :\n                         | GROUP BY column_id_list\n                         | GROUP EACH BY column_id_list\n    optional_order_by :\n                         | ORDER BY order_by_listorder_by_list : strict_order_by_list\n                     | strict_order_by_list COMMAstrict_order_by_list : ordering\n                            | strict_order_by_list COMMA orderingordering : column_id\n                | column_id ASCordering : column_id DESCcolumn_id_list : strict_column_id_list\n                      | strict_column_id_list COMMAstrict_column_id_list : column_id\n                             | strict_column_id_list COMMA column_id\n    optional_limit :\n                      | LIMIT NUMBER\n    full_table_expr : aliased_table_expr_listfull_table_expr : aliased_table_expr JOIN aliased_table_expr                             ON expression\n                       | aliased_table_expr JOIN EACH aliased_table_expr                             ON expression\n    full_table_expr : aliased_table_expr LEFT OUTER JOIN                          aliased_table_expr ON expression\n                       | aliased_table_expr LEFT OUTER JOIN EACH                          aliased_table_expr ON expression\n    full_table_expr : aliased_table_expr CROSS JOIN aliased_table_expraliased_table_expr_list : strict_aliased_table_expr_list\n                               | strict_aliased_table_expr_list COMMAstrict_aliased_table_expr_list : aliased_table_expr\n                                      | strict_aliased_table_expr_list COMMA                                             aliased_table_expr\n    aliased_table_expr : table_expr\n                          | table_expr ID\n                          | table_expr AS IDtable_expr : id_component_listtable_expr : ID LPAREN arg_list RPARENtable_expr : selecttable_expr : LPAREN table_expr RPARENselect_field_list : strict_select_field_list\n                         | strict_select_field_list COMMAstrict_select_field_list : select_field\n                                | strict_select_field_list COMMA select_field\n    select_field : expression\n                    | expression ID\n                    | expression AS ID\n    select_field : STARexpression : LPAREN expression RPARENexpression : MINUS expressionexpression : expression IS NULLexpression : expression IS NOT NULLexpression : expression PLUS expression\n                  | expression MINUS expression\n                  | expression STAR expression\n                  | expression DIVIDED_BY expression\n                  | expression MOD expression\n                  | expression EQUALS expression\n                  | expression NOT_EQUAL expression\n                  | expression GREATER_THAN expression\n                  | expression LESS_THAN expression\n                  | expression GREATER_THAN_OR_EQUAL expression\n                  | expression LESS_THAN_OR_EQUAL expression\n                  | expression AND expression\n                  | expression OR expression\n    expression : ID LPAREN arg_list RPARENexpression : COUNT LPAREN arg_list RPARENexpression : COUNT LPAREN DISTINCT arg_list RPARENexpression : COUNT LPAREN parenthesized_star RPARENparenthesized_star : STAR\n                          | LPAREN parenthesized_star RPARENarg_list :\n                | expression\n                | arg_list COMMA expressionexpression : expression IN LPAREN constant_list RPARENconstant_list : strict_constant_list\n                     | strict_constant_list COMMAstrict_constant_list : constant\n                            | strict_constant_list COMMA constantexpression : constantconstant : NUMBERconstant : FLOATconstant : STRINGconstant : TRUEconstant : FALSEconstant : NULLexpression : column_idcolumn_id : id_component_listid_component_list : ID\n                         | id_component_list DOT ID'
     
-_lr_action_items = {'GROUP':([3,4,5,6,7,8,10,11,12,14,16,17,18,19,20,22,25,29,42,47,54,55,56,57,59,60,61,62,63,64,66,67,68,69,70,71,72,73,75,76,77,79,80,81,82,83,84,86,89,96,97,98,99,103,106,108,109,114,115,116,118,124,127,129,130,131,133,137,138,139,140,141,142,143,146,147,148,149,150,152,153,],[-46,-79,-86,-78,-84,-82,-81,-41,-85,-21,-83,-87,-80,-39,-43,-48,-1,-40,-44,-88,-36,-37,-23,-3,-87,-31,-33,-29,-22,-47,-42,-53,-61,-59,-52,-57,-54,-51,-49,-56,-45,-58,-62,-60,-63,-55,-67,-65,107,-34,-30,-64,-50,-66,-8,-4,-38,-35,-32,-73,-21,-28,-2,-19,-17,-6,-24,-9,-10,-12,-14,-18,-7,-25,-11,-15,-16,-20,-26,-13,-27,]),'LESS_THAN_OR_EQUAL':([4,5,6,7,8,10,12,16,17,18,20,22,27,47,53,64,67,68,69,70,71,72,73,75,76,79,80,81,82,83,84,86,98,99,103,104,108,116,133,143,150,153,],[-79,-86,-78,-84,-82,-81,-85,-83,-87,-80,31,-48,31,-88,31,-47,-53,-61,-59,-52,-57,-54,-51,-49,-56,-58,31,-60,31,-55,-67,-65,-64,-50,-66,31,31,-73,31,31,31,31,]),'NUMBER':([2,9,15,23,26,28,29,30,31,32,33,34,35,36,38,41,43,44,45,46,50,52,78,87,90,117,122,134,144,151,],[4,4,4,4,63,4,4,4,4,4,4,4,4,4,4,4,4,4,4,4,4,4,4,4,4,4,4,4,4,4,]),'LIMIT':([3,4,5,6,7,8,10,11,12,14,16,17,18,19,20,22,25,29,42,47,54,55,56,57,59,60,61,62,63,64,66,67,68,69,70,71,72,73,75,76,77,79,80,81,82,83,84,86,89,96,97,98,99,103,106,108,109,114,115,116,118,124,127,129,130,131,133,137,138,139,140,141,142,143,146,147,148,149,150,152,153,],[-46,-79,-86,-78,-84,-82,-81,-41,-85,26,-83,-87,-80,-39,-43,-48,-1,-40,-44,-88,-36,-37,-23,-3,-87,-31,-33,-29,-22,-47,-42,-53,-61,-59,-52,-57,-54,-51,-49,-56,-45,-58,-62,-60,-63,-55,-67,-65,-5,-34,-30,-64,-50,-66,-8,-4,-38,-35,-32,-73,26,-28,-2,-19,-17,-6,-24,-9,-10,-12,-14,-18,-7,-25,-11,-15,-16,-20,-26,-13,-27,]),'STAR':([2,4,5,6,7,8,10,12,16,17,18,20,22,23,27,29,47,52,53,64,67,68,69,70,71,72,73,75,76,79,80,81,82,83,84,86,98,99,103,104,108,116,133,143,150,153,],[3,-79,-86,-78,-84,-82,-81,-85,-83,-87,-80,30,30,48,30,3,-88,48,30,-47,-53,30,30,30,30,-54,30,-49,30,30,30,30,30,-55,-67,-65,-64,-50,-66,30,30,-73,30,30,30,30,]),'LESS_THAN':([4,5,6,7,8,10,12,16,17,18,20,22,27,47,53,64,67,68,69,70,71,72,73,75,76,79,80,81,82,83,84,86,98,99,103,104,108,116,133,143,150,153,],[-79,-86,-78,-84,-82,-81,-85,-83,-87,-80,32,-48,32,-88,32,-47,-53,-61,-59,-52,-57,-54,-51,-49,-56,-58,32,-60,32,-55,-67,-65,-64,-50,-66,32,32,-73,32,32,32,32,]),'NULL':([2,9,15,23,28,29,30,31,32,33,34,35,36,37,38,41,43,44,45,46,50,52,74,78,87,90,117,122,134,144,151,],[7,7,7,7,7,7,7,7,7,7,7,7,7,75,7,7,7,7,7,7,7,7,99,7,7,7,7,7,7,7,7,]),'TRUE':([2,9,15,23,28,29,30,31,32,33,34,35,36,38,41,43,44,45,46,50,52,78,87,90,117,122,134,144,151,],[8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,]),'ORDER':([3,4,5,6,7,8,10,11,12,14,16,17,18,19,20,22,25,29,42,47,54,55,56,57,59,60,61,62,63,64,66,67,68,69,70,71,72,73,75,76,77,79,80,81,82,83,84,86,89,96,97,98,99,103,106,108,109,114,115,116,118,124,127,129,130,131,133,137,138,139,140,141,142,143,146,147,148,149,150,152,153,],[-46,-79,-86,-78,-84,-82,-81,-41,-85,-21,-83,-87,-80,-39,-43,-48,-1,-40,-44,-88,-36,-37,-23,-3,-87,-31,-33,-29,-22,-47,-42,-53,-61,-59,-52,-57,-54,-51,-49,-56,-45,-58,-62,-60,-63,-55,-67,-65,-5,-34,-30,-64,-50,-66,119,-4,-38,-35,-32,-73,-21,-28,-2,-19,-17,-6,-24,-9,-10,-12,-14,-18,-7,-25,-11,-15,-16,-20,-26,-13,-27,]),'SELECT':([0,24,58,92,97,111,112,125,136,],[2,2,2,2,2,2,2,2,2,]),'NOT_EQUAL':([4,5,6,7,8,10,12,16,17,18,20,22,27,47,53,64,67,68,69,70,71,72,73,75,76,79,80,81,82,83,84,86,98,99,103,104,108,116,133,143,150,153,],[-79,-86,-78,-84,-82,-81,-85,-83,-87,-80,34,-48,34,-88,34,-47,-53,-61,-59,-52,-57,-54,-51,-49,-56,-58,34,-60,34,-55,-67,-65,-64,-50,-66,34,34,-73,34,34,34,34,]),'RPAREN':([3,4,5,6,7,8,10,11,12,14,16,17,18,19,20,22,23,25,27,28,29,42,47,48,49,50,51,53,54,55,56,57,59,60,61,62,63,64,65,66,67,68,69,70,71,72,73,75,76,77,79,80,81,82,83,84,85,86,88,89,91,96,97,98,99,100,101,102,103,104,105,106,108,109,114,115,116,117,118,124,126,127,129,130,131,133,137,138,139,140,141,142,143,146,147,148,149,150,152,153,],[-46,-79,-86,-78,-84,-82,-81,-41,-85,-21,-83,-87,-80,-39,-43,-48,-70,-1,64,-70,-40,-44,-88,-68,84,-70,86,-71,-36,-37,-23,-3,-87,-31,-33,-29,-22,-47,98,-42,-53,-61,-59,-52,-57,-54,-51,-49,-56,-45,-58,-62,-60,-63,-55,-67,103,-65,105,-5,109,-34,-30,-64,-50,116,-74,-76,-66,-72,-69,-8,-4,-38,-35,-32,-73,-75,-21,-28,-77,-2,-19,-17,-6,-24,-9,-10,-12,-14,-18,-7,-25,-11,-15,-16,-20,-26,-13,-27,]),'DISTINCT':([23,],[50,]),'DIVIDED_BY':([4,5,6,7,8,10,12,16,17,18,20,22,27,47,53,64,67,68,69,70,71,72,73,75,76,79,80,81,82,83,84,86,98,99,103,104,108,116,133,143,150,153,],[-79,-86,-78,-84,-82,-81,-85,-83,-87,-80,35,35,35,-88,35,-47,-53,35,35,35,35,-54,35,-49,35,35,35,35,35,-55,-67,-65,-64,-50,-66,35,35,-73,35,35,35,35,]),'FALSE':([2,9,15,23,28,29,30,31,32,33,34,35,36,38,41,43,44,45,46,50,52,78,87,90,117,122,134,144,151,],[16,16,16,16,16,16,16,16,16,16,16,16,16,16,16,16,16,16,16,16,16,16,16,16,16,16,16,16,16,]),'MINUS':([2,4,5,6,7,8,9,10,12,15,16,17,18,20,22,23,27,28,29,30,31,32,33,34,35,36,38,41,43,44,45,46,47,50,52,53,64,67,68,69,70,71,72,73,75,76,79,80,81,82,83,84,86,87,90,98,99,103,104,108,116,122,133,134,143,144,150,151,153,],[9,-79,-86,-78,-84,-82,9,-81,-85,9,-83,-87,-80,33,-48,9,33,9,9,9,9,9,9,9,9,9,9,9,9,9,9,9,-88,9,9,33,-47,-53,33,33,-52,33,-54,-51,-49,33,33,33,33,33,-55,-67,-65,9,9,-64,-50,-66,33,33,-73,9,33,9,33,9,33,9,33,]),'ASC':([5,47,59,140,],[-86,-88,-87,147,]),'COMMA':([3,4,5,6,7,8,10,11,12,14,16,17,18,19,20,22,23,25,28,29,42,47,50,51,53,54,55,56,57,59,60,61,62,63,64,65,66,67,68,69,70,71,72,73,75,76,77,79,80,81,82,83,84,85,86,89,96,97,98,99,101,102,103,104,106,108,109,114,115,116,118,124,126,127,129,130,131,133,137,138,139,140,141,142,143,146,147,148,149,150,152,153,],[-46,-79,-86,-78,-84,-82,-81,-41,-85,-21,-83,-87,-80,29,-43,-48,-70,-1,-70,-40,-44,-88,-70,87,-71,-36,-37,-23,-3,-87,-31,-33,97,-22,-47,87,-42,-53,-61,-59,-52,-57,-54,-51,-49,-56,-45,-58,-62,-60,-63,-55,-67,87,-65,-5,-34,-30,-64,-50,117,-76,-66,-72,-8,-4,-38,-35,-32,-73,-21,-28,-77,-2,-19,141,-6,-24,-9,146,-12,-14,-18,-7,-25,-11,-15,-16,-20,-26,-13,-27,]),'DOT':([5,17,47,54,59,],[21,-87,-88,21,-87,]),'PLUS':([4,5,6,7,8,10,12,16,17,18,20,22,27,47,53,64,67,68,69,70,71,72,73,75,76,79,80,81,82,83,84,86,98,99,103,104,108,116,133,143,150,153,],[-79,-86,-78,-84,-82,-81,-85,-83,-87,-80,36,-48,36,-88,36,-47,-53,36,36,-52,36,-54,-51,-49,36,36,36,36,36,-55,-67,-65,-64,-50,-66,36,36,-73,36,36,36,36,]),'BY':([107,119,121,],[120,128,132,]),'$end':([1,3,4,5,6,7,8,10,11,12,14,16,17,18,19,20,22,25,29,42,47,54,55,56,57,59,60,61,62,63,64,66,67,68,69,70,71,72,73,75,76,77,79,80,81,82,83,84,86,89,96,97,98,99,103,106,108,109,114,115,116,118,124,127,129,130,131,133,137,138,139,140,141,142,143,146,147,148,149,150,152,153,],[0,-46,-79,-86,-78,-84,-82,-81,-41,-85,-21,-83,-87,-80,-39,-43,-48,-1,-40,-44,-88,-36,-37,-23,-3,-87,-31,-33,-29,-22,-47,-42,-53,-61,-59,-52,-57,-54,-51,-49,-56,-45,-58,-62,-60,-63,-55,-67,-65,-5,-34,-30,-64,-50,-66,-8,-4,-38,-35,-32,-73,-21,-28,-2,-19,-17,-6,-24,-9,-10,-12,-14,-18,-7,-25,-11,-15,-16,-20,-26,-13,-27,]),'COUNT':([2,9,15,23,28,29,30,31,32,33,34,35,36,38,41,43,44,45,46,50,52,87,90,122,134,144,151,],[13,13,13,13,13,13,13,13,13,13,13,13,13,13,13,13,13,13,13,13,13,13,13,13,13,13,13,]),'OUTER':([94,],[113,]),'STRING':([2,9,15,23,28,29,30,31,32,33,34,35,36,38,41,43,44,45,46,50,52,78,87,90,117,122,134,144,151,],[10,10,10,10,10,10,10,10,10,10,10,10,10,10,10,10,10,10,10,10,10,10,10,10,10,10,10,10,10,]),'IS':([4,5,6,7,8,10,12,16,17,18,20,22,27,47,53,64,67,68,69,70,71,72,73,75,76,79,80,81,82,83,84,86,98,99,103,104,108,116,133,143,150,153,],[-79,-86,-78,-84,-82,-81,-85,-83,-87,-80,37,-48,37,-88,37,-47,-53,-61,-59,-52,-57,-54,-51,-49,-56,-58,37,-60,37,-55,-67,-65,-64,-50,-66,37,37,-73,37,37,37,37,]),'EQUALS':([4,5,6,7,8,10,12,16,17,18,20,22,27,47,53,64,67,68,69,70,71,72,73,75,76,79,80,81,82,83,84,86,98,99,103,104,108,116,133,143,150,153,],[-79,-86,-78,-84,-82,-81,-85,-83,-87,-80,38,-48,38,-88,38,-47,-53,-61,-59,-52,-57,-54,-51,-49,-56,-58,38,-60,38,-55,-67,-65,-64,-50,-66,38,38,-73,38,38,38,38,]),'CROSS':([3,4,5,6,7,8,10,11,12,14,16,17,18,19,20,22,25,29,42,47,54,55,56,57,59,60,61,62,63,64,66,67,68,69,70,71,72,73,75,76,77,79,80,81,82,83,84,86,89,96,97,98,99,103,106,108,109,114,115,116,118,124,127,129,130,131,133,137,138,139,140,141,142,143,146,147,148,149,150,152,153,],[-46,-79,-86,-78,-84,-82,-81,-41,-85,-21,-83,-87,-80,-39,-43,-48,-1,-40,-44,-88,-36,-37,-23,-3,-87,93,-33,-29,-22,-47,-42,-53,-61,-59,-52,-57,-54,-51,-49,-56,-45,-58,-62,-60,-63,-55,-67,-65,-5,-34,-30,-64,-50,-66,-8,-4,-38,-35,-32,-73,-21,-28,-2,-19,-17,-6,-24,-9,-10,-12,-14,-18,-7,-25,-11,-15,-16,-20,-26,-13,-27,]),'AS':([3,4,5,6,7,8,10,11,12,14,16,17,18,19,20,22,25,29,42,47,54,55,56,57,59,60,61,62,63,64,66,67,68,69,70,71,72,73,75,76,77,79,80,81,82,83,84,86,89,96,97,98,99,103,106,108,109,114,115,116,118,124,127,129,130,131,133,137,138,139,140,141,142,143,146,147,148,149,150,152,153,],[-46,-79,-86,-78,-84,-82,-81,-41,-85,-21,-83,-87,-80,-39,39,-48,-1,-40,-44,-88,-36,-37,-23,-3,-87,-31,95,-29,-22,-47,-42,-53,-61,-59,-52,-57,-54,-51,-49,-56,-45,-58,-62,-60,-63,-55,-67,-65,-5,-34,-30,-64,-50,-66,-8,-4,-38,-35,-32,-73,-21,-28,-2,-19,-17,-6,-24,-9,-10,-12,-14,-18,-7,-25,-11,-15,-16,-20,-26,-13,-27,]),'LPAREN':([2,9,13,15,17,23,24,28,29,30,31,32,33,34,35,36,38,40,41,43,44,45,46,50,52,58,87,90,92,97,111,112,122,125,134,136,144,151,],[15,15,23,15,28,52,58,15,15,15,15,15,15,15,15,15,15,78,15,15,15,15,15,15,52,58,15,15,58,58,58,58,15,58,15,58,15,15,]),'IN':([4,5,6,7,8,10,12,16,17,18,20,22,27,47,53,64,67,68,69,70,71,72,73,75,76,79,80,81,82,83,84,86,98,99,103,104,108,116,133,143,150,153,],[-79,-86,-78,-84,-82,-81,-85,-83,-87,-80,40,-48,40,-88,40,-47,-53,-61,-59,-52,-57,-54,-51,-49,-56,-58,40,-60,40,-55,-67,-65,-64,-50,-66,40,40,-73,40,40,40,40,]),'GREATER_THAN':([4,5,6,7,8,10,12,16,17,18,20,22,27,47,53,64,67,68,69,70,71,72,73,75,76,79,80,81,82,83,84,86,98,99,103,104,108,116,133,143,150,153,],[-79,-86,-78,-84,-82,-81,-85,-83,-87,-80,41,-48,41,-88,41,-47,-53,-61,-59,-52,-57,-54,-51,-49,-56,-58,41,-60,41,-55,-67,-65,-64,-50,-66,41,41,-73,41,41,41,41,]),'JOIN':([3,4,5,6,7,8,10,11,12,14,16,17,18,19,20,22,25,29,42,47,54,55,56,57,59,60,61,62,63,64,66,67,68,69,70,71,72,73,75,76,77,79,80,81,82,83,84,86,89,93,96,97,98,99,103,106,108,109,113,114,115,116,118,124,127,129,130,131,133,137,138,139,140,141,142,143,146,147,148,149,150,152,153,],[-46,-79,-86,-78,-84,-82,-81,-41,-85,-21,-83,-87,-80,-39,-43,-48,-1,-40,-44,-88,-36,-37,-23,-3,-87,92,-33,-29,-22,-47,-42,-53,-61,-59,-52,-57,-54,-51,-49,-56,-45,-58,-62,-60,-63,-55,-67,-65,-5,112,-34,-30,-64,-50,-66,-8,-4,-38,125,-35,-32,-73,-21,-28,-2,-19,-17,-6,-24,-9,-10,-12,-14,-18,-7,-25,-11,-15,-16,-20,-26,-13,-27,]),'WHERE':([3,4,5,6,7,8,10,11,12,14,16,17,18,19,20,22,25,29,42,47,54,55,56,57,59,60,61,62,63,64,66,67,68,69,70,71,72,73,75,76,77,79,80,81,82,83,84,86,89,96,97,98,99,103,106,108,109,114,115,116,118,124,127,129,130,131,133,137,138,139,140,141,142,143,146,147,148,149,150,152,153,],[-46,-79,-86,-78,-84,-82,-81,-41,-85,-21,-83,-87,-80,-39,-43,-48,-1,-40,-44,-88,-36,-37,-23,90,-87,-31,-33,-29,-22,-47,-42,-53,-61,-59,-52,-57,-54,-51,-49,-56,-45,-58,-62,-60,-63,-55,-67,-65,-5,-34,-30,-64,-50,-66,-8,-4,-38,-35,-32,-73,-21,-28,-2,-19,-17,-6,-24,-9,-10,-12,-14,-18,-7,-25,-11,-15,-16,-20,-26,-13,-27,]),'ID':([2,3,4,5,6,7,8,9,10,11,12,14,15,16,17,18,19,20,21,22,23,24,25,28,29,30,31,32,33,34,35,36,38,39,41,42,43,44,45,46,47,50,52,54,55,56,57,58,59,60,61,62,63,64,66,67,68,69,70,71,72,73,75,76,77,79,80,81,82,83,84,86,87,89,90,92,95,96,97,98,99,103,106,108,109,111,112,114,115,116,118,120,122,124,125,127,128,129,130,131,132,133,134,136,137,138,139,140,141,142,143,144,146,147,148,149,150,151,152,153,],[17,-46,-79,-86,-78,-84,-82,17,-81,-41,-85,-21,17,-83,-87,-80,-39,42,47,-48,17,59,-1,17,17,17,17,17,17,17,17,17,17,77,17,-44,17,17,17,17,-88,17,17,-36,-37,-23,-3,59,-87,-31,96,-29,-22,-47,-42,-53,-61,-59,-52,-57,-54,-51,-49,-56,-45,-58,-62,-60,-63,-55,-67,-65,17,-5,17,59,114,-34,59,-64,-50,-66,-8,-4,-38,59,59,-35,-32,-73,-21,59,17,-28,59,-2,59,-19,-17,-6,59,-24,17,59,-9,-10,-12,-14,59,-7,-25,17,59,-15,-16,-20,-26,17,-13,-27,]),'DESC':([5,47,59,140,],[-86,-88,-87,148,]),'AND':([4,5,6,7,8,10,12,16,17,18,20,22,27,47,53,64,67,68,69,70,71,72,73,75,76,79,80,81,82,83,84,86,98,99,103,104,108,116,133,143,150,153,],[-79,-86,-78,-84,-82,-81,-85,-83,-87,-80,43,-48,43,-88,43,-47,-53,-61,-59,-52,-57,-54,-51,-49,-56,-58,43,-60,43,-55,-67,-65,-64,-50,-66,43,43,-73,43,43,43,43,]),'ON':([3,4,5,6,7,8,10,11,12,14,16,17,18,19,20,22,25,29,42,47,54,55,56,57,59,60,61,62,63,64,66,67,68,69,70,71,72,73,75,76,77,79,80,81,82,83,84,86,89,96,97,98,99,103,106,108,109,110,114,115,116,118,123,124,127,129,130,131,133,135,137,138,139,140,141,142,143,145,146,147,148,149,150,152,153,],[-46,-79,-86,-78,-84,-82,-81,-41,-85,-21,-83,-87,-80,-39,-43,-48,-1,-40,-44,-88,-36,-37,-23,-3,-87,-31,-33,-29,-22,-47,-42,-53,-61,-59,-52,-57,-54,-51,-49,-56,-45,-58,-62,-60,-63,-55,-67,-65,-5,-34,-30,-64,-50,-66,-8,-4,-38,122,-35,-32,-73,-21,134,-28,-2,-19,-17,-6,-24,144,-9,-10,-12,-14,-18,-7,-25,151,-11,-15,-16,-20,-26,-13,-27,]),'FROM':([3,4,5,6,7,8,10,11,12,14,16,17,18,19,20,22,29,42,47,64,66,67,68,69,70,71,72,73,75,76,77,79,80,81,82,83,84,86,98,99,103,116,],[-46,-79,-86,-78,-84,-82,-81,-41,-85,24,-83,-87,-80,-39,-43,-48,-40,-44,-88,-47,-42,-53,-61,-59,-52,-57,-54,-51,-49,-56,-45,-58,-62,-60,-63,-55,-67,-65,-64,-50,-66,-73,]),'GREATER_THAN_OR_EQUAL':([4,5,6,7,8,10,12,16,17,18,20,22,27,47,53,64,67,68,69,70,71,72,73,75,76,79,80,81,82,83,84,86,98,99,103,104,108,116,133,143,150,153,],[-79,-86,-78,-84,-82,-81,-85,-83,-87,-80,44,-48,44,-88,44,-47,-53,-61,-59,-52,-57,-54,-51,-49,-56,-58,44,-60,44,-55,-67,-65,-64,-50,-66,44,44,-73,44,44,44,44,]),'FLOAT':([2,9,15,23,28,29,30,31,32,33,34,35,36,38,41,43,44,45,46,50,52,78,87,90,117,122,134,144,151,],[18,18,18,18,18,18,18,18,18,18,18,18,18,18,18,18,18,18,18,18,18,18,18,18,18,18,18,18,18,]),'EACH':([92,107,125,],[111,121,136,]),'NOT':([37,],[74,]),'LEFT':([3,4,5,6,7,8,10,11,12,14,16,17,18,19,20,22,25,29,42,47,54,55,56,57,59,60,61,62,63,64,66,67,68,69,70,71,72,73,75,76,77,79,80,81,82,83,84,86,89,96,97,98,99,103,106,108,109,114,115,116,118,124,127,129,130,131,133,137,138,139,140,141,142,143,146,147,148,149,150,152,153,],[-46,-79,-86,-78,-84,-82,-81,-41,-85,-21,-83,-87,-80,-39,-43,-48,-1,-40,-44,-88,-36,-37,-23,-3,-87,94,-33,-29,-22,-47,-42,-53,-61,-59,-52,-57,-54,-51,-49,-56,-45,-58,-62,-60,-63,-55,-67,-65,-5,-34,-30,-64,-50,-66,-8,-4,-38,-35,-32,-73,-21,-28,-2,-19,-17,-6,-24,-9,-10,-12,-14,-18,-7,-25,-11,-15,-16,-20,-26,-13,-27,]),'OR':([4,5,6,7,8,10,12,16,17,18,20,22,27,47,53,64,67,68,69,70,71,72,73,75,76,79,80,81,82,83,84,86,98,99,103,104,108,116,133,143,150,153,],[-79,-86,-78,-84,-82,-81,-85,-83,-87,-80,45,-48,45,-88,45,-47,-53,-61,-59,-52,-57,-54,-51,-49,-56,-58,45,-60,45,-55,-67,-65,-64,-50,-66,45,45,-73,45,45,45,45,]),'MOD':([4,5,6,7,8,10,12,16,17,18,20,22,27,47,53,64,67,68,69,70,71,72,73,75,76,79,80,81,82,83,84,86,98,99,103,104,108,116,133,143,150,153,],[-79,-86,-78,-84,-82,-81,-85,-83,-87,-80,46,46,46,-88,46,-47,-53,46,46,46,46,-54,46,-49,46,46,46,46,46,-55,-67,-65,-64,-50,-66,46,46,-73,46,46,46,46,]),}
+_lr_action_items = {'GROUP':([7,8,9,10,11,12,14,15,16,18,20,21,22,23,24,27,30,34,47,52,59,60,61,62,64,65,66,67,68,69,71,72,73,74,75,76,77,78,80,81,82,84,85,86,87,88,89,91,94,102,103,104,105,109,112,114,115,121,122,123,125,129,132,135,137,138,139,140,142,146,147,148,149,150,151,152,155,156,157,158,159,161,162,],[-50,-83,-90,-82,-88,-86,-85,-45,-89,-24,-87,-91,-84,-43,-47,-52,-4,-44,-48,-92,-39,-41,-26,-6,-91,-34,-36,-32,-25,-51,-46,-57,-65,-63,-56,-61,-58,-55,-53,-60,-49,-62,-66,-64,-67,-59,-71,-69,113,-37,-33,-68,-54,-70,-11,-7,-42,-38,-35,-77,-24,-40,-31,-5,-22,-20,-9,-91,-27,-12,-13,-15,-17,-21,-10,-28,-14,-18,-19,-23,-29,-16,-30,]),'EXPLAIN':([0,],[1,]),'NUMBER':([4,13,19,28,31,33,34,35,36,37,38,39,40,41,43,46,48,49,50,51,55,57,83,92,95,97,124,130,143,153,160,],[8,8,8,8,68,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,]),'LIMIT':([7,8,9,10,11,12,14,15,16,18,20,21,22,23,24,27,30,34,47,52,59,60,61,62,64,65,66,67,68,69,71,72,73,74,75,76,77,78,80,81,82,84,85,86,87,88,89,91,94,102,103,104,105,109,112,114,115,121,122,123,125,129,132,135,137,138,139,140,142,146,147,148,149,150,151,152,155,156,157,158,159,161,162,],[-50,-83,-90,-82,-88,-86,-85,-45,-89,31,-87,-91,-84,-43,-47,-52,-4,-44,-48,-92,-39,-41,-26,-6,-91,-34,-36,-32,-25,-51,-46,-57,-65,-63,-56,-61,-58,-55,-53,-60,-49,-62,-66,-64,-67,-59,-71,-69,-8,-37,-33,-68,-54,-70,-11,-7,-42,-38,-35,-77,31,-40,-31,-5,-22,-20,-9,-91,-27,-12,-13,-15,-17,-21,-10,-28,-14,-18,-19,-23,-29,-16,-30,]),'STAR':([4,8,9,10,11,12,14,16,20,21,22,24,27,28,32,34,52,57,58,69,72,73,74,75,76,77,78,80,81,84,85,86,87,88,89,91,104,105,109,110,114,123,142,152,159,162,],[7,-83,-90,-82,-88,-86,-85,-89,-87,-91,-84,35,35,53,35,7,-92,53,35,-51,-57,35,35,35,35,-58,35,-53,35,35,35,35,35,-59,-71,-69,-68,-54,-70,35,35,-77,35,35,35,35,]),'LESS_THAN':([8,9,10,11,12,14,16,20,21,22,24,27,32,52,58,69,72,73,74,75,76,77,78,80,81,84,85,86,87,88,89,91,104,105,109,110,114,123,142,152,159,162,],[-83,-90,-82,-88,-86,-85,-89,-87,-91,-84,37,-52,37,-92,37,-51,-57,-65,-63,-56,-61,-58,-55,-53,-60,-62,37,-64,37,-59,-71,-69,-68,-54,-70,37,37,-77,37,37,37,37,]),'NULL':([4,13,19,28,33,34,35,36,37,38,39,40,41,42,43,46,48,49,50,51,55,57,79,83,92,95,97,124,130,143,153,160,],[11,11,11,11,11,11,11,11,11,11,11,11,11,80,11,11,11,11,11,11,11,11,105,11,11,11,11,11,11,11,11,11,]),'TRUE':([4,13,19,28,33,34,35,36,37,38,39,40,41,43,46,48,49,50,51,55,57,83,92,95,97,124,130,143,153,160,],[12,12,12,12,12,12,12,12,12,12,12,12,12,12,12,12,12,12,12,12,12,12,12,12,12,12,12,12,12,12,]),'MINUS':([4,8,9,10,11,12,13,14,16,19,20,21,22,24,27,28,32,33,34,35,36,37,38,39,40,41,43,46,48,49,50,51,52,55,57,58,69,72,73,74,75,76,77,78,80,81,84,85,86,87,88,89,91,92,95,97,104,105,109,110,114,123,130,142,143,152,153,159,160,162,],[13,-83,-90,-82,-88,-86,13,-85,-89,13,-87,-91,-84,38,-52,13,38,13,13,13,13,13,13,13,13,13,13,13,13,13,13,13,-92,13,13,38,-51,-57,38,38,-56,38,-58,-55,-53,38,38,38,38,38,-59,-71,-69,13,13,13,-68,-54,-70,38,38,-77,13,38,13,38,13,38,13,38,]),'SELECT':([0,1,6,29,63,98,103,118,119,133,145,],[4,4,4,4,4,4,4,4,4,4,4,]),'NOT_EQUAL':([8,9,10,11,12,14,16,20,21,22,24,27,32,52,58,69,72,73,74,75,76,77,78,80,81,84,85,86,87,88,89,91,104,105,109,110,114,123,142,152,159,162,],[-83,-90,-82,-88,-86,-85,-89,-87,-91,-84,39,-52,39,-92,39,-51,-57,-65,-63,-56,-61,-58,-55,-53,-60,-62,39,-64,39,-59,-71,-69,-68,-54,-70,39,39,-77,39,39,39,39,]),'RPAREN':([7,8,9,10,11,12,14,15,16,18,20,21,22,23,24,27,28,30,32,33,34,47,52,53,54,55,56,58,59,60,61,62,64,65,66,67,68,69,70,71,72,73,74,75,76,77,78,80,81,82,84,85,86,87,88,89,90,91,93,94,96,97,102,103,104,105,106,107,108,109,110,111,112,114,115,116,121,122,123,124,125,129,132,134,135,137,138,139,140,142,146,147,148,149,150,151,152,155,156,157,158,159,161,162,],[-50,-83,-90,-82,-88,-86,-85,-45,-89,-24,-87,-91,-84,-43,-47,-52,-74,-4,69,-74,-44,-48,-92,-72,89,-74,91,-75,-39,-41,-26,-6,-91,-34,-36,-32,-25,-51,104,-46,-57,-65,-63,-56,-61,-58,-55,-53,-60,-49,-62,-66,-64,-67,-59,-71,109,-69,111,-8,115,-74,-37,-33,-68,-54,123,-78,-80,-70,-76,-73,-11,-7,-42,129,-38,-35,-77,-79,-24,-40,-31,-81,-5,-22,-20,-9,-91,-27,-12,-13,-15,-17,-21,-10,-28,-14,-18,-19,-23,-29,-16,-30,]),'DISTINCT':([28,],[55,]),'DIVIDED_BY':([8,9,10,11,12,14,16,20,21,22,24,27,32,52,58,69,72,73,74,75,76,77,78,80,81,84,85,86,87,88,89,91,104,105,109,110,114,123,142,152,159,162,],[-83,-90,-82,-88,-86,-85,-89,-87,-91,-84,40,40,40,-92,40,-51,-57,40,40,40,40,-58,40,-53,40,40,40,40,40,-59,-71,-69,-68,-54,-70,40,40,-77,40,40,40,40,]),'FALSE':([4,13,19,28,33,34,35,36,37,38,39,40,41,43,46,48,49,50,51,55,57,83,92,95,97,124,130,143,153,160,],[20,20,20,20,20,20,20,20,20,20,20,20,20,20,20,20,20,20,20,20,20,20,20,20,20,20,20,20,20,20,]),'ORDER':([7,8,9,10,11,12,14,15,16,18,20,21,22,23,24,27,30,34,47,52,59,60,61,62,64,65,66,67,68,69,71,72,73,74,75,76,77,78,80,81,82,84,85,86,87,88,89,91,94,102,103,104,105,109,112,114,115,121,122,123,125,129,132,135,137,138,139,140,142,146,147,148,149,150,151,152,155,156,157,158,159,161,162,],[-50,-83,-90,-82,-88,-86,-85,-45,-89,-24,-87,-91,-84,-43,-47,-52,-4,-44,-48,-92,-39,-41,-26,-6,-91,-34,-36,-32,-25,-51,-46,-57,-65,-63,-56,-61,-58,-55,-53,-60,-49,-62,-66,-64,-67,-59,-71,-69,-8,-37,-33,-68,-54,-70,126,-7,-42,-38,-35,-77,-24,-40,-31,-5,-22,-20,-9,-91,-27,-12,-13,-15,-17,-21,-10,-28,-14,-18,-19,-23,-29,-16,-30,]),'ASC':([9,52,140,149,],[-90,-92,-91,156,]),'COMMA':([7,8,9,10,11,12,14,15,16,18,20,21,22,23,24,27,28,30,33,34,47,52,55,56,58,59,60,61,62,64,65,66,67,68,69,70,71,72,73,74,75,76,77,78,80,81,82,84,85,86,87,88,89,90,91,94,97,102,103,104,105,107,108,109,110,112,114,115,116,121,122,123,125,129,132,134,135,137,138,139,140,142,146,147,148,149,150,151,152,155,156,157,158,159,161,162,],[-50,-83,-90,-82,-88,-86,-85,-45,-89,-24,-87,-91,-84,34,-47,-52,-74,-4,-74,-44,-48,-92,-74,92,-75,-39,-41,-26,-6,-91,-34,-36,103,-25,-51,92,-46,-57,-65,-63,-56,-61,-58,-55,-53,-60,-49,-62,-66,-64,-67,-59,-71,92,-69,-8,-74,-37,-33,-68,-54,124,-80,-70,-76,-11,-7,-42,92,-38,-35,-77,-24,-40,-31,-81,-5,-22,150,-9,-91,-27,-12,155,-15,-17,-21,-10,-28,-14,-18,-19,-23,-29,-16,-30,]),'DOT':([9,21,52,59,64,140,],[26,-91,-92,26,-91,-91,]),'PLUS':([8,9,10,11,12,14,16,20,21,22,24,27,32,52,58,69,72,73,74,75,76,77,78,80,81,84,85,86,87,88,89,91,104,105,109,110,114,123,142,152,159,162,],[-83,-90,-82,-88,-86,-85,-89,-87,-91,-84,41,-52,41,-92,41,-51,-57,41,41,-56,41,-58,-55,-53,41,41,41,41,41,-59,-71,-69,-68,-54,-70,41,41,-77,41,41,41,41,]),'BY':([113,126,128,],[127,136,141,]),'LESS_THAN_OR_EQUAL':([8,9,10,11,12,14,16,20,21,22,24,27,32,52,58,69,72,73,74,75,76,77,78,80,81,84,85,86,87,88,89,91,104,105,109,110,114,123,142,152,159,162,],[-83,-90,-82,-88,-86,-85,-89,-87,-91,-84,36,-52,36,-92,36,-51,-57,-65,-63,-56,-61,-58,-55,-53,-60,-62,36,-64,36,-59,-71,-69,-68,-54,-70,36,36,-77,36,36,36,36,]),'$end':([2,3,5,7,8,9,10,11,12,14,15,16,18,20,21,22,23,24,25,27,30,34,47,52,59,60,61,62,64,65,66,67,68,69,71,72,73,74,75,76,77,78,80,81,82,84,85,86,87,88,89,91,94,102,103,104,105,109,112,114,115,121,122,123,125,129,132,135,137,138,139,140,142,146,147,148,149,150,151,152,155,156,157,158,159,161,162,],[-1,0,-2,-50,-83,-90,-82,-88,-86,-85,-45,-89,-24,-87,-91,-84,-43,-47,-3,-52,-4,-44,-48,-92,-39,-41,-26,-6,-91,-34,-36,-32,-25,-51,-46,-57,-65,-63,-56,-61,-58,-55,-53,-60,-49,-62,-66,-64,-67,-59,-71,-69,-8,-37,-33,-68,-54,-70,-11,-7,-42,-38,-35,-77,-24,-40,-31,-5,-22,-20,-9,-91,-27,-12,-13,-15,-17,-21,-10,-28,-14,-18,-19,-23,-29,-16,-30,]),'COUNT':([4,13,19,28,33,34,35,36,37,38,39,40,41,43,46,48,49,50,51,55,57,92,95,97,130,143,153,160,],[17,17,17,17,17,17,17,17,17,17,17,17,17,17,17,17,17,17,17,17,17,17,17,17,17,17,17,17,]),'OUTER':([100,],[120,]),'STRING':([4,13,19,28,33,34,35,36,37,38,39,40,41,43,46,48,49,50,51,55,57,83,92,95,97,124,130,143,153,160,],[14,14,14,14,14,14,14,14,14,14,14,14,14,14,14,14,14,14,14,14,14,14,14,14,14,14,14,14,14,14,]),'IS':([8,9,10,11,12,14,16,20,21,22,24,27,32,52,58,69,72,73,74,75,76,77,78,80,81,84,85,86,87,88,89,91,104,105,109,110,114,123,142,152,159,162,],[-83,-90,-82,-88,-86,-85,-89,-87,-91,-84,42,-52,42,-92,42,-51,-57,-65,-63,-56,-61,-58,-55,-53,-60,-62,42,-64,42,-59,-71,-69,-68,-54,-70,42,42,-77,42,42,42,42,]),'EQUALS':([8,9,10,11,12,14,16,20,21,22,24,27,32,52,58,69,72,73,74,75,76,77,78,80,81,84,85,86,87,88,89,91,104,105,109,110,114,123,142,152,159,162,],[-83,-90,-82,-88,-86,-85,-89,-87,-91,-84,43,-52,43,-92,43,-51,-57,-65,-63,-56,-61,-58,-55,-53,-60,-62,43,-64,43,-59,-71,-69,-68,-54,-70,43,43,-77,43,43,43,43,]),'CROSS':([7,8,9,10,11,12,14,15,16,18,20,21,22,23,24,27,30,34,47,52,59,60,61,62,64,65,66,67,68,69,71,72,73,74,75,76,77,78,80,81,82,84,85,86,87,88,89,91,94,102,103,104,105,109,112,114,115,121,122,123,125,129,132,135,137,138,139,140,142,146,147,148,149,150,151,152,155,156,157,158,159,161,162,],[-50,-83,-90,-82,-88,-86,-85,-45,-89,-24,-87,-91,-84,-43,-47,-52,-4,-44,-48,-92,-39,-41,-26,-6,-91,99,-36,-32,-25,-51,-46,-57,-65,-63,-56,-61,-58,-55,-53,-60,-49,-62,-66,-64,-67,-59,-71,-69,-8,-37,-33,-68,-54,-70,-11,-7,-42,-38,-35,-77,-24,-40,-31,-5,-22,-20,-9,-91,-27,-12,-13,-15,-17,-21,-10,-28,-14,-18,-19,-23,-29,-16,-30,]),'AS':([7,8,9,10,11,12,14,15,16,18,20,21,22,23,24,27,30,34,47,52,59,60,61,62,64,65,66,67,68,69,71,72,73,74,75,76,77,78,80,81,82,84,85,86,87,88,89,91,94,102,103,104,105,109,112,114,115,121,122,123,125,129,132,135,137,138,139,140,142,146,147,148,149,150,151,152,155,156,157,158,159,161,162,],[-50,-83,-90,-82,-88,-86,-85,-45,-89,-24,-87,-91,-84,-43,44,-52,-4,-44,-48,-92,-39,-41,-26,-6,-91,-34,101,-32,-25,-51,-46,-57,-65,-63,-56,-61,-58,-55,-53,-60,-49,-62,-66,-64,-67,-59,-71,-69,-8,-37,-33,-68,-54,-70,-11,-7,-42,-38,-35,-77,-24,-40,-31,-5,-22,-20,-9,-91,-27,-12,-13,-15,-17,-21,-10,-28,-14,-18,-19,-23,-29,-16,-30,]),'LPAREN':([4,13,17,19,21,28,29,33,34,35,36,37,38,39,40,41,43,45,46,48,49,50,51,55,57,63,64,92,95,97,98,103,118,119,130,133,143,145,153,160,],[19,19,28,19,33,57,63,19,19,19,19,19,19,19,19,19,19,83,19,19,19,19,19,19,57,63,97,19,19,19,63,63,63,63,19,63,19,63,19,19,]),'IN':([8,9,10,11,12,14,16,20,21,22,24,27,32,52,58,69,72,73,74,75,76,77,78,80,81,84,85,86,87,88,89,91,104,105,109,110,114,123,142,152,159,162,],[-83,-90,-82,-88,-86,-85,-89,-87,-91,-84,45,-52,45,-92,45,-51,-57,-65,-63,-56,-61,-58,-55,-53,-60,-62,45,-64,45,-59,-71,-69,-68,-54,-70,45,45,-77,45,45,45,45,]),'GREATER_THAN':([8,9,10,11,12,14,16,20,21,22,24,27,32,52,58,69,72,73,74,75,76,77,78,80,81,84,85,86,87,88,89,91,104,105,109,110,114,123,142,152,159,162,],[-83,-90,-82,-88,-86,-85,-89,-87,-91,-84,46,-52,46,-92,46,-51,-57,-65,-63,-56,-61,-58,-55,-53,-60,-62,46,-64,46,-59,-71,-69,-68,-54,-70,46,46,-77,46,46,46,46,]),'JOIN':([7,8,9,10,11,12,14,15,16,18,20,21,22,23,24,27,30,34,47,52,59,60,61,62,64,65,66,67,68,69,71,72,73,74,75,76,77,78,80,81,82,84,85,86,87,88,89,91,94,99,102,103,104,105,109,112,114,115,120,121,122,123,125,129,132,135,137,138,139,140,142,146,147,148,149,150,151,152,155,156,157,158,159,161,162,],[-50,-83,-90,-82,-88,-86,-85,-45,-89,-24,-87,-91,-84,-43,-47,-52,-4,-44,-48,-92,-39,-41,-26,-6,-91,98,-36,-32,-25,-51,-46,-57,-65,-63,-56,-61,-58,-55,-53,-60,-49,-62,-66,-64,-67,-59,-71,-69,-8,119,-37,-33,-68,-54,-70,-11,-7,-42,133,-38,-35,-77,-24,-40,-31,-5,-22,-20,-9,-91,-27,-12,-13,-15,-17,-21,-10,-28,-14,-18,-19,-23,-29,-16,-30,]),'ANALYZE':([1,],[6,]),'WHERE':([7,8,9,10,11,12,14,15,16,18,20,21,22,23,24,27,30,34,47,52,59,60,61,62,64,65,66,67,68,69,71,72,73,74,75,76,77,78,80,81,82,84,85,86,87,88,89,91,94,102,103,104,105,109,112,114,115,121,122,123,125,129,132,135,137,138,139,140,142,146,147,148,149,150,151,152,155,156,157,158,159,161,162,],[-50,-83,-90,-82,-88,-86,-85,-45,-89,-24,-87,-91,-84,-43,-47,-52,-4,-44,-48,-92,-39,-41,-26,95,-91,-34,-36,-32,-25,-51,-46,-57,-65,-63,-56,-61,-58,-55,-53,-60,-49,-62,-66,-64,-67,-59,-71,-69,-8,-37,-33,-68,-54,-70,-11,-7,-42,-38,-35,-77,-24,-40,-31,-5,-22,-20,-9,-91,-27,-12,-13,-15,-17,-21,-10,-28,-14,-18,-19,-23,-29,-16,-30,]),'ID':([4,7,8,9,10,11,12,13,14,15,16,18,19,20,21,22,23,24,26,27,28,29,30,33,34,35,36,37,38,39,40,41,43,44,46,47,48,49,50,51,52,55,57,59,60,61,62,63,64,65,66,67,68,69,71,72,73,74,75,76,77,78,80,81,82,84,85,86,87,88,89,91,92,94,95,97,98,101,102,103,104,105,109,112,114,115,118,119,121,122,123,125,127,129,130,132,133,135,136,137,138,139,140,141,142,143,145,146,147,148,149,150,151,152,153,155,156,157,158,159,160,161,162,],[21,-50,-83,-90,-82,-88,-86,21,-85,-45,-89,-24,21,-87,-91,-84,-43,47,52,-52,21,64,-4,21,21,21,21,21,21,21,21,21,21,82,21,-48,21,21,21,21,-92,21,21,-39,-41,-26,-6,64,-91,-34,102,-32,-25,-51,-46,-57,-65,-63,-56,-61,-58,-55,-53,-60,-49,-62,-66,-64,-67,-59,-71,-69,21,-8,21,21,64,121,-37,64,-68,-54,-70,-11,-7,-42,64,64,-38,-35,-77,-24,140,-40,21,-31,64,-5,140,-22,-20,-9,-91,140,-27,21,64,-12,-13,-15,-17,140,-10,-28,21,140,-18,-19,-23,-29,21,-16,-30,]),'DESC':([9,52,140,149,],[-90,-92,-91,157,]),'AND':([8,9,10,11,12,14,16,20,21,22,24,27,32,52,58,69,72,73,74,75,76,77,78,80,81,84,85,86,87,88,89,91,104,105,109,110,114,123,142,152,159,162,],[-83,-90,-82,-88,-86,-85,-89,-87,-91,-84,48,-52,48,-92,48,-51,-57,-65,-63,-56,-61,-58,-55,-53,-60,-62,48,-64,48,-59,-71,-69,-68,-54,-70,48,48,-77,48,48,48,48,]),'ON':([7,8,9,10,11,12,14,15,16,18,20,21,22,23,24,27,30,34,47,52,59,60,61,62,64,65,66,67,68,69,71,72,73,74,75,76,77,78,80,81,82,84,85,86,87,88,89,91,94,102,103,104,105,109,112,114,115,117,121,122,123,125,129,131,132,135,137,138,139,140,142,144,146,147,148,149,150,151,152,154,155,156,157,158,159,161,162,],[-50,-83,-90,-82,-88,-86,-85,-45,-89,-24,-87,-91,-84,-43,-47,-52,-4,-44,-48,-92,-39,-41,-26,-6,-91,-34,-36,-32,-25,-51,-46,-57,-65,-63,-56,-61,-58,-55,-53,-60,-49,-62,-66,-64,-67,-59,-71,-69,-8,-37,-33,-68,-54,-70,-11,-7,-42,130,-38,-35,-77,-24,-40,143,-31,-5,-22,-20,-9,-91,-27,153,-12,-13,-15,-17,-21,-10,-28,160,-14,-18,-19,-23,-29,-16,-30,]),'FROM':([7,8,9,10,11,12,14,15,16,18,20,21,22,23,24,27,34,47,52,69,71,72,73,74,75,76,77,78,80,81,82,84,85,86,87,88,89,91,104,105,109,123,],[-50,-83,-90,-82,-88,-86,-85,-45,-89,29,-87,-91,-84,-43,-47,-52,-44,-48,-92,-51,-46,-57,-65,-63,-56,-61,-58,-55,-53,-60,-49,-62,-66,-64,-67,-59,-71,-69,-68,-54,-70,-77,]),'GREATER_THAN_OR_EQUAL':([8,9,10,11,12,14,16,20,21,22,24,27,32,52,58,69,72,73,74,75,76,77,78,80,81,84,85,86,87,88,89,91,104,105,109,110,114,123,142,152,159,162,],[-83,-90,-82,-88,-86,-85,-89,-87,-91,-84,49,-52,49,-92,49,-51,-57,-65,-63,-56,-61,-58,-55,-53,-60,-62,49,-64,49,-59,-71,-69,-68,-54,-70,49,49,-77,49,49,49,49,]),'FLOAT':([4,13,19,28,33,34,35,36,37,38,39,40,41,43,46,48,49,50,51,55,57,83,92,95,97,124,130,143,153,160,],[22,22,22,22,22,22,22,22,22,22,22,22,22,22,22,22,22,22,22,22,22,22,22,22,22,22,22,22,22,22,]),'EACH':([98,113,133,],[118,128,145,]),'NOT':([42,],[79,]),'LEFT':([7,8,9,10,11,12,14,15,16,18,20,21,22,23,24,27,30,34,47,52,59,60,61,62,64,65,66,67,68,69,71,72,73,74,75,76,77,78,80,81,82,84,85,86,87,88,89,91,94,102,103,104,105,109,112,114,115,121,122,123,125,129,132,135,137,138,139,140,142,146,147,148,149,150,151,152,155,156,157,158,159,161,162,],[-50,-83,-90,-82,-88,-86,-85,-45,-89,-24,-87,-91,-84,-43,-47,-52,-4,-44,-48,-92,-39,-41,-26,-6,-91,100,-36,-32,-25,-51,-46,-57,-65,-63,-56,-61,-58,-55,-53,-60,-49,-62,-66,-64,-67,-59,-71,-69,-8,-37,-33,-68,-54,-70,-11,-7,-42,-38,-35,-77,-24,-40,-31,-5,-22,-20,-9,-91,-27,-12,-13,-15,-17,-21,-10,-28,-14,-18,-19,-23,-29,-16,-30,]),'OR':([8,9,10,11,12,14,16,20,21,22,24,27,32,52,58,69,72,73,74,75,76,77,78,80,81,84,85,86,87,88,89,91,104,105,109,110,114,123,142,152,159,162,],[-83,-90,-82,-88,-86,-85,-89,-87,-91,-84,50,-52,50,-92,50,-51,-57,-65,-63,-56,-61,-58,-55,-53,-60,-62,50,-64,50,-59,-71,-69,-68,-54,-70,50,50,-77,50,50,50,50,]),'MOD':([8,9,10,11,12,14,16,20,21,22,24,27,32,52,58,69,72,73,74,75,76,77,78,80,81,84,85,86,87,88,89,91,104,105,109,110,114,123,142,152,159,162,],[-83,-90,-82,-88,-86,-85,-89,-87,-91,-84,51,51,51,-92,51,-51,-57,51,51,51,51,-58,51,-53,51,51,51,51,51,-59,-71,-69,-68,-54,-70,51,51,-77,51,51,51,51,]),}
 
 _lr_action = {}
 for _k, _v in _lr_action_items.items():
@@ -16,7 +17,7 @@ for _k, _v in _lr_action_items.items():
       _lr_action[_x][_k] = _y
 del _lr_action_items
 
-_lr_goto_items = {'constant':([2,9,15,23,28,29,30,31,32,33,34,35,36,38,41,43,44,45,46,50,52,78,87,90,117,122,134,144,151,],[6,6,6,6,6,6,6,6,6,6,6,6,6,6,6,6,6,6,6,6,6,102,6,6,126,6,6,6,6,]),'parenthesized_star':([23,52,],[49,88,]),'column_id':([2,9,15,23,28,29,30,31,32,33,34,35,36,38,41,43,44,45,46,50,52,87,90,120,122,128,132,134,141,144,146,151,],[12,12,12,12,12,12,12,12,12,12,12,12,12,12,12,12,12,12,12,12,12,12,12,129,12,140,129,12,149,12,140,12,]),'select':([0,24,58,92,97,111,112,125,136,],[1,55,55,55,55,55,55,55,55,]),'strict_order_by_list':([128,],[138,]),'select_field':([2,29,],[11,66,]),'optional_order_by':([106,],[118,]),'column_id_list':([120,132,],[131,142,]),'ordering':([128,146,],[139,152,]),'optional_where':([57,],[89,]),'id_component_list':([2,9,15,23,24,28,29,30,31,32,33,34,35,36,38,41,43,44,45,46,50,52,58,87,90,92,97,111,112,120,122,125,128,132,134,136,141,144,146,151,],[5,5,5,5,54,5,5,5,5,5,5,5,5,5,5,5,5,5,5,5,5,5,54,5,5,54,54,54,54,5,5,54,5,5,5,54,5,5,5,5,]),'strict_constant_list':([78,],[101,]),'strict_column_id_list':([120,132,],[130,130,]),'arg_list':([23,28,50,],[51,65,85,]),'aliased_table_expr_list':([24,],[56,]),'order_by_list':([128,],[137,]),'optional_group_by':([89,],[106,]),'select_field_list':([2,],[14,]),'full_table_expr':([24,],[57,]),'constant_list':([78,],[100,]),'optional_limit':([14,118,],[25,127,]),'aliased_table_expr':([24,92,97,111,112,125,136,],[60,110,115,123,124,135,145,]),'expression':([2,9,15,23,28,29,30,31,32,33,34,35,36,38,41,43,44,45,46,50,52,87,90,122,134,144,151,],[20,22,27,53,53,20,67,68,69,70,71,72,73,76,79,80,81,82,83,53,27,104,108,133,143,150,153,]),'strict_select_field_list':([2,],[19,]),'table_expr':([24,58,92,97,111,112,125,136,],[61,91,61,61,61,61,61,61,]),'strict_aliased_table_expr_list':([24,],[62,]),}
+_lr_goto_items = {'constant':([4,13,19,28,33,34,35,36,37,38,39,40,41,43,46,48,49,50,51,55,57,83,92,95,97,124,130,143,153,160,],[10,10,10,10,10,10,10,10,10,10,10,10,10,10,10,10,10,10,10,10,10,108,10,10,10,134,10,10,10,10,]),'parenthesized_star':([28,57,],[54,93,]),'query':([0,],[3,]),'column_id':([4,13,19,28,33,34,35,36,37,38,39,40,41,43,46,48,49,50,51,55,57,92,95,97,127,130,136,141,143,150,153,155,160,],[16,16,16,16,16,16,16,16,16,16,16,16,16,16,16,16,16,16,16,16,16,16,16,16,137,16,149,137,16,158,16,149,16,]),'select':([0,1,6,29,63,98,103,118,119,133,145,],[2,5,25,60,60,60,60,60,60,60,60,]),'strict_order_by_list':([136,],[147,]),'select_field':([4,34,],[15,71,]),'optional_order_by':([112,],[125,]),'column_id_list':([127,141,],[139,151,]),'ordering':([136,155,],[148,161,]),'optional_where':([62,],[94,]),'id_component_list':([4,13,19,28,29,33,34,35,36,37,38,39,40,41,43,46,48,49,50,51,55,57,63,92,95,97,98,103,118,119,127,130,133,136,141,143,145,150,153,155,160,],[9,9,9,9,59,9,9,9,9,9,9,9,9,9,9,9,9,9,9,9,9,9,59,9,9,9,59,59,59,59,9,9,59,9,9,9,59,9,9,9,9,]),'strict_constant_list':([83,],[107,]),'strict_column_id_list':([127,141,],[138,138,]),'arg_list':([28,33,55,97,],[56,70,90,116,]),'aliased_table_expr_list':([29,],[61,]),'order_by_list':([136,],[146,]),'optional_group_by':([94,],[112,]),'select_field_list':([4,],[18,]),'full_table_expr':([29,],[62,]),'constant_list':([83,],[106,]),'optional_limit':([18,125,],[30,135,]),'aliased_table_expr':([29,98,103,118,119,133,145,],[65,117,122,131,132,144,154,]),'expression':([4,13,19,28,33,34,35,36,37,38,39,40,41,43,46,48,49,50,51,55,57,92,95,97,130,143,153,160,],[24,27,32,58,58,24,72,73,74,75,76,77,78,81,84,85,86,87,88,58,32,110,114,58,142,152,159,162,]),'strict_select_field_list':([4,],[23,]),'table_expr':([29,63,98,103,118,119,133,145,],[66,96,66,66,66,66,66,66,]),'strict_aliased_table_expr_list':([29,],[67,]),}
 
 _lr_goto = {}
 for _k, _v in _lr_goto_items.items():
@@ -25,93 +26,97 @@ for _k, _v in _lr_goto_items.items():
        _lr_goto[_x][_k] = _y
 del _lr_goto_items
 _lr_productions = [
-  ("S' -> select","S'",1,None,None,None),
-  ('select -> SELECT select_field_list optional_limit','select',3,'p_select','parser.py',21),
-  ('select -> SELECT select_field_list FROM full_table_expr optional_where optional_group_by optional_order_by optional_limit','select',8,'p_select','parser.py',22),
-  ('optional_where -> <empty>','optional_where',0,'p_optional_where','parser.py',34),
-  ('optional_where -> WHERE expression','optional_where',2,'p_optional_where','parser.py',35),
-  ('optional_group_by -> <empty>','optional_group_by',0,'p_optional_group_by','parser.py',44),
-  ('optional_group_by -> GROUP BY column_id_list','optional_group_by',3,'p_optional_group_by','parser.py',45),
-  ('optional_group_by -> GROUP EACH BY column_id_list','optional_group_by',4,'p_optional_group_by','parser.py',46),
-  ('optional_order_by -> <empty>','optional_order_by',0,'p_optional_order_by','parser.py',55),
-  ('optional_order_by -> ORDER BY order_by_list','optional_order_by',3,'p_optional_order_by','parser.py',56),
-  ('order_by_list -> strict_order_by_list','order_by_list',1,'p_order_by_list','parser.py',64),
-  ('order_by_list -> strict_order_by_list COMMA','order_by_list',2,'p_order_by_list','parser.py',65),
-  ('strict_order_by_list -> ordering','strict_order_by_list',1,'p_strict_order_by_list','parser.py',70),
-  ('strict_order_by_list -> strict_order_by_list COMMA ordering','strict_order_by_list',3,'p_strict_order_by_list','parser.py',71),
-  ('ordering -> column_id','ordering',1,'p_ordering_asc','parser.py',80),
-  ('ordering -> column_id ASC','ordering',2,'p_ordering_asc','parser.py',81),
-  ('ordering -> column_id DESC','ordering',2,'p_ordering_desc','parser.py',86),
-  ('column_id_list -> strict_column_id_list','column_id_list',1,'p_column_id_list','parser.py',91),
-  ('column_id_list -> strict_column_id_list COMMA','column_id_list',2,'p_column_id_list','parser.py',92),
-  ('strict_column_id_list -> column_id','strict_column_id_list',1,'p_strict_column_id_list','parser.py',97),
-  ('strict_column_id_list -> strict_column_id_list COMMA column_id','strict_column_id_list',3,'p_strict_column_id_list','parser.py',98),
-  ('optional_limit -> <empty>','optional_limit',0,'p_optional_limit','parser.py',108),
-  ('optional_limit -> LIMIT NUMBER','optional_limit',2,'p_optional_limit','parser.py',109),
-  ('full_table_expr -> aliased_table_expr_list','full_table_expr',1,'p_table_expr_table_or_union','parser.py',118),
-  ('full_table_expr -> aliased_table_expr JOIN aliased_table_expr ON expression','full_table_expr',5,'p_table_expr_join','parser.py',128),
-  ('full_table_expr -> aliased_table_expr JOIN EACH aliased_table_expr ON expression','full_table_expr',6,'p_table_expr_join','parser.py',129),
-  ('full_table_expr -> aliased_table_expr LEFT OUTER JOIN aliased_table_expr ON expression','full_table_expr',7,'p_table_expr_left_outer_join','parser.py',137),
-  ('full_table_expr -> aliased_table_expr LEFT OUTER JOIN EACH aliased_table_expr ON expression','full_table_expr',8,'p_table_expr_left_outer_join','parser.py',138),
-  ('full_table_expr -> aliased_table_expr CROSS JOIN aliased_table_expr','full_table_expr',4,'p_table_expr_cross_join','parser.py',146),
-  ('aliased_table_expr_list -> strict_aliased_table_expr_list','aliased_table_expr_list',1,'p_aliased_table_expr_list','parser.py',151),
-  ('aliased_table_expr_list -> strict_aliased_table_expr_list COMMA','aliased_table_expr_list',2,'p_aliased_table_expr_list','parser.py',152),
-  ('strict_aliased_table_expr_list -> aliased_table_expr','strict_aliased_table_expr_list',1,'p_strict_aliased_table_expr_list','parser.py',157),
-  ('strict_aliased_table_expr_list -> strict_aliased_table_expr_list COMMA aliased_table_expr','strict_aliased_table_expr_list',3,'p_strict_aliased_table_expr_list','parser.py',158),
-  ('aliased_table_expr -> table_expr','aliased_table_expr',1,'p_aliased_table_expr','parser.py',169),
-  ('aliased_table_expr -> table_expr ID','aliased_table_expr',2,'p_aliased_table_expr','parser.py',170),
-  ('aliased_table_expr -> table_expr AS ID','aliased_table_expr',3,'p_aliased_table_expr','parser.py',171),
-  ('table_expr -> id_component_list','table_expr',1,'p_table_id','parser.py',186),
-  ('table_expr -> select','table_expr',1,'p_select_table_expression','parser.py',191),
-  ('table_expr -> LPAREN table_expr RPAREN','table_expr',3,'p_table_expression_parens','parser.py',196),
-  ('select_field_list -> strict_select_field_list','select_field_list',1,'p_select_field_list','parser.py',201),
-  ('select_field_list -> strict_select_field_list COMMA','select_field_list',2,'p_select_field_list','parser.py',202),
-  ('strict_select_field_list -> select_field','strict_select_field_list',1,'p_strict_select_field_list','parser.py',207),
-  ('strict_select_field_list -> strict_select_field_list COMMA select_field','strict_select_field_list',3,'p_strict_select_field_list','parser.py',208),
-  ('select_field -> expression','select_field',1,'p_select_field','parser.py',218),
-  ('select_field -> expression ID','select_field',2,'p_select_field','parser.py',219),
-  ('select_field -> expression AS ID','select_field',3,'p_select_field','parser.py',220),
-  ('select_field -> STAR','select_field',1,'p_select_star','parser.py',230),
-  ('expression -> LPAREN expression RPAREN','expression',3,'p_expression_parens','parser.py',235),
-  ('expression -> MINUS expression','expression',2,'p_expression_unary','parser.py',240),
-  ('expression -> expression IS NULL','expression',3,'p_expression_is_null','parser.py',245),
-  ('expression -> expression IS NOT NULL','expression',4,'p_expression_is_not_null','parser.py',250),
-  ('expression -> expression PLUS expression','expression',3,'p_expression_binary','parser.py',255),
-  ('expression -> expression MINUS expression','expression',3,'p_expression_binary','parser.py',256),
-  ('expression -> expression STAR expression','expression',3,'p_expression_binary','parser.py',257),
-  ('expression -> expression DIVIDED_BY expression','expression',3,'p_expression_binary','parser.py',258),
-  ('expression -> expression MOD expression','expression',3,'p_expression_binary','parser.py',259),
-  ('expression -> expression EQUALS expression','expression',3,'p_expression_binary','parser.py',260),
-  ('expression -> expression NOT_EQUAL expression','expression',3,'p_expression_binary','parser.py',261),
-  ('expression -> expression GREATER_THAN expression','expression',3,'p_expression_binary','parser.py',262),
-  ('expression -> expression LESS_THAN expression','expression',3,'p_expression_binary','parser.py',263),
-  ('expression -> expression GREATER_THAN_OR_EQUAL expression','expression',3,'p_expression_binary','parser.py',264),
-  ('expression -> expression LESS_THAN_OR_EQUAL expression','expression',3,'p_expression_binary','parser.py',265),
-  ('expression -> expression AND expression','expression',3,'p_expression_binary','parser.py',266),
-  ('expression -> expression OR expression','expression',3,'p_expression_binary','parser.py',267),
-  ('expression -> ID LPAREN arg_list RPAREN','expression',4,'p_expression_func_call','parser.py',273),
-  ('expression -> COUNT LPAREN arg_list RPAREN','expression',4,'p_expression_count','parser.py',278),
-  ('expression -> COUNT LPAREN DISTINCT arg_list RPAREN','expression',5,'p_expression_count_distinct','parser.py',283),
-  ('expression -> COUNT LPAREN parenthesized_star RPAREN','expression',4,'p_expression_count_star','parser.py',288),
-  ('parenthesized_star -> STAR','parenthesized_star',1,'p_parenthesized_star','parser.py',294),
-  ('parenthesized_star -> LPAREN parenthesized_star RPAREN','parenthesized_star',3,'p_parenthesized_star','parser.py',295),
-  ('arg_list -> <empty>','arg_list',0,'p_arg_list','parser.py',299),
-  ('arg_list -> expression','arg_list',1,'p_arg_list','parser.py',300),
-  ('arg_list -> arg_list COMMA expression','arg_list',3,'p_arg_list','parser.py',301),
-  ('expression -> expression IN LPAREN constant_list RPAREN','expression',5,'p_expression_in','parser.py',314),
-  ('constant_list -> strict_constant_list','constant_list',1,'p_constant_list','parser.py',319),
-  ('constant_list -> strict_constant_list COMMA','constant_list',2,'p_constant_list','parser.py',320),
-  ('strict_constant_list -> constant','strict_constant_list',1,'p_strict_constant_list','parser.py',325),
-  ('strict_constant_list -> strict_constant_list COMMA constant','strict_constant_list',3,'p_strict_constant_list','parser.py',326),
-  ('expression -> constant','expression',1,'p_expression_constant','parser.py',335),
-  ('constant -> NUMBER','constant',1,'p_int_literal','parser.py',340),
-  ('constant -> FLOAT','constant',1,'p_float_literal','parser.py',345),
-  ('constant -> STRING','constant',1,'p_string_literal','parser.py',350),
-  ('constant -> TRUE','constant',1,'p_true_literal','parser.py',355),
-  ('constant -> FALSE','constant',1,'p_false_literal','parser.py',360),
-  ('constant -> NULL','constant',1,'p_null_literal','parser.py',365),
-  ('expression -> column_id','expression',1,'p_expr_column_id','parser.py',370),
-  ('column_id -> id_component_list','column_id',1,'p_column_id','parser.py',375),
-  ('id_component_list -> ID','id_component_list',1,'p_id_component_list','parser.py',380),
-  ('id_component_list -> id_component_list DOT ID','id_component_list',3,'p_id_component_list','parser.py',381),
+  ("S' -> query","S'",1,None,None,None),
+  ('query -> select','query',1,'p_query','parser.py',22),
+  ('query -> EXPLAIN select','query',2,'p_query','parser.py',23),
+  ('query -> EXPLAIN ANALYZE select','query',3,'p_query','parser.py',24),
+  ('select -> SELECT select_field_list optional_limit','select',3,'p_select','parser.py',33),
+  ('select -> SELECT select_field_list FROM full_table_expr optional_where optional_group_by optional_order_by optional_limit','select',8,'p_select','parser.py',34),
+  ('optional_where -> <empty>','optional_where',0,'p_optional_where','parser.py',49),
+  ('optional_where -> WHERE expression','optional_where',2,'p_optional_where','parser.py',50),
+  ('optional_group_by -> <empty>','optional_group_by',0,'p_optional_group_by','parser.py',59),
+  ('optional_group_by -> GROUP BY column_id_list','optional_group_by',3,'p_optional_group_by','parser.py',60),
+  ('optional_group_by -> GROUP EACH BY column_id_list','optional_group_by',4,'p_optional_group_by','parser.py',61),
+  ('optional_order_by -> <empty>','optional_order_by',0,'p_optional_order_by','parser.py',71),
+  ('optional_order_by -> ORDER BY order_by_list','optional_order_by',3,'p_optional_order_by','parser.py',72),
+  ('order_by_list -> strict_order_by_list','order_by_list',1,'p_order_by_list','parser.py',80),
+  ('order_by_list -> strict_order_by_list COMMA','order_by_list',2,'p_order_by_list','parser.py',81),
+  ('strict_order_by_list -> ordering','strict_order_by_list',1,'p_strict_order_by_list','parser.py',86),
+  ('strict_order_by_list -> strict_order_by_list COMMA ordering','strict_order_by_list',3,'p_strict_order_by_list','parser.py',87),
+  ('ordering -> column_id','ordering',1,'p_ordering_asc','parser.py',96),
+  ('ordering -> column_id ASC','ordering',2,'p_ordering_asc','parser.py',97),
+  ('ordering -> column_id DESC','ordering',2,'p_ordering_desc','parser.py',102),
+  ('column_id_list -> strict_column_id_list','column_id_list',1,'p_column_id_list','parser.py',107),
+  ('column_id_list -> strict_column_id_list COMMA','column_id_list',2,'p_column_id_list','parser.py',108),
+  ('strict_column_id_list -> column_id','strict_column_id_list',1,'p_strict_column_id_list','parser.py',113),
+  ('strict_column_id_list -> strict_column_id_list COMMA column_id','strict_column_id_list',3,'p_strict_column_id_list','parser.py',114),
+  ('optional_limit -> <empty>','optional_limit',0,'p_optional_limit','parser.py',124),
+  ('optional_limit -> LIMIT NUMBER','optional_limit',2,'p_optional_limit','parser.py',125),
+  ('full_table_expr -> aliased_table_expr_list','full_table_expr',1,'p_table_expr_table_or_union','parser.py',134),
+  ('full_table_expr -> aliased_table_expr JOIN aliased_table_expr ON expression','full_table_expr',5,'p_table_expr_join','parser.py',144),
+  ('full_table_expr -> aliased_table_expr JOIN EACH aliased_table_expr ON expression','full_table_expr',6,'p_table_expr_join','parser.py',145),
+  ('full_table_expr -> aliased_table_expr LEFT OUTER JOIN aliased_table_expr ON expression','full_table_expr',7,'p_table_expr_left_outer_join','parser.py',154),
+  ('full_table_expr -> aliased_table_expr LEFT OUTER JOIN EACH aliased_table_expr ON expression','full_table_expr',8,'p_table_expr_left_outer_join','parser.py',155),
+  ('full_table_expr -> aliased_table_expr CROSS JOIN aliased_table_expr','full_table_expr',4,'p_table_expr_cross_join','parser.py',164),
+  ('aliased_table_expr_list -> strict_aliased_table_expr_list','aliased_table_expr_list',1,'p_aliased_table_expr_list','parser.py',169),
+  ('aliased_table_expr_list -> strict_aliased_table_expr_list COMMA','aliased_table_expr_list',2,'p_aliased_table_expr_list','parser.py',170),
+  ('strict_aliased_table_expr_list -> aliased_table_expr','strict_aliased_table_expr_list',1,'p_strict_aliased_table_expr_list','parser.py',175),
+  ('strict_aliased_table_expr_list -> strict_aliased_table_expr_list COMMA aliased_table_expr','strict_aliased_table_expr_list',3,'p_strict_aliased_table_expr_list','parser.py',176),
+  ('aliased_table_expr -> table_expr','aliased_table_expr',1,'p_aliased_table_expr','parser.py',187),
+  ('aliased_table_expr -> table_expr ID','aliased_table_expr',2,'p_aliased_table_expr','parser.py',188),
+  ('aliased_table_expr -> table_expr AS ID','aliased_table_expr',3,'p_aliased_table_expr','parser.py',189),
+  ('table_expr -> id_component_list','table_expr',1,'p_table_id','parser.py',204),
+  ('table_expr -> ID LPAREN arg_list RPAREN','table_expr',4,'p_table_function','parser.py',209),
+  ('table_expr -> select','table_expr',1,'p_select_table_expression','parser.py',214),
+  ('table_expr -> LPAREN table_expr RPAREN','table_expr',3,'p_table_expression_parens','parser.py',219),
+  ('select_field_list -> strict_select_field_list','select_field_list',1,'p_select_field_list','parser.py',224),
+  ('select_field_list -> strict_select_field_list COMMA','select_field_list',2,'p_select_field_list','parser.py',225),
+  ('strict_select_field_list -> select_field','strict_select_field_list',1,'p_strict_select_field_list','parser.py',230),
+  ('strict_select_field_list -> strict_select_field_list COMMA select_field','strict_select_field_list',3,'p_strict_select_field_list','parser.py',231),
+  ('select_field -> expression','select_field',1,'p_select_field','parser.py',241),
+  ('select_field -> expression ID','select_field',2,'p_select_field','parser.py',242),
+  ('select_field -> expression AS ID','select_field',3,'p_select_field','parser.py',243),
+  ('select_field -> STAR','select_field',1,'p_select_star','parser.py',253),
+  ('expression -> LPAREN expression RPAREN','expression',3,'p_expression_parens','parser.py',258),
+  ('expression -> MINUS expression','expression',2,'p_expression_unary','parser.py',263),
+  ('expression -> expression IS NULL','expression',3,'p_expression_is_null','parser.py',268),
+  ('expression -> expression IS NOT NULL','expression',4,'p_expression_is_not_null','parser.py',273),
+  ('expression -> expression PLUS expression','expression',3,'p_expression_binary','parser.py',278),
+  ('expression -> expression MINUS expression','expression',3,'p_expression_binary','parser.py',279),
+  ('expression -> expression STAR expression','expression',3,'p_expression_binary','parser.py',280),
+  ('expression -> expression DIVIDED_BY expression','expression',3,'p_expression_binary','parser.py',281),
+  ('expression -> expression MOD expression','expression',3,'p_expression_binary','parser.py',282),
+  ('expression -> expression EQUALS expression','expression',3,'p_expression_binary','parser.py',283),
+  ('expression -> expression NOT_EQUAL expression','expression',3,'p_expression_binary','parser.py',284),
+  ('expression -> expression GREATER_THAN expression','expression',3,'p_expression_binary','parser.py',285),
+  ('expression -> expression LESS_THAN expression','expression',3,'p_expression_binary','parser.py',286),
+  ('expression -> expression GREATER_THAN_OR_EQUAL expression','expression',3,'p_expression_binary','parser.py',287),
+  ('expression -> expression LESS_THAN_OR_EQUAL expression','expression',3,'p_expression_binary','parser.py',288),
+  ('expression -> expression AND expression','expression',3,'p_expression_binary','parser.py',289),
+  ('expression -> expression OR expression','expression',3,'p_expression_binary','parser.py',290),
+  ('expression -> ID LPAREN arg_list RPAREN','expression',4,'p_expression_func_call','parser.py',296),
+  ('expression -> COUNT LPAREN arg_list RPAREN','expression',4,'p_expression_count','parser.py',301),
+  ('expression -> COUNT LPAREN DISTINCT arg_list RPAREN','expression',5,'p_expression_count_distinct','parser.py',306),
+  ('expression -> COUNT LPAREN parenthesized_star RPAREN','expression',4,'p_expression_count_star','parser.py',311),
+  ('parenthesized_star -> STAR','parenthesized_star',1,'p_parenthesized_star','parser.py',317),
+  ('parenthesized_star -> LPAREN parenthesized_star RPAREN','parenthesized_star',3,'p_parenthesized_star','parser.py',318),
+  ('arg_list -> <empty>','arg_list',0,'p_arg_list','parser.py',322),
+  ('arg_list -> expression','arg_list',1,'p_arg_list','parser.py',323),
+  ('arg_list -> arg_list COMMA expression','arg_list',3,'p_arg_list','parser.py',324),
+  ('expression -> expression IN LPAREN constant_list RPAREN','expression',5,'p_expression_in','parser.py',337),
+  ('constant_list -> strict_constant_list','constant_list',1,'p_constant_list','parser.py',342),
+  ('constant_list -> strict_constant_list COMMA','constant_list',2,'p_constant_list','parser.py',343),
+  ('strict_constant_list -> constant','strict_constant_list',1,'p_strict_constant_list','parser.py',348),
+  ('strict_constant_list -> strict_constant_list COMMA constant','strict_constant_list',3,'p_strict_constant_list','parser.py',349),
+  ('expression -> constant','expression',1,'p_expression_constant','parser.py',358),
+  ('constant -> NUMBER','constant',1,'p_int_literal','parser.py',363),
+  ('constant -> FLOAT','constant',1,'p_float_literal','parser.py',368),
+  ('constant -> STRING','constant',1,'p_string_literal','parser.py',373),
+  ('constant -> TRUE','constant',1,'p_true_literal','parser.py',378),
+  ('constant -> FALSE','constant',1,'p_false_literal','parser.py',383),
+  ('constant -> NULL','constant',1,'p_null_literal','parser.py',388),
+  ('expression -> column_id','expression',1,'p_expr_column_id','parser.py',393),
+  ('column_id -> id_component_list','column_id',1,'p_column_id','parser.py',398),
+  ('id_component_list -> ID','id_component_list',1,'p_id_component_list','parser.py',403),
+  ('id_component_list -> id_component_list DOT ID','id_component_list',3,'p_id_component_list','parser.py',404),
 ]
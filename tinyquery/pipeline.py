@@ -0,0 +1,297 @@
+"""Pull-based evaluation of select statements in batches of rows.
+
+The Evaluator normally builds a full Context for each step of a query before
+the next step runs. For a select over a table, or over a chain of joins
+starting from a table, the steps can instead be a chain of generators that
+pass along batches of at most BATCH_SIZE rows: scan, filter, join probe,
+then project, limit or hash aggregate. Each step only holds the batch it is
+working on, so apart from the result, the memory used is proportional to the
+batch size, plus the hash tables of any joins and aggregates. If the query
+has a memory budget, the batches are made smaller when a full batch would
+take up too much of what's left of it.
+"""
+import array
+import collections
+import itertools
+
+import context
+import evaluator
+import memory
+import spill
+import typed_ast
+
+
+BATCH_SIZE = 10000
+# The most of what's left of a query's memory budget that one batch from a
+# scan may use. Each step of the pipeline can hold a batch at the same time,
+# so a batch gets only a fraction of it.
+BATCH_BUDGET_FRACTION = 0.1
+
+
+def can_evaluate_select(select_ast):
+    """Return True if evaluate_select can evaluate a select statement."""
+    return (can_iter_table_expr(select_ast.table) and
+            (select_ast.group_set is None or
+             evaluator.can_merge_aggregates(select_ast.select_fields)))
+
+
+def can_iter_table_expr(table_expr):
+    """Return True if iter_table_expr_batches can read a table expression."""
+    if isinstance(table_expr, (typed_ast.Table, typed_ast.TablePartitions)):
+        return True
+    # JOIN EACH is left to Evaluator.eval_table_Join, which partitions the
+    # keys of both sides instead of building a hash table of the whole second
+    # table. It evaluates both sides in full, though, rather than in batches.
+    return (isinstance(table_expr, typed_ast.Join) and
+            bool(table_expr.conditions) and not table_expr.is_each and
+            can_iter_table_expr(table_expr.table1))
+
+
+def evaluate_select(tq_evaluator, select_ast, column_keys):
+    """Evaluate a select statement using a pipeline of batches.
+
+    This gives the same result as Evaluator.evaluate_select, except for the
+    order of the groups of a GROUP BY.
+
+    Arguments:
+        tq_evaluator: The Evaluator to evaluate expressions with.
+        select_ast: A typed_ast.Select for which can_evaluate_select is True.
+        column_keys: A set of the (table, column) keys of the columns that
+            the select fields and WHERE expression use.
+    """
+    query_stats = tq_evaluator.query_stats
+    memory_tracker = tq_evaluator.memory_tracker
+    # Passing the WHERE expression to a scan of a base table lets it skip
+    # chunks that can't match.
+    batches = query_stats.timed_batches(
+        'Filter', select_ast,
+        memory_tracker.track_batches(filter_batches(
+            tq_evaluator,
+            iter_table_expr_batches(tq_evaluator, select_ast.table,
+                                    column_keys, select_ast.where_expr),
+            select_ast.where_expr)))
+
+    if select_ast.group_set is not None:
+        with query_stats.timed('Aggregate', select_ast) as stats:
+            result = aggregate_batches(tq_evaluator, batches,
+                                       select_ast.select_fields,
+                                       select_ast.group_set)
+            tq_evaluator.add_output(stats, result)
+        if select_ast.limit is not None:
+            with query_stats.timed('Limit', select_ast) as stats:
+                context.truncate_context(result, select_ast.limit)
+                tq_evaluator.add_output(stats, result)
+        return result
+
+    batches = query_stats.timed_batches(
+        'Project', select_ast,
+        memory_tracker.track_batches(project_batches(
+            tq_evaluator, batches, select_ast.select_fields)))
+    if select_ast.limit is not None:
+        batches = query_stats.timed_batches(
+            'Limit', select_ast, limit_batches(batches, select_ast.limit))
+    result_batches = list(batches)
+    if not result_batches:
+        return tq_evaluator.empty_context_from_select_fields(
+            select_ast.select_fields)
+    result = context.concat_contexts(result_batches)
+    memory_tracker.track_context(result)
+    return result
+
+
+def iter_table_expr_batches(tq_evaluator, table_expr, column_keys,
+                            where_expr=None):
+    """Lazily read a table expression in batches.
+
+    Arguments:
+        tq_evaluator: The Evaluator to evaluate expressions with.
+        table_expr: A table expression for which can_iter_table_expr is
+            True.
+        column_keys: A set of the (table, column) keys of the columns that
+            are needed. The batches may leave out other columns.
+        where_expr: If given, the expression that the batches will be
+            filtered by. If table_expr is a base table, chunks that can't
+            match it are skipped, but the rows aren't filtered here.
+
+    Yields: A context for each batch of rows.
+    """
+    query_stats = tq_evaluator.query_stats
+    if isinstance(table_expr, typed_ast.Join):
+        key_column_keys = {
+            (column_ref.table, column_ref.column)
+            for condition in table_expr.conditions
+            for column_ref in condition}
+        return query_stats.timed_batches(
+            'Join', table_expr,
+            tq_evaluator.memory_tracker.track_batches(probe_join(
+                tq_evaluator,
+                iter_table_expr_batches(tq_evaluator, table_expr.table1,
+                                        column_keys | key_column_keys),
+                table_expr, column_keys | key_column_keys)))
+    return query_stats.timed_batches(
+        'Scan', table_expr,
+        scan_table(tq_evaluator, table_expr, column_keys, where_expr))
+
+
+def scan_table(tq_evaluator, table_expr, column_keys, where_expr=None):
+    """Read a Table or TablePartitions in batches.
+
+    Arguments:
+        tq_evaluator: The Evaluator to evaluate expressions with.
+        table_expr: A typed_ast.Table or typed_ast.TablePartitions.
+        column_keys: A set of the (table, column) keys of the columns that
+            are needed. The batches only have these columns.
+        where_expr: If given, chunks whose column statistics show they can't
+            match this expression are skipped. The rows of the other chunks
+            still need to be filtered.
+
+    Yields: A context for each non-empty batch of rows.
+    """
+    for chunk_context in tq_evaluator.iter_chunk_contexts(table_expr,
+                                                          where_expr):
+        chunk_context = context.project_context(chunk_context, column_keys)
+        batch_size = get_batch_size(tq_evaluator.memory_tracker,
+                                    chunk_context)
+        for start in xrange(0, chunk_context.num_rows, batch_size):
+            yield context.slice_context(chunk_context, start,
+                                        start + batch_size)
+
+
+def get_batch_size(memory_tracker, chunk_context):
+    """Get the number of rows to read from a chunk at a time.
+
+    This is BATCH_SIZE, unless a batch that big would use more than
+    BATCH_BUDGET_FRACTION of what's left of the memory budget, so that
+    queries with small budgets can still run, just in smaller batches.
+    """
+    remaining_bytes = memory_tracker.get_remaining_bytes()
+    if remaining_bytes is None:
+        return BATCH_SIZE
+    row_bytes = max(1, memory.estimate_row_bytes(chunk_context))
+    return max(1, min(BATCH_SIZE, int(remaining_bytes * BATCH_BUDGET_FRACTION)
+                      // row_bytes))
+
+
+def filter_batches(tq_evaluator, batches, where_expr):
+    """Filter each batch, skipping any that end up empty."""
+    for batch in batches:
+        batch = tq_evaluator.filter_context(batch, where_expr)
+        if batch.num_rows > 0:
+            yield batch
+
+
+def probe_join(tq_evaluator, batches, join_expr, column_keys):
+    """Join batches of the first table of a join with its second table.
+
+    The second table is evaluated in full and put in a hash table, and then
+    each batch of the first table is looked up in it. This gives the same
+    rows in the same order as Evaluator.eval_table_Join.
+
+    Arguments:
+        tq_evaluator: The Evaluator to evaluate expressions with.
+        batches: An iterable of batches of the first table of the join.
+        join_expr: A typed_ast.Join with at least one condition.
+        column_keys: A set of the (table, column) keys of the columns that
+            are needed. The columns of the second table are limited to these.
+
+    Yields: A context for each non-empty batch of joined rows.
+    """
+    key_refs1 = [condition.column1 for condition in join_expr.conditions]
+    key_refs2 = [condition.column2 for condition in join_expr.conditions]
+    build_context = context.project_context(
+        tq_evaluator.evaluate_table_expr(join_expr.table2), column_keys)
+    indexes2_by_key = evaluator.get_join_hash_table(build_context,
+                                                    key_refs2)
+    build_row_bytes = memory.estimate_row_bytes(build_context)
+
+    for batch in batches:
+        values1 = evaluator.get_dictionary_join_key(batch, key_refs1)
+        if values1 is not None:
+            indexes1, indexes2 = evaluator.probe_dictionary_join(
+                indexes2_by_key, values1, join_expr.is_left_outer)
+        else:
+            indexes1, indexes2 = probe_join_hash_table(
+                indexes2_by_key, evaluator.get_join_keys(batch, key_refs1),
+                join_expr.is_left_outer)
+        if indexes1:
+            tq_evaluator.memory_tracker.check_allocation(
+                len(indexes1) * (memory.estimate_row_bytes(batch) +
+                                 build_row_bytes))
+            yield evaluator.context_from_join_indexes(
+                batch, build_context, indexes1, indexes2)
+
+
+def probe_join_hash_table(indexes2_by_key, keys1, is_left_outer):
+    """Find the matches for a batch of keys of the first table of a join.
+
+    Returns: The matches, in the same form and order as
+        evaluator.flatten_join_matches.
+    """
+    indexes1 = array.array('l')
+    indexes2 = array.array('l')
+    for index1, key in enumerate(keys1):
+        match_indexes2 = indexes2_by_key.get(key)
+        if match_indexes2 is not None:
+            indexes1.extend(itertools.repeat(index1, len(match_indexes2)))
+            indexes2.extend(match_indexes2)
+        elif is_left_outer:
+            indexes1.append(index1)
+            indexes2.append(-1)
+    return indexes1, indexes2
+
+
+def project_batches(tq_evaluator, batches, select_fields):
+    """Evaluate the select fields for each batch."""
+    for batch in batches:
+        yield tq_evaluator.evaluate_select_fields(select_fields, batch)
+
+
+def limit_batches(batches, limit):
+    """Pass on batches until there are limit rows, and then stop."""
+    # BigQuery allows non-int limits; see context.truncate_context.
+    rows_left = int(limit)
+    if rows_left <= 0:
+        return
+    for batch in batches:
+        if batch.num_rows >= rows_left:
+            context.truncate_context(batch, rows_left)
+            yield batch
+            return
+        rows_left -= batch.num_rows
+        yield batch
+
+
+def aggregate_batches(tq_evaluator, batches, select_fields, group_set):
+    """Group batches of rows and evaluate the select fields for each group.
+
+    Every aggregate call in the select fields must be mergeable, so that each
+    batch can be folded into the partial states for its groups. For GROUP
+    EACH BY, or once the groups don't fit in the memory budget of the query,
+    the partial states are spilled to disk; see spill.aggregate_batches.
+
+    Returns: A context with a row for each group.
+    """
+    aggregation = evaluator.GroupAggregation.create(select_fields, group_set,
+                                                    num_partitions=1)
+    if group_set.is_each:
+        return spill.aggregate_batches(tq_evaluator, aggregation, batches)
+    merged_states = collections.OrderedDict()
+    if aggregation.is_trivial:
+        # Grouping by nothing gives one group even if there are no rows.
+        merged_states[()] = [call.func.partial_state([])
+                             for call in aggregation.aggregate_calls]
+    values_per_group = (len(aggregation.key_column_types) +
+                        len(aggregation.aggregate_calls))
+    memory_tracker = tq_evaluator.memory_tracker
+    batches = iter(batches)
+    for batch in batches:
+        evaluator.merge_group_states(
+            aggregation, merged_states,
+            tq_evaluator.aggregate_rows(aggregation, batch))
+        group_bytes = memory.estimate_group_bytes(len(merged_states),
+                                                  values_per_group)
+        if not memory_tracker.has_room(group_bytes):
+            return spill.aggregate_batches(tq_evaluator, aggregation,
+                                           batches, merged_states)
+        memory_tracker.check_allocation(group_bytes)
+    return tq_evaluator.context_from_group_states(aggregation, merged_states)
@@ -0,0 +1,113 @@
+"""Helpers for finding simple column predicates in compiled expressions.
+
+A WHERE expression is split into its top-level AND conjuncts, and each conjunct
+that compares a single column against constants is described by a
+ColumnPredicate. Optimizations like skipping table chunks only need to handle
+these simple predicates; any other conjunct is treated as something that might
+match any row.
+"""
+import collections
+
+import runtime
+import typed_ast
+
+
+class ColumnPredicate(collections.namedtuple(
+        'ColumnPredicate', ['column', 'operator', 'values'])):
+    """A comparison between a column and a list of constant values.
+
+    Fields:
+        column: A typed_ast.ColumnRef for the column being compared.
+        operator: One of '=', '<', '<=', '>', '>=', 'in', 'is_null' and
+            'is_not_null'. For the binary comparisons, the column is always
+            on the left side.
+        values: A tuple of the (non-null) constants being compared against.
+            This is empty for the null checks.
+    """
+
+
+# When a comparison has the constant on the left, we flip it around so that
+# the column is always on the left.
+_FLIPPED_OPERATORS = {
+    '=': '=',
+    '<': '>',
+    '<=': '>=',
+    '>': '<',
+    '>=': '<=',
+}
+
+
+def get_conjuncts(expr):
+    """Split an expression into a list of expressions that are ANDed."""
+    if (isinstance(expr, typed_ast.FunctionCall) and
+            expr.func is runtime.get_binary_op('and')):
+        return get_conjuncts(expr.args[0]) + get_conjuncts(expr.args[1])
+    return [expr]
+
+
+def get_column_predicates(expr):
+    """Find all simple column predicates that must hold for expr to be true.
+
+    Returns: A list of ColumnPredicate objects. Conjuncts that aren't simple
+        comparisons are omitted.
+    """
+    result = []
+    for conjunct in get_conjuncts(expr):
+        predicate = get_column_predicate(conjunct)
+        if predicate is not None:
+            result.append(predicate)
+    return result
+
+
+def get_table_column_predicates(type_ctx, column_names, expr):
+    """Find the simple predicates that apply to the columns of a base table.
+
+    Arguments:
+        type_ctx: The type context used for the table, which gives the full
+            names that the expression uses to refer to the table's columns.
+        column_names: The names of the columns within the table itself, in the
+            same order as the columns of type_ctx.
+        expr: A compiled expression (usually a WHERE clause) to search.
+
+    Returns: A list of (column name, ColumnPredicate) pairs, where the column
+        name is the name of the column within the table.
+    """
+    table_column_names = dict(zip(type_ctx.columns.iterkeys(), column_names))
+    result = []
+    for predicate in get_column_predicates(expr):
+        column_key = (predicate.column.table, predicate.column.column)
+        if column_key in table_column_names:
+            result.append((table_column_names[column_key], predicate))
+    return result
+
+
+def get_column_predicate(expr):
+    """Return a ColumnPredicate for the expression, or None if not simple."""
+    if not isinstance(expr, typed_ast.FunctionCall):
+        return None
+    args = expr.args
+    for operator in ('is_null', 'is_not_null'):
+        if (expr.func is runtime.get_unary_op(operator) and
+                isinstance(args[0], typed_ast.ColumnRef)):
+            return ColumnPredicate(args[0], operator, ())
+    if expr.func is runtime.get_func('in'):
+        if (isinstance(args[0], typed_ast.ColumnRef) and
+                all(_is_non_null_literal(arg) for arg in args[1:])):
+            return ColumnPredicate(
+                args[0], 'in', tuple(arg.value for arg in args[1:]))
+        return None
+    for operator, flipped_operator in _FLIPPED_OPERATORS.iteritems():
+        if expr.func is not runtime.get_binary_op(operator):
+            continue
+        left, right = args
+        if (isinstance(left, typed_ast.ColumnRef) and
+                _is_non_null_literal(right)):
+            return ColumnPredicate(left, operator, (right.value,))
+        if (_is_non_null_literal(left) and
+                isinstance(right, typed_ast.ColumnRef)):
+            return ColumnPredicate(right, flipped_operator, (left.value,))
+    return None
+
+
+def _is_non_null_literal(expr):
+    return isinstance(expr, typed_ast.Literal) and expr.value is not None
@@ -1,10 +1,15 @@
 """Implementation of the standard built-in functions."""
 import abc
+import itertools
+import operator
 import random
+import re
 import time
 import math
 
 import compiler
+import encoding
+import nulls
 import tq_types
 
 
@@ -30,9 +35,50 @@ class Function(object):
                 operate on. For normal functions, the length of each arugment
                 must be num_rows, but for aggregate functions, num_rows will be
                 1 and each arg can be any length.
+
+        Unless a function says otherwise, a null argument gives a null
+        result, and aggregate functions ignore null values.
+        """
+
+
+class LazyFunction(Function):
+    """A function that only needs some of its arguments for some rows.
+
+    Functions like AND and IF decide from their first argument which rows
+    need the others, so the evaluator calls evaluate_lazily to avoid
+    evaluating expensive arguments for rows whose result is already known.
+    """
+    @abc.abstractmethod
+    def evaluate_lazily(self, num_rows, evaluate_arg):
+        """Evaluate the function, only evaluating arguments where needed.
+
+        Arguments:
+            num_rows: The number of rows that should be returned.
+            evaluate_arg: A function taking the index of an argument and an
+                optional mask, a list with True for each row to evaluate the
+                argument for. It returns the values of the argument for the
+                rows selected by the mask, in order, or for every row if no
+                mask is given.
+
+        Returns: The same result as evaluate would.
         """
 
 
+def merge_by_mask(mask, true_values, false_values):
+    """Interleave the values for the rows that a mask selects and doesn't.
+
+    Arguments:
+        mask: A list of bools for each row.
+        true_values: An iterable of the values for the rows where the mask
+            is true, in order.
+        false_values: An iterable of the values for the other rows.
+    """
+    true_iter = iter(true_values)
+    false_iter = iter(false_values)
+    return [next(true_iter) if selected else next(false_iter)
+            for selected in mask]
+
+
 class ArithmeticOperator(Function):
     """Basic operators like +."""
     def __init__(self, func):
@@ -48,7 +94,7 @@ class ArithmeticOperator(Function):
             return tq_types.INT
 
     def evaluate(self, num_rows, list1, list2):
-        return [self.func(arg1, arg2) for arg1, arg2 in zip(list1, list2)]
+        return nulls.map_valid(self.func, [list1, list2])
 
 
 class ComparisonOperator(Function):
@@ -60,19 +106,49 @@ class ComparisonOperator(Function):
         return tq_types.BOOL
 
     def evaluate(self, num_rows, list1, list2):
-        return [self.func(arg1, arg2) for arg1, arg2 in zip(list1, list2)]
+        return nulls.map_valid(self.func, [list1, list2])
 
 
-class BooleanOperator(Function):
-    def __init__(self, func):
+class BooleanOperator(LazyFunction):
+    """AND and OR, with three-valued logic for nulls.
+
+    A null operand gives a null result, unless the other operand decides the
+    result by itself (false for AND, and true for OR). When evaluated lazily,
+    the second operand is only evaluated for the rows that the first one
+    doesn't decide.
+    """
+    def __init__(self, func, deciding_value):
         self.func = func
+        self.deciding_value = deciding_value
 
     def check_types(self, type1, type2):
         # TODO: Fail if types are wrong.
         return tq_types.BOOL
 
     def evaluate(self, num_rows, list1, list2):
-        return [self.func(arg1, arg2) for arg1, arg2 in zip(list1, list2)]
+        validity = nulls.and_validity(nulls.get_validity(list1),
+                                      nulls.get_validity(list2))
+        if validity is None:
+            return map(self.func, list1, list2)
+        deciding_value = self.deciding_value
+        return [self.func(arg1, arg2) if valid else
+                deciding_value if (arg1 is deciding_value or
+                                   arg2 is deciding_value) else None
+                for valid, arg1, arg2 in itertools.izip(validity, list1,
+                                                        list2)]
+
+    def evaluate_lazily(self, num_rows, evaluate_arg):
+        list1 = evaluate_arg(0)
+        deciding_value = self.deciding_value
+        mask = [value is not deciding_value for value in list1]
+        if False not in mask:
+            # No row is decided yet, so there's nothing to merge back in.
+            return self.evaluate(num_rows, list1, evaluate_arg(1))
+        list2 = evaluate_arg(1, mask)
+        undecided_results = self.evaluate(
+            len(list2), encoding.compress(list1, mask), list2)
+        return merge_by_mask(mask, undecided_results,
+                             itertools.repeat(deciding_value))
 
 
 class UnaryIntOperator(Function):
@@ -85,21 +161,25 @@ class UnaryIntOperator(Function):
         return tq_types.INT
 
     def evaluate(self, num_rows, arg_list):
-        return [self.func(arg) for arg in arg_list]
+        return nulls.map_valid(self.func, [arg_list])
 
 
-class UnaryBoolOperator(Function):
-    def __init__(self, func):
-        self.func = func
+class NullCheckOperator(Function):
+    """IS NULL or IS NOT NULL, which are never null themselves."""
+    def __init__(self, is_null):
+        self.is_null = is_null
 
     def check_types(self, arg):
         return tq_types.BOOL
 
     def evaluate(self, num_rows, arg_list):
-        return [self.func(arg) for arg in arg_list]
+        validity = nulls.get_validity(arg_list)
+        if validity is None:
+            return [not self.is_null] * len(arg_list)
+        return map(operator.not_ if self.is_null else bool, validity)
 
 
-class IfFunction(Function):
+class IfFunction(LazyFunction):
     def check_types(self, cond, arg1, arg2):
         if cond != tq_types.BOOL:
             raise TypeError('Expected bool type.')
@@ -115,8 +195,15 @@ class IfFunction(Function):
         return [arg1 if cond else arg2
                 for cond, arg1, arg2 in zip(cond_list, arg1_list, arg2_list)]
 
+    def evaluate_lazily(self, num_rows, evaluate_arg):
+        # Each branch is only evaluated for the rows that take it.
+        cond_mask = map(bool, evaluate_arg(0))
+        else_mask = map(operator.not_, cond_mask)
+        return merge_by_mask(cond_mask, evaluate_arg(1, cond_mask),
+                             evaluate_arg(2, else_mask))
+
 
-class IfNullFunction(Function):
+class IfNullFunction(LazyFunction):
     def check_types(self, arg1, arg2):
         if arg1 == tq_types.NONETYPE:
             return arg2
@@ -127,7 +214,23 @@ class IfNullFunction(Function):
         return arg1
 
     def evaluate(self, num_rows, arg1, arg2):
-        return arg2 if arg1 is None else arg1
+        validity = nulls.get_validity(arg1)
+        if validity is None:
+            return list(arg1)
+        return [value1 if valid else value2
+                for valid, value1, value2 in itertools.izip(validity, arg1,
+                                                            arg2)]
+
+    def evaluate_lazily(self, num_rows, evaluate_arg):
+        # The second argument is only evaluated for the rows where the first
+        # is null.
+        arg1 = evaluate_arg(0)
+        validity = nulls.get_validity(arg1)
+        if validity is None:
+            return list(arg1)
+        null_mask = map(operator.not_, validity)
+        return merge_by_mask(null_mask, evaluate_arg(1, null_mask),
+                             nulls.iter_valid(arg1))
 
 
 class HashFunction(Function):
@@ -146,7 +249,7 @@ class FloorFunction(Function):
         return tq_types.FLOAT
 
     def evaluate(self, num_rows, arg_list):
-        return [math.floor(arg) for arg in arg_list]
+        return nulls.map_valid(math.floor, [arg_list])
 
 
 class RandFunction(Function):
@@ -181,7 +284,46 @@ class NthFunction(Function):
         return rep_elem[index - 1]
 
 
-class FirstFunction(Function):
+def get_run_values(arg_list):
+    """Get the value of each run of run-length encoded values.
+
+    This gives the same result as the values themselves for functions that
+    don't care how many times each value appears, like MIN and MAX.
+    """
+    if isinstance(arg_list, encoding.RunLengthValues):
+        return arg_list.run_values
+    return arg_list
+
+
+def get_valid_runs(arg_list):
+    """Get the (value, length) pairs of the runs that aren't null."""
+    return [(value, length) for value, length in arg_list.iter_runs()
+            if value is not None]
+
+
+class MergeableAggregateFunction(Function):
+    """An aggregate function that can be computed in pieces.
+
+    The values for a group can be split up in any way, as long as the pieces
+    are merged back together in order. Each piece is reduced to a partial
+    state, the partial states are merged, and the merged state is finalized
+    to get the same value that evaluate would return for all of the values at
+    once.
+    """
+    @abc.abstractmethod
+    def partial_state(self, arg_list):
+        """Return the partial state for a list of argument values."""
+
+    @abc.abstractmethod
+    def merge_states(self, state1, state2):
+        """Combine two partial states, where state1 came from earlier rows."""
+
+    @abc.abstractmethod
+    def finalize_state(self, state):
+        """Return the value of the aggregate from a merged partial state."""
+
+
+class FirstFunction(MergeableAggregateFunction):
     def check_types(self, rep_list_type):
         return rep_list_type
 
@@ -197,6 +339,15 @@ class FirstFunction(Function):
             # FIRST over rows
             return [rep_list[0]]
 
+    def partial_state(self, arg_list):
+        return list(arg_list[:1])
+
+    def merge_states(self, state1, state2):
+        return state1 or state2
+
+    def finalize_state(self, state):
+        return self.evaluate(1, state)[0]
+
 
 class NoArgFunction(Function):
     def __init__(self, func):
@@ -214,8 +365,9 @@ class InFunction(Function):
         return tq_types.BOOL
 
     def evaluate(self, num_rows, arg1, *other_args):
-        return [val1 in val_list
-                for val1, val_list in zip(arg1, zip(*other_args))]
+        # Only a null left side makes the result null.
+        return nulls.map_valid(lambda val1, *val_list: val1 in val_list,
+                               [arg1] + list(other_args), [arg1])
 
 
 class ConcatFunction(Function):
@@ -225,7 +377,7 @@ class ConcatFunction(Function):
         return tq_types.STRING
 
     def evaluate(self, num_rows, *args):
-        return [''.join(strs) for strs in zip(*args)]
+        return nulls.map_valid(lambda *strs: ''.join(strs), list(args))
 
 
 class StringFunction(Function):
@@ -233,10 +385,22 @@ class StringFunction(Function):
         return tq_types.STRING
 
     def evaluate(self, num_rows, arg_list):
-        return [str(arg) for arg in arg_list]
+        return nulls.map_valid(str, [arg_list])
+
+
+class RegexpMatchFunction(Function):
+    def check_types(self, arg_type, pattern_type):
+        if arg_type != tq_types.STRING or pattern_type != tq_types.STRING:
+            raise TypeError('REGEXP_MATCH only takes string arguments.')
+        return tq_types.BOOL
 
+    def evaluate(self, num_rows, arg_list, pattern_list):
+        return nulls.map_valid(
+            lambda arg, pattern: re.search(pattern, arg) is not None,
+            [arg_list, pattern_list])
 
-class MinMaxFunction(Function):
+
+class MinMaxFunction(MergeableAggregateFunction):
     def __init__(self, func):
         self.func = func
 
@@ -244,10 +408,28 @@ class MinMaxFunction(Function):
         return arg
 
     def evaluate(self, num_rows, arg_list):
-        return [self.func(arg_list)]
+        return [self.finalize_state(self.partial_state(arg_list))]
+
+    # The state is a list with the min or max so far, or an empty list if
+    # there haven't been any non-null values yet.
+    def partial_state(self, arg_list):
+        values = get_run_values(arg_list)
+        num_nulls = nulls.count_nulls(values)
+        if num_nulls == len(values):
+            return []
+        if num_nulls == 0:
+            return [self.func(values)]
+        return [self.func(nulls.iter_valid(values))]
+
+    def merge_states(self, state1, state2):
+        states = state1 + state2
+        return [self.func(states)] if states else []
+
+    def finalize_state(self, state):
+        return self.func(state) if state else None
 
 
-class SumFunction(Function):
+class SumFunction(MergeableAggregateFunction):
     def check_types(self, arg):
         if arg == tq_types.BOOL:
             return tq_types.INT
@@ -257,35 +439,94 @@ class SumFunction(Function):
             raise TypeError('Unexpected type.')
 
     def evaluate(self, num_rows, arg_list):
-        return [sum([0 if arg is None else arg for arg in arg_list])]
+        return [self.partial_state(arg_list)]
+
+    # The state is the sum of the non-null values, or None if there haven't
+    # been any yet.
+    def partial_state(self, arg_list):
+        if isinstance(arg_list, encoding.RunLengthValues):
+            runs = get_valid_runs(arg_list)
+            if not runs:
+                return None
+            return sum(value * length for value, length in runs)
+        num_nulls = nulls.count_nulls(arg_list)
+        if num_nulls == len(arg_list):
+            return None
+        if num_nulls == 0:
+            return sum(arg_list)
+        return sum(nulls.iter_valid(arg_list))
+
+    def merge_states(self, state1, state2):
+        if state1 is None:
+            return state2
+        if state2 is None:
+            return state1
+        return state1 + state2
+
+    def finalize_state(self, state):
+        return state
 
 
-class CountFunction(Function):
+class CountFunction(MergeableAggregateFunction):
     def check_types(self, arg):
         return tq_types.INT
 
     def evaluate(self, num_rows, arg_list):
-        return [len([0 for arg in arg_list if arg is not None])]
+        return [len(arg_list) - nulls.count_nulls(arg_list)]
 
+    def partial_state(self, arg_list):
+        return self.evaluate(1, arg_list)[0]
 
-class AvgFunction(Function):
+    def merge_states(self, state1, state2):
+        return state1 + state2
+
+    def finalize_state(self, state):
+        return state
+
+
+class AvgFunction(MergeableAggregateFunction):
     def check_types(self, arg):
         return tq_types.FLOAT
 
     def evaluate(self, num_rows, arg_list):
-        filtered_args = [arg for arg in arg_list if arg is not None]
-        if not filtered_args:
-            return [None]
-        else:
-            return [float(sum(filtered_args)) / len(filtered_args)]
+        return [self.finalize_state(self.partial_state(arg_list))]
+
+    # The state is a (sum, count) tuple of the non-null values.
+    def partial_state(self, arg_list):
+        if isinstance(arg_list, encoding.RunLengthValues):
+            runs = get_valid_runs(arg_list)
+            return (sum(value * length for value, length in runs),
+                    sum(length for _, length in runs))
+        return (sum(nulls.iter_valid(arg_list)),
+                len(arg_list) - nulls.count_nulls(arg_list))
+
+    def merge_states(self, state1, state2):
+        return state1[0] + state2[0], state1[1] + state2[1]
+
+    def finalize_state(self, state):
+        total, count = state
+        if count == 0:
+            return None
+        return float(total) / count
 
 
-class CountDistinctFunction(Function):
+class CountDistinctFunction(MergeableAggregateFunction):
     def check_types(self, arg):
         return tq_types.INT
 
     def evaluate(self, num_rows, arg_list):
-        return [len(set(arg_list))]
+        return [len(self.partial_state(arg_list))]
+
+    def partial_state(self, arg_list):
+        values = set(get_run_values(arg_list))
+        values.discard(None)
+        return values
+
+    def merge_states(self, state1, state2):
+        return state1 | state2
+
+    def finalize_state(self, state):
+        return len(state)
 
 
 class StddevSampFunction(Function):
@@ -328,26 +569,26 @@ class QuantilesFunction(Function):
 
 
 _UNARY_OPERATORS = {
-    '-': UnaryIntOperator(lambda a: -a),
-    'is_null': UnaryBoolOperator(lambda a: a is None),
-    'is_not_null': UnaryBoolOperator(lambda a: a is not None),
+    '-': UnaryIntOperator(operator.neg),
+    'is_null': NullCheckOperator(is_null=True),
+    'is_not_null': NullCheckOperator(is_null=False),
 }
 
 
 _BINARY_OPERATORS = {
-    '+': ArithmeticOperator(lambda a, b: a + b),
-    '-': ArithmeticOperator(lambda a, b: a - b),
-    '*': ArithmeticOperator(lambda a, b: a * b),
-    '/': ArithmeticOperator(lambda a, b: a / b),
-    '%': ArithmeticOperator(lambda a, b: a % b),
-    '=': ComparisonOperator(lambda a, b: a == b),
-    '!=': ComparisonOperator(lambda a, b: a != b),
-    '>': ComparisonOperator(lambda a, b: a > b),
-    '<': ComparisonOperator(lambda a, b: a < b),
-    '>=': ComparisonOperator(lambda a, b: a >= b),
-    '<=': ComparisonOperator(lambda a, b: a <= b),
-    'and': BooleanOperator(lambda a, b: a and b),
-    'or': BooleanOperator(lambda a, b: a or b),
+    '+': ArithmeticOperator(operator.add),
+    '-': ArithmeticOperator(operator.sub),
+    '*': ArithmeticOperator(operator.mul),
+    '/': ArithmeticOperator(operator.div),
+    '%': ArithmeticOperator(operator.mod),
+    '=': ComparisonOperator(operator.eq),
+    '!=': ComparisonOperator(operator.ne),
+    '>': ComparisonOperator(operator.gt),
+    '<': ComparisonOperator(operator.lt),
+    '>=': ComparisonOperator(operator.ge),
+    '<=': ComparisonOperator(operator.le),
+    'and': BooleanOperator(lambda a, b: a and b, deciding_value=False),
+    'or': BooleanOperator(lambda a, b: a or b, deciding_value=True),
 }
 
 
@@ -358,7 +599,8 @@ _FUNCTIONS = {
     'nth': NthFunction(),
     'concat': ConcatFunction(),
     'string': StringFunction(),
-    'pow': ArithmeticOperator(lambda a, b: a ** b),
+    'regexp_match': RegexpMatchFunction(),
+    'pow': ArithmeticOperator(operator.pow),
     'now': NoArgFunction(lambda: int(time.time() * 1000000)),
     'in': InFunction(),
     'if': IfFunction(),
@@ -403,3 +645,17 @@ def get_func(name):
 
 def is_aggregate_func(name):
     return name in _AGGREGATE_FUNCTIONS
+
+
+def is_operator_name(name):
+    return name in _UNARY_OPERATORS or name in _BINARY_OPERATORS
+
+
+def get_func_name(func):
+    """Get the name of a built-in Function, for describing expressions."""
+    for funcs in (_UNARY_OPERATORS, _BINARY_OPERATORS, _FUNCTIONS,
+                  _AGGREGATE_FUNCTIONS):
+        for name, registered_func in funcs.iteritems():
+            if registered_func is func:
+                return name
+    return func.__class__.__name__
@@ -0,0 +1,237 @@
+"""Grace hash joins and GROUP BYs, which spill their partitions to disk.
+
+GROUP EACH BY and JOIN EACH, as well as GROUP BYs and joins whose hash tables
+wouldn't fit in what's left of the memory budget of the query, split their
+rows into NUM_PARTITIONS partitions by the hash of their key, so rows with
+equal keys always end up in the same partition. Each partition is written to
+its own temporary file, and then the partitions are read back and processed
+one at a time, so only the hash table for one partition is in memory at once.
+
+For a join, that hash table is the only part that is bounded: both tables are
+still evaluated in full before they're partitioned, and the joined rows are
+built in memory afterwards, so that they come out in the same order as for
+any other join. A GROUP BY only holds one partition of its groups.
+
+Rows are written with marshal, which has a compact binary encoding for every
+type of value that a column can hold, in batches of WRITE_BATCH_ROWS rows.
+"""
+import collections
+import contextlib
+import itertools
+import marshal
+import tempfile
+
+import context
+import evaluator
+import memory
+
+
+# The number of partitions to split the rows into.
+NUM_PARTITIONS = 16
+# The number of rows of a partition that are buffered before writing them.
+WRITE_BATCH_ROWS = 1000
+
+
+def get_partition(key, num_partitions):
+    """Get the partition for a hashable key.
+
+    The key is hashed inside a tuple so that the partition doesn't depend on
+    the low bits of hash(key). Otherwise, every key in a partition would have
+    the same low bits, which are the ones that a dict uses to place them.
+    """
+    return hash((key,)) % num_partitions
+
+
+class PartitionFiles(object):
+    """Temporary files that rows are split into by the hash of their keys.
+
+    Fields:
+        num_partitions: The number of partitions.
+        num_rows: The number of rows added so far.
+    """
+    def __init__(self, num_partitions=NUM_PARTITIONS):
+        self.num_partitions = num_partitions
+        self.num_rows = 0
+        self.files = [tempfile.TemporaryFile()
+                      for _ in xrange(num_partitions)]
+        self.buffers = [[] for _ in xrange(num_partitions)]
+
+    def add(self, key, row):
+        """Add a row to the partition for its key.
+
+        Arguments:
+            key: The hashable key that decides the partition.
+            row: Any value that marshal can write.
+        """
+        partition_index = get_partition(key, self.num_partitions)
+        rows = self.buffers[partition_index]
+        rows.append(row)
+        self.num_rows += 1
+        if len(rows) >= WRITE_BATCH_ROWS:
+            self.flush(partition_index)
+
+    def flush(self, partition_index):
+        rows = self.buffers[partition_index]
+        if rows:
+            marshal.dump(rows, self.files[partition_index])
+            self.buffers[partition_index] = []
+
+    def iter_partition(self, partition_index):
+        """Read back the rows of a partition, in the order they were added."""
+        self.flush(partition_index)
+        partition_file = self.files[partition_index]
+        partition_file.seek(0)
+        while True:
+            try:
+                rows = marshal.load(partition_file)
+            except EOFError:
+                return
+            for row in rows:
+                yield row
+
+    def close(self):
+        """Delete the files."""
+        for partition_file in self.files:
+            partition_file.close()
+
+
+def join_contexts(context1, key_refs1, context2, key_refs2, is_left_outer):
+    """Find the rows matched by a join, one partition at a time.
+
+    Only the index and key of each row are written to the partitions, and
+    only the hash table for one partition is built at a time. The contexts
+    themselves stay in memory, and the caller builds the joined rows from
+    the matches, so this bounds the memory used by the hash table, not by
+    the rows of the join.
+
+    Arguments:
+        context1: A context with the rows of the first table.
+        key_refs1: A list of ColumnRefs for the key columns of context1.
+        context2: A context with the rows of the second table.
+        key_refs2: A list of ColumnRefs for the key columns of context2.
+        is_left_outer: True for a left outer join.
+
+    Returns: The matches, in the same form and order as
+        evaluator.flatten_join_matches.
+    """
+    with contextlib.closing(PartitionFiles()) as partitions1, \
+            contextlib.closing(PartitionFiles()) as partitions2:
+        for partitions, table_context, key_refs in (
+                (partitions1, context1, key_refs1),
+                (partitions2, context2, key_refs2)):
+            keys = itertools.izip(*[
+                table_context.column_from_ref(key_ref).values
+                for key_ref in key_refs])
+            for index, key in enumerate(keys):
+                partitions.add(key, (index, key))
+
+        partition_matches = []
+        for partition_index in xrange(NUM_PARTITIONS):
+            indexes1, indexes2 = evaluator.flatten_join_matches(
+                evaluator.join_rows(
+                    partitions1.iter_partition(partition_index),
+                    partitions2.iter_partition(partition_index),
+                    is_left_outer))
+            partition_matches.append(evaluator.encode_join_matches(
+                indexes1, indexes2, context2.num_rows))
+    return evaluator.decode_join_matches(partition_matches,
+                                         context2.num_rows)
+
+
+def group_context(tq_evaluator, select_fields, group_set, select_context):
+    """Evaluate a GROUP BY one partition of the rows at a time.
+
+    Every row of select_context is written to the partition for its group
+    key. Then the rows of each partition are read back into a context, whose
+    groups are evaluated in memory. The aggregates don't need to be
+    mergeable, since every row of a group is in the same partition.
+
+    Arguments:
+        tq_evaluator: The Evaluator to evaluate expressions with.
+        select_fields: A list of SelectFields to evaluate.
+        group_set: A GroupSet other than TRIVIAL_GROUP_SET.
+        select_context: A context with the rows to group.
+
+    Returns: A context with a row for each group, in the form returned by
+        Evaluator.evaluate_groups.
+    """
+    alias_group_context = tq_evaluator.evaluate_select_fields(
+        [field for field in select_fields
+         if field.alias in group_set.alias_groups],
+        select_context)
+    keys = itertools.izip(*(
+        [select_context.column_from_ref(field_group).values
+         for field_group in group_set.field_groups] +
+        [alias_group_context.columns[(None, alias)].values
+         for alias in sorted(group_set.alias_groups)]))
+    column_types = [(column_key, column.type) for column_key, column
+                    in select_context.columns.iteritems()]
+    if select_context.columns:
+        rows = itertools.izip(*[column.values for column
+                                in select_context.columns.itervalues()])
+    else:
+        rows = itertools.repeat((), select_context.num_rows)
+
+    result_contexts = []
+    with contextlib.closing(PartitionFiles()) as partitions:
+        for key, row in itertools.izip(keys, rows):
+            partitions.add(key, row)
+        row_bytes = memory.estimate_row_bytes(select_context)
+        for partition_index in xrange(NUM_PARTITIONS):
+            partition_rows = list(partitions.iter_partition(partition_index))
+            tq_evaluator.memory_tracker.check_allocation(
+                2 * len(partition_rows) * row_bytes)
+            partition_columns = zip(*partition_rows) or [
+                () for _ in column_types]
+            partition_context = context.Context(
+                len(partition_rows),
+                collections.OrderedDict(
+                    (column_key, context.Column(column_type, list(values)))
+                    for (column_key, column_type), values in zip(
+                        column_types, partition_columns)),
+                None)
+            del partition_rows
+            result_contexts.append(tq_evaluator.evaluate_groups_in_memory(
+                select_fields, group_set, partition_context))
+    return context.concat_contexts(result_contexts)
+
+
+def aggregate_batches(tq_evaluator, aggregation, batches,
+                      initial_states=None):
+    """Group batches of rows one partition of the groups at a time.
+
+    Each batch is pre-aggregated into partial states for its groups, which
+    are written to the partition for their group key. Then the partial states
+    in each partition are merged and finalized.
+
+    Arguments:
+        tq_evaluator: The Evaluator to evaluate expressions with.
+        aggregation: An evaluator.GroupAggregation.
+        batches: An iterable of contexts with the rows to group.
+        initial_states: If given, a dict of the merged partial states of the
+            rows before the batches, in the form returned by
+            Evaluator.aggregate_rows.
+
+    Returns: A context with a row for each group.
+    """
+    values_per_group = (len(aggregation.key_column_types) +
+                        len(aggregation.aggregate_calls))
+    result_contexts = []
+    with contextlib.closing(PartitionFiles()) as partitions:
+        for group_states in itertools.chain(
+                [initial_states or {}],
+                (tq_evaluator.aggregate_rows(aggregation, batch)
+                 for batch in batches)):
+            for key, states in group_states.iteritems():
+                partitions.add(key, (key, states))
+        for partition_index in xrange(NUM_PARTITIONS):
+            merged_states = collections.OrderedDict()
+            for key, states in partitions.iter_partition(partition_index):
+                evaluator.merge_group_states(aggregation, merged_states,
+                                             {key: states})
+            tq_evaluator.memory_tracker.check_allocation(
+                memory.estimate_group_bytes(len(merged_states),
+                                            values_per_group))
+            result_contexts.append(tq_evaluator.context_from_group_states(
+                aggregation, merged_states))
+    return context.concat_contexts(result_contexts)
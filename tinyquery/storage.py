@@ -0,0 +1,296 @@
+"""Chunked storage for the contents of a table.
+
+A table's rows are split into a list of row groups ("chunks"), each of which
+holds one value list per column. Chunks are never modified once they are built,
+so appending to a table only needs to push new chunks, and copying a table only
+needs to copy the list of chunk references.
+"""
+import bisect
+import collections
+
+import context
+import encoding
+import nulls
+
+
+# The maximum number of rows to store in a single chunk.
+CHUNK_SIZE = 64 * 1024
+
+
+class Chunk(object):
+    """An immutable group of consecutive rows in a table.
+
+    Fields:
+        num_rows: The number of rows in this chunk.
+        columns: An OrderedDict mapping column name to Column. The value lists
+            may be shared with other chunks, tables, and contexts, so they must
+            never be modified after the chunk is created.
+        stats: A dict mapping column name to ColumnStats for that column. If
+            not given, the stats are computed from the column values.
+    """
+    def __init__(self, num_rows, columns, stats=None):
+        assert isinstance(columns, collections.OrderedDict)
+        for col_name, column in columns.iteritems():
+            assert len(column.values) == num_rows, (
+                'Column %s had %s rows, expected %s.' % (
+                    col_name, len(column.values), num_rows))
+        if stats is None:
+            stats = {col_name: ColumnStats.from_values(column.values)
+                     for col_name, column in columns.iteritems()}
+        self.num_rows = num_rows
+        self.columns = columns
+        self.stats = stats
+
+    def may_match(self, column_name, predicate):
+        """Return False if no row can match the given ColumnPredicate.
+
+        A return value of True doesn't guarantee that any rows match.
+        """
+        return self.stats[column_name].may_match(predicate, self.num_rows)
+
+    def __repr__(self):
+        return 'Chunk({}, {})'.format(self.num_rows, self.columns)
+
+
+class ColumnStats(collections.namedtuple(
+        'ColumnStats', ['min', 'max', 'null_count'])):
+    """Summary statistics (a "zone map") for one column of a chunk.
+
+    Fields:
+        min: The smallest non-null value, or None if all values are null.
+        max: The largest non-null value, or None if all values are null.
+        null_count: The number of null values.
+    """
+    @classmethod
+    def from_values(cls, values):
+        if isinstance(values, encoding.RunLengthValues):
+            # Only the value of each run needs to be looked at.
+            runs = [(value, length) for value, length in values.iter_runs()
+                    if value is not None]
+            if not runs:
+                return cls(None, None, len(values))
+            non_null_values = [value for value, _ in runs]
+            return cls(min(non_null_values), max(non_null_values),
+                       len(values) - sum(length for _, length in runs))
+        non_null_values = [value for value in values if value is not None]
+        if not non_null_values:
+            return cls(None, None, len(values))
+        return cls(min(non_null_values), max(non_null_values),
+                   len(values) - len(non_null_values))
+
+    @classmethod
+    def all_null(cls, num_rows):
+        return cls(None, None, num_rows)
+
+    @classmethod
+    def merge(cls, stats1, stats2):
+        """Compute the stats for the concatenation of two columns."""
+        if stats1.min is None:
+            min_value, max_value = stats2.min, stats2.max
+        elif stats2.min is None:
+            min_value, max_value = stats1.min, stats1.max
+        else:
+            min_value = min(stats1.min, stats2.min)
+            max_value = max(stats1.max, stats2.max)
+        return cls(min_value, max_value,
+                   stats1.null_count + stats2.null_count)
+
+    def may_match(self, predicate, num_rows):
+        """Return False if no value in the column can match the predicate.
+
+        This needs to agree with how the runtime evaluates each operator. In
+        particular, comparing a null value with anything gives null, so null
+        values can only match the null checks.
+        """
+        operator = predicate.operator
+        if operator == 'is_null':
+            return self.null_count > 0
+        elif operator == 'is_not_null':
+            return self.null_count < num_rows
+        elif self.min is None:
+            # Every value is null, and nulls can't match anything else.
+            return False
+        elif operator == '=':
+            return self.min <= predicate.values[0] <= self.max
+        elif operator == 'in':
+            return any(self.min <= value <= self.max
+                       for value in predicate.values)
+        elif operator == '<':
+            return self.min < predicate.values[0]
+        elif operator == '<=':
+            return self.min <= predicate.values[0]
+        elif operator == '>':
+            return self.max > predicate.values[0]
+        elif operator == '>=':
+            return self.max >= predicate.values[0]
+        else:
+            return True
+
+
+def chunks_from_columns(num_rows, columns, chunk_size=None):
+    """Split an OrderedDict of full columns into a list of chunks.
+
+    If all rows fit in a single chunk, the given value lists are used directly
+    rather than being copied. Value lists with nulls are stored with their
+    validity bitmaps.
+    """
+    chunk_size = chunk_size or CHUNK_SIZE
+    if num_rows == 0:
+        return []
+    if num_rows <= chunk_size:
+        return [Chunk(num_rows, collections.OrderedDict(
+            (col_name, column._replace(
+                values=nulls.with_validity(column.values)))
+            for col_name, column in columns.iteritems()))]
+    return [
+        Chunk(min(chunk_size, num_rows - start), collections.OrderedDict(
+            (col_name, context.Column(column.type, nulls.with_validity(
+                column.values[start:start + chunk_size])))
+            for col_name, column in columns.iteritems()))
+        for start in xrange(0, num_rows, chunk_size)
+    ]
+
+
+def columns_from_chunks(column_types, chunks):
+    """Build full columns containing every row of the given chunks.
+
+    Arguments:
+        column_types: An OrderedDict mapping column name to type.
+        chunks: A list of Chunk objects whose columns match column_types.
+
+    Returns: An OrderedDict mapping column name to Column. For a single chunk,
+        this is just the chunk's columns, so the result must not be modified.
+    """
+    if len(chunks) == 1:
+        return chunks[0].columns
+    return collections.OrderedDict(
+        (col_name, context.Column(col_type, encoding.concat_values(
+            [chunk.columns[col_name].values for chunk in chunks])))
+        for col_name, col_type in column_types.iteritems())
+
+
+def project_chunk(chunk, column_types):
+    """Return a chunk with exactly the given columns, in the given order.
+
+    Columns that are missing from the source chunk are filled in with nulls,
+    and columns that exist share their value lists with the source chunk.
+    """
+    if chunk.columns.keys() == column_types.keys():
+        return chunk
+    columns = collections.OrderedDict()
+    stats = {}
+    for col_name, col_type in column_types.iteritems():
+        column = chunk.columns.get(col_name)
+        if column is None:
+            columns[col_name] = context.Column(col_type,
+                                               [None] * chunk.num_rows)
+            stats[col_name] = ColumnStats.all_null(chunk.num_rows)
+        else:
+            columns[col_name] = column
+            stats[col_name] = chunk.stats[col_name]
+    return Chunk(chunk.num_rows, columns, stats)
+
+
+def concat_chunks(chunk1, chunk2):
+    """Build a new chunk with the rows of chunk1 followed by those of chunk2.
+
+    The two chunks must have the same columns. The stats of the new chunk are
+    merged from the stats of the two chunks rather than being recomputed.
+    """
+    return Chunk(
+        chunk1.num_rows + chunk2.num_rows,
+        collections.OrderedDict(
+            (col_name, context.Column(
+                column.type, column.values + chunk2.columns[col_name].values))
+            for col_name, column in chunk1.columns.iteritems()),
+        {col_name: ColumnStats.merge(col_stats, chunk2.stats[col_name])
+         for col_name, col_stats in chunk1.stats.iteritems()})
+
+
+def append_chunks(chunks, new_chunks, chunk_size=None):
+    """Return a new list of chunks with new_chunks added after chunks.
+
+    Neither input list is modified. Chunks are shared rather than copied,
+    except that a small trailing chunk is merged with the following one when
+    they fit together, so that many small appends don't leave a table with a
+    long tail of tiny chunks.
+    """
+    chunk_size = chunk_size or CHUNK_SIZE
+    result = list(chunks)
+    for chunk in new_chunks:
+        if chunk.num_rows == 0:
+            continue
+        if result and result[-1].num_rows + chunk.num_rows <= chunk_size:
+            result[-1] = concat_chunks(result[-1], chunk)
+        else:
+            result.append(chunk)
+    return result
+
+
+def take_rows(column_types, chunks, row_nums):
+    """Gather specific rows out of a list of chunks.
+
+    Arguments:
+        column_types: An OrderedDict mapping column name to type.
+        chunks: A list of Chunk objects whose columns match column_types.
+        row_nums: A sorted list of row numbers within the whole list of chunks.
+
+    Returns: An OrderedDict mapping column name to a Column with the values of
+        the requested rows, in order.
+    """
+    values_lists = collections.OrderedDict(
+        (col_name, []) for col_name in column_types)
+    chunk_start = 0
+    row_index = 0
+    for chunk in chunks:
+        chunk_end = chunk_start + chunk.num_rows
+        next_row_index = bisect.bisect_left(row_nums, chunk_end, row_index)
+        if next_row_index > row_index:
+            chunk_row_nums = [
+                row_num - chunk_start
+                for row_num in row_nums[row_index:next_row_index]]
+            for col_name, values_list in values_lists.iteritems():
+                values_list.append(encoding.take(
+                    chunk.columns[col_name].values, chunk_row_nums))
+        row_index = next_row_index
+        chunk_start = chunk_end
+    return collections.OrderedDict(
+        (col_name, context.Column(col_type, encoding.concat_values(
+            values_lists[col_name])))
+        for col_name, col_type in column_types.iteritems())
+
+
+def slice_rows(column_types, chunks, start, end):
+    """Gather a contiguous range of rows out of a list of chunks.
+
+    Only the chunks overlapping the range are read, and only the values in the
+    range are copied.
+
+    Arguments:
+        column_types: An OrderedDict mapping column name to type.
+        chunks: A list of Chunk objects whose columns match column_types.
+        start: The row number (within the whole list of chunks) of the first
+            row to include.
+        end: The row number just past the last row to include.
+
+    Returns: An OrderedDict mapping column name to a Column with the values of
+        the requested rows, in order.
+    """
+    values_lists = collections.OrderedDict(
+        (col_name, []) for col_name in column_types)
+    chunk_start = 0
+    for chunk in chunks:
+        if chunk_start >= end:
+            break
+        chunk_end = chunk_start + chunk.num_rows
+        if chunk_end > start:
+            slice_start = max(start, chunk_start) - chunk_start
+            slice_end = min(end, chunk_end) - chunk_start
+            for col_name, values_list in values_lists.iteritems():
+                values_list.append(
+                    chunk.columns[col_name].values[slice_start:slice_end])
+        chunk_start = chunk_end
+    return collections.OrderedDict(
+        (col_name, context.Column(col_type, encoding.concat_values(
+            values_lists[col_name])))
+        for col_name, col_type in column_types.iteritems())
@@ -1,50 +1,149 @@
 """Implementation of the TinyQuery service."""
+import bisect
 import collections
+import copy
+import multiprocessing.pool
+import threading
+import time
 
 import compiler
 import context
+import encoding
 import evaluator
+import explain
+import indexes
+import instrumentation
+import lexer
+import locks
+import memory
+import parser
+import storage
+import tq_ast
 import tq_types
+import typed_ast
+
+
+# The number of recent insert IDs to remember for each table, for
+# deduplicating streaming inserts.
+INSERT_ID_WINDOW_SIZE = 100000
 
 
 class TinyQueryError(Exception):
     # TODO: Use BigQuery-specific error codes here.
-    pass
+    reason = 'invalid'
+
+
+class ResourcesExceededError(TinyQueryError):
+    """Raised when a query needs more memory than its budget allows."""
+    reason = 'resourcesExceeded'
 
 
 class TinyQuery(object):
-    def __init__(self):
-        self.tables_by_name = {}
+    def __init__(self, job_pool_size=None, num_query_workers=1,
+                 query_instrumentation=None, max_query_bytes=None):
+        """Create an empty TinyQuery service.
+
+        Arguments:
+            job_pool_size: If given, query and copy jobs are run in the
+                background by a pool of this many worker threads, and move
+                through the PENDING, RUNNING and DONE states like BigQuery
+                jobs. Otherwise, jobs run synchronously when they are
+                inserted, and are already DONE when they are returned.
+            num_query_workers: The number of worker processes to use for
+                parallel parts of query evaluation. Using worker processes
+                requires os.fork, and only pays off for large queries.
+            query_instrumentation: If given, an
+                instrumentation.Instrumentation to send the start and end
+                events of each stage of each query to.
+            max_query_bytes: If given, the memory budget of each query, in
+                bytes. Queries that need more memory than this (by the
+                estimates in the memory module) fail with a
+                ResourcesExceededError.
+        """
+        self.num_query_workers = num_query_workers
+        self.max_query_bytes = max_query_bytes
+        if query_instrumentation is None:
+            query_instrumentation = instrumentation.Instrumentation()
+        self.instrumentation = query_instrumentation
+        self.tables_by_name = TablesByName()
+        # Held while adding or removing tables and datasets, but not while
+        # reading or writing the contents of a table, which use the table's
+        # own lock.
+        self.registry_lock = threading.RLock()
         self.next_job_num = 0
         self.job_map = {}
+        self.job_lock = threading.Lock()
+        self.job_pool = None
+        if job_pool_size is not None:
+            self.job_pool = multiprocessing.pool.ThreadPool(job_pool_size)
+        # Map from full table name to the InsertIdWindow for streaming inserts
+        # into that table.
+        self.insert_id_windows = {}
 
     def load_table_or_view(self, table):
         """Create a table."""
-        self.tables_by_name[table.name] = table
+        with self.registry_lock:
+            self.tables_by_name[table.name] = table
 
-    def load_table_from_csv(self, table_name, raw_schema, filename):
-        result_table = self.make_empty_table(table_name, raw_schema)
+    def load_table_from_csv(self, table_name, raw_schema, filename,
+                            partition_column=None):
+        columns = self.make_empty_columns(raw_schema)
+        # STRING columns are dictionary-encoded as they are read, if they
+        # turn out to have few enough distinct values.
+        string_builders = collections.OrderedDict(
+            (column_name, encoding.DictionaryBuilder())
+            for column_name, column in columns.iteritems()
+            if column.type == tq_types.STRING)
+        appends = [
+            string_builders[column_name].append
+            if column_name in string_builders else column.values.append
+            for column_name, column in columns.iteritems()]
+        num_rows = 0
         with open(filename, 'r') as f:
             for line in f:
                 if line[-1] == '\n':
                     line = line[:-1]
                 tokens = line.split(',')
-                assert len(tokens) == len(result_table.columns), (
+                assert len(tokens) == len(columns), (
                     'Expected {} tokens on line {}, but got {}'.format(
-                        len(result_table.columns), line, len(tokens)))
-                for token, column in zip(tokens,
-                                         result_table.columns.itervalues()):
+                        len(columns), line, len(tokens)))
+                for token, column, append in zip(
+                        tokens, columns.itervalues(), appends):
                     if column.type == tq_types.INT:
                         token = int(token)
                     elif column.type == tq_types.FLOAT:
                         token = float(token)
                     elif token == 'null':
                         token = None
-                    column.values.append(token)
-                result_table.num_rows += 1
-        self.load_table_or_view(result_table)
+                    append(token)
+                num_rows += 1
+        for column_name, builder in string_builders.iteritems():
+            columns[column_name] = columns[column_name]._replace(
+                values=builder.build())
+        # Columns with long runs of equal values are stored as runs.
+        for column_name, column in columns.items():
+            columns[column_name] = column._replace(
+                values=encoding.choose_encoding(column.values))
+        if partition_column is not None:
+            table = PartitionedTable(table_name, num_rows, columns,
+                                     partition_column)
+        else:
+            table = Table(table_name, num_rows, columns)
+        self.load_table_or_view(table)
+
+    def make_empty_table(self, table_name, raw_schema,
+                         partition_column=None):
+        columns = self.make_empty_columns(raw_schema)
+        if partition_column is not None:
+            if partition_column not in columns:
+                raise TinyQueryError(
+                    'Partition column {} not found in schema.'.format(
+                        partition_column))
+            return PartitionedTable(table_name, 0, columns, partition_column)
+        return Table(table_name, 0, columns)
 
-    def make_empty_table(self, table_name, raw_schema):
+    @staticmethod
+    def make_empty_columns(raw_schema):
         columns = collections.OrderedDict()
         for field in raw_schema['fields']:
             # TODO: Handle the mode here. We should default to NULLABLE, but
@@ -53,7 +152,7 @@ class TinyQuery(object):
             # advantage of the fact that type names match the types defined in
             # tq_types.py.
             columns[field['name']] = context.Column(field['type'], [])
-        return Table(table_name, 0, columns)
+        return columns
 
     def make_view(self, view_name, query):
         # TODO: Figure out the schema by compiling the query, and refactor the
@@ -68,18 +167,118 @@ class TinyQuery(object):
         return self.tables_by_name
 
     def get_table_names_for_dataset(self, dataset):
-        # TODO(alan): Improve this to use a more first-class dataset structure.
-        return [full_table[len(dataset + '.'):]
-                for full_table in self.tables_by_name.iterkeys()
-                if full_table.startswith(dataset + '.')]
+        """Returns the sorted short names of the tables in a dataset."""
+        return self.tables_by_name.get_dataset_table_names(dataset)
+
+    def get_num_tables_in_dataset(self, dataset):
+        """Returns the number of tables in a dataset, or 0 if it's missing."""
+        return self.tables_by_name.get_dataset_num_tables(dataset)
 
     def get_all_table_info_in_dataset(self, project_id, dataset):
-        """Gets a "table info" dictionary for each table, sorted by name.
+        """Gets a "table info" dictionary for each table, sorted by name."""
+        return [self.get_short_table_info(project_id, dataset, table)
+                for table in self.get_table_names_for_dataset(dataset)]
+
+    def get_table_info_page(self, project_id, dataset, first_table_name=None,
+                            max_results=None):
+        """Gets "table info" dictionaries for a page of tables in a dataset.
 
-        In practice, this is a bit wasteful when it is used for multiple pages.
+        Arguments:
+            project_id: The project to report in the table info.
+            dataset: The name of the dataset to list.
+            first_table_name: If given, only tables with this name or a later
+                one (in sorted order) are included.
+            max_results: The maximum number of tables to include, or None for
+                no limit.
+
+        Returns: A pair of the list of table info dicts, sorted by name, and
+            the name of the next table after the page, or None if this is the
+            last page.
         """
-        return [self.get_short_table_info(project_id, dataset, table)
-                for table in sorted(self.get_table_names_for_dataset(dataset))]
+        table_names = self.tables_by_name.get_dataset_table_names_page(
+            dataset, first_table_name, max_results)
+        next_table_name = None
+        if max_results is not None and len(table_names) > max_results:
+            next_table_name = table_names.pop()
+        return ([self.get_short_table_info(project_id, dataset, table)
+                 for table in table_names],
+                next_table_name)
+
+    def create_dataset(self, project_id, dataset, info=None):
+        """Create an empty dataset and return the info for it.
+
+        Arguments:
+            project_id: The project to report in the dataset info.
+            dataset: The name of the new dataset.
+            info: A dict of extra dataset properties, like friendlyName and
+                description, to store with the dataset.
+        """
+        try:
+            with self.registry_lock:
+                self.tables_by_name.create_dataset(dataset, info)
+        except KeyError:
+            raise TinyQueryError('Dataset already exists: {}'.format(dataset))
+        return self.get_dataset_info(project_id, dataset)
+
+    def get_dataset_names(self):
+        """Returns the sorted names of all datasets."""
+        return list(self.tables_by_name.dataset_names)
+
+    def get_dataset_info_page(self, project_id, first_dataset_name=None,
+                              max_results=None):
+        """Gets "dataset info" dictionaries for a page of datasets.
+
+        Arguments:
+            project_id: The project to report in the dataset info.
+            first_dataset_name: If given, only datasets with this name or a
+                later one (in sorted order) are included.
+            max_results: The maximum number of datasets to include, or None
+                for no limit.
+
+        Returns: A pair of the list of dataset info dicts, sorted by name, and
+            the name of the next dataset after the page, or None if this is
+            the last page.
+        """
+        dataset_names = self.tables_by_name.get_dataset_names_page(
+            first_dataset_name, max_results)
+        next_dataset_name = None
+        if max_results is not None and len(dataset_names) > max_results:
+            next_dataset_name = dataset_names.pop()
+        return ([self.get_short_dataset_info(project_id, dataset)
+                 for dataset in dataset_names],
+                next_dataset_name)
+
+    def get_short_dataset_info(self, project_id, dataset):
+        """Returns the format from bq_service.datasets().list()."""
+        return {
+            'id': '{}:{}'.format(project_id, dataset),
+            'datasetReference': {
+                'projectId': project_id,
+                'datasetId': dataset
+            }
+        }
+
+    def get_dataset_info(self, project_id, dataset):
+        """Returns the format from bq_service.datasets().get()."""
+        # Will throw KeyError if the dataset doesn't exist.
+        dataset_obj = self.tables_by_name.datasets[dataset]
+        dataset_info = dict(dataset_obj.info)
+        dataset_info.update(self.get_short_dataset_info(project_id, dataset))
+        dataset_info['creationTime'] = str(dataset_obj.creation_time)
+        return dataset_info
+
+    def delete_dataset(self, dataset, delete_contents=False):
+        """Delete a dataset.
+
+        Unless delete_contents is true, the dataset must not have any tables.
+        Will throw KeyError if the dataset doesn't exist.
+        """
+        with self.registry_lock:
+            dataset_obj = self.tables_by_name.datasets[dataset]
+            if dataset_obj.table_names and not delete_contents:
+                raise TinyQueryError(
+                    'Dataset {} is still in use.'.format(dataset))
+            self.tables_by_name.delete_dataset(dataset)
 
     def get_short_table_info(self, project_id, dataset, table_name):
         """Returns the format from bq_service.tables().list()."""
@@ -96,14 +295,14 @@ class TinyQuery(object):
         # Will throw KeyError if the table doesn't exist.
         table = self.tables_by_name[dataset + '.' + table_name]
         schema_fields = []
-        for col_name, column in table.columns.iteritems():
+        for col_name, col_type in table.column_types.iteritems():
             schema_fields.append({
                 'name': col_name,
-                'type': column.type,
+                'type': col_type,
                 'mode': 'NULLABLE'
             })
 
-        return {
+        table_info = {
             'schema': {
                 'fields': schema_fields
             },
@@ -113,51 +312,312 @@ class TinyQuery(object):
                 'tableId': table_name
             }
         }
+        if isinstance(table, PartitionedTable):
+            table_info['timePartitioning'] = {
+                'type': 'DAY',
+                'field': table.partition_column
+            }
+        return table_info
+
+    def create_index(self, table_name, column_name, kind='hash'):
+        """Create a secondary index on a column of a table.
+
+        Arguments:
+            table_name: The full name of the table to index.
+            column_name: The name of the column to index.
+            kind: Either 'hash', for an index that supports equality and IN
+                lookups, or 'sorted', which also supports range lookups.
+
+        Returns: The new indexes.Index. Its get_stats() method reports the
+            time taken to build the index and how much memory it uses.
+        """
+        table = self.tables_by_name.get(table_name)
+        if not isinstance(table, Table):
+            raise TinyQueryError('Not a table: {}'.format(table_name))
+        if column_name not in table.column_types:
+            raise TinyQueryError('Column {} not found in table {}.'.format(
+                column_name, table_name))
+        if kind not in indexes.INDEX_CLASSES:
+            raise TinyQueryError('Unknown index kind: {}'.format(kind))
+        with table.lock.write_locked():
+            return table.create_index(column_name, kind)
 
     def get_table(self, dataset, table_name):
         """Returns the tinyquery.Table with the given dataset and name."""
         return self.tables_by_name[dataset + '.' + table_name]
 
     def delete_table(self, dataset, table_name):
-        del self.tables_by_name[dataset + '.' + table_name]
+        full_table_name = dataset + '.' + table_name
+        with self.registry_lock:
+            del self.tables_by_name[full_table_name]
+            self.insert_id_windows.pop(full_table_name, None)
+
+    def insert_rows(self, dataset, table_name, rows, skip_invalid_rows=False,
+                    ignore_unknown_values=False):
+        """Stream rows into a table, like tabledata().insertAll.
+
+        Every row is validated against the table schema before anything is
+        inserted, and then all accepted rows are converted to columns and
+        appended to the table at once.
+
+        Arguments:
+            dataset: The dataset of the table to insert into.
+            table_name: The short name of the table to insert into.
+            rows: A list of (insert_id, row) pairs, where row is a dict
+                mapping column name to value, and insert_id is None or a
+                string. A row with the same insert ID as a recent row in the
+                same table is silently dropped.
+            skip_invalid_rows: If true, insert the valid rows even if some
+                rows are invalid. Otherwise, no rows are inserted if any row
+                is invalid.
+            ignore_unknown_values: If true, ignore values for columns that
+                aren't in the schema rather than treating them as invalid.
+
+        Returns: A list of (row index, error message) pairs for the rows that
+            weren't inserted because of an error. Rows that are valid but
+            weren't inserted because another row was invalid have the
+            message None.
+        """
+        full_table_name = dataset + '.' + table_name
+        # Will throw KeyError if the table doesn't exist.
+        table = self.tables_by_name[full_table_name]
+        if not isinstance(table, Table):
+            raise TinyQueryError('Cannot insert into a view: {}'.format(
+                full_table_name))
+        columns = table.empty_columns()
+        errors = []
+        accepted_insert_ids = []
+        for row_index, (insert_id, row) in enumerate(rows):
+            try:
+                converted_row = self.convert_row(table.column_types, row,
+                                                 ignore_unknown_values)
+            except ValueError as e:
+                errors.append((row_index, str(e)))
+                continue
+            accepted_insert_ids.append(insert_id)
+            for column, value in zip(columns.itervalues(), converted_row):
+                column.values.append(value)
+        if errors and not skip_invalid_rows:
+            invalid_row_indexes = set(row_index for row_index, _ in errors)
+            return sorted(errors + [(row_index, None)
+                                    for row_index in xrange(len(rows))
+                                    if row_index not in invalid_row_indexes])
+
+        with table.lock.write_locked():
+            insert_id_window = self.insert_id_windows.setdefault(
+                full_table_name, InsertIdWindow())
+            new_row_nums = [
+                row_num
+                for row_num, insert_id in enumerate(accepted_insert_ids)
+                if insert_id_window.add(insert_id)]
+            if len(new_row_nums) < len(accepted_insert_ids):
+                columns = collections.OrderedDict(
+                    (col_name, context.Column(
+                        column.type, [column.values[i] for i in new_row_nums]))
+                    for col_name, column in columns.iteritems())
+            table.append_chunks(storage.chunks_from_columns(
+                len(new_row_nums), columns))
+        return errors
+
+    @staticmethod
+    def convert_row(column_types, row, ignore_unknown_values):
+        """Convert a JSON row from insertAll to a list of column values.
+
+        Raises: ValueError if the row doesn't match the schema.
+        """
+        if not isinstance(row, dict):
+            raise ValueError('Row must be a JSON object.')
+        if not ignore_unknown_values:
+            for col_name in row:
+                if col_name not in column_types:
+                    raise ValueError('No such field: {}.'.format(col_name))
+        result = []
+        for col_name, col_type in column_types.iteritems():
+            value = row.get(col_name)
+            try:
+                result.append(convert_json_value(col_type, value))
+            except (TypeError, ValueError):
+                raise ValueError('Invalid {} value for field {}: {!r}'.format(
+                    col_type, col_name, value))
+        return result
 
-    def evaluate_query(self, query):
-        select_ast = compiler.compile_text(query, self.tables_by_name)
-        select_evaluator = evaluator.Evaluator(self.tables_by_name)
-        return select_evaluator.evaluate_select(select_ast)
+    def evaluate_query(self, query, query_stats=None, memory_tracker=None):
+        """Run a query and return the resulting context.
+
+        An EXPLAIN query results in a single STRING column named plan, with
+        one row for each line of the plan. EXPLAIN ANALYZE also runs the
+        query, and includes the statistics of each operator in the plan.
+
+        Arguments:
+            query: The text of the query.
+            query_stats: If given, an explain.QueryStats to record the plan
+                of the query and the statistics of each operator in.
+            memory_tracker: If given, the memory.MemoryTracker to count the
+                memory used by the query with. By default, the query gets a
+                new tracker with a budget of max_query_bytes.
+        """
+        if memory_tracker is None:
+            memory_tracker = memory.MemoryTracker(self.max_query_bytes)
+        fingerprint = instrumentation.get_fingerprint(query)
+        with self.measure_stage(fingerprint, 'lex') as measurement:
+            tokens = lexer.lex_text(query)
+            measurement.size = len(tokens)
+        with self.measure_stage(fingerprint, 'parse') as measurement:
+            query_ast = parser.parse_tokens(tokens)
+            measurement.size = len(tokens)
+        if isinstance(query_ast, tq_ast.Explain):
+            explain_stats = explain.QueryStats()
+            explain_stats.set_instrumentation(self.instrumentation,
+                                              fingerprint)
+            self.evaluate_select(query_ast.select, explain_stats,
+                                 memory_tracker, run=query_ast.analyze)
+            lines = explain_stats.format_plan(query_ast.analyze).split('\n')
+            return context.Context(len(lines), collections.OrderedDict([
+                ((None, 'plan'), context.Column(tq_types.STRING, lines))
+            ]), None)
+        if query_stats is None:
+            query_stats = explain.QueryStats()
+        query_stats.set_instrumentation(self.instrumentation, fingerprint)
+        return self.evaluate_select(query_ast, query_stats, memory_tracker)
+
+    def measure_stage(self, fingerprint, stage):
+        """Send the instrumentation events for a stage of a query.
+
+        Returns: A context manager; see instrumentation.measure_stage.
+        """
+        return instrumentation.measure_stage(self.instrumentation,
+                                             fingerprint, stage)
+
+    def evaluate_select(self, select_ast, query_stats=None,
+                        memory_tracker=None, run=True):
+        """Compile and run a parsed select statement.
+
+        The query holds read locks on every table that it reads while it is
+        compiled and evaluated, so it sees a consistent snapshot of each of
+        them even if other threads are writing to them. The tables aren't
+        known until the query is compiled (views and table functions can read
+        any table), so we compile it once to find them, and then again once
+        they're locked, repeating if the set of tables has changed.
+
+        Arguments:
+            select_ast: A tq_ast.Select.
+            query_stats: If given, an explain.QueryStats to record the plan
+                of the query and the statistics of each operator in.
+            memory_tracker: If given, the memory.MemoryTracker to count the
+                memory used by the query with.
+            run: If False, the query is only compiled, and None is returned.
+
+        Returns: The resulting context.
+        """
+        if query_stats is None:
+            query_stats = explain.NullQueryStats()
+        table_names = set()
+        while True:
+            locked_tables = {name: self.tables_by_name.get(name)
+                             for name in table_names}
+            table_locks = [locked_tables[name].lock
+                           for name in sorted(table_names)
+                           if isinstance(locked_tables[name], Table)]
+            with locks.all_read_locked(table_locks):
+                with self.measure_stage(query_stats.fingerprint,
+                                        'compile') as measurement:
+                    compiled_select = compiler.Compiler(
+                        self.tables_by_name).compile_select(select_ast)
+                    needed_table_names = get_table_names(compiled_select)
+                    measurement.size = len(needed_table_names)
+                if needed_table_names <= table_names and all(
+                        self.tables_by_name.get(name) is table
+                        for name, table in locked_tables.iteritems()):
+                    query_stats.set_plan(compiled_select)
+                    if not run:
+                        return None
+                    select_evaluator = evaluator.Evaluator(
+                        locked_tables, self.num_query_workers, query_stats,
+                        memory_tracker)
+                    return select_evaluator.evaluate_select(compiled_select)
+            table_names |= needed_table_names
 
     def create_job(self, project_id, job_object):
-        """Create a job with the given status and return the info for it."""
-        job_id = 'job:%s' % self.next_job_num
-        self.next_job_num += 1
-        job_object.job_info['jobReference'] = {
-            'projectId': project_id,
-            'jobId': job_id
-        }
-        self.job_map[job_id] = job_object
-        return job_object.job_info
+        """Register a job and return the info for it."""
+        with self.job_lock:
+            job_id = 'job:%s' % self.next_job_num
+            self.next_job_num += 1
+            job_object.job_info['jobReference'] = {
+                'projectId': project_id,
+                'jobId': job_id
+            }
+            self.job_map[job_id] = job_object
+        return copy.deepcopy(job_object.job_info)
+
+    def start_job(self, project_id, job, run_func):
+        """Run a new job and return the info for it.
+
+        With a job pool, the job is queued in the PENDING state and run in the
+        background. Otherwise, it is run right away, and any error is raised
+        directly rather than being reported in the job status.
+
+        Arguments:
+            project_id: The project that the job belongs to.
+            job: A new Job object.
+            run_func: A function that does the work of the job. It takes the
+                job as its argument, and returns the query result Table for
+                query jobs, or None for other jobs.
+        """
+        if self.job_pool is None:
+            job.set_running()
+            job.set_done(run_func(job))
+            return self.create_job(project_id, job)
+        job_info = self.create_job(project_id, job)
+        self.job_pool.apply_async(self.run_job, (job, run_func))
+        return job_info
+
+    @staticmethod
+    def run_job(job, run_func):
+        """Run a PENDING job in a worker thread."""
+        if job.cancel_requested:
+            job.set_error('stopped', 'Job cancelled.')
+            return
+        job.set_running()
+        try:
+            result = run_func(job)
+        except Exception as e:
+            if job.cancel_requested:
+                job.set_error('stopped', 'Job cancelled.')
+            else:
+                # Only TinyQueryErrors know their BigQuery error reason.
+                job.set_error(getattr(e, 'reason', 'invalid'), str(e))
+        else:
+            job.set_done(result)
 
     def run_query_job(self, project_id, query, dest_dataset, dest_table_name,
                       create_disposition, write_disposition):
-        query_result_context = self.evaluate_query(query)
-        query_result_table = self.table_from_context('query_results',
-                                                     query_result_context)
+        def run(job):
+            query_stats = explain.QueryStats()
+            memory_tracker = memory.MemoryTracker(self.max_query_bytes)
+            query_result_context = self.evaluate_query(query, query_stats,
+                                                       memory_tracker)
+            job.set_query_statistics(
+                peakMemoryBytes=str(memory_tracker.peak_bytes))
+            if query_stats.plan is not None:
+                job.set_query_statistics(
+                    queryPlan=query_stats.get_query_plan())
+            query_result_table = self.table_from_context('query_results',
+                                                         query_result_context)
+            job.check_cancelled()
 
-        if dest_dataset is not None and dest_table_name is not None:
-            dest_full_table_name = dest_dataset + '.' + dest_table_name
-            self.copy_table(query_result_table, dest_full_table_name,
-                            create_disposition, write_disposition)
+            if dest_dataset is not None and dest_table_name is not None:
+                dest_full_table_name = dest_dataset + '.' + dest_table_name
+                self.copy_table(query_result_table, dest_full_table_name,
+                                create_disposition, write_disposition)
+            return query_result_table
 
-        return self.create_job(project_id, QueryJob({
-            'status': {
-                'state': 'DONE'
-            },
+        return self.start_job(project_id, QueryJob({
             'statistics': {
                 'query': {
                     'totalBytesProcessed': '0'
                 }
             }
-        }, query_result_table))
+        }, fingerprint=instrumentation.get_fingerprint(query)), run)
 
     @staticmethod
     def table_from_context(table_name, ctx):
@@ -172,77 +632,372 @@ class TinyQuery(object):
         # TODO: Handle errors in the same way as BigQuery.
         src_full_table_name = src_dataset + '.' + src_table_name
         dest_full_table_name = dest_dataset + '.' + dest_table_name
-        src_table = self.tables_by_name[src_full_table_name]
-        self.copy_table(src_table, dest_full_table_name, create_disposition,
-                        write_disposition)
-        return self.create_job(project_id, CopyJob({
-            'status': {
-                'state': 'DONE'
-            },
-        }))
+
+        def run(job):
+            src_table = self.tables_by_name[src_full_table_name]
+            self.copy_table(src_table, dest_full_table_name,
+                            create_disposition, write_disposition)
+
+        return self.start_job(project_id, CopyJob({}), run)
 
     def copy_table(self, src_table, dest_table_name, create_disposition,
                    write_disposition):
         """Write the given Table object to the destination table name."""
-        if dest_table_name not in self.tables_by_name:
-            if create_disposition == 'CREATE_NEVER':
-                raise TinyQueryError('CREATE_NEVER specified, but table did '
-                                     'not exist: {}'.format(dest_table_name))
-            self.load_empty_table_from_template(dest_table_name, src_table)
+        with self.registry_lock:
+            if dest_table_name not in self.tables_by_name:
+                if create_disposition == 'CREATE_NEVER':
+                    raise TinyQueryError(
+                        'CREATE_NEVER specified, but table did not exist: '
+                        '{}'.format(dest_table_name))
+                self.load_empty_table_from_template(dest_table_name,
+                                                    src_table)
+            dest_table = self.tables_by_name[dest_table_name]
+
+        # Chunks are immutable, so once we have the list of chunks, we don't
+        # need to hold the source lock while writing to the destination. This
+        # way, no thread ever holds two table locks at once.
+        with src_table.lock.read_locked():
+            src_chunks = src_table.chunks
 
         # TODO: Handle schema differences and raise errors with illegal schema
         # updates.
-        dest_table = self.tables_by_name[dest_table_name]
-        if dest_table.num_rows > 0:
-            if write_disposition == 'WRITE_EMPTY':
-                raise TinyQueryError(
-                    'WRITE_EMPTY was specified, but the table {} was not '
-                    'empty.'.format(dest_table_name))
-            if write_disposition == 'WRITE_TRUNCATE':
-                self.clear_table(dest_table)
-        self.append_to_table(src_table, dest_table)
+        with dest_table.lock.write_locked():
+            if dest_table.num_rows > 0:
+                if write_disposition == 'WRITE_EMPTY':
+                    raise TinyQueryError(
+                        'WRITE_EMPTY was specified, but the table {} was not '
+                        'empty.'.format(dest_table_name))
+                if write_disposition == 'WRITE_TRUNCATE':
+                    dest_table.clear()
+            dest_table.append_chunks(src_chunks)
 
     def load_empty_table_from_template(self, table_name, template_table):
-        columns = collections.OrderedDict(
-            (col_name, context.Column(col.type, []))
-            for col_name, col in template_table.columns.iteritems()
-        )
-        table = Table(table_name, 0, columns)
-        self.load_table_or_view(table)
+        # The new table gets the same indexes (and partitioning) as the
+        # template, and they are filled in as rows are copied over.
+        self.load_table_or_view(template_table.make_empty_copy(table_name))
 
-    @staticmethod
-    def clear_table(table):
-        table.num_rows = 0
-        for column in table.columns.itervalues():
-            column.values[:] = []
+    def get_job_info(self, job_id):
+        # Raise a KeyError if the job doesn't exist.
+        return copy.deepcopy(self.job_map[job_id].job_info)
 
-    @staticmethod
-    def append_to_table(src_table, dest_table):
-        dest_table.num_rows += src_table.num_rows
-        for col_name, column in dest_table.columns.iteritems():
-            if col_name in src_table.columns:
-                column.values.extend(src_table.columns[col_name].values)
-            else:
-                column.values.extend([None] * src_table.num_rows)
+    def wait_for_job(self, job_id, timeout):
+        """Wait up to timeout seconds for a job to finish.
 
-    def get_job_info(self, job_id):
-        # Raise a KeyError if the table doesn't exist.
-        return self.job_map[job_id].job_info
+        Returns: True if the job is DONE.
+        """
+        return self.job_map[job_id].done_event.wait(timeout)
+
+    def cancel_job(self, job_id):
+        """Request that a job be cancelled, and return the info for it.
+
+        A PENDING job is never run. A RUNNING query job stops before writing
+        to its destination table, if it hasn't already. Jobs that have
+        finished aren't affected.
+        """
+        self.job_map[job_id].cancel_requested = True
+        return self.get_job_info(job_id)
 
     def get_query_result_table(self, job_id):
         # TODO: Return an appropriate error if not a query job.
         return self.job_map[job_id].query_results
 
+    def get_query_fingerprint(self, job_id):
+        """Get the instrumentation fingerprint of a query job's query."""
+        return self.job_map[job_id].fingerprint
+
+
+def get_table_names(node):
+    """Find the names of the tables read by a compiled query.
+
+    Arguments:
+        node: A typed_ast node, or a list of them.
+
+    Returns: A set of full table names.
+    """
+    if isinstance(node, (typed_ast.Table, typed_ast.TablePartitions,
+                         typed_ast.IndexLookup)):
+        return {node.name}
+    result = set()
+    if isinstance(node, (tuple, list)):
+        for child in node:
+            result |= get_table_names(child)
+    return result
+
+
+def convert_json_value(col_type, value):
+    """Convert a JSON value for a column to the value stored in the table.
+
+    Numbers and booleans may be given either natively or as strings, as in
+    the BigQuery API.
+
+    Raises: ValueError or TypeError if the value isn't valid for the type.
+    """
+    if value is None:
+        return None
+    if col_type == tq_types.INT:
+        if isinstance(value, bool) or isinstance(value, float):
+            raise ValueError()
+        return int(value)
+    elif col_type == tq_types.FLOAT:
+        if isinstance(value, bool):
+            raise ValueError()
+        return float(value)
+    elif col_type == tq_types.BOOL:
+        if isinstance(value, bool):
+            return value
+        if isinstance(value, basestring) and value.lower() in ('true',
+                                                               'false'):
+            return value.lower() == 'true'
+        raise ValueError()
+    elif col_type == tq_types.STRING:
+        if not isinstance(value, basestring):
+            raise ValueError()
+        return value
+    else:
+        return value
+
+
+class InsertIdWindow(object):
+    """The insert IDs of the most recent rows streamed into a table.
+
+    BigQuery deduplicates streamed rows by insert ID on a best-effort basis
+    for a short time. We emulate that by remembering a bounded number of the
+    most recent insert IDs.
+    """
+    def __init__(self, max_size=None):
+        self.max_size = max_size or INSERT_ID_WINDOW_SIZE
+        self.insert_ids = collections.OrderedDict()
+
+    def add(self, insert_id):
+        """Record an insert ID.
+
+        Returns: False if the ID is already in the window, True otherwise.
+            Rows without an insert ID are never duplicates.
+        """
+        if insert_id is None:
+            return True
+        if insert_id in self.insert_ids:
+            return False
+        self.insert_ids[insert_id] = None
+        if len(self.insert_ids) > self.max_size:
+            self.insert_ids.popitem(last=False)
+        return True
+
+
+class TablesByName(dict):
+    """A dict mapping full table name to Table or View.
+
+    This is the registry of every table, and also of the datasets that hold
+    them. Each dataset keeps a sorted list of its table names, so that the
+    tables in a dataset can be listed, and searched by name prefix or name
+    range, without scanning every table.
+
+    Full table names have the form dataset.table. Tables without a dataset
+    in their name are still stored, but aren't part of any dataset. Adding a
+    table to a dataset that doesn't exist yet creates the dataset.
+
+    Fields:
+        datasets: A dict mapping dataset name to Dataset.
+        dataset_names: A sorted list of the dataset names.
+    """
+    def __init__(self, tables_by_name=None):
+        super(TablesByName, self).__init__()
+        self.datasets = {}
+        self.dataset_names = []
+        for full_name, table in (tables_by_name or {}).iteritems():
+            self[full_name] = table
+
+    @staticmethod
+    def split_name(full_name):
+        """Split a full table name into (dataset, table), if possible.
+
+        Returns: A (dataset, table_name) pair, or None if the name doesn't
+            include a dataset.
+        """
+        if '.' not in full_name:
+            return None
+        return tuple(full_name.split('.', 1))
+
+    def __setitem__(self, full_name, table):
+        if full_name not in self:
+            split_name = self.split_name(full_name)
+            if split_name is not None:
+                dataset, table_name = split_name
+                self.get_or_create_dataset(dataset).add_table_name(table_name)
+        super(TablesByName, self).__setitem__(full_name, table)
+
+    def __delitem__(self, full_name):
+        super(TablesByName, self).__delitem__(full_name)
+        split_name = self.split_name(full_name)
+        if split_name is not None:
+            dataset, table_name = split_name
+            self.datasets[dataset].remove_table_name(table_name)
+
+    def create_dataset(self, dataset, info=None):
+        """Add a new empty dataset and return it.
+
+        Raises: KeyError if the dataset already exists.
+        """
+        if dataset in self.datasets:
+            raise KeyError(dataset)
+        result = Dataset(dataset, info)
+        self.datasets[dataset] = result
+        bisect.insort(self.dataset_names, dataset)
+        return result
+
+    def get_or_create_dataset(self, dataset):
+        result = self.datasets.get(dataset)
+        if result is None:
+            result = self.create_dataset(dataset)
+        return result
+
+    def delete_dataset(self, dataset):
+        """Remove a dataset along with all of its tables.
+
+        Raises: KeyError if the dataset doesn't exist.
+        """
+        for table_name in self.datasets[dataset].table_names:
+            super(TablesByName, self).__delitem__(dataset + '.' + table_name)
+        del self.datasets[dataset]
+        del self.dataset_names[bisect.bisect_left(self.dataset_names,
+                                                  dataset)]
+
+    def get_dataset_names_page(self, first_name, max_results):
+        """Returns the sorted dataset names starting at first_name.
+
+        One more than max_results names are returned (if there are that many),
+        so that the caller can tell where the next page starts.
+        """
+        return get_names_page(self.dataset_names, first_name, max_results)
+
+    def get_dataset_table_names(self, dataset):
+        """Returns a sorted list of the short table names in a dataset."""
+        if dataset not in self.datasets:
+            return []
+        return list(self.datasets[dataset].table_names)
+
+    def get_dataset_num_tables(self, dataset):
+        if dataset not in self.datasets:
+            return 0
+        return self.datasets[dataset].num_tables
+
+    def get_dataset_table_names_in_range(self, dataset, first_name,
+                                         last_name):
+        """Returns the sorted short table names in an inclusive name range.
+
+        This takes O(log n + k) time, where k is the number of results.
+        """
+        if dataset not in self.datasets:
+            return []
+        return self.datasets[dataset].get_table_names_in_range(first_name,
+                                                               last_name)
+
+    def get_dataset_table_names_page(self, dataset, first_name, max_results):
+        """Returns the sorted short table names starting at first_name.
+
+        One more than max_results names are returned (if there are that many),
+        so that the caller can tell where the next page starts.
+        """
+        if dataset not in self.datasets:
+            return []
+        return self.datasets[dataset].get_table_names_page(first_name,
+                                                           max_results)
+
+    def get_dataset_table_names_with_prefix(self, dataset, prefix):
+        """Returns the sorted short table names that start with a prefix."""
+        if dataset not in self.datasets:
+            return []
+        return self.datasets[dataset].get_table_names_with_prefix(prefix)
+
+
+def get_names_page(sorted_names, first_name, max_results):
+    """Get a page of a sorted list of names, starting at first_name.
+
+    Arguments:
+        sorted_names: A sorted list of names.
+        first_name: The first name to include, or the name that would come
+            after it if it's not in the list. If None, the page starts at the
+            beginning of the list.
+        max_results: The number of names in a page, or None for no limit.
+
+    Returns: A list of up to max_results + 1 names, where the extra name is
+        the start of the next page.
+    """
+    start = 0
+    if first_name is not None:
+        start = bisect.bisect_left(sorted_names, first_name)
+    if max_results is None:
+        return sorted_names[start:]
+    return sorted_names[start:start + max_results + 1]
+
+
+class Dataset(object):
+    """Information about a dataset, which is a named group of tables.
+
+    The tables themselves are stored in TablesByName; a dataset only tracks
+    the names of its tables, in sorted order.
+
+    Fields:
+        name: The name of the dataset.
+        info: A dict of extra dataset properties given when the dataset was
+            created, like friendlyName and description.
+        creation_time: The creation time, in milliseconds since the epoch.
+        table_names: A sorted list of the short names of the tables in the
+            dataset.
+    """
+    def __init__(self, name, info=None):
+        self.name = name
+        self.info = info or {}
+        self.creation_time = int(time.time() * 1000)
+        self.table_names = []
+
+    @property
+    def num_tables(self):
+        return len(self.table_names)
+
+    def add_table_name(self, table_name):
+        bisect.insort(self.table_names, table_name)
+
+    def remove_table_name(self, table_name):
+        del self.table_names[bisect.bisect_left(self.table_names, table_name)]
+
+    def get_table_names_in_range(self, first_name, last_name):
+        return self.table_names[
+            bisect.bisect_left(self.table_names, first_name):
+            bisect.bisect_right(self.table_names, last_name)]
+
+    def get_table_names_page(self, first_name, max_results):
+        return get_names_page(self.table_names, first_name, max_results)
+
+    def get_table_names_with_prefix(self, prefix):
+        start = bisect.bisect_left(self.table_names, prefix)
+        end = start
+        while (end < len(self.table_names) and
+               self.table_names[end].startswith(prefix)):
+            end += 1
+        return self.table_names[start:end]
+
 
 class Table(object):
     """Information containing metadata and contents of a table.
 
+    The table contents are stored as a list of immutable chunks (see
+    storage.py). Modifying the table replaces the list of chunks rather than
+    changing any existing chunk, so chunks can be freely shared between tables
+    and with any code reading from the table.
+
     Fields:
         name: The name of the table.
         num_rows: The number of rows in the table.
-        columns: An OrderedDict mapping column name to Column. Note that unlike
-            in Context objects, the column name is just a string and does not
-            include a table component.
+        column_types: An OrderedDict mapping column name to type. Note that
+            unlike in Context objects, the column name is just a string and
+            does not include a table component.
+        chunks: A list of storage.Chunk objects holding the rows of the table,
+            in order. Every chunk has exactly the columns in column_types.
+        indexes: A dict mapping column name to the indexes.Index on that
+            column, for columns that have an index.
+        lock: A locks.ReadWriteLock to hold while reading or changing the
+            table when it may be shared between threads.
     """
     def __init__(self, name, num_rows, columns):
         assert isinstance(columns, collections.OrderedDict)
@@ -252,14 +1007,179 @@ class Table(object):
                 'Column %s had %s rows, expected %s.' % (
                     col_name, len(column.values), num_rows))
         self.name = name
-        self.num_rows = num_rows
-        self.columns = columns
+        self.column_types = collections.OrderedDict(
+            (col_name, column.type)
+            for col_name, column in columns.iteritems())
+        self.indexes = {}
+        self.lock = locks.ReadWriteLock()
+        self.clear()
+        self.append_chunks(storage.chunks_from_columns(num_rows, columns))
+
+    @property
+    def columns(self):
+        """An OrderedDict mapping column name to a Column with every value.
+
+        This needs to concatenate all chunks when there is more than one, so
+        code that can work a chunk at a time should use the chunks directly.
+        The returned columns must not be modified.
+        """
+        return storage.columns_from_chunks(self.column_types, self.chunks)
+
+    def append_chunks(self, chunks):
+        """Add the rows from the given chunks to the end of this table.
+
+        Columns that this table has but the chunks don't are filled in with
+        nulls, and extra columns in the chunks are ignored.
+        """
+        new_chunks = [storage.project_chunk(chunk, self.column_types)
+                      for chunk in chunks]
+        self.chunks = storage.append_chunks(self.chunks, new_chunks)
+        self.num_rows += sum(chunk.num_rows for chunk in new_chunks)
+        for index in self.indexes.itervalues():
+            index.add_chunks(new_chunks)
+
+    def clear(self):
+        """Remove all rows from this table."""
+        self.chunks = []
+        self.num_rows = 0
+        for index in self.indexes.itervalues():
+            index.clear()
+
+    def create_index(self, column_name, kind):
+        """Build an index of the given kind and keep it up to date."""
+        index = indexes.INDEX_CLASSES[kind](column_name, self.chunks)
+        self.indexes[column_name] = index
+        return index
+
+    def make_empty_copy(self, name):
+        """Create an empty table with the same schema and indexes."""
+        table = Table(name, 0, self.empty_columns())
+        for column_name, index in self.indexes.iteritems():
+            table.create_index(column_name, index.kind)
+        return table
+
+    def empty_columns(self):
+        return collections.OrderedDict(
+            (col_name, context.Column(col_type, []))
+            for col_name, col_type in self.column_types.iteritems())
+
+    def take_rows(self, row_nums):
+        """Return columns with just the rows with the given sorted numbers."""
+        return storage.take_rows(self.column_types, self.chunks, row_nums)
+
+    def slice_rows(self, start, end):
+        """Return columns with just the rows in the range [start, end)."""
+        return storage.slice_rows(self.column_types, self.chunks, start, end)
 
     def __repr__(self):
         return 'Table({}, {}, {})'.format(self.name, self.num_rows,
                                           self.columns)
 
 
+class PartitionedTable(Table):
+    """A table whose rows are split into partitions by a partition column.
+
+    Every row is stored in the partition for its value of the partition
+    column, and queries only read the partitions that they need. A single
+    partition can be selected with a decorator on the table name, like
+    [dataset.table$20160101], and the compiler prunes partitions that can't
+    match the WHERE clause of a query.
+
+    The chunks of the table are the chunks of every partition, in partition
+    order, so row numbers change as rows are added to earlier partitions.
+    Indexes are therefore kept for each partition separately (see
+    indexes.PartitionedIndex), so that an append only indexes the new rows.
+
+    Fields:
+        partition_column: The name of the column to partition by.
+        partitions: A dict mapping each partition key (a value of the
+            partition column) to the list of chunks in that partition.
+        partition_keys: A sorted list of the partition keys.
+    """
+    def __init__(self, name, num_rows, columns, partition_column):
+        assert partition_column in columns, (
+            'Partition column %s is not in the table.' % partition_column)
+        self.partition_column = partition_column
+        super(PartitionedTable, self).__init__(name, num_rows, columns)
+
+    @property
+    def chunks(self):
+        return self.get_partition_chunks(self.partition_keys)
+
+    def get_partition_chunks(self, partition_keys):
+        """Get the chunks for the given partitions, skipping unknown keys."""
+        return [chunk
+                for key in partition_keys
+                for chunk in self.partitions.get(key, [])]
+
+    def get_decorator_partition_keys(self, decorator):
+        """Find the partition keys selected by a table decorator string.
+
+        Returns: A list with the matching partition key, or an empty list if
+            there's no partition for the decorator.
+        """
+        return [key for key in self.partition_keys
+                if self.format_partition_key(key) == decorator]
+
+    @staticmethod
+    def format_partition_key(key):
+        return '__NULL__' if key is None else str(key)
+
+    def append_chunks(self, chunks):
+        """Add the rows from the given chunks to their partitions."""
+        new_chunks_by_key = collections.defaultdict(list)
+        for chunk in chunks:
+            chunk = storage.project_chunk(chunk, self.column_types)
+            for key, partition_chunk in self.split_chunk(chunk):
+                new_chunks_by_key[key].append(partition_chunk)
+        for key, new_chunks in new_chunks_by_key.iteritems():
+            if key not in self.partitions:
+                bisect.insort(self.partition_keys, key)
+            self.partitions[key] = storage.append_chunks(
+                self.partitions.get(key, []), new_chunks)
+            self.num_rows += sum(chunk.num_rows for chunk in new_chunks)
+            for index in self.indexes.itervalues():
+                index.add_partition_chunks(key, new_chunks)
+
+    def split_chunk(self, chunk):
+        """Split a chunk into (partition key, chunk) pairs."""
+        stats = chunk.stats[self.partition_column]
+        if stats.null_count == chunk.num_rows:
+            return [(None, chunk)]
+        if stats.null_count == 0 and stats.min == stats.max:
+            # The common case: all rows go in the same partition, so there's
+            # no need to copy anything.
+            return [(stats.min, chunk)]
+        row_nums_by_key = collections.defaultdict(list)
+        partition_values = chunk.columns[self.partition_column].values
+        for row_num, key in enumerate(partition_values):
+            row_nums_by_key[key].append(row_num)
+        return [
+            (key, storage.Chunk(len(row_nums), storage.take_rows(
+                self.column_types, [chunk], row_nums)))
+            for key, row_nums in row_nums_by_key.iteritems()]
+
+    def clear(self):
+        self.partitions = {}
+        self.partition_keys = []
+        self.num_rows = 0
+        for index in self.indexes.itervalues():
+            index.clear()
+
+    def create_index(self, column_name, kind):
+        index = indexes.PartitionedIndex(
+            column_name, indexes.INDEX_CLASSES[kind], self.partitions)
+        self.indexes[column_name] = index
+        return index
+
+    def make_empty_copy(self, name):
+        table = PartitionedTable(name, 0, self.empty_columns(),
+                                 self.partition_column)
+        for column_name, index in self.indexes.iteritems():
+            table.create_index(column_name, index.kind)
+        return table
+
+
 class View(object):
     """Information about a view (a virtual table defined by a query).
 
@@ -272,10 +1192,87 @@ class View(object):
         self.query = query
 
 
-class QueryJob(collections.namedtuple('QueryJob', ['job_info',
-                                                   'query_results'])):
-    pass
+class Job(object):
+    """Information about a query or copy job.
+
+    The job info dict is replaced rather than modified whenever the job
+    changes state, so readers never see a partially-updated dict.
+
+    Fields:
+        job_info: A dict in the format returned by bq_service.jobs().get().
+        done_event: A threading.Event that is set when the job is DONE.
+        cancel_requested: True if the job has been asked to stop.
+    """
+    def __init__(self, job_info):
+        self.done_event = threading.Event()
+        self.cancel_requested = False
+        job_info = dict(job_info)
+        job_info['status'] = {'state': 'PENDING'}
+        statistics = dict(job_info.get('statistics', {}))
+        statistics['creationTime'] = self.current_time_millis()
+        job_info['statistics'] = statistics
+        self.job_info = job_info
+
+    @staticmethod
+    def current_time_millis():
+        return str(int(time.time() * 1000))
+
+    def update_job_info(self, status, **statistics):
+        job_info = dict(self.job_info)
+        job_info['status'] = status
+        job_info['statistics'] = dict(job_info['statistics'], **statistics)
+        self.job_info = job_info
+
+    def set_running(self):
+        self.update_job_info({'state': 'RUNNING'},
+                             startTime=self.current_time_millis())
+
+    def set_done(self, result):
+        self.update_job_info({'state': 'DONE'},
+                             endTime=self.current_time_millis())
+        self.done_event.set()
+
+    def set_error(self, reason, message):
+        error_result = {'reason': reason, 'message': message}
+        self.update_job_info({
+            'state': 'DONE',
+            'errorResult': error_result,
+            'errors': [error_result]
+        }, endTime=self.current_time_millis())
+        self.done_event.set()
+
+    def check_cancelled(self):
+        """Raise an error if the job has been asked to stop."""
+        if self.cancel_requested:
+            raise TinyQueryError('Job cancelled.')
+
+
+class QueryJob(Job):
+    """A query job.
+
+    Fields:
+        query_results: The Table of query results once the job is done, or
+            None before then.
+        fingerprint: The instrumentation fingerprint of the query.
+    """
+    def __init__(self, job_info, query_results=None, fingerprint=None):
+        super(QueryJob, self).__init__(job_info)
+        self.query_results = query_results
+        self.fingerprint = fingerprint
+
+    def set_query_statistics(self, **query_statistics):
+        """Add to the query statistics, in statistics.query."""
+        job_info = dict(self.job_info)
+        statistics = dict(job_info['statistics'])
+        statistics['query'] = dict(statistics.get('query', {}),
+                                   **query_statistics)
+        job_info['statistics'] = statistics
+        self.job_info = job_info
+
+    def set_done(self, result):
+        self.query_results = result
+        super(QueryJob, self).set_done(result)
 
 
-class CopyJob(collections.namedtuple('CopyJob', ['job_info'])):
+class CopyJob(Job):
     pass
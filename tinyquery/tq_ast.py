@@ -9,7 +9,7 @@ import collections
 
 class Select(collections.namedtuple(
         'Select', ['select_fields', 'table_expr', 'where_expr', 'groups',
-                   'orderings', 'limit', 'alias'])):
+                   'is_group_each', 'orderings', 'limit', 'alias'])):
     """Represents a top-level select statement.
 
     Fields:
@@ -20,6 +20,8 @@ class Select(collections.namedtuple(
             no WHERE filter.
         groups: A list of strings for fields to group by, or None if there is
             no GROUP BY clause.
+        is_group_each: True if the clause was GROUP EACH BY, which asks for
+            the groups to be built in partitions that can spill to disk.
         orderings: A list of Ordering instances, or None if there was no
             ORDER BY clause.
         limit: An integer limit
@@ -34,7 +36,8 @@ class Select(collections.namedtuple(
         if self.where_expr:
             result += ' WHERE {}'.format(self.where_expr)
         if self.groups:
-            result += ' GROUP BY {}'.format(
+            result += ' GROUP {}BY {}'.format(
+                'EACH ' if self.is_group_each else '',
                 ', '.join(str(group) for group in self.groups))
         if self.orderings:
             result += ' ORDER BY {}'.format(
@@ -44,6 +47,19 @@ class Select(collections.namedtuple(
         return result
 
 
+class Explain(collections.namedtuple('Explain', ['select', 'analyze'])):
+    """Represents an EXPLAIN statement.
+
+    Fields:
+        select: The Select statement to explain.
+        analyze: True for EXPLAIN ANALYZE, which also runs the query to
+            measure each part of it.
+    """
+    def __str__(self):
+        return 'EXPLAIN {}{}'.format('ANALYZE ' if self.analyze else '',
+                                     self.select)
+
+
 class SelectField(collections.namedtuple('SelectField', ['expr', 'alias'])):
     def __str__(self):
         if self.alias is not None:
@@ -105,6 +121,20 @@ class TableId(collections.namedtuple('TableId', ['name', 'alias'])):
         return self.name
 
 
+class TableFunction(collections.namedtuple('TableFunction',
+                                           ['name', 'args', 'alias'])):
+    """Table expression for a table wildcard function.
+
+    Fields:
+        name: The lower-case name of the function, like 'table_date_range'.
+        args: A list of expressions for the function arguments.
+        alias: An alias to use for the resulting table, or None.
+    """
+    def __str__(self):
+        return '{}({})'.format(self.name.upper(),
+                               ', '.join(str(arg) for arg in self.args))
+
+
 class TableUnion(collections.namedtuple('TableUnion', ['tables'])):
     """Table expression for a union of tables (the comma operator).
 
@@ -115,18 +145,17 @@ class TableUnion(collections.namedtuple('TableUnion', ['tables'])):
 
 
 class Join(collections.namedtuple('Join', ['table1', 'table2', 'condition',
-                                           'is_left_outer'])):
+                                           'is_left_outer', 'is_each'])):
     """Table expression for a join of two tables.
 
-    Joining more than two tables currently isn't supported.
+    Joining more than two tables currently isn't supported. The is_each field
+    is True for JOIN EACH, which asks for the join to be done in partitions
+    that can spill to disk.
     """
     def __str__(self):
-        if self.is_left_outer:
-            return '{} LEFT OUTER JOIN {} ON {}'.format(
-                self.table1, self.table2, self.condition)
-        else:
-            return '{} JOIN {} ON {}'.format(
-                self.table1, self.table2, self.condition)
+        return '{} {}JOIN {}{} ON {}'.format(
+            self.table1, 'LEFT OUTER ' if self.is_left_outer else '',
+            'EACH ' if self.is_each else '', self.table2, self.condition)
 
 
 class CrossJoin(collections.namedtuple('CrossJoin', ['table1', 'table2'])):
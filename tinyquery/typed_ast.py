@@ -38,7 +38,7 @@ class SelectField(collections.namedtuple('SelectField', ['expr', 'alias'])):
 
 
 class GroupSet(collections.namedtuple(
-        'GroupSet', ['alias_groups', 'field_groups'])):
+        'GroupSet', ['alias_groups', 'field_groups', 'is_each'])):
     """Information about the groups to use for a query.
 
     Fields:
@@ -47,6 +47,8 @@ class GroupSet(collections.namedtuple(
             compiled and evaluated differently from normal select fields.
         field_groups: A list of ColumnRefs referencing columns in the table
             expression of the SELECT statement.
+        is_each: True for GROUP EACH BY, which always builds the groups one
+            partition at a time, spilling the partitions to disk.
     """
 
 
@@ -55,7 +57,7 @@ class GroupSet(collections.namedtuple(
 # used, but no GROUP BY groups are specified explicitly). It's almost enough to
 # just omit all alias and field groups, but we also need to make sure that we
 # include the group even if there are no rows in the table being selected.
-TRIVIAL_GROUP_SET = GroupSet(set(), [])
+TRIVIAL_GROUP_SET = GroupSet(set(), [], False)
 
 
 class TableExpression(object):
@@ -77,14 +79,51 @@ class Table(collections.namedtuple('Table', ['name', 'type_ctx']),
         return Table(self.name, type_ctx)
 
 
+class TablePartitions(collections.namedtuple(
+        'TablePartitions', ['name', 'partition_keys', 'type_ctx']),
+        TableExpression):
+    """Table expression for some of the partitions of a partitioned table.
+
+    Fields:
+        name: The name of the tinyquery.PartitionedTable.
+        partition_keys: A tuple of the partition keys to read, in order.
+        type_ctx: The type context for the table, as in Table.
+    """
+    def with_type_ctx(self, type_ctx):
+        return TablePartitions(self.name, self.partition_keys, type_ctx)
+
+
+class IndexLookup(collections.namedtuple(
+        'IndexLookup', ['name', 'column', 'operator', 'values', 'type_ctx']),
+        TableExpression):
+    """Table expression for the rows of a table found using an index.
+
+    The compiler uses this in place of a Table when the WHERE clause has a
+    predicate that an index on the table can answer. The WHERE clause is still
+    applied to the result, so the lookup only needs to narrow down the rows.
+
+    Fields:
+        name: The name of the table.
+        column: The name of the indexed column within the table.
+        operator: The predicate operator to look up, as in
+            predicates.ColumnPredicate.
+        values: A tuple of the constants used by the operator.
+        type_ctx: The type context for the table, as in Table.
+    """
+    def with_type_ctx(self, type_ctx):
+        return IndexLookup(self.name, self.column, self.operator, self.values,
+                           type_ctx)
+
+
 class TableUnion(collections.namedtuple('TableUnion', ['tables', 'type_ctx']),
                  TableExpression):
-    pass
+    def with_type_ctx(self, type_ctx):
+        return TableUnion(self.tables, type_ctx)
 
 
 class Join(collections.namedtuple('Join', ['table1', 'table2',
                                            'conditions', 'is_left_outer',
-                                           'type_ctx']),
+                                           'is_each', 'type_ctx']),
            TableExpression):
     """Table expression for a join operation.
 
@@ -94,6 +133,8 @@ class Join(collections.namedtuple('Join', ['table1', 'table2',
         conditions: A list of JoinFields objects, each of which specifies a
             field from table1 joined on a field from table2.
         is_left_outer: A boolean for whether or not this is a left outer join.
+        is_each: True for JOIN EACH, which always joins the tables one
+            partition at a time, spilling the partitions to disk.
         type_ctx: The resulting type context.
     """
 